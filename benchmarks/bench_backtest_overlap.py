@@ -0,0 +1,74 @@
+"""
+RollingBacktester stress test: 100k overlapping signals with a long horizon,
+so tens of thousands of positions are open at once and bursts mature together.
+Per-snapshot cost should track the number matured, not the number open.
+Usage:
+    python benchmarks/bench_backtest_overlap.py --signals 100000 --horizon-seconds 600
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from moa.backtest import RollingBacktester, backtest_signals
+from moa.schemas import Signal
+
+class _MidPoint(NamedTuple):
+    ts: float
+    mid: float
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--signals", type=int, default=100_000)
+    p.add_argument("--snapshots-per-signal", type=int, default=2)
+    p.add_argument("--horizon-seconds", type=float, default=600.0)
+    p.add_argument("--exit-on-opposite-signal", action="store_true")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(13)
+    n = args.signals * args.snapshots_per_signal
+    # bursty arrivals: clusters of near-zero gaps between quiet stretches
+    gaps = np.where(rng.random(n) < 0.9, rng.exponential(0.005, n), rng.exponential(0.5, n))
+    ts = 1.7e9 + np.cumsum(gaps)
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, n))
+    direction = np.zeros(n, dtype=np.int8)
+    picks = rng.choice(n, args.signals, replace=False)
+    direction[picks] = rng.choice(np.array([1, -1], dtype=np.int8), args.signals)
+
+    bt = RollingBacktester(horizon_seconds=args.horizon_seconds, exit_on_opposite_signal=args.exit_on_opposite_signal)
+    lat = np.empty(n)
+    matured = np.empty(n, dtype=np.int64)
+    max_open = 0
+    clock = time.perf_counter_ns
+    t_all = time.perf_counter()
+    for i in range(n):
+        snap = _MidPoint(float(ts[i]), float(mid[i]))
+        t0 = clock()
+        if direction[i]:
+            kind = "BUY_PRESSURE" if direction[i] > 0 else "SELL_PRESSURE"
+            bt.on_signal(snap, Signal(ts=snap.ts, kind=kind, strength=1.0))
+        matured[i] = len(bt.on_snapshot(snap))
+        lat[i] = clock() - t0
+        max_open = max(max_open, bt.open_positions)
+    dt_all = time.perf_counter() - t_all
+
+    _, summary = backtest_signals(ts, mid, direction, horizon_seconds=args.horizon_seconds,
+                                  exit_on_opposite_signal=args.exit_on_opposite_signal)
+    assert summary == bt.summary(), "streaming and array backtests disagree"
+
+    lat /= 1e3
+    idle = lat[matured == 0]
+    busy = matured > 0
+    print(f"snapshots={n:,} signals={args.signals:,} max_open={max_open:,} trades={summary['trades']:,}")
+    print(f"total {dt_all:.2f}s  largest burst matured in one snapshot: {matured.max():,}")
+    print(f"no maturation : p50 {np.percentile(idle, 50):7.2f} us  p99 {np.percentile(idle, 99):7.2f} us")
+    if busy.any():
+        per = lat[busy] / matured[busy]
+        print(f"per matured   : p50 {np.percentile(per, 50):7.2f} us  p99 {np.percentile(per, 99):7.2f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Work saved by conflation on captures and synthetic books. Every setting
+replays the same snapshots through features, signals and the backtester, and
+reports:
+- the share of snapshots forwarded
+- loop time per received snapshot, and speedup over no conflation
+- signals and trades
+
+Each setting also checks that:
+- update_rate at every forwarded snapshot equals the unconflated stream's
+- the streaming Conflator keeps the same rows as conflate_index
+Synthetic "quiet" books change only a few sizes per update
+(SyntheticBook.p_size_update), as on less liquid symbols.
+Usage:
+    python benchmarks/bench_conflation.py --files data/samples/sample_orderbook.jsonl data/raw/btcusdt.jsonl
+    python benchmarks/bench_conflation.py --rows 200000 --bucket-ms 50 100
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from moa.backtest import RollingBacktester
+from moa.conflate import Conflator, conflate_index
+from moa.features import FeatureEngine
+from moa.ingest import ReplayIngestor
+from moa.jit import warm_up
+from moa.schemas import BookSnapshot
+from moa.signals import ThresholdSignalEngine
+from moa.synthetic import SyntheticBook
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--files", nargs="*", default=["data/samples/sample_orderbook.jsonl"])
+    p.add_argument("--rows", type=int, default=200_000, help="synthetic rows per profile (0: skip)")
+    p.add_argument("--levels", type=int, default=5, help="levels compared and used by the features")
+    p.add_argument("--bucket-ms", type=float, nargs="+", default=[50.0])
+    p.add_argument("--min-update-rate", type=float, default=2.0)
+    p.add_argument("--repeat", type=int, default=3, help="best-of for the loop time")
+    return p.parse_args()
+
+SYNTHETIC = {
+    "synthetic busy": dict(levels=10),
+    "synthetic quiet": dict(levels=10, p_size_update=0.05, p_move=0.02, burst_p_move=0.06),
+}
+
+def run_once(snaps: List[BookSnapshot], conf: Optional[Conflator], levels: int,
+             min_rate: float) -> Tuple[float, Dict[int, float], dict, List[int]]:
+    fe = FeatureEngine(depth_levels=levels)
+    se = ThresholdSignalEngine(min_update_rate=min_rate)
+    bt = RollingBacktester(tick_size=0.1)
+    rates: Dict[int, float] = {}  # keyed by id(snapshot): the same objects are replayed in every run
+    kept: List[int] = []
+    stream = conf.iter(snaps) if conf is not None else ((s, ()) for s in snaps)
+    t0 = time.perf_counter()
+    for snap, skipped in stream:
+        if skipped:
+            fe.skip(skipped)
+        fv = fe.push(snap)
+        sig = se.evaluate(fv)
+        if sig:
+            bt.on_signal(snap, sig)
+        bt.on_snapshot(snap)
+        rates[id(snap)] = fv.update_rate
+        kept.append(id(snap))
+    return time.perf_counter() - t0, rates, bt.summary(), kept
+
+def run(snaps: List[BookSnapshot], make_conf, args) -> Tuple[float, Dict[int, float], dict, List[int], Optional[Conflator]]:
+    best = None
+    for _ in range(max(args.repeat, 1)):
+        conf = make_conf()
+        out = run_once(snaps, conf, args.levels, args.min_update_rate)
+        if best is None or out[0] < best[0]:
+            best = out + (conf,)
+    return best
+
+def report(name: str, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray, snaps: List[BookSnapshot], args) -> None:
+    n = len(snaps)
+    row = {id(s): i for i, s in enumerate(snaps)}
+    print(f"\n{name}: {n:,} snapshots")
+    print(f"{'setting':<22} {'forwarded':>10} {'us/snap':>9} {'speedup':>8} {'signals':>8} {'trades':>7}")
+    base_s, base_rates, summary, _, _ = run(snaps, lambda: None, args)
+    print(f"{'none':<22} {1.0:>10.1%} {base_s / n * 1e6:>9.2f} {1.0:>7.2f}x "
+          f"{summary['buy_signals'] + summary['sell_signals']:>8} {summary['trades']:>7}")
+    settings = [("dedupe", dict(dedupe=True))]
+    settings += [(f"bucket {b:g}ms", dict(dedupe=False, bucket_ms=b)) for b in args.bucket_ms]
+    settings += [(f"dedupe + bucket {b:g}ms", dict(dedupe=True, bucket_ms=b)) for b in args.bucket_ms]
+    for label, kw in settings:
+        dt, rates, summary, kept, conf = run(snaps, lambda: Conflator(levels=args.levels, **kw), args)
+        assert all(rates[k] == base_rates[k] for k in kept), f"{name} {label}: update_rate differs"
+        idx = conflate_index(ts, bids, asks, args.levels, **kw)
+        assert np.array_equal(idx, [row[k] for k in kept]), f"{name} {label}: conflate_index differs"
+        print(f"{label:<22} {conf.stats.forwarded / n:>10.1%} {dt / n * 1e6:>9.2f} {base_s / dt:>7.2f}x "
+              f"{summary['buy_signals'] + summary['sell_signals']:>8} {summary['trades']:>7}")
+
+def main():
+    args = parse_args()
+    warm_up(background=False)  # compile kernels before timing anything
+    for path in args.files:
+        ing = ReplayIngestor(path)
+        snaps = list(ing.iter())
+        ts, bids, asks = ing.arrays()
+        report(path, np.asarray(ts), np.asarray(bids), np.asarray(asks), snaps, args)
+    if args.rows:
+        for name, params in SYNTHETIC.items():
+            ts, bids, asks = SyntheticBook(**params).arrays(args.rows)
+            snaps = [BookSnapshot(ts=float(ts[i]), bids=bids[i], asks=asks[i]) for i in range(ts.shape[0])]
+            report(name, ts, bids, asks, snaps, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+BinanceIngestor message decode: the original per-pair float()/np.array/argsort
+path vs ingest.decode_depth, over depth payloads rendered from a replay file
+(or synthetic depth20 books with --synthetic).
+Usage:
+    python benchmarks/bench_decode.py --file data/samples/sample_orderbook.jsonl --levels 5
+    python benchmarks/bench_decode.py --synthetic 20000 --levels 20
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+
+import numpy as np
+
+from moa.ingest import ReplayIngestor, decode_depth, _loads
+from moa.schemas import BookSnapshot
+from moa.wsreplay import depth_message
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--file", type=str, default="data/samples/sample_orderbook.jsonl")
+    p.add_argument("--synthetic", type=int, default=0, help="render N synthetic 20-level books instead")
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--repeat", type=int, default=20)
+    return p.parse_args()
+
+def legacy_decode(msg, levels):
+    d = json.loads(msg)
+    payload = d.get("data", d)
+    bids = np.array([[float(p), float(q)] for p, q in payload.get("b", [])[:levels]], dtype=float)
+    asks = np.array([[float(p), float(q)] for p, q in payload.get("a", [])[:levels]], dtype=float)
+    ts = float(payload.get("E", payload.get("T", 0))) / 1000.0
+    if bids.size == 0 or asks.size == 0:
+        return None
+    bids = bids[np.argsort(-bids[:, 0])]
+    asks = asks[np.argsort(asks[:, 0])]
+    return BookSnapshot(ts=ts, bids=bids, asks=asks)
+
+def payloads(args):
+    if args.synthetic:
+        rng = np.random.default_rng(4)
+        offs = (np.arange(20) + 0.5) * 0.1
+        for i in range(args.synthetic):
+            m = 60000.0 + rng.normal(0, 5)
+            q = np.round(rng.uniform(0.001, 5, (2, 20)), 3)
+            yield depth_message(BookSnapshot(ts=1.7e9 + 0.1 * i, bids=np.stack([np.round(m - offs, 1), q[0]], 1),
+                                             asks=np.stack([np.round(m + offs, 1), q[1]], 1)))
+    else:
+        for snap in ReplayIngestor(args.file).iter():
+            yield depth_message(snap)
+
+def main():
+    args = parse_args()
+    msgs = list(payloads(args))
+    for m in msgs:
+        a, b = legacy_decode(m, args.levels), decode_depth(m, args.levels)
+        assert a.ts == b.ts and np.array_equal(a.bids, b.bids) and np.array_equal(a.asks, b.asks)
+    print(f"{len(msgs):,} payloads, levels={args.levels}, json parser: {_loads.__module__}")
+    base = None
+    for name, fn in (("legacy", legacy_decode), ("decode_depth", decode_depth)):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for m in msgs:
+                fn(m, args.levels)
+        rate = len(msgs) * args.repeat / (time.perf_counter() - t0)
+        base = base or rate
+        print(f"{name:<13} {rate:>12,.0f} msgs/s  x{rate / base:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Event bus fan-out throughput with 1..N subscribers. The stream is what a replay
+publishes: every snapshot and feature vector of a synthetic book, plus its
+signals and evaluations (EventBus.publish_step). Four sections:
+- publish cost with N subscribers that never poll (lapped, not waited for),
+  against one deque per subscriber, the usual fan-out
+- same-thread fan-out: the producer publishes --batch events, then every
+  subscriber polls. Reports events/s published and deliveries/s
+  (events x subscribers). Every subscriber must receive every event
+- threaded subscribers (Subscription.start) draining while the producer runs
+  flat out; with the GIL they fall behind and get lapped rather than slowing it
+- cross-process: subscriber processes attached to a SharedRing. The cost
+  includes pickling on publish and unpickling in every process. --rate paces
+  the producer (events/s; 0 = unpaced)
+Usage:
+    python benchmarks/bench_eventbus.py --rows 100000 --subscribers 1 2 4 8
+    python benchmarks/bench_eventbus.py --rows 20000 --shared-topics signal evaluation --rate 20000
+"""
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import time
+from collections import deque
+from typing import Any, List, Tuple
+
+from moa.backtest import RollingBacktester
+from moa.bus import TOPICS, EventBus, SharedRing
+from moa.features import FeatureEngine
+from moa.jit import warm_up
+from moa.schemas import BookSnapshot
+from moa.signals import ThresholdSignalEngine
+from moa.synthetic import SyntheticBook
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=100_000, help="synthetic snapshots (about 2 events each)")
+    p.add_argument("--levels", type=int, default=10)
+    p.add_argument("--subscribers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--capacity", type=int, default=1 << 14)
+    p.add_argument("--batch", type=int, default=1024, help="events published between polls")
+    p.add_argument("--shared-rows", type=int, default=20_000, help="snapshots for the cross-process section (0: skip)")
+    p.add_argument("--shared-topics", nargs="+", choices=TOPICS, default=None)
+    p.add_argument("--slot-size", type=int, default=2048)
+    p.add_argument("--rate", type=float, default=0.0)
+    p.add_argument("--repeat", type=int, default=3, help="best-of for the in-process timings")
+    return p.parse_args()
+
+def build_events(rows: int, levels: int) -> List[Tuple[str, Any]]:
+    ts, bids, asks = SyntheticBook(levels=levels).arrays(rows)
+    fe, se, bt = FeatureEngine(depth_levels=levels), ThresholdSignalEngine(), RollingBacktester(tick_size=0.1)
+    bus = EventBus(capacity=4 * rows + 16)  # big enough to keep the whole stream
+    sub = bus.subscribe()
+    for i in range(rows):
+        snap = BookSnapshot(ts=float(ts[i]), bids=bids[i], asks=asks[i])
+        fv = fe.push(snap)
+        sig = se.evaluate(fv)
+        if sig:
+            bt.on_signal(snap, sig)
+        bus.publish_step(snap, fv, sig, bt.on_snapshot(snap))
+    return sub.poll(bus.head)
+
+def best(fn, repeat: int) -> float:
+    return min(fn() for _ in range(max(repeat, 1)))
+
+def publish_only(events, k: int, capacity: int) -> Tuple[float, int]:
+    bus = EventBus(capacity)
+    subs = [bus.subscribe() for _ in range(k)]
+    publish = bus.publish
+    t0 = time.perf_counter()
+    for topic, ev in events:
+        publish(topic, ev)
+    dt = time.perf_counter() - t0
+    subs[0].poll(1)
+    return dt, subs[0].missed
+
+def deque_fanout(events, k: int, capacity: int) -> float:
+    queues = [deque(maxlen=capacity) for _ in range(k)]
+    t0 = time.perf_counter()
+    for item in events:
+        for q in queues:
+            q.append(item)
+    return time.perf_counter() - t0
+
+def same_thread(events, k: int, capacity: int, batch: int) -> float:
+    bus = EventBus(capacity)
+    subs = [bus.subscribe() for _ in range(k)]
+    publish = bus.publish
+    got = [0] * k
+    t0 = time.perf_counter()
+    for i, (topic, ev) in enumerate(events, 1):
+        publish(topic, ev)
+        if i % batch == 0:
+            for j, s in enumerate(subs):
+                got[j] += len(s.poll(batch))
+    for j, s in enumerate(subs):
+        got[j] += len(s.poll(capacity))
+    dt = time.perf_counter() - t0
+    assert got == [len(events)] * k and not any(s.missed for s in subs), "a subscriber lost events"
+    return dt
+
+def threaded(events, k: int, capacity: int) -> Tuple[float, int, int]:
+    bus = EventBus(capacity)
+    counts = [0] * k
+    subs = [bus.subscribe(name=f"t{j}") for j in range(k)]
+
+    def handler_for(j):
+        def handler(topic, ev):
+            counts[j] += 1
+        return handler
+
+    for j, s in enumerate(subs):
+        s.start(handler_for(j))
+    publish = bus.publish
+    t0 = time.perf_counter()
+    for topic, ev in events:
+        publish(topic, ev)
+    dt = time.perf_counter() - t0
+    for s in subs:
+        s.stop()
+    return dt, sum(counts), sum(s.missed for s in subs)
+
+def _reader(name: str, topics, total: int, ready, out) -> None:
+    ring = SharedRing.attach(name)
+    sub = ring.subscribe(topics)
+    ready.put(1)
+    last = time.perf_counter()
+    while sub.cursor < total and time.perf_counter() - last < 5.0:
+        if sub.poll():
+            last = time.perf_counter()
+        else:
+            time.sleep(0.0002)
+    out.put((sub.received, sub.missed, time.perf_counter()))
+    ring.close()
+
+def cross_process(events, k: int, args) -> Tuple[float, float, int, int]:
+    bus = EventBus(args.capacity)
+    ring = bus.share(topics=args.shared_topics, capacity=args.capacity, slot_size=args.slot_size)
+    ctx = mp.get_context("spawn")
+    ready, out = ctx.Queue(), ctx.Queue()
+    wanted = set(args.shared_topics or TOPICS)
+    total = sum(1 for topic, _ in events if topic in wanted)
+    procs = [ctx.Process(target=_reader, args=(ring.name, args.shared_topics, total, ready, out)) for _ in range(k)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.get()
+    gap = 1.0 / args.rate if args.rate else 0.0
+    t0 = time.perf_counter()
+    for i, (topic, ev) in enumerate(events):
+        bus.publish(topic, ev)
+        if gap:
+            while time.perf_counter() - t0 < (i + 1) * gap:
+                pass
+    pub_s = time.perf_counter() - t0
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    bus.close()
+    done = max(r[2] for r in results) - t0
+    return pub_s, done, sum(r[0] for r in results), sum(r[1] for r in results)
+
+def main():
+    args = parse_args()
+    warm_up(background=False)
+    events = build_events(args.rows, args.levels)
+    n = len(events)
+    counts = {t: sum(1 for topic, _ in events if topic == t) for t in TOPICS}
+    print(f"{n:,} events from {args.rows:,} snapshots: {counts}; ring capacity {args.capacity:,}\n")
+
+    print("publish cost, subscribers not polling")
+    print(f"{'subs':>5} {'bus ns/ev':>10} {'deques ns/ev':>13} {'missed/sub':>11}")
+    for k in args.subscribers:
+        missed = publish_only(events, k, args.capacity)[1]
+        bus_s = best(lambda: publish_only(events, k, args.capacity)[0], args.repeat)
+        dq_s = best(lambda: deque_fanout(events, k, args.capacity), args.repeat)
+        print(f"{k:>5} {bus_s / n * 1e9:>10.0f} {dq_s / n * 1e9:>13.0f} {missed:>11,}")
+
+    print(f"\nsame-thread fan-out, every subscriber polls each {args.batch} events")
+    print(f"{'subs':>5} {'events/s':>12} {'deliveries/s':>13} {'ns/delivery':>12}")
+    for k in args.subscribers:
+        dt = best(lambda: same_thread(events, k, args.capacity, args.batch), args.repeat)
+        print(f"{k:>5} {n / dt:>12,.0f} {n * k / dt:>13,.0f} {dt / (n * k) * 1e9:>12.0f}")
+
+    print("\nthreaded subscribers, producer unpaced")
+    print(f"{'subs':>5} {'events/s':>12} {'delivered':>10} {'missed':>10}")
+    for k in args.subscribers:
+        dt, got, missed = threaded(events, k, args.capacity)
+        print(f"{k:>5} {n / dt:>12,.0f} {got / (n * k):>10.1%} {missed / (n * k):>10.1%}")
+
+    if args.shared_rows:
+        shared = events[:2 * args.shared_rows]  # about shared_rows snapshots
+        wanted = set(args.shared_topics or TOPICS)
+        m = sum(1 for topic, _ in shared if topic in wanted)
+        pace = f"{args.rate:,.0f} events/s" if args.rate else "unpaced"
+        print(f"\ncross-process ({m:,} of {len(shared):,} events shared, {pace}, slot {args.slot_size} B)")
+        print(f"{'subs':>5} {'publish us/ev':>14} {'events/s':>12} {'all read s':>11} {'delivered':>10} {'missed':>8}")
+        for k in args.subscribers:
+            pub_s, done_s, got, missed = cross_process(shared, k, args)
+            print(f"{k:>5} {pub_s / len(shared) * 1e6:>14.2f} {len(shared) / pub_s:>12,.0f} {done_s:>11.2f} "
+                  f"{got / (m * k):>10.1%} {missed / (m * k):>8.1%}")
+
+if __name__ == "__main__":
+    main()
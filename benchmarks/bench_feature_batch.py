@@ -0,0 +1,60 @@
+"""
+Streaming FeatureEngine.push vs FeatureEngine.batch over a synthetic day.
+The push loop is timed on a prefix and extrapolated to the full row count.
+Usage:
+    python benchmarks/bench_feature_batch.py --rows 10000000 --push-rows 200000
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from moa.features import FeatureEngine
+from moa.schemas import BookSnapshot
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.add_argument("--push-rows", type=int, default=200_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--update-rate-window", type=int, default=30)
+    return p.parse_args()
+
+def synthetic_book(rows: int, levels: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.1, rows))
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, rows))
+    offs = (np.arange(levels) + 0.5) * 0.1
+    bids = np.empty((rows, levels, 2))
+    asks = np.empty((rows, levels, 2))
+    bids[:, :, 0] = mid[:, None] - offs
+    asks[:, :, 0] = mid[:, None] + offs
+    bids[:, :, 1] = rng.uniform(0.1, 3.0, (rows, levels))
+    asks[:, :, 1] = rng.uniform(0.1, 3.0, (rows, levels))
+    return ts, bids, asks
+
+def main():
+    args = parse_args()
+    ts, bids, asks = synthetic_book(args.rows, args.levels)
+    m = min(args.push_rows, args.rows)
+
+    fe = FeatureEngine(update_rate_window=args.update_rate_window, depth_levels=args.levels)
+    fe.push(BookSnapshot(ts=float(ts[0]), bids=bids[0], asks=asks[0]))  # jit warm-up
+    fe = FeatureEngine(update_rate_window=args.update_rate_window, depth_levels=args.levels)
+    t0 = time.perf_counter()
+    streamed = [fe.push(BookSnapshot(ts=float(ts[i]), bids=bids[i], asks=asks[i])) for i in range(m)]
+    dt_push = (time.perf_counter() - t0) * args.rows / m
+
+    t0 = time.perf_counter()
+    fb = FeatureEngine(update_rate_window=args.update_rate_window, depth_levels=args.levels).batch(ts, bids, asks)
+    dt_batch = time.perf_counter() - t0
+
+    mismatches = sum(fb.row(i) != streamed[i] for i in range(m))
+    print(f"rows={args.rows:,} levels={args.levels} update_rate_window={args.update_rate_window}")
+    print(f"push  : {dt_push:8.2f}s (extrapolated from {m:,} rows)")
+    print(f"batch : {dt_batch:8.2f}s  x{dt_push / dt_batch:.0f}")
+    print(f"mismatches vs push on first {m:,} rows: {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Feature cache: cold run (parse + features + store) vs warm load, and the cost
+of a slider change (signals + backtest only) on a day of 100ms snapshots.
+Usage:
+    python benchmarks/bench_feature_cache.py --rows 864000 --levels 5
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from bench_replay_formats import write_synthetic_jsonl
+from moa.backtest import backtest_signals
+from moa.cache import FeatureCache
+from moa.features import FeatureEngine
+from moa.signals import generate_signals
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=864_000, help="default: one day at 100ms")
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--workdir", type=str, default=None)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        src = Path(tmp) / "day.jsonl"
+        write_synthetic_jsonl(src, args.rows, args.levels)
+        fe = FeatureEngine(depth_levels=args.levels)
+
+        t0 = time.perf_counter()
+        table, hit = FeatureCache(Path(tmp) / "cache").load_or_compute(src, fe)
+        cold = time.perf_counter() - t0
+        assert not hit
+        t0 = time.perf_counter()
+        table, hit = FeatureCache(Path(tmp) / "cache").load_or_compute(src, fe)  # fresh process: re-hash
+        warm = time.perf_counter() - t0
+        assert hit
+        cache = FeatureCache(Path(tmp) / "cache")
+        cache.load_or_compute(src, fe)
+        t0 = time.perf_counter()
+        table, hit = cache.load_or_compute(src, fe)  # same process: hash memoized
+        warm_memo = time.perf_counter() - t0
+
+        ts, mid, imb, bs, asl, rate = table[:6]
+        generate_signals(imb[:100], bs[:100], asl[:100], rate[:100])  # jit warm-up
+        t0 = time.perf_counter()
+        for th in (0.05, 0.1, 0.15, 0.2):
+            direction, _ = generate_signals(imb, bs, asl, rate, imbalance_threshold=th)
+            backtest_signals(ts, mid, direction)
+        rerun = (time.perf_counter() - t0) / 4
+
+        print(f"rows={args.rows} levels={args.levels} cache entry={table.nbytes / 1e6:.1f} MB")
+        print(f"{'cold (parse + features)':<28} {cold:>8.3f}s")
+        print(f"{'warm (hash + mmap)':<28} {warm:>8.3f}s")
+        print(f"{'warm (hash memoized)':<28} {warm_memo:>8.3f}s")
+        print(f"{'slider change':<28} {rerun:>8.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Cost of FeatureLibrary columns on the streaming push path: FeatureEngine.push
+alone vs with 1, 5 and 20 library columns fused into one kernel, plus batch
+throughput. Before timing, the streaming and batch outputs are checked for
+exact equality and against straightforward NumPy reference implementations.
+Usage:
+    python benchmarks/bench_feature_library.py --rows 20000 --levels 10
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from bench_snapshot_memory import synthetic
+from moa.featurelib import FeatureLibrary
+from moa.features import FeatureEngine
+from moa.schemas import BookSnapshot
+
+TICK = 0.1
+SPECS = ["ofi", {"name": "ofi", "depth": 5}, "microprice_offset", {"name": "depth_mid", "depth": 5}, "spread_ticks",
+         {"name": "imbalance", "depth": 1}, {"name": "imbalance", "depth": 3}, {"name": "imbalance", "depth": 10},
+         {"name": "decay_imbalance", "decay": 0.5, "depth": 10}, "mid_change"]
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=20_000)
+    p.add_argument("--levels", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=3)
+    return p.parse_args()
+
+def books(n, levels, seed=5):
+    """Synthetic books with ragged depth (NaN-padded), so missing levels are exercised."""
+    ts, bids, asks = synthetic(n, levels, seed)
+    rng = np.random.default_rng(seed)
+    for side in (bids, asks):
+        depth = rng.integers(1, levels + 1, n)
+        side[np.arange(levels)[None, :] >= depth[:, None]] = np.nan
+    return ts, bids, asks
+
+# --- NumPy references --------------------------------------------------------
+
+def _sz(side, d):
+    q = side[:, :d, 1]
+    return np.where(np.isfinite(q), q, 0.0)
+
+def _imb(b, a):
+    d = b + a
+    return np.where(d > 1e-12, (b - a) / np.where(d > 1e-12, d, 1.0), 0.0)
+
+def _ofi(bids, asks, d):
+    out = np.zeros(bids.shape[0])
+    for i in range(min(d, bids.shape[1])):
+        bp, bq = bids[:, i, 0], np.nan_to_num(bids[:, i, 1])
+        ap, aq = asks[:, i, 0], np.nan_to_num(asks[:, i, 1])
+        pbp, pbq, pap, paq = (np.concatenate([[np.nan if k % 2 == 0 else 0.0], x[:-1]])
+                              for k, x in enumerate((bp, bq, ap, aq)))
+        with np.errstate(invalid="ignore"):
+            out += np.where(bp >= pbp, bq, 0) - np.where(bp <= pbp, pbq, 0) \
+                - np.where(ap <= pap, aq, 0) + np.where(ap >= pap, paq, 0)
+    return out
+
+def _ewma(x, h):
+    out, prev = np.empty_like(x), np.nan
+    a = 2.0 / (h + 1)
+    for i, v in enumerate(x):
+        if np.isfinite(v):
+            prev = v if not np.isfinite(prev) else prev + a * (v - prev)
+        out[i] = prev
+    return out
+
+def reference(bids, asks, horizons):
+    b0p, a0p = bids[:, 0, 0], asks[:, 0, 0]
+    b0q, a0q = bids[:, 0, 1], asks[:, 0, 1]
+    mid = 0.5 * (b0p + a0p)
+    micro = (b0p * a0q + a0p * b0q) / (b0q + a0q)
+    bq5, aq5 = _sz(bids, 5), _sz(asks, 5)
+    bv = np.nansum(bids[:, :5, 0] * bq5, axis=1) / bq5.sum(axis=1)
+    av = np.nansum(asks[:, :5, 0] * aq5, axis=1) / aq5.sum(axis=1)
+    w = np.exp(-0.5 * np.arange(10))
+    prev_mid = np.concatenate([[np.nan], mid[:-1]])
+    base = [
+        _ofi(bids, asks, 1), _ofi(bids, asks, 5), (micro - mid) / TICK,
+        (bv * aq5.sum(axis=1) + av * bq5.sum(axis=1)) / (bq5.sum(axis=1) + aq5.sum(axis=1)),
+        (a0p - b0p) / TICK,
+        _imb(_sz(bids, 1).sum(axis=1), _sz(asks, 1).sum(axis=1)),
+        _imb(_sz(bids, 3).sum(axis=1), _sz(asks, 3).sum(axis=1)),
+        _imb(_sz(bids, 10).sum(axis=1), _sz(asks, 10).sum(axis=1)),
+        _imb(_sz(bids, 10) @ w[:bids.shape[1]][:10], _sz(asks, 10) @ w[:asks.shape[1]][:10]),
+        np.where(np.isfinite(prev_mid), (mid - prev_mid) / TICK, 0.0),
+    ]
+    return np.column_stack([x if h == 1 else _ewma(x, h) for x in base for h in horizons])
+
+# --- timing --------------------------------------------------------------------
+
+def push_time(snaps, library, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        fe = FeatureEngine(depth_levels=5, library=library)
+        t0 = time.perf_counter()
+        for s in snaps:
+            fe.push(s)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(snaps)
+
+def main():
+    args = parse_args()
+    ts, bids, asks = books(args.rows, args.levels)
+    snaps = [BookSnapshot(ts=float(ts[i]), bids=bids[i][np.isfinite(bids[i, :, 1])],
+                          asks=asks[i][np.isfinite(asks[i, :, 1])]) for i in range(args.rows)]
+
+    t0 = time.perf_counter()
+    libs = {1: FeatureLibrary(SPECS[:1], TICK), 5: FeatureLibrary(SPECS[:5], TICK),
+            20: FeatureLibrary(SPECS, TICK, horizons=(1, 10))}
+    for lib in libs.values():
+        lib.compute(bids[:2], asks[:2])
+        lib.step(snaps[0], lib.new_state())
+    print(f"built and compiled {len(libs)} libraries in {time.perf_counter() - t0:.2f}s "
+          f"(numba reuses the on-disk cache on later runs)")
+
+    lib = libs[20]
+    fe = FeatureEngine(depth_levels=5, library=lib)
+    streamed = np.array([fe.push(s).extra for s in snaps])
+    batched = fe.batch(ts, bids, asks).extra
+    ok = np.array_equal(streamed, batched, equal_nan=True)
+    ref = reference(bids, asks, (1, 10))
+    close = np.isclose(batched, ref, rtol=1e-9, atol=1e-9, equal_nan=True).all(axis=0)
+    ok &= bool(close.all())
+    print(f"streaming == batch: {np.array_equal(streamed, batched, equal_nan=True)}; "
+          f"matches NumPy reference: {int(close.sum())}/{close.size} columns"
+          + ("" if close.all() else f" (differs: {[n for n, c in zip(lib.names, close) if not c]})"))
+
+    FeatureEngine(depth_levels=5).push(snaps[0])  # jit warm-up
+    base = push_time(snaps, None, args.repeat)
+    print(f"\n{'push':<28} {'us/snap':>9} {'vs base':>8} {'us/column':>10}")
+    print(f"{'FeatureEngine':<28} {base * 1e6:>9.2f} {1.0:>7.2f}x {'':>10}")
+    for width, lib in libs.items():
+        t = push_time(snaps, lib, args.repeat)
+        print(f"{f'+ {lib.width} library columns':<28} {t * 1e6:>9.2f} {t / base:>7.2f}x {(t - base) / lib.width * 1e6:>10.3f}")
+
+    t0 = time.perf_counter()
+    libs[20].compute(bids, asks)
+    t = time.perf_counter() - t0
+    print(f"\nbatch, {libs[20].width} columns: {args.rows / t:,.0f} rows/s")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
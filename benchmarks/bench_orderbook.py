@@ -0,0 +1,108 @@
+"""
+Local order book throughput on a synthetic ~10k-level-a-side diff-depth feed:
+level updates/sec for LocalOrderBook (from parsed arrays, and end to end from
+the venue's string payloads through DiffDepthSync) against a dict-of-levels
+book, plus the cost of reading the top K levels and a full-depth snapshot.
+Usage:
+    python benchmarks/bench_orderbook.py --levels 10000 --events 50000 --updates 20
+"""
+from __future__ import annotations
+import argparse
+import heapq
+import time
+
+import numpy as np
+
+from moa.orderbook import DiffDepthSync, LocalOrderBook, SyntheticDiffFeed, parse_levels
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--levels", type=int, default=10_000, help="levels per side")
+    p.add_argument("--events", type=int, default=50_000)
+    p.add_argument("--updates", type=int, default=20, help="level updates per event")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--reads", type=int, default=20_000)
+    return p.parse_args()
+
+class DictBook:
+    """The straightforward alternative: {price: qty} per side, sorted on read."""
+    def __init__(self, bids, asks):
+        self.bids = {p: q for p, q in bids}
+        self.asks = {p: q for p, q in asks}
+
+    def apply(self, bids, asks):
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            for p, q in levels:
+                if q > 0:
+                    side[p] = q
+                else:
+                    side.pop(p, None)
+
+    def top(self, k):
+        bp = heapq.nlargest(k, self.bids)
+        ap = heapq.nsmallest(k, self.asks)
+        return [(p, self.bids[p]) for p in bp], [(p, self.asks[p]) for p in ap]
+
+def timed(fn, n):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) / n
+
+def main():
+    args = parse_args()
+    t0 = time.perf_counter()
+    feed = SyntheticDiffFeed(levels=args.levels, updates=args.updates, seed=3)
+    snap = feed.snapshot()
+    events = feed.events(args.events)
+    print(f"generated {len(events)} events on a {args.levels}-level book in {time.perf_counter() - t0:.1f}s")
+    parsed = [(parse_levels(ev["b"]), parse_levels(ev["a"])) for ev in events]
+    n_upd = sum(b.shape[0] + a.shape[0] for b, a in parsed)
+    snap_b, snap_a = parse_levels(snap["bids"]), parse_levels(snap["asks"])
+
+    def make_book():
+        book = LocalOrderBook(0.1, 1)
+        book.load_snapshot(snap_b, snap_a)
+        return book
+
+    warm = make_book()  # JIT compile outside the timings
+    warm.apply(*parsed[0])
+    warm.top(args.top)
+
+    dict_book = DictBook(snap_b.tolist(), snap_a.tolist())
+    dict_parsed = [(b.tolist(), a.tolist()) for b, a in parsed]
+    t_dict = timed(lambda: [dict_book.apply(b, a) for b, a in dict_parsed], n_upd)
+
+    book = make_book()
+    t_arr = timed(lambda: [book.apply(b, a) for b, a in parsed], n_upd)
+
+    sync = DiffDepthSync(make_book())
+    sync.last_id = snap["lastUpdateId"]
+    t_e2e = timed(lambda: [sync.on_event(ev) for ev in events], n_upd)
+    if sync.gaps or sync.applied != len(events):
+        raise SystemExit("sequence check failed on a gap-free feed")
+
+    ref_b, ref_a = feed.reference_top()
+    got_b, got_a = book.top()
+    if not (np.array_equal(got_b, ref_b) and np.array_equal(got_a, ref_a)):
+        raise SystemExit("LocalOrderBook differs from the reference book")
+
+    k, r = args.top, args.reads
+    t_top_dict = timed(lambda: [dict_book.top(k) for _ in range(r)], r)
+    t_top = timed(lambda: [book.top(k) for _ in range(r)], r)
+    t_snap = timed(lambda: [book.snapshot(0.0, k) for _ in range(r)], r)
+    t_full = timed(lambda: [book.top() for _ in range(200)], 200)
+
+    nb, na = book.depth()
+    print(f"book depth {nb}/{na} levels, grid {book.capacity} ticks, {n_upd:,} level updates "
+          f"({n_upd / len(events):.1f} per event)\n")
+    print(f"{'apply':<34} {'updates/s':>12} {'ns/update':>10}")
+    for name, t in (("dict book", t_dict), ("LocalOrderBook (parsed arrays)", t_arr),
+                    ("LocalOrderBook + sync (strings)", t_e2e)):
+        print(f"{name:<34} {1 / t:>12,.0f} {t * 1e9:>10.0f}")
+    print(f"\n{'read':<34} {'us/read':>12}")
+    for name, t in ((f"dict book top {k}", t_top_dict), (f"LocalOrderBook top {k}", t_top),
+                    (f"BookSnapshot({k} levels)", t_snap), (f"full depth ({nb + na} levels)", t_full)):
+        print(f"{name:<34} {t * 1e6:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+End-to-end async pipeline against the local websocket stand-in.
+Reports per-snapshot latency percentiles and drops for each overflow policy;
+--slow-ms adds a synthetic per-event consumer cost to force backpressure.
+Usage:
+    python benchmarks/bench_pipeline.py --file data/samples/sample_orderbook.jsonl --speedup 10 100
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from moa.backtest import RollingBacktester
+from moa.features import FeatureEngine
+from moa.ingest import BinanceIngestor
+from moa.pipeline import POLICIES, PipelineRunner
+from moa.schemas import BookSnapshot
+from moa.signals import ThresholdSignalEngine
+from moa.wsreplay import serve_in_thread
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--file", type=str, default="data/samples/sample_orderbook.jsonl")
+    p.add_argument("--speedup", type=float, nargs="+", default=[10.0, 100.0])
+    p.add_argument("--policies", type=str, nargs="+", default=list(POLICIES))
+    p.add_argument("--queue-size", type=int, default=16)
+    p.add_argument("--slow-ms", type=float, default=0.0)
+    return p.parse_args()
+
+async def one(args, speedup: float, policy: str) -> None:
+    def on_event(ev):
+        if args.slow_ms:
+            time.sleep(args.slow_ms / 1e3)
+
+    with serve_in_thread(args.file, speedup=speedup) as srv:
+        runner = PipelineRunner(BinanceIngestor(srv.url, levels=5).stream(), FeatureEngine(), ThresholdSignalEngine(),
+                                RollingBacktester(), queue_size=args.queue_size, policy=policy, on_event=on_event)
+        t0 = time.perf_counter()
+        stats = await runner.run()
+        dt = time.perf_counter() - t0
+    lat = stats.latency_percentiles()
+    print(f"x{speedup:<6g} {policy:<12} recv={stats.received:<6} proc={stats.processed:<6} "
+          f"dropped={sum(stats.dropped.values()):<5} wall={dt:6.2f}s "
+          f"p50={lat.get('p50', 0):7.3f}ms p99={lat.get('p99', 0):7.3f}ms max={lat.get('max', 0):7.3f}ms")
+
+async def main_async(args):
+    book = np.ones((5, 2))
+    FeatureEngine().push(BookSnapshot(ts=0.0, bids=book, asks=book))  # jit warm-up
+    for speedup in args.speedup:
+        for policy in args.policies:
+            await one(args, speedup, policy)
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
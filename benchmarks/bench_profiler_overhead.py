@@ -0,0 +1,60 @@
+"""
+Profiler overhead on the replay hot loop: plain engines vs a disabled profiler
+(nothing wrapped) vs an enabled one. Also prints the enabled run's stage table.
+Usage:
+    python benchmarks/bench_profiler_overhead.py --file data/samples/sample_orderbook.jsonl --repeat 20
+"""
+from __future__ import annotations
+import argparse
+import time
+
+from moa.config import load_config
+from moa.ingest import ReplayIngestor
+from moa.metrics import Profiler
+from moa.shards import build_engines
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", type=str, default="configs/default.yaml")
+    p.add_argument("--file", type=str, default=None, help="defaults to replay.file from the config")
+    p.add_argument("--repeat", type=int, default=20)
+    return p.parse_args()
+
+def run(cfg, snaps, prof):
+    fe, se, bt = build_engines(cfg)
+    if prof is not None:
+        prof.instrument(fe, se, bt)
+    it = snaps if prof is None else prof.iter(snaps, "ingest", counter="snapshots")
+    t0 = time.perf_counter()
+    for snap in it:
+        fv = fe.push(snap)
+        sig = se.evaluate(fv)
+        if sig:
+            bt.on_signal(snap, sig)
+        bt.on_snapshot(snap)
+    return time.perf_counter() - t0
+
+def main():
+    args = parse_args()
+    cfg = load_config(args.config)
+    snaps = list(ReplayIngestor(args.file or cfg.replay["file"]).iter())
+    modes = {"plain": lambda: None, "disabled": lambda: Profiler(enabled=False), "enabled": lambda: Profiler()}
+    best = {}
+    last = None
+    for name, make in modes.items():
+        times = []
+        for _ in range(args.repeat):
+            prof = make()
+            times.append(run(cfg, snaps, prof))
+            if prof is not None and prof.enabled:
+                last = prof
+        best[name] = min(times)
+    n = len(snaps)
+    print(f"{'mode':<10} {'us/snapshot':>12} {'overhead':>9}")
+    for name, t in best.items():
+        print(f"{name:<10} {t / n * 1e6:>12.2f} {(t / best['plain'] - 1) * 100:>8.1f}%")
+    print()
+    print(last.format())
+
+if __name__ == "__main__":
+    main()
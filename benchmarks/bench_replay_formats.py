@@ -0,0 +1,74 @@
+"""
+Replay throughput: JSONL vs memory-mapped columnar backend.
+Usage:
+    python benchmarks/bench_replay_formats.py --rows 2000000 --levels 5
+"""
+from __future__ import annotations
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from moa.columnar import convert_jsonl
+from moa.ingest import ReplayIngestor
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--workdir", type=str, default=None)
+    return p.parse_args()
+
+def write_synthetic_jsonl(path: Path, rows: int, levels: int, seed: int = 7) -> None:
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.1, rows))
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, rows))
+    offs = (np.arange(levels) + 0.5) * 0.1
+    chunk = 100_000
+    with open(path, "w", encoding="utf-8") as f:
+        for s in range(0, rows, chunk):
+            e = min(s + chunk, rows)
+            bp = np.round(mid[s:e, None] - offs, 2)
+            ap = np.round(mid[s:e, None] + offs, 2)
+            bq = np.round(rng.uniform(0.1, 3.0, (e - s, levels)), 4)
+            aq = np.round(rng.uniform(0.1, 3.0, (e - s, levels)), 4)
+            lines = []
+            for k in range(e - s):
+                lines.append(json.dumps({
+                    "ts": float(ts[s + k]),
+                    "bids": np.stack([bp[k], bq[k]], axis=1).tolist(),
+                    "asks": np.stack([ap[k], aq[k]], axis=1).tolist(),
+                }))
+            f.write("\n".join(lines) + "\n")
+
+def consume(path: Path) -> tuple[int, float, float]:
+    t0 = time.perf_counter()
+    n, acc = 0, 0.0
+    for snap in ReplayIngestor(path, speedup=0.0).iter():
+        acc += snap.bids[0, 1]
+        n += 1
+    return n, time.perf_counter() - t0, acc
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        jsonl = Path(tmp) / "synthetic.jsonl"
+        col = Path(tmp) / "synthetic.moab"
+        t0 = time.perf_counter()
+        write_synthetic_jsonl(jsonl, args.rows, args.levels)
+        print(f"generated {args.rows:,} rows in {time.perf_counter() - t0:.1f}s ({jsonl.stat().st_size / 1e6:.0f} MB)")
+        t0 = time.perf_counter()
+        convert_jsonl(jsonl, col)
+        print(f"converted in {time.perf_counter() - t0:.1f}s ({col.stat().st_size / 1e6:.0f} MB)")
+
+        n_j, dt_j, acc_j = consume(jsonl)
+        n_c, dt_c, acc_c = consume(col)
+        assert n_j == n_c and acc_j == acc_c, "backends disagree"
+        print(f"jsonl    : {n_j / dt_j:>12,.0f} snapshots/s ({dt_j:.2f}s)")
+        print(f"columnar : {n_c / dt_c:>12,.0f} snapshots/s ({dt_c:.2f}s)  x{dt_j / dt_c:.1f}")
+
+if __name__ == "__main__":
+    main()
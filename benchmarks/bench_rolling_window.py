@@ -0,0 +1,45 @@
+"""
+Per-push FeatureEngine latency as the rolling windows grow.
+With O(1) accumulators the cost should stay flat from 10 to 10,000.
+Usage:
+    python benchmarks/bench_rolling_window.py --pushes 50000
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from moa.features import FeatureEngine
+from moa.schemas import BookSnapshot
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--pushes", type=int, default=50_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--windows", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(3)
+    n = args.pushes
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.1, n))
+    books = rng.uniform(0.1, 3.0, (n, 2, args.levels, 2))
+    snaps = [BookSnapshot(ts=float(ts[i]), bids=books[i, 0], asks=books[i, 1]) for i in range(n)]
+    FeatureEngine(depth_levels=args.levels).push(snaps[0])  # jit warm-up
+
+    print(f"{'window':>8} {'mean us':>9} {'p50 us':>8} {'p99 us':>8}")
+    for w in args.windows:
+        fe = FeatureEngine(window_size=w, update_rate_window=w, depth_levels=args.levels)
+        lat = np.empty(n)
+        clock = time.perf_counter_ns
+        for i, snap in enumerate(snaps):
+            t0 = clock()
+            fe.push(snap)
+            lat[i] = clock() - t0
+        lat = lat[min(w, n // 2):] / 1e3  # steady state only
+        print(f"{w:>8} {lat.mean():>9.2f} {np.percentile(lat, 50):>8.2f} {np.percentile(lat, 99):>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Time-range replay on a multi-GB JSONL file (synthetic, cached in --workdir):
+- building the seek index (one pass) and loading the sidecar afterwards
+- start_ts -> first snapshot at random points in the file, with the index,
+  vs a linear parse from the start (timed on --scan-rows, extrapolated)
+- reading a --window-s window into arrays
+- parsing a --parse-rows range into arrays with 1..N worker processes
+  (checked identical to the serial read)
+Seek latency should stay flat from the start of the file to the end.
+Usage:
+    python benchmarks/bench_seek.py --rows 5000000 --levels 10     # ~2 GB
+    python benchmarks/bench_seek.py --rows 12000000 --workers 1 2 4 8 --columnar
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from moa.ingest import ReplayIngestor
+from moa.seekindex import build_index, index_path, read_index, save_index
+from moa.synthetic import SyntheticBook
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=5_000_000)
+    p.add_argument("--levels", type=int, default=10)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--workdir", type=str, default="data/tmp")
+    p.add_argument("--seeks", type=int, default=50)
+    p.add_argument("--scan-rows", type=int, default=200_000, help="rows parsed to time the linear-scan baseline")
+    p.add_argument("--window-s", type=float, default=600.0)
+    p.add_argument("--parse-rows", type=int, default=1_000_000)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--columnar", action="store_true", help="also time ColumnarBook.range on a .moab copy")
+    return p.parse_args()
+
+def dataset(args, suffix: str) -> Path:
+    path = Path(args.workdir) / f"seek_{args.rows}x{args.levels}_s{args.seed}{suffix}"
+    if not path.exists():
+        t0 = time.perf_counter()
+        SyntheticBook(levels=args.levels, seed=args.seed).write(path, args.rows)
+        print(f"generated {path} in {time.perf_counter() - t0:.1f}s")
+    return path
+
+def first_snapshot_ms(path: Path, start_ts: float) -> float:
+    t0 = time.perf_counter()
+    next(ReplayIngestor(path, start_ts=start_ts).iter())
+    return (time.perf_counter() - t0) * 1e3
+
+def linear_scan_rate(path: Path, rows: int) -> float:
+    """Rows/sec of what a range used to cost: parse every line until ts >= start."""
+    it = ReplayIngestor(path).iter()
+    t0 = time.perf_counter()
+    for _ in zip(range(rows), it):
+        pass
+    return rows / (time.perf_counter() - t0)
+
+def main():
+    args = parse_args()
+    path = dataset(args, ".jsonl")
+    size_gb = path.stat().st_size / 1e9
+    print(f"{path}: {args.rows:,} rows x {args.levels} levels, {size_gb:.2f} GB\n")
+
+    t0 = time.perf_counter()
+    idx = build_index(path)
+    build_s = time.perf_counter() - t0
+    save_index(idx, path)
+    t0 = time.perf_counter()
+    assert read_index(path) is not None
+    load_ms = (time.perf_counter() - t0) * 1e3
+    print(f"index build          {build_s:8.2f} s   ({size_gb / build_s:.2f} GB/s, {idx.ts.shape[0]:,} samples, "
+          f"sidecar {index_path(path).stat().st_size / 1024:.0f} KiB)")
+    print(f"sidecar load         {load_ms:8.2f} ms")
+
+    # random seek targets; sampled ts give exact row positions for the baseline
+    rng = np.random.default_rng(args.seed)
+    fracs = np.sort(rng.random(args.seeks))
+    lo, hi = idx.first_ts, idx.last_ts
+    targets = lo + fracs * (hi - lo)
+    first_snapshot_ms(path, float(targets[0]))  # page cache / imports
+    ms = np.array([first_snapshot_ms(path, float(t)) for t in targets])
+    rows_before = np.searchsorted(idx.ts, targets) * idx.stride
+    rate = linear_scan_rate(path, args.scan_rows)
+    scan_s = rows_before / rate
+    print(f"\nstart_ts -> first snapshot ({args.seeks} random points)")
+    print(f"{'':20} {'p50':>10} {'p99':>10} {'max':>10}")
+    print(f"{'indexed ms':20} {np.median(ms):10.2f} {np.percentile(ms, 99):10.2f} {ms.max():10.2f}")
+    print(f"{'linear scan s (est)':20} {np.median(scan_s):10.1f} {np.percentile(scan_s, 99):10.1f} {scan_s.max():10.1f}"
+          f"   (parse rate {rate:,.0f} rows/s)")
+    thirds = [ms[(fracs >= a) & (fracs < a + 1 / 3)] for a in (0, 1 / 3, 2 / 3)]
+    print("indexed p50 by position: " + ", ".join(f"{n} {np.median(t):.2f} ms" for n, t in
+                                                 zip(("first third", "middle", "last third"), thirds) if t.size))
+
+    start = float(targets[len(targets) // 2])
+    t0 = time.perf_counter()
+    ts, _, _ = ReplayIngestor(path, start_ts=start, end_ts=start + args.window_s).arrays()
+    print(f"\n{args.window_s:.0f}s window: {ts.shape[0]:,} rows in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+    i0 = int(rng.integers(0, max(idx.ts.shape[0] - 1, 1)))
+    start = float(idx.ts[i0])
+    stop_i = min(i0 + max(args.parse_rows // idx.stride, 1), idx.ts.shape[0] - 1)
+    end = float(idx.ts[stop_i]) if stop_i > i0 else None
+    print(f"\nparse range into arrays")
+    print(f"{'workers':>8} {'rows':>12} {'s':>8} {'rows/s':>12} {'speedup':>8}")
+    ref, base = None, None
+    for w in args.workers:
+        t0 = time.perf_counter()
+        out = ReplayIngestor(path, start_ts=start, end_ts=end).arrays(workers=w)
+        dt = time.perf_counter() - t0
+        if ref is None:
+            ref, base = out, dt
+        else:
+            assert all(np.array_equal(a, b, equal_nan=True) for a, b in zip(out, ref)), f"workers={w} differs"
+        n = out[0].shape[0]
+        print(f"{w:>8} {n:>12,} {dt:>8.2f} {n / dt:>12,.0f} {base / dt:>7.2f}x")
+
+    if args.columnar:
+        moab = dataset(args, ".moab")
+        from moa.columnar import ColumnarBook
+        book = ColumnarBook(moab)
+        t0 = time.perf_counter()
+        for t in targets:
+            book.range(float(t), float(t) + args.window_s)
+        us = (time.perf_counter() - t0) / len(targets) * 1e6
+        cms = np.array([first_snapshot_ms(moab, float(t)) for t in targets])
+        print(f"\ncolumnar ({moab.stat().st_size / 1e9:.2f} GB): range() {us:.1f} us, "
+              f"start_ts -> first snapshot p50 {np.median(cms):.2f} ms")
+
+    print("\n" + json.dumps({"rows": args.rows, "gb": round(size_gb, 3), "index_build_s": round(build_s, 3),
+                             "seek_p50_ms": round(float(np.median(ms)), 3),
+                             "scan_p50_s": round(float(np.median(scan_s)), 1)}))
+
+if __name__ == "__main__":
+    main()
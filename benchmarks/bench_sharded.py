@@ -0,0 +1,55 @@
+"""
+Multi-symbol throughput vs worker count: every symbol replays its own
+synthetic columnar file unpaced through a full per-symbol pipeline.
+Usage:
+    python benchmarks/bench_sharded.py --symbols 16 --rows 50000 --workers 1 2 4 8
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from moa.columnar import write_columnar
+from moa.config import load_config
+from moa.shards import run_sharded
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", type=str, default="configs/default.yaml")
+    p.add_argument("--symbols", type=int, default=16)
+    p.add_argument("--rows", type=int, default=50_000)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    cfg = load_config(args.config)
+    rng = np.random.default_rng(17)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for k in range(args.symbols):
+            n, L = args.rows, cfg.levels
+            ts = 1.7e9 + np.cumsum(rng.exponential(0.1, n))
+            mid = 100.0 * (k + 1) + np.cumsum(rng.normal(0.0, 0.05, n))
+            offs = (np.arange(L) + 0.5) * cfg.tick_size
+            bids = np.stack([mid[:, None] - offs, rng.uniform(0.1, 3.0, (n, L))], axis=2)
+            asks = np.stack([mid[:, None] + offs, rng.uniform(0.1, 3.0, (n, L))], axis=2)
+            sym = f"sym{k:03d}"
+            files[sym] = str(write_columnar(Path(tmp) / f"{sym}.moab", ts, bids, asks))
+        cfg.symbols = list(files)
+        cfg.replay = {**cfg.replay, "files": files, "speedup": 0.0}
+
+        total = args.symbols * args.rows
+        base = None
+        for w in args.workers:
+            res = run_sharded(cfg, workers=w)
+            rate = total / res.elapsed_s
+            base = base or rate
+            worst = max((r["queued"] for r in res.health_table()), default=0)
+            print(f"workers={w:<3} shards={len(res.shards):<3} {res.elapsed_s:7.2f}s  {rate:>10,.0f} snapshots/s  "
+                  f"x{rate / base:.2f}  signals={res.signals} max_queued={worst}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Streaming ThresholdSignalEngine + RollingBacktester vs the array kernels
+(signals.generate_signals + backtest.backtest_signals) on precomputed features.
+Usage:
+    python benchmarks/bench_signal_backtest.py --rows 10000000 --stream-rows 500000
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from moa.backtest import RollingBacktester, backtest_signals
+from moa.schemas import FeatureVector
+from moa.signals import ThresholdSignalEngine, generate_signals
+
+class _MidPoint(NamedTuple):
+    ts: float
+    mid: float
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.add_argument("--stream-rows", type=int, default=500_000)
+    p.add_argument("--imbalance-threshold", type=float, default=0.12)
+    p.add_argument("--min-update-rate", type=float, default=2.0)
+    p.add_argument("--confirm-n", type=int, default=2)
+    p.add_argument("--horizon-seconds", type=float, default=5.0)
+    return p.parse_args()
+
+def streaming(ts, mid, imb, bs, asl, rate, args):
+    se = ThresholdSignalEngine(args.imbalance_threshold, args.min_update_rate, args.confirm_n)
+    bt = RollingBacktester(horizon_seconds=args.horizon_seconds)
+    ts, mid, imb, bs, asl, rate = (c.tolist() for c in (ts, mid, imb, bs, asl, rate))
+    for i in range(len(ts)):
+        snap = _MidPoint(ts[i], mid[i])
+        sig = se.evaluate(FeatureVector(ts=ts[i], imbalance=imb[i], bid_slope=bs[i], ask_slope=asl[i], update_rate=rate[i]))
+        if sig:
+            bt.on_signal(snap, sig)
+        bt.on_snapshot(snap)
+    return bt.summary()
+
+def vectorized(ts, mid, imb, bs, asl, rate, args):
+    d, _ = generate_signals(imb, bs, asl, rate, args.imbalance_threshold, args.min_update_rate, args.confirm_n)
+    return backtest_signals(ts, mid, d, horizon_seconds=args.horizon_seconds)[1]
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(9)
+    n = args.rows
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.25, n))
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, n))
+    imb = np.clip(rng.normal(0.0, 0.15, n), -1, 1)
+    bs = rng.uniform(0.5, 2.0, n)
+    asl = rng.uniform(0.5, 2.0, n)
+    rate = rng.uniform(1.0, 6.0, n)
+    cols = (ts, mid, imb, bs, asl, rate)
+
+    m = min(args.stream_rows, n)
+    head = tuple(c[:m] for c in cols)
+    vectorized(*head, args)  # jit warm-up
+    assert streaming(*head, args) == vectorized(*head, args), "kernels disagree with streaming classes"
+
+    t0 = time.perf_counter()
+    streaming(*head, args)
+    dt_stream = (time.perf_counter() - t0) * n / m
+    t0 = time.perf_counter()
+    summary = vectorized(*cols, args)
+    dt_vec = time.perf_counter() - t0
+    print(f"rows={n:,}  {summary}")
+    print(f"streaming  : {dt_stream:8.2f}s (extrapolated from {m:,} rows)")
+    print(f"vectorized : {dt_vec:8.3f}s  x{dt_stream / dt_vec:.0f}")
+
+if __name__ == "__main__":
+    main()
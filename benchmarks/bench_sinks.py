@@ -0,0 +1,92 @@
+"""
+End-to-end replay time and output size per result sink (CSV, Parquet, NPZ
+parts), inline and with the writer thread. Input is a synthetic columnar
+file, so parsing does not hide the output cost.
+Usage:
+    python benchmarks/bench_sinks.py --rows 500000 --levels 5
+"""
+from __future__ import annotations
+import argparse
+import csv
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bench_replay_formats import write_synthetic_jsonl
+from moa.backtest import RollingBacktester
+from moa.columnar import convert_jsonl
+from moa.features import FeatureEngine
+from moa.ingest import ReplayIngestor
+from moa.signals import ThresholdSignalEngine
+from moa.sinks import open_sink
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=500_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--chunk-rows", type=int, default=65536)
+    p.add_argument("--workdir", type=str, default=None)
+    return p.parse_args()
+
+class PerRowCsv:
+    """The original output path: one csv.writer.writerow per snapshot."""
+    def __init__(self, path: Path):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.w = csv.writer(self.f)
+        self.w.writerow(["ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate", "signal", "strength", "cum_pnl_ticks"])
+
+    def write_row(self, ts, mid, imb, bs, asl, rate, kind, strength, cum):
+        self.w.writerow([ts, mid, imb, bs, asl, rate, kind, strength if kind else "", cum])
+
+    def close(self):
+        self.f.close()
+
+def replay(src: Path, levels: int, sink) -> float:
+    fe = FeatureEngine(depth_levels=levels)
+    se = ThresholdSignalEngine()
+    bt = RollingBacktester()
+    t0 = time.perf_counter()
+    cum = 0.0
+    for snap in ReplayIngestor(src).iter():
+        fv = fe.push(snap)
+        sig = se.evaluate(fv)
+        if sig:
+            bt.on_signal(snap, sig)
+        for ev in bt.on_snapshot(snap):
+            cum += ev.pnl_ticks
+        if sink is not None:
+            sink.write_row(snap.ts, snap.mid, fv.imbalance, fv.bid_slope, fv.ask_slope, fv.update_rate,
+                           sig.kind if sig else "", sig.strength if sig else np.nan, cum)
+    if sink is not None:
+        sink.close()
+    return time.perf_counter() - t0
+
+def size_of(path: Path) -> int:
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.iterdir())
+    return path.stat().st_size if path.exists() else 0
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        tmp = Path(tmp)
+        write_synthetic_jsonl(tmp / "in.jsonl", args.rows, args.levels)
+        src = convert_jsonl(tmp / "in.jsonl", tmp / "in.moab")
+        replay(src, args.levels, None)  # jit warm-up
+        base = replay(src, args.levels, None)
+        print(f"rows={args.rows} chunk_rows={args.chunk_rows}")
+        print(f"{'sink':<18} {'seconds':>8} {'vs none':>8} {'MB':>8}")
+        print(f"{'none':<18} {base:>8.2f} {'':>8} {'':>8}")
+        t = replay(src, args.levels, PerRowCsv(tmp / "legacy.csv"))
+        print(f"{'csv per-row':<18} {t:>8.2f} {t / base:>7.2f}x {size_of(tmp / 'legacy.csv') / 1e6:>8.1f}")
+        for name, suffix in (("csv", ".csv"), ("parquet", ".parquet"), ("npz", "")):
+            for threaded in (False, True):
+                out = tmp / f"out-{name}-{int(threaded)}{suffix}"
+                t = replay(src, args.levels, open_sink(out, name, chunk_rows=args.chunk_rows, threaded=threaded))
+                label = name + (" +thread" if threaded else "")
+                print(f"{label:<18} {t:>8.2f} {t / base:>7.2f}x {size_of(out) / 1e6:>8.1f}")
+
+if __name__ == "__main__":
+    main()
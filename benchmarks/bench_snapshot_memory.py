@@ -0,0 +1,99 @@
+"""
+Footprint and attribute-access cost of retained snapshots: the previous
+dict-backed dataclass (one pair of small ndarrays per snapshot), the slotted
+BookSnapshot, and a SnapshotBatch holding the same rows contiguously.
+Usage:
+    python benchmarks/bench_snapshot_memory.py --rows 1000000 --levels 5
+"""
+from __future__ import annotations
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+import numpy as np
+
+from moa.schemas import BookSnapshot, SnapshotBatch
+
+@dataclass
+class LegacySnapshot:
+    ts: float
+    bids: np.ndarray
+    asks: np.ndarray
+
+    @property
+    def best_bid(self) -> float:
+        return float(self.bids[0, 0]) if self.bids.size else np.nan
+
+    @property
+    def best_ask(self) -> float:
+        return float(self.asks[0, 0]) if self.asks.size else np.nan
+
+    @property
+    def mid(self) -> float:
+        bb, ba = self.best_bid, self.best_ask
+        if np.isfinite(bb) and np.isfinite(ba):
+            return (bb + ba) / 2.0
+        return np.nan
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--access", type=int, default=200_000, help="snapshots touched in the access timing")
+    p.add_argument("--reads", type=int, default=3, help="mid reads per snapshot")
+    return p.parse_args()
+
+def synthetic(n, levels, seed=13):
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.1, n))
+    mid = 60000.0 + np.round(np.cumsum(rng.normal(0.0, 0.5, n)), 1)
+    offs = 0.05 + 0.1 * np.arange(levels)
+    bids = np.stack([mid[:, None] - offs, rng.uniform(0.1, 5.0, (n, levels))], axis=2)
+    asks = np.stack([mid[:, None] + offs, rng.uniform(0.1, 5.0, (n, levels))], axis=2)
+    return ts, bids, asks
+
+def measured(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+def main():
+    args = parse_args()
+    ts, bids, asks = synthetic(args.rows, args.levels)
+    tsl = ts.tolist()
+    # per-snapshot copies, as a JSONL replay or websocket decode produces them
+    legacy, legacy_b = measured(lambda: [LegacySnapshot(tsl[i], bids[i].copy(), asks[i].copy()) for i in range(args.rows)])
+    slotted, slotted_b = measured(lambda: [BookSnapshot(tsl[i], bids[i].copy(), asks[i].copy()) for i in range(args.rows)])
+    batch, batch_b = measured(lambda: SnapshotBatch.from_arrays(ts, bids, asks))
+
+    n = args.rows
+    print(f"{'layout':<16} {'MB':>9} {'bytes/snap':>11} {'vs legacy':>10}")
+    for name, b in (("legacy", legacy_b), ("slotted", slotted_b), ("SnapshotBatch", batch_b)):
+        print(f"{name:<16} {b / 1e6:>9.1f} {b / n:>11.1f} {legacy_b / b:>9.2f}x")
+
+    m = min(args.access, n)
+    def touch(snaps):
+        t0 = time.perf_counter()
+        acc = 0.0
+        for s in snaps[:m]:
+            for _ in range(args.reads):
+                acc += s.mid
+        return time.perf_counter() - t0, acc
+    t_legacy, a = touch(legacy)
+    t_slotted, b = touch(slotted)
+    t0 = time.perf_counter()
+    c = float(np.sum(np.repeat(batch.mid[:m], args.reads)))
+    t_col = time.perf_counter() - t0
+    assert a == b and np.isclose(a, c)
+    print()
+    print(f"{'mid access':<16} {'ns/read':>9}")
+    for name, t in (("legacy", t_legacy), ("slotted", t_slotted), ("batch column", t_col)):
+        print(f"{name:<16} {t / (m * args.reads) * 1e9:>9.1f}")
+
+if __name__ == "__main__":
+    main()
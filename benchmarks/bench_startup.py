@@ -0,0 +1,112 @@
+"""
+Startup cost of the entry points, each measured in fresh interpreters, with
+lazily compiled kernels (MOA_JIT=lazy, the default) vs the old @njit(cache=True)
+behaviour (MOA_JIT=eager: numba imported with each module, every kernel
+compiled or loaded from cache on its first call):
+- import time of moa.ingest / moa.config / moa.features / the full engine set
+- first-snapshot latency: process start -> first FeatureVector from a replay,
+  the first push alone, and when the background warm-up has every kernel ready
+- time to the first FeatureEngine.batch result on a larger file
+Use --cold to point numba at an empty cache directory, i.e. the first run
+after install or after a kernel changed.
+Usage:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --repeat 3 --cold
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from moa.synthetic import SyntheticBook
+
+IMPORTS = {
+    "numpy": "import numpy",
+    "moa.ingest": "import moa.ingest",
+    "moa.config": "import moa.config",
+    "moa.features": "import moa.features",
+    "features+signals+backtest": "import moa.features, moa.signals, moa.backtest",
+}
+
+FIRST_SNAPSHOT = """
+import time, json
+t0 = time.perf_counter()
+from moa.ingest import ReplayIngestor
+from moa.features import FeatureEngine
+import moa.jit
+it = ReplayIngestor({path!r}).iter()
+fe = FeatureEngine()
+snap = next(it)
+t1 = time.perf_counter()
+fe.push(snap)
+t2 = time.perf_counter()
+for snap in it:
+    fe.push(snap)
+while not moa.jit.ready():
+    time.sleep(0.001)
+t3 = time.perf_counter()
+print(json.dumps({{"first_fv_ms": (t2 - t0) * 1e3, "first_push_us": (t2 - t1) * 1e6, "jit_ready_ms": (t3 - t0) * 1e3}}))
+"""
+
+FIRST_BATCH = """
+import time, json
+t0 = time.perf_counter()
+from moa.ingest import ReplayIngestor
+from moa.features import FeatureEngine
+ts, bids, asks = ReplayIngestor({path!r}).arrays()
+FeatureEngine().batch(ts, bids, asks)
+print(json.dumps({{"first_batch_ms": (time.perf_counter() - t0) * 1e3}}))
+"""
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--batch-rows", type=int, default=1_000_000)
+    p.add_argument("--cold", action="store_true", help="empty numba cache for every run")
+    return p.parse_args()
+
+def run(code: str, mode: str, cold: bool) -> dict:
+    env = {**os.environ, "MOA_JIT": mode}
+    with tempfile.TemporaryDirectory() as cache:
+        if cold:
+            env["NUMBA_CACHE_DIR"] = cache
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def median_of(code: str, mode: str, args) -> dict:
+    runs = [run(code, mode, args.cold) for _ in range(args.repeat)]
+    return {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+
+def import_code(stmt: str) -> str:
+    return f"import time, json\nt0 = time.perf_counter()\n{stmt}\nprint(json.dumps({{'import_ms': (time.perf_counter() - t0) * 1e3}}))"
+
+def main():
+    args = parse_args()
+    modes = ("lazy", "eager")
+    print(f"median of {args.repeat} fresh interpreters{', cold numba cache' if args.cold else ''}\n")
+    print(f"{'import':<28} " + " ".join(f"{m + ' ms':>10}" for m in modes))
+    for name, stmt in IMPORTS.items():
+        ms = [median_of(import_code(stmt), m, args)["import_ms"] for m in modes]
+        print(f"{name:<28} " + " ".join(f"{v:>10.1f}" for v in ms))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        small = SyntheticBook(levels=5).write(Path(tmp) / "small.jsonl", 300)
+        big = SyntheticBook(levels=5).write(Path(tmp) / "big.moab", args.batch_rows)
+        first = {m: median_of(FIRST_SNAPSHOT.format(path=str(small)), m, args) for m in modes}
+        batch = {m: median_of(FIRST_BATCH.format(path=str(big)), m, args) for m in modes}
+
+    print(f"\n{'first snapshot':<28} " + " ".join(f"{m:>10}" for m in modes))
+    for key, label in (("first_fv_ms", "start -> first features ms"), ("first_push_us", "first push us"),
+                       ("jit_ready_ms", "start -> warm-up done ms")):
+        # eager kernels count as ready from import; only the lazy warm-up has a finish time
+        print(f"{label:<28} " + " ".join(f"{first[m][key]:>10.1f}" if key != "jit_ready_ms" or m == "lazy"
+                                         else f"{'-':>10}" for m in modes))
+    print(f"{f'start -> batch of {args.batch_rows:,} ms':<28} " + " ".join(f"{batch[m]['first_batch_ms']:>10.1f}" for m in modes))
+
+if __name__ == "__main__":
+    main()
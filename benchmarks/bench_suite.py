@@ -0,0 +1,327 @@
+"""
+Pipeline benchmark suite on deterministic synthetic books (moa.synthetic).
+
+Each stage runs in a fresh process so peak memory is its own. The suite
+reports:
+- throughput;
+- latency percentiles, per snapshot for the streaming stages and per
+  65,536-row block for the batch ones;
+- the process's peak RSS and the peak above its post-setup level.
+Results are compared with stored baselines (benchmarks/baselines.json by
+default); with --check the run fails on a throughput or memory regression
+beyond --tolerance. Baselines only compare like with like: record them on the
+machine that checks them.
+Usage:
+    python benchmarks/bench_suite.py                              # all stages vs stored baselines
+    python benchmarks/bench_suite.py --stages features end_to_end --check
+    python benchmarks/bench_suite.py --save-baseline              # re-record after an intended change
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from pathlib import Path
+
+from moa.backtest import RollingBacktester, backtest_signals
+from moa.columnar import ColumnarBook
+from moa.features import FeatureEngine
+from moa.ingest import ReplayIngestor
+from moa.metrics import LatencyHistogram, Profiler
+from moa.signals import ThresholdSignalEngine, generate_signals
+from moa.sweep import feature_table
+from moa.synthetic import BLOCK_ROWS, SyntheticBook
+
+BASELINES = Path(__file__).with_name("baselines.json")
+FE = {"window_size": 20, "update_rate_window": 30, "depth_levels": 5, "mid_ewma_alpha": 0.1}
+SIG = {"imbalance_threshold": 0.12, "min_update_rate": 2.0, "confirm_n": 2}
+BT = {"tick_size": 0.1, "horizon_seconds": 5.0}
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=2_000_000, help="snapshots for the generator and batch stages")
+    p.add_argument("--stream-rows", type=int, default=200_000, help="snapshots for the per-snapshot stages")
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--stages", nargs="+", default=None, help=f"subset of: {' '.join(STAGES)}")
+    p.add_argument("--workdir", type=str, default=None, help="keep the generated inputs here (default: a temp dir)")
+    p.add_argument("--baseline", type=str, default=str(BASELINES))
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--check", action="store_true", help="exit 1 on a regression against the baseline")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown / memory growth")
+    p.add_argument("--out", type=str, default=None, help="also write this run's results as JSON")
+    return p.parse_args()
+
+# --- stage bodies (run in a child process) ---------------------------------------
+
+def _mem_mb(field: str) -> float:
+    """VmRSS / VmHWM of this process (Linux). ru_maxrss would carry the parent's peak across spawn."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+def _reset_peak() -> float:
+    """Restart the VmHWM high-water mark after setup; returns the current RSS."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    return _mem_mb("VmRSS")
+
+def _book(ctx):
+    return ColumnarBook(ctx["columnar"])
+
+def _snaps(ctx):
+    return list(_book(ctx).iter(0, ctx["stream_rows"]))
+
+def _stream(setup, run, latency):
+    """setup() -> inputs; run(inputs) does the timed pass; latency(inputs, profiler) the instrumented one."""
+    def stage(ctx):
+        inputs = setup(ctx)
+        base = _reset_peak()
+        t0 = time.perf_counter()
+        n = run(inputs)
+        seconds = time.perf_counter() - t0
+        prof = Profiler()
+        latency(inputs, prof)
+        (h,) = prof.stages.values()
+        return {"rows": n, "seconds": seconds, "unit": "snapshot", "base_mb": base, **h.summary()}
+    return stage
+
+def _blocks(setup, run_block):
+    """Batch stages: run_block(inputs, start, stop) over BLOCK_ROWS-row blocks."""
+    def stage(ctx):
+        inputs, n = setup(ctx)
+        base = _reset_peak()
+        h = LatencyHistogram()
+        t0 = time.perf_counter()
+        for s in range(0, n, BLOCK_ROWS):
+            t = time.perf_counter_ns()
+            run_block(inputs, s, min(s + BLOCK_ROWS, n))
+            h.record(time.perf_counter_ns() - t)
+        seconds = time.perf_counter() - t0
+        return {"rows": n, "seconds": seconds, "unit": f"{BLOCK_ROWS}-row block", "base_mb": base, **h.summary()}
+    return stage
+
+def _generate(ctx):
+    gen = SyntheticBook(levels=ctx["levels"], seed=ctx["seed"])
+    gen.arrays(1)  # jit warm-up
+    base = _reset_peak()
+    h = LatencyHistogram()
+    t0 = time.perf_counter()
+    blocks = gen.blocks(ctx["rows"])
+    while True:
+        t = time.perf_counter_ns()
+        if next(blocks, None) is None:
+            break
+        h.record(time.perf_counter_ns() - t)
+    seconds = time.perf_counter() - t0
+    return {"rows": ctx["rows"], "seconds": seconds, "unit": f"{BLOCK_ROWS}-row block", "base_mb": base, **h.summary()}
+
+def _ingest(key):
+    def setup(ctx):
+        return ctx[key], ctx["stream_rows"]
+    def run(inputs):
+        path, n = inputs
+        k = 0
+        for _ in islice(ReplayIngestor(path).iter(), n):
+            k += 1
+        return k
+    def latency(inputs, prof):
+        path, n = inputs
+        for _ in prof.iter(islice(ReplayIngestor(path).iter(), n), "ingest"):
+            pass
+    return _stream(setup, run, latency)
+
+def _features_run(snaps):
+    fe = FeatureEngine(**FE)
+    for s in snaps:
+        fe.push(s)
+    return len(snaps)
+
+def _features_latency(snaps, prof):
+    fe = prof.wrap(FeatureEngine(**FE), "push", "features")
+    for s in snaps:
+        fe.push(s)
+
+def _fvs(ctx):
+    book = _book(ctx)
+    n = ctx["stream_rows"]
+    fb = FeatureEngine(**FE).batch(book.ts[:n], book.bids[:n], book.asks[:n])
+    return [fb.row(i) for i in range(len(fb))]
+
+def _signals_run(fvs):
+    se = ThresholdSignalEngine(**SIG)
+    for fv in fvs:
+        se.evaluate(fv)
+    return len(fvs)
+
+def _signals_latency(fvs, prof):
+    se = prof.wrap(ThresholdSignalEngine(**SIG), "evaluate", "signals")
+    for fv in fvs:
+        se.evaluate(fv)
+
+def _bt_inputs(ctx):
+    se = ThresholdSignalEngine(**SIG)
+    return _snaps(ctx), [se.evaluate(fv) for fv in _fvs(ctx)]
+
+def _bt_run(inputs, bt=None):
+    snaps, sigs = inputs
+    bt = bt or RollingBacktester(**BT)
+    for snap, sig in zip(snaps, sigs):
+        if sig:
+            bt.on_signal(snap, sig)
+        bt.on_snapshot(snap)
+    return len(snaps)
+
+def _bt_latency(inputs, prof):
+    _bt_run(inputs, prof.wrap(RollingBacktester(**BT), "on_snapshot", "backtest"))
+
+def _e2e_setup(ctx):
+    return ctx["columnar"], ctx["stream_rows"]
+
+def _e2e(path, n, h=None):
+    fe, se, bt = FeatureEngine(**FE), ThresholdSignalEngine(**SIG), RollingBacktester(**BT)
+    clock = time.perf_counter_ns
+    k, t = 0, clock()
+    for snap in islice(ReplayIngestor(path).iter(), n):
+        sig = se.evaluate(fe.push(snap))
+        if sig:
+            bt.on_signal(snap, sig)
+        bt.on_snapshot(snap)
+        k += 1
+        if h is not None:
+            now = clock()
+            h.record(now - t)
+            t = now
+    return k
+
+def _e2e_latency(inputs, prof):
+    _e2e(*inputs, prof.hist("end_to_end"))
+
+def _batch_features_setup(ctx):
+    book, fe = _book(ctx), FeatureEngine(**FE)
+    fe.batch(book.ts[:100], book.bids[:100], book.asks[:100])  # jit warm-up
+    return (book, fe), len(book)
+
+def _batch_features_block(inputs, s, e):
+    book, fe = inputs
+    fe.batch(book.ts[s:e], book.bids[s:e], book.asks[s:e])
+
+def _kernels_setup(ctx):
+    book = _book(ctx)
+    table = feature_table(book.ts, book.bids, book.asks, FeatureEngine(**FE))
+    generate_signals(*table[2:6, :100], **SIG)  # jit warm-up
+    return table, table.shape[1]
+
+def _kernels_block(table, s, e):
+    ts, mid, imb, bs, asl, rate = table[:, s:e]
+    direction, _ = generate_signals(imb, bs, asl, rate, **SIG)
+    backtest_signals(ts, mid, direction, **BT)
+
+STAGES = {
+    "generate": _generate,
+    "ingest_jsonl": _ingest("jsonl"),
+    "ingest_columnar": _ingest("columnar"),
+    "features": _stream(_snaps, _features_run, _features_latency),
+    "features_batch": _blocks(_batch_features_setup, _batch_features_block),
+    "signals": _stream(_fvs, _signals_run, _signals_latency),
+    "backtest": _stream(_bt_inputs, _bt_run, _bt_latency),
+    "signal_kernels": _blocks(_kernels_setup, _kernels_block),
+    "end_to_end": _stream(_e2e_setup, lambda inputs: _e2e(*inputs), _e2e_latency),
+}
+
+def _run_stage(name, ctx):
+    out = STAGES[name](ctx)
+    out["peak_rss_mb"] = _mem_mb("VmHWM")
+    out["stage_mb"] = max(0.0, out["peak_rss_mb"] - out.pop("base_mb"))
+    out["rows_per_s"] = out["rows"] / out["seconds"] if out["seconds"] else 0.0
+    return out
+
+# --- driver -----------------------------------------------------------------------
+
+def prepare(args, workdir: Path) -> dict:
+    """Generate (or reuse) the columnar and JSONL inputs."""
+    gen = SyntheticBook(levels=args.levels, seed=args.seed)
+    ctx = {"rows": args.rows, "stream_rows": args.stream_rows, "levels": args.levels, "seed": args.seed,
+           "columnar": str(workdir / f"suite-{args.seed}-{args.levels}-{args.rows}.moab"),
+           "jsonl": str(workdir / f"suite-{args.seed}-{args.levels}-{args.stream_rows}.jsonl")}
+    for key, rows in (("columnar", args.rows), ("jsonl", args.stream_rows)):
+        if not Path(ctx[key]).exists():
+            t0 = time.perf_counter()
+            gen.write(ctx[key], rows)
+            print(f"generated {rows:,} rows -> {ctx[key]} in {time.perf_counter() - t0:.1f}s")
+    return ctx
+
+def params(args) -> dict:
+    return {"rows": args.rows, "stream_rows": args.stream_rows, "levels": args.levels, "seed": args.seed}
+
+def compare(results, baseline, tolerance):
+    """Print the table; return the names of stages that regressed."""
+    stages = baseline.get("stages", {}) if baseline else {}
+    failed = []
+    print(f"\n{'stage':<16} {'rows/s':>12} {'vs base':>8} {'p50 us':>10} {'p99 us':>10} {'p999 us':>10} "
+          f"{'peak MB':>8} {'stage MB':>9}  unit")
+    for name, r in results.items():
+        b = stages.get(name)
+        rel = f"{r['rows_per_s'] / b['rows_per_s']:.2f}x" if b and b["rows_per_s"] else "-"
+        bad = b is not None and (r["rows_per_s"] < b["rows_per_s"] * (1.0 - tolerance)
+                                 or r["stage_mb"] > b["stage_mb"] * (1.0 + tolerance) + 16.0)
+        if bad:
+            failed.append(name)
+        print(f"{name:<16} {r['rows_per_s']:>12,.0f} {rel:>8} {r['p50_us']:>10.2f} {r['p99_us']:>10.2f} "
+              f"{r['p999_us']:>10.2f} {r['peak_rss_mb']:>8.0f} {r['stage_mb']:>9.0f}  {r['unit']}"
+              + ("  REGRESSION" if bad else ""))
+    return failed
+
+def main():
+    args = parse_args()
+    names = args.stages or list(STAGES)
+    unknown = set(names) - set(STAGES)
+    if unknown:
+        sys.exit(f"unknown stages: {sorted(unknown)}; choose from {list(STAGES)}")
+
+    baseline = None
+    if Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("params") != params(args):
+            print(f"baseline was recorded with {baseline.get('params')}; not comparing")
+            baseline = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        ctx = prepare(args, workdir)
+        results = {}
+        for name in names:
+            # a fresh interpreter per stage, so ru_maxrss is that stage's alone
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                results[name] = pool.submit(_run_stage, name, ctx).result()
+            print(f"{name}: {results[name]['rows_per_s']:,.0f} rows/s")
+
+    failed = compare(results, baseline, args.tolerance)
+    record = {"params": params(args),
+              "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+              "stages": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(record, indent=2) + "\n")
+    if args.save_baseline:
+        if baseline is not None:  # keep stages this run skipped
+            record["stages"] = {**baseline["stages"], **results}
+        Path(args.baseline).write_text(json.dumps(record, indent=2) + "\n")
+        print(f"saved baseline to {args.baseline}")
+    if failed:
+        print(f"regressed beyond {args.tolerance:.0%}: {', '.join(failed)}")
+    sys.exit(1 if failed and args.check else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Sweep throughput vs worker count on a 1000-point grid.
+Usage:
+    python benchmarks/bench_sweep.py --rows 500000 --workers 1 2 4 8
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from moa.features import FeatureEngine
+from moa.sweep import feature_table, expand_grid, run_sweep
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=500_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(5)
+    n, L = args.rows, args.levels
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.25, n))
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, n))
+    offs = (np.arange(L) + 0.5) * 0.1
+    bids = np.stack([np.broadcast_to(mid[:, None] - offs, (n, L)), rng.uniform(0.1, 3.0, (n, L))], axis=2)
+    asks = np.stack([np.broadcast_to(mid[:, None] + offs, (n, L)), rng.uniform(0.1, 3.0, (n, L))], axis=2)
+    table = feature_table(ts, bids, asks, FeatureEngine(depth_levels=L))
+
+    grid = expand_grid({
+        "imbalance_threshold": list(np.round(np.linspace(0.02, 0.3, 10), 3)),
+        "min_update_rate": [0.0, 1.0, 2.0, 3.0, 4.0],
+        "confirm_n": [1, 2, 3, 4],
+        "horizon_seconds": [2.0, 5.0, 10.0, 30.0, 60.0],
+    })
+    print(f"grid={len(grid)} points, rows={n:,}")
+    base = None
+    for w in args.workers:
+        t0 = time.perf_counter()
+        run_sweep(table, grid, workers=w)
+        dt = time.perf_counter() - t0
+        base = base or dt
+        print(f"workers={w:<3} {dt:8.2f}s  {len(grid) / dt:8.1f} points/s  speedup x{base / dt:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+UI refresh cost vs history length: MinMaxSeries append cost and the per-refresh
+work (decimated points -> DataFrame with datetimes) after 1k ... 10M snapshots.
+Usage:
+    python benchmarks/bench_ui_refresh.py --sizes 1000 100000 10000000
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from moa.timeseries import MinMaxSeries
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000, 10_000_000])
+    p.add_argument("--max-points", type=int, default=1000)
+    p.add_argument("--refreshes", type=int, default=50)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(8)
+    print(f"{'history':>10} {'append us':>10} {'points':>7} {'refresh ms':>11}")
+    for n in args.sizes:
+        ts = (1.7e9 + np.cumsum(rng.exponential(0.1, n))).tolist()
+        mid = (60000.0 + np.cumsum(rng.normal(0.0, 0.5, n))).tolist()
+        series = MinMaxSeries(args.max_points // 2)
+        t0 = time.perf_counter()
+        for t, m in zip(ts, mid):
+            series.append(t, m)
+        append_us = (time.perf_counter() - t0) / n * 1e6
+        t0 = time.perf_counter()
+        for _ in range(args.refreshes):
+            pt, py = series.points()
+            pd.DataFrame({"time": pd.to_datetime(pt, unit="s"), "mid": py})
+        refresh_ms = (time.perf_counter() - t0) / args.refreshes * 1e3
+        print(f"{n:>10,} {append_us:>10.3f} {pt.size:>7} {refresh_ms:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Walk-forward evaluation on a multi-million-snapshot synthetic columnar file:
+folds warm-started at their boundary (serial and over worker processes) vs
+re-replaying features from the start of the series for every fold. Checks
+that warm-started signal features equal the full-replay ones on every fold
+and that both give the same per-fold metrics.
+Usage:
+    python benchmarks/bench_walkforward.py --rows 2000000 --folds 10 --workers 1 2 4
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bench_snapshot_memory import synthetic
+from moa.columnar import ColumnarBook, write_columnar
+from moa.features import FeatureEngine
+from moa.sweep import expand_grid, feature_table
+from moa.backtest import trade_stats
+from moa.walkforward import evaluate_fold, make_folds, run_walkforward, warmup_rows
+
+FE_PARAMS = {"window_size": 20, "update_rate_window": 30, "depth_levels": 5, "mid_ewma_alpha": 0.1}
+METRICS = ("trades", "total_pnl_ticks", "sharpe_ticks", "max_drawdown_ticks", "turnover_per_hour", "pnl_p05", "pnl_p50", "pnl_p95")
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--levels", type=int, default=5)
+    p.add_argument("--folds", type=int, default=10)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    return p.parse_args()
+
+def check_warm_start(ts, bids, asks, folds) -> bool:
+    """Signal inputs computed from the warm-up point equal a replay from row 0."""
+    w = warmup_rows(FE_PARAMS)
+    ok = True
+    for f in folds[:3]:
+        a, d = f.train[0], f.test[1]
+        s = max(0, a - w)
+        warm = feature_table(ts[s:d], bids[s:d], asks[s:d], FeatureEngine(**FE_PARAMS))[:, a - s:]
+        full = feature_table(ts[:d], bids[:d], asks[:d], FeatureEngine(**FE_PARAMS))[:, a:]
+        ok &= bool(np.array_equal(warm, full, equal_nan=True))
+    return ok
+
+def rereplay(ts, bids, asks, grid, n_folds):
+    """Every fold replays features from row 0 (what a walk-forward without warm starts costs)."""
+    job = {"fe_params": FE_PARAMS, "grid": grid, "tick_size": 0.1, "objective": "sharpe_ticks",
+           "min_trades": 10, "warmup": len(ts)}
+    folds = [evaluate_fold(ts, bids, asks, f, job) for f in make_folds(ts, n_folds)]
+    pnl = np.concatenate([r["pnl_ticks"] for r in folds])
+    return {"folds": folds, "aggregate": trade_stats(pnl, sum(r["test_end"] - r["test_start"] for r in folds))}
+
+def _metrics(result):
+    return [tuple(r["test"][c] for c in METRICS) for r in result["folds"]] + [tuple(result["aggregate"][c] for c in METRICS)]
+
+def main():
+    args = parse_args()
+    grid = expand_grid({"imbalance_threshold": [0.05, 0.1, 0.15, 0.2], "min_update_rate": [2.0],
+                        "confirm_n": [1, 2, 3], "horizon_seconds": [5.0]})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "wf.moab"
+        ts, bids, asks = synthetic(args.rows, args.levels)
+        write_columnar(path, ts, bids, asks)
+        del ts, bids, asks
+        book = ColumnarBook(path)
+        ts, bids, asks = np.asarray(book.ts), np.asarray(book.bids), np.asarray(book.asks)
+        hours = (ts[-1] - ts[0]) / 3600
+        print(f"{args.rows:,} snapshots ({hours:.0f}h of data), {args.folds} folds, {len(grid)} grid points per fold\n")
+
+        folds = make_folds(ts, args.folds)
+        ok = check_warm_start(ts, bids, asks, folds)
+        print(f"warm-started features == full replay: {ok}")
+
+        kw = dict(n_folds=args.folds, min_trades=10, source=path)
+        t0 = time.perf_counter()
+        naive = rereplay(ts, bids, asks, grid, args.folds)
+        t_naive = time.perf_counter() - t0
+        results = {}
+        for w in args.workers:
+            t0 = time.perf_counter()
+            results[w] = run_walkforward(ts, bids, asks, FE_PARAMS, grid, workers=w, **kw)
+            results[w]["seconds"] = time.perf_counter() - t0
+
+        base = results[args.workers[0]]
+        same = all(_metrics(r) == _metrics(base) for r in results.values())
+        same_naive = _metrics(naive) == _metrics(base)
+        ok &= same and same_naive
+        print(f"per-fold metrics identical across worker counts: {same}; warm-started == re-replay: {same_naive}\n")
+
+        print(f"{'mode':<34} {'seconds':>8} {'vs re-replay':>13}")
+        print(f"{'re-replay from start, serial':<34} {t_naive:>8.2f} {1.0:>12.2f}x")
+        for w, r in results.items():
+            print(f"{f'warm-started, {w} worker(s)':<34} {r['seconds']:>8.2f} {t_naive / r['seconds']:>12.2f}x")
+
+        print("\n" + " ".join(f"{c:>18}" for c in ("fold",) + METRICS))
+        for r in base["folds"] + [{"fold": "all", "test": base["aggregate"]}]:
+            print(" ".join([f"{r['fold']:>18}"] + [f"{r['test'][c]:>18.3f}" for c in METRICS]))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Capture path against the local websocket stand-in: rotated gzip/plain/zstd
+JSONL and columnar segments replay the served snapshots exactly, dropped
+connections are re-opened, and the wall-clock cutoff holds on an idle socket.
+Also times the batched writer against the old per-message json.dumps + write.
+Exits non-zero on any mismatch.
+Usage:
+    python benchmarks/check_capture.py --file data/samples/sample_orderbook.jsonl
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from moa.capture import CaptureWriter, SegmentWriter, capture
+from moa.ingest import ReplayIngestor, _loads
+from moa.wsreplay import depth_message, serve_in_thread
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--file", type=str, default="data/samples/sample_orderbook.jsonl")
+    p.add_argument("--limit", type=int, default=120, help="messages per connection before the stand-in hangs up")
+    p.add_argument("--timing-rows", type=int, default=50_000)
+    return p.parse_args()
+
+def served(snaps, levels=None):
+    """What a capture should replay: ts at ms resolution, sides as sent."""
+    out = []
+    for s in snaps:
+        ts = round(s.ts * 1000.0) / 1000.0
+        out.append((ts, s.bids[:levels], s.asks[:levels]))
+    return out
+
+def same(replayed, expected) -> bool:
+    if len(replayed) != len(expected):
+        print(f"  rows: {len(replayed)} != {len(expected)}")
+        return False
+    for i, (r, (ts, b, a)) in enumerate(zip(replayed, expected)):
+        if r.ts != ts or not np.array_equal(r.bids, b) or not np.array_equal(r.asks, a):
+            print(f"  row {i} differs")
+            return False
+    return True
+
+async def run_capture(url, base, n, **kw):
+    async with CaptureWriter(base, flush_s=0.05, **kw) as w:
+        stats = await capture(url, {"btcusdt": w}, max_messages=n, reconnect_s=0.05)
+    return w, stats
+
+def check_roundtrip(args, snaps, tmp: Path, name: str, **kw) -> bool:
+    n = 2 * args.limit + 10  # forces two reconnects
+    base = tmp / name / ("btcusdt.moab" if kw.get("fmt") == "columnar" else "btcusdt.jsonl")
+    with serve_in_thread(args.file, speedup=0.0, limit=args.limit) as srv:
+        w, stats = asyncio.run(run_capture(srv.url, base, n, **kw))
+    levels = kw.get("levels") if kw.get("fmt") == "columnar" else None
+    expected = served(snaps, levels)
+    expected = (expected[:args.limit] * 3)[:n]
+    replayed = list(ReplayIngestor(base).iter())
+    ok = same(replayed, expected) and stats["reconnects"] >= 2 and len(w.segments) > 1
+    print(f"{name:<10} {'ok' if ok else 'FAIL'}: {stats['messages']} msgs, {stats['reconnects']} reconnects, "
+          f"{len(w.segments)} segments ({w.segments[0].name} ... {w.segments[-1].name})")
+    return ok
+
+def check_cutoff(args, tmp: Path) -> bool:
+    # stand-in paced so slowly that nothing after the first message arrives before the cutoff
+    with serve_in_thread(args.file, speedup=1e-3) as srv:
+        t0 = time.perf_counter()
+        asyncio.run(_idle(srv.url, tmp / "idle" / "btcusdt.jsonl"))
+        took = time.perf_counter() - t0
+    ok = took < 1.5
+    print(f"{'cutoff':<10} {'ok' if ok else 'FAIL'}: returned after {took:.2f}s for a 0.5s capture on an idle stream")
+    return ok
+
+async def _idle(url, base):
+    async with CaptureWriter(base, flush_s=0.05) as w:
+        await capture(url, {"btcusdt": w}, duration_s=0.5)
+
+def timing(args, snaps, tmp: Path) -> None:
+    msgs = [depth_message(snaps[i % len(snaps)]) for i in range(args.timing_rows)]
+    t0 = time.perf_counter()
+    with open(tmp / "legacy.jsonl", "w", encoding="utf-8") as f:
+        for msg in msgs:
+            d = json.loads(msg)
+            data = d.get("data", d)
+            ts = data.get("E", data.get("T", 0)) / 1000.0
+            bids = [[float(p), float(q)] for p, q in data.get("b", [])]
+            asks = [[float(p), float(q)] for p, q in data.get("a", [])]
+            f.write(json.dumps({"ts": ts, "bids": bids, "asks": asks}) + "\n")
+    legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    payloads = [_loads(m)["data"] for m in msgs]  # receive loop: parse + buffer
+    recv = time.perf_counter() - t0
+    rows = []
+    for comp in ("none", "gzip"):
+        seg = SegmentWriter(tmp / f"timed-{comp}" / "x.jsonl", compression=comp)
+        t0 = time.perf_counter()
+        seg.write(payloads)
+        seg.close()
+        rows.append((comp, time.perf_counter() - t0, sum(p.stat().st_size for p in seg.segments)))
+    n = args.timing_rows
+    print(f"\nper-message json.dumps+write: {n / legacy:>10,.0f} msg/s  ({(tmp / 'legacy.jsonl').stat().st_size / 1e6:.1f} MB)")
+    print(f"receive loop (parse+buffer): {n / recv:>10,.0f} msg/s")
+    for comp, t, size in rows:
+        print(f"batched writer, {comp:<5}:      {n / t:>10,.0f} msg/s  ({size / 1e6:.1f} MB)")
+
+def main():
+    args = parse_args()
+    snaps = list(ReplayIngestor(args.file).iter())
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        ok = True
+        ok &= check_roundtrip(args, snaps, tmp, "plain", rotate_bytes=16_000)
+        ok &= check_roundtrip(args, snaps, tmp, "gzip", compression="gzip", rotate_bytes=16_000)
+        ok &= check_roundtrip(args, snaps, tmp, "columnar", fmt="columnar", levels=5, rotate_bytes=16_000)
+        try:
+            import zstandard  # noqa: F401
+            ok &= check_roundtrip(args, snaps, tmp, "zstd", compression="zstd", rotate_bytes=16_000)
+        except ImportError:
+            print(f"{'zstd':<10} skipped (zstandard not installed)")
+        ok &= check_cutoff(args, tmp)
+        timing(args, snaps, tmp)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Local order book against SyntheticDiffFeed's dict reference book: full depth
+and top-K must match exactly after every checkpoint, injected sequence gaps
+(dropped events) must be detected and healed by a snapshot resync, and the
+same holds for spot-style (no pu) ids, for a book that drifts off its initial
+grid, and for DiffDepthIngestor fed over a local websocket.
+Exits non-zero on any mismatch.
+Usage:
+    python benchmarks/check_orderbook.py --events 20000 --levels 2000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+
+import numpy as np
+
+from moa.orderbook import DiffDepthIngestor, DiffDepthSync, LocalOrderBook, SyntheticDiffFeed
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--events", type=int, default=20_000)
+    p.add_argument("--levels", type=int, default=2_000)
+    p.add_argument("--every", type=int, default=500, help="compare against the reference every N events")
+    p.add_argument("--gap-prob", type=float, default=0.002)
+    p.add_argument("--seed", type=int, default=7)
+    return p.parse_args()
+
+def same_book(book: LocalOrderBook, feed: SyntheticDiffFeed, k=None) -> bool:
+    got, ref = book.top(k), feed.reference_top(k)
+    return all(np.array_equal(g, r) for g, r in zip(got, ref))
+
+def run_feed(label, args, gap_prob=0.0, **feed_kw) -> bool:
+    feed = SyntheticDiffFeed(levels=args.levels, seed=args.seed, **feed_kw)
+    book = LocalOrderBook(0.1, 1, capacity=1 << 12)
+    sync = DiffDepthSync(book)
+    rng = np.random.default_rng(args.seed + 1)
+    pre = feed.events(5)  # events that arrive before the snapshot are buffered, stale ones dropped
+    for ev in pre:
+        sync.on_event(ev)
+    snap = feed.snapshot()
+    for ev in feed.events(5):
+        sync.on_event(ev)
+    sync.load_snapshot(snap)
+    dropped = resyncs = 0
+    ok = True
+    for i in range(args.events):
+        ev = feed.event()
+        if rng.random() < gap_prob:
+            dropped += 1
+            continue
+        sync.on_event(ev)
+        if sync.needs_snapshot:  # what DiffDepthIngestor does: fetch, then replay the buffer
+            resyncs += 1
+            sync.load_snapshot(feed.snapshot())
+        if (i + 1) % args.every == 0 and not (same_book(book, feed) and same_book(book, feed, 20)):
+            print(f"  {label}: book differs from the reference after event {i}")
+            ok = False
+            break
+    ok &= same_book(book, feed) and sync.gaps == dropped and resyncs == dropped
+    nb, na = book.depth()
+    print(f"{label:<12} {'ok' if ok else 'FAIL'}: {args.events} events, {book.updates} level updates, "
+          f"{dropped} dropped -> {sync.gaps} gaps / {resyncs} resyncs, final depth {nb}/{na}, grid {book.capacity}")
+    return ok
+
+def check_prices(args) -> bool:
+    """Grid prices are the same doubles float() gives for the venue's strings."""
+    ok = True
+    for tick, dec in ((0.1, 1), (0.01, 2), (0.5, 1), (0.001, 3), (1.0, 0)):
+        book = LocalOrderBook(tick, dec)
+        units = round(tick * 10 ** dec)
+        ticks = np.random.default_rng(args.seed).integers(1, 10 ** 7, 5000)
+        strs = [f"{t * units / 10 ** dec:.{dec}f}" for t in ticks]
+        ok &= all(book.price(book.tick(float(s))) == float(s) for s in strs)
+    print(f"{'prices':<12} {'ok' if ok else 'FAIL'}: tick -> price round trip matches float(str)")
+    return ok
+
+async def _serve_and_ingest(snapshot, events, levels):
+    import websockets
+    async def handler(ws, *_):
+        for i, ev in enumerate(events):
+            await ws.send(json.dumps({"stream": "btcusdt@depth@100ms", "data": ev}))
+            if i < 3:  # live events are 100ms apart; give the snapshot fetch time to land
+                await asyncio.sleep(0.05)
+        await ws.close()
+    async with websockets.serve(handler, "127.0.0.1", 0) as srv:
+        port = next(iter(srv.sockets)).getsockname()[1]
+        ing = DiffDepthIngestor(f"ws://127.0.0.1:{port}", fetch=lambda: snapshot, levels=levels)
+        snaps = [s async for s in ing.stream()]
+    return ing, snaps
+
+def check_ingestor(args) -> bool:
+    feed = SyntheticDiffFeed(levels=500, seed=args.seed)
+    events = feed.events(3)  # subscribed before the REST snapshot was taken
+    snapshot = feed.snapshot()
+    events += feed.events(2000)
+    ing, snaps = asyncio.run(_serve_and_ingest(snapshot, events, 10))
+    ref_b, ref_a = feed.reference_top(10)
+    last = snaps[-1] if snaps else None
+    ok = (last is not None and np.array_equal(last.bids, ref_b) and np.array_equal(last.asks, ref_a)
+          and ing.resyncs == 1 and ing.sync.gaps == 0 and last.ts == events[-1]["E"] / 1000.0)
+    print(f"{'ingestor':<12} {'ok' if ok else 'FAIL'}: {len(snaps)} snapshots from {len(events)} diff events over a websocket")
+    return ok
+
+def main():
+    args = parse_args()
+    ok = check_prices(args)
+    ok &= run_feed("futures", args)
+    ok &= run_feed("gaps", args, gap_prob=args.gap_prob)
+    ok &= run_feed("spot", args, gap_prob=args.gap_prob, spot=True)
+    ok &= run_feed("drift", args, p_move=0.9)  # the touch wanders, so the grid has to recentre
+    ok &= check_ingestor(args)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Paced-replay accuracy check: replays 100k synthetic snapshots at 50x through
+ReplayIngestor.iter() and ReplayIngestor.stream() and fails if the cumulative
+timing error (actual elapsed - scheduled elapsed) or lag p99 exceeds the bound.
+Usage:
+    python benchmarks/check_pacing.py --rows 100000 --speedup 50 --pacing hybrid
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from moa.columnar import write_columnar
+from moa.ingest import ReplayIngestor
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--speedup", type=float, default=50.0)
+    p.add_argument("--interval-ms", type=float, default=10.0, help="mean data spacing")
+    p.add_argument("--pacing", type=str, nargs="+", default=["sleep", "hybrid"])
+    p.add_argument("--max-error-ms", type=float, default=5.0)
+    return p.parse_args()
+
+def report(label: str, ing: ReplayIngestor, elapsed: float, scheduled: float, bound_ms: float) -> bool:
+    err_ms = (elapsed - scheduled) * 1e3
+    st = ing.clock.lag_stats()
+    ok = abs(err_ms) <= bound_ms and st["p99_ms"] <= bound_ms
+    print(f"{label:<14} cumulative error {err_ms:+8.3f} ms   lag p50 {st['p50_ms']:.3f} p99 {st['p99_ms']:.3f} "
+          f"max {st['max_ms']:.3f} ms   {'OK' if ok else 'FAIL'}")
+    return ok
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(21)
+    n, L = args.rows, 5
+    ts = 1.7e9 + np.cumsum(rng.exponential(args.interval_ms / 1e3, n))
+    book = np.ones((n, L, 2))
+    scheduled = (ts[-1] - ts[0]) / args.speedup
+    print(f"{n:,} snapshots at x{args.speedup:g}: scheduled {scheduled:.2f}s")
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_columnar(Path(tmp) / "pacing.moab", ts, book, book)
+        for mode in args.pacing:
+            ing = ReplayIngestor(path, speedup=args.speedup, pacing=mode)
+            t0 = None
+            for snap in ing.iter():
+                t0 = t0 or time.perf_counter()
+            ok &= report(f"iter/{mode}", ing, time.perf_counter() - t0, scheduled, args.max_error_ms)
+
+            async def consume():
+                t0 = None
+                async for snap in ing.stream():
+                    t0 = t0 or time.perf_counter()
+                return time.perf_counter() - t0
+            ok &= report(f"stream/{mode}", ing, asyncio.run(consume()), scheduled, args.max_error_ms)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
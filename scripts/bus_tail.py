@@ -0,0 +1,85 @@
+"""
+Subscribe to the shared-memory event bus of a running run_live.py / run_replay.py
+(bus.enabled and bus.shared.enabled in its config) from another process.
+Prints signals, and with --out records every received event as JSONL; with
+--alert-strength only signals at least that strong are printed. Lapped events
+(this process fell more than bus.shared.capacity behind) are counted, not
+waited for: the producer never slows down for a subscriber.
+Usage:
+    python scripts/bus_tail.py --name moa_bus
+    python scripts/bus_tail.py --name moa_bus --topics signal evaluation --out data/tmp/bus.jsonl
+    python scripts/bus_tail.py --name moa_bus --alert-strength 0.3 --idle-exit 10
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from dataclasses import fields
+from pathlib import Path
+
+import numpy as np
+
+from moa.bus import TOPICS, SharedRing
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--name", type=str, default="moa_bus", help="bus.shared.name of the producer")
+    p.add_argument("--topics", nargs="+", choices=TOPICS, default=None, help="default: everything shared")
+    p.add_argument("--out", type=str, default=None, help="append received events to this JSONL file")
+    p.add_argument("--alert-strength", type=float, default=0.0, help="print only signals at least this strong")
+    p.add_argument("--from-oldest", action="store_true", help="start with the events still held in the ring")
+    p.add_argument("--wait", type=float, default=30.0, help="seconds to wait for the producer to create the ring")
+    p.add_argument("--idle-exit", type=float, default=0.0, help="exit after this many seconds without events (0 = never)")
+    return p.parse_args()
+
+def record(topic: str, ev) -> dict:
+    d = {"topic": topic}
+    for f in fields(ev):
+        if not f.name.startswith("_"):
+            v = getattr(ev, f.name)
+            d[f.name] = v.tolist() if isinstance(v, np.ndarray) else v
+    return d
+
+def attach(name: str, wait_s: float) -> SharedRing:
+    deadline = time.monotonic() + wait_s
+    while True:
+        try:
+            return SharedRing.attach(name)
+        except FileNotFoundError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+def main():
+    args = parse_args()
+    ring = attach(args.name, args.wait)
+    sub = ring.subscribe(args.topics, name="tail", from_oldest=args.from_oldest)
+    out = None
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        out = open(args.out, "a", encoding="utf-8")
+    last = time.monotonic()
+    try:
+        while True:
+            items = sub.poll()
+            if not items:
+                if args.idle_exit and time.monotonic() - last > args.idle_exit:
+                    break
+                time.sleep(0.005)
+                continue
+            last = time.monotonic()
+            for topic, ev in items:
+                if topic == "signal" and ev.strength >= args.alert_strength:
+                    print(f"{ev.ts:.3f} {ev.kind} strength={ev.strength:.3f}")
+                if out is not None:
+                    out.write(json.dumps(record(topic, ev)) + "\n")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if out is not None:
+            out.close()
+        print("Subscriber:", sub.as_dict())
+        ring.close()
+
+if __name__ == "__main__":
+    main()
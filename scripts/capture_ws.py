@@ -1,47 +1,64 @@
 """
-Capture a Binance Futures depth20@100ms stream to JSONL for replay.
+Capture Binance Futures depth20@100ms streams to rotating replay segments.
 Usage:
     python scripts/capture_ws.py --symbol btcusdt --minutes 5 --outfile data/raw/btcusdt_depth.jsonl
+    python scripts/capture_ws.py --symbols btcusdt ethusdt --minutes 0 --compression gzip \
+        --outfile "data/raw/{symbol}.jsonl" --rotate-mb 256 --rotate-minutes 60
+Segments are written as <outfile stem>.00000<suffix>[.gz|.zst], ...; point
+replay.file at the --outfile path to replay them in order.
 """
 from __future__ import annotations
 import argparse
 import asyncio
-import json
+from contextlib import AsyncExitStack
 from pathlib import Path
 
-import websockets
+from moa.capture import COMPRESSIONS, FORMATS, CaptureWriter, capture
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--symbol", type=str, default="btcusdt")
-    p.add_argument("--minutes", type=int, default=5)
-    p.add_argument("--outfile", type=str, default="data/raw/capture.jsonl")
+    p.add_argument("--symbols", type=str, nargs="+", default=None, help="capture several symbols over one connection")
+    p.add_argument("--minutes", type=float, default=5, help="0 = until interrupted")
+    p.add_argument("--outfile", type=str, default="data/raw/capture.jsonl",
+                   help="may contain {symbol}; otherwise the symbol is appended for multi-symbol captures")
+    p.add_argument("--format", choices=FORMATS, default="jsonl", help="columnar = memory-mapped replay layout")
+    p.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    p.add_argument("--rotate-mb", type=float, default=256.0)
+    p.add_argument("--rotate-minutes", type=float, default=60.0)
+    p.add_argument("--flush-seconds", type=float, default=1.0)
+    p.add_argument("--levels", type=int, default=20, help="depth kept by the columnar format")
+    p.add_argument("--url", type=str, default=None, help="override the stream URL (e.g. a local stand-in)")
     return p.parse_args()
 
-async def run(symbol: str, minutes: int, outfile: str):
-    url = f"wss://fstream.binance.com/stream?streams={symbol}@depth20@100ms"
-    out_path = Path(outfile)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    cutoff = minutes * 60
-    first_ts = None
-    async with websockets.connect(url, max_size=2**22) as ws, open(outfile, "w", encoding="utf-8") as f:
-        async for msg in ws:
-            d = json.loads(msg)
-            data = d.get("data", d)
-            ts = data.get("E", data.get("T", 0)) / 1000.0
-            if first_ts is None:
-                first_ts = ts
-            elapsed = ts - first_ts
-            bids = [[float(p), float(q)] for p,q in data.get("b", [])]
-            asks = [[float(p), float(q)] for p,q in data.get("a", [])]
-            if not bids or not asks:
-                continue
-            out = {"ts": ts, "bids": bids, "asks": asks}
-            f.write(json.dumps(out) + "\n")
-            if elapsed >= cutoff:
-                break
-    print(f"Wrote: {outfile}")
+def outfile_for(template: str, symbol: str, multi: bool) -> Path:
+    if "{symbol}" in template:
+        return Path(template.replace("{symbol}", symbol))
+    p = Path(template)
+    return p.with_name(f"{p.stem}_{symbol}{p.suffix}") if multi else p
+
+async def run(args):
+    symbols = [s.lower() for s in (args.symbols or [args.symbol])]
+    url = args.url or "wss://fstream.binance.com/stream?streams=" + "/".join(f"{s}@depth20@100ms" for s in symbols)
+    async with AsyncExitStack() as stack:
+        writers = {}
+        for s in symbols:
+            w = CaptureWriter(outfile_for(args.outfile, s, len(symbols) > 1), flush_s=args.flush_seconds,
+                              fmt=args.format, compression=args.compression, rotate_bytes=int(args.rotate_mb * (1 << 20)),
+                              rotate_s=args.rotate_minutes * 60.0, levels=args.levels)
+            writers[s] = await stack.enter_async_context(w)
+        try:
+            stats = await capture(url, writers, duration_s=args.minutes * 60.0 if args.minutes > 0 else None)
+            print(f"Received {stats['messages']} messages ({stats['reconnects']} reconnects)")
+        finally:
+            await stack.aclose()
+            for s, w in writers.items():
+                print(f"{s}: {w.seg.rows} rows in {len(w.segments)} segment(s)")
+                for seg in w.segments:
+                    print(f"  Wrote: {seg}")
 
 if __name__ == "__main__":
-    args = parse_args()
-    asyncio.run(run(args.symbol, args.minutes, args.outfile))
+    try:
+        asyncio.run(run(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,25 @@
+"""
+Convert a JSONL capture into the memory-mapped columnar replay format.
+Usage:
+    python scripts/convert_replay.py --infile data/samples/sample_orderbook.jsonl --outfile data/samples/sample_orderbook.moab
+"""
+from __future__ import annotations
+import argparse
+
+from moa.columnar import convert_jsonl, ColumnarBook
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--infile", type=str, required=True)
+    p.add_argument("--outfile", type=str, required=True)
+    p.add_argument("--levels", type=int, default=None, help="levels per side (default: depth of first row)")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    out = convert_jsonl(args.infile, args.outfile, levels=args.levels)
+    book = ColumnarBook(out)
+    print(f"Wrote {len(book)} rows x {book.levels} levels to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Write a deterministic synthetic replay file (see moa.synthetic).
+Usage:
+    python scripts/generate_synthetic.py --rows 10000000 --levels 20 --outfile data/tmp/synthetic.moab
+    python scripts/generate_synthetic.py --rows 1000000 --outfile data/tmp/synthetic.jsonl.gz --seed 3
+"""
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+
+from moa.synthetic import SyntheticBook
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--levels", type=int, default=20)
+    p.add_argument("--outfile", type=str, default="data/tmp/synthetic.moab",
+                   help=".moab = columnar; .jsonl or .jsonl.gz = JSONL")
+    p.add_argument("--format", choices=("jsonl", "columnar"), default=None, help="override the suffix-based format")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--tick-size", type=float, default=0.1)
+    p.add_argument("--price-decimals", type=int, default=1)
+    p.add_argument("--mid", type=float, default=60000.0)
+    p.add_argument("--rate-hz", type=float, default=10.0, help="snapshot rate outside bursts")
+    p.add_argument("--burst-rate-hz", type=float, default=200.0)
+    p.add_argument("--p-burst", type=float, default=0.002, help="chance per snapshot that a burst starts")
+    p.add_argument("--burst-len", type=float, default=200.0, help="mean burst length in snapshots")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    gen = SyntheticBook(levels=args.levels, tick_size=args.tick_size, price_decimals=args.price_decimals, mid=args.mid,
+                        rate_hz=args.rate_hz, burst_rate_hz=args.burst_rate_hz, p_burst=args.p_burst,
+                        burst_len=args.burst_len, seed=args.seed)
+    t0 = time.perf_counter()
+    out = gen.write(args.outfile, args.rows, args.format)
+    dt = time.perf_counter() - t0
+    print(f"Wrote {args.rows:,} snapshots x {args.levels} levels to {out} "
+          f"({Path(out).stat().st_size / 1e6:,.0f} MB) in {dt:.1f}s ({args.rows / dt:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Build (or refresh) the seek-index sidecars for a replay file or capture so the
+first ranged replay doesn't pay for it. Columnar files need no index.
+Usage:
+    python scripts/index_replay.py --file data/raw/btcusdt.jsonl
+    python scripts/index_replay.py --file data/raw/btcusdt.jsonl --stride 1024 --rebuild
+"""
+from __future__ import annotations
+import argparse
+import time
+from datetime import datetime, timezone
+
+from moa.columnar import is_columnar
+from moa.seekindex import INDEX_STRIDE, build_index, index_path, load_index, save_index
+from moa.segments import replay_segments
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--file", type=str, required=True, help="file, directory, or capture base path")
+    p.add_argument("--stride", type=int, default=INDEX_STRIDE, help="lines between index samples")
+    p.add_argument("--rebuild", action="store_true", help="rebuild even if the sidecar is current")
+    return p.parse_args()
+
+def utc(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="milliseconds") if ts == ts else "-"
+
+def main():
+    args = parse_args()
+    for seg in replay_segments(args.file):
+        if is_columnar(seg):
+            print(f"{seg.name}: columnar, searched directly")
+            continue
+        t0 = time.perf_counter()
+        if args.rebuild:
+            idx = build_index(seg, args.stride)
+            save_index(idx, seg)
+        else:
+            idx = load_index(seg, args.stride)
+        side = index_path(seg)
+        print(f"{seg.name}: {idx.rows:,} rows, {utc(idx.first_ts)} .. {utc(idx.last_ts)}, "
+              f"{idx.ts.shape[0]:,} samples, {side.stat().st_size / 1024 if side.exists() else 0:.0f} KiB "
+              f"in {time.perf_counter() - t0:.2f}s")
+
+if __name__ == "__main__":
+    main()
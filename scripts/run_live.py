@@ -0,0 +1,99 @@
+"""
+Run the async ingest -> features -> signals -> backtest pipeline.
+Live mode reads cfg.ws_url; --replay-server serves cfg.replay.file from a local
+websocket stand-in instead so the live path can be exercised offline.
+--diff-depth maintains a full-depth local book from the diff stream
+(cfg.orderbook) instead of reading depth20 partial snapshots.
+With bus.enabled and bus.shared.enabled in the config (or --bus-shared NAME),
+every snapshot, feature vector, signal and evaluation is also published to a
+shared-memory ring that scripts/bus_tail.py and other processes can subscribe to.
+Usage:
+    python scripts/run_live.py --config configs/default.yaml
+    python scripts/run_live.py --config configs/default.yaml --replay-server --bus-shared moa_bus
+    python scripts/run_live.py --config configs/default.yaml --replay-server --speedup 50
+    python scripts/run_live.py --config configs/default.yaml --diff-depth
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+from typing import Optional
+
+from moa.bus import bus_from_config
+from moa.config import load_config
+from moa.conflate import conflator_from_config
+from moa.ingest import BinanceIngestor
+from moa.orderbook import DiffDepthIngestor
+from moa.features import FeatureEngine
+from moa.featurelib import library_from_config
+from moa.signals import ThresholdSignalEngine
+from moa.backtest import RollingBacktester
+from moa.pipeline import PipelineRunner
+from moa.wsreplay import ReplayWebSocketServer
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", type=str, default="configs/default.yaml")
+    p.add_argument("--replay-server", action="store_true", help="serve replay.file over a local websocket")
+    p.add_argument("--speedup", type=float, default=50.0, help="replay-server pacing (0 = unpaced)")
+    p.add_argument("--max-snapshots", type=int, default=None)
+    p.add_argument("--diff-depth", action="store_true", help="full-depth local book from the diff-depth stream")
+    p.add_argument("--bus-shared", type=str, default=None, metavar="NAME",
+                   help="publish to a shared-memory event bus ring with this name")
+    return p.parse_args()
+
+def diff_depth_ingestor(cfg) -> DiffDepthIngestor:
+    ob = cfg.orderbook
+    sym = cfg.symbol
+    ws_url = ob.get("ws_url", "wss://fstream.binance.com/stream?streams={symbol}@depth@100ms")
+    rest = ob.get("snapshot_url", "https://fapi.binance.com/fapi/v1/depth?symbol={SYMBOL}&limit=1000")
+    return DiffDepthIngestor(ws_url.replace("{symbol}", sym.lower()), rest.replace("{SYMBOL}", sym.upper()),
+                             tick_size=cfg.tick_size, price_decimals=cfg.price_decimals,
+                             levels=ob.get("levels", cfg.levels))
+
+async def run(cfg, ws_url: str, max_snapshots, diff_depth: bool = False, bus_shared: Optional[str] = None):
+    fe = FeatureEngine(window_size=cfg.features["window_size"],
+                       update_rate_window=cfg.features["update_rate_window"],
+                       depth_levels=cfg.levels,
+                       mid_ewma_alpha=cfg.features.get("mid_ewma_alpha", 0.1),
+                       library=library_from_config(cfg))
+    se = ThresholdSignalEngine(imbalance_threshold=cfg.signals["imbalance_threshold"],
+                               min_update_rate=cfg.signals["min_update_rate"],
+                               confirm_n=cfg.signals["confirm_n"])
+    bt = RollingBacktester(tick_size=cfg.tick_size, horizon_seconds=cfg.backtest["horizon_seconds"],
+                           exit_on_opposite_signal=cfg.backtest.get("exit_on_opposite_signal", False),
+                           slippage_ticks=cfg.backtest.get("slippage_ticks", 0.0))
+
+    def on_event(ev):
+        if ev.signal:
+            print(f"{ev.signal.ts:.3f} {ev.signal.kind} strength={ev.signal.strength:.3f}")
+
+    bus = bus_from_config(cfg, bus_shared)
+    if bus is not None and bus.shared is not None:
+        print(f"Publishing to shared ring {bus.shared.name!r}")
+    source = diff_depth_ingestor(cfg) if diff_depth else BinanceIngestor(ws_url, levels=cfg.levels)
+    runner = PipelineRunner(source.stream(), fe, se, bt,
+                            queue_size=cfg.pipeline.get("queue_size", 1024),
+                            policy=cfg.pipeline.get("overflow", "drop_oldest"),
+                            on_event=on_event, conflator=conflator_from_config(cfg), bus=bus)
+    try:
+        stats = await runner.run(stop_after=max_snapshots)
+    finally:
+        if bus is not None:
+            bus.close()
+    print("Pipeline:", json.dumps(stats.as_dict()))
+    print("Summary:", bt.summary())
+    if diff_depth:
+        print(f"Order book: {source.sync.applied} events, {source.sync.gaps} sequence gaps, {source.resyncs} snapshots")
+
+async def main_async(args):
+    cfg = load_config(args.config)
+    if args.replay_server:
+        async with ReplayWebSocketServer(cfg.replay["file"], speedup=args.speedup,
+                                         stream=f"{cfg.symbol}@depth20@100ms") as srv:
+            await run(cfg, srv.url, args.max_snapshots, bus_shared=args.bus_shared)
+    else:
+        await run(cfg, cfg.ws_url, args.max_snapshots, diff_depth=args.diff_depth, bus_shared=args.bus_shared)
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
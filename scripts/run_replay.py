@@ -1,52 +1,117 @@
 from __future__ import annotations
 import argparse
 from pathlib import Path
-import csv
+import time
 
+import numpy as np
+
+from moa.bus import bus_from_config
 from moa.config import load_config
+from moa.conflate import conflator_from_config
 from moa.ingest import ReplayIngestor
 from moa.features import FeatureEngine
-from moa.signals import ThresholdSignalEngine
-from moa.backtest import RollingBacktester
+from moa.featurelib import library_from_config
+from moa.signals import ThresholdSignalEngine, generate_signals
+from moa.backtest import RollingBacktester, backtest_signals, cumulative_pnl
+from moa.cache import cache_from_config
+from moa.sinks import SINKS, open_sink
+from moa.metrics import profiler_from_config
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--config", type=str, default="configs/default.yaml")
-    p.add_argument("--out", type=str, default="data/tmp/replay_results.csv")
+    p.add_argument("--out", type=str, default="data/tmp/replay_results.csv",
+                   help="format follows the suffix: .csv, .parquet, .npz (a directory of parts)")
+    p.add_argument("--format", choices=sorted(SINKS), default=None, help="override the suffix-based format")
+    p.add_argument("--chunk-rows", type=int, default=65536)
+    p.add_argument("--writer-thread", action="store_true", help="format and write chunks on a background thread")
+    p.add_argument("--profile", action="store_true", help="print per-stage latency percentiles")
+    p.add_argument("--no-cache", action="store_true", help="recompute features even if cached")
+    p.add_argument("--start-ts", type=str, default=None, help="replay from this time (epoch seconds or ISO-8601)")
+    p.add_argument("--bus-shared", type=str, default=None, metavar="NAME",
+                   help="publish to a shared-memory event bus ring with this name (see bus in the config)")
+    p.add_argument("--end-ts", type=str, default=None, help="replay up to, not including, this time")
     return p.parse_args()
 
+def run_cached(cfg, cache, fe, sink) -> dict:
+    """Unpaced replay from cached features: only the signal and backtest stages run."""
+    t0 = time.perf_counter()
+    table, hit = cache.load_or_compute(cfg.replay["file"], fe)
+    ts, mid, imb, bs, asl, rate = table[:6]
+    print(f"Features {'loaded from cache' if hit else 'computed and cached'} in {time.perf_counter() - t0:.2f}s")
+    direction, strength = generate_signals(imb, bs, asl, rate, imbalance_threshold=cfg.signals["imbalance_threshold"],
+                                           min_update_rate=cfg.signals["min_update_rate"],
+                                           confirm_n=cfg.signals["confirm_n"])
+    evals, summary = backtest_signals(ts, mid, direction, tick_size=cfg.tick_size,
+                                      horizon_seconds=cfg.backtest["horizon_seconds"],
+                                      slippage_ticks=cfg.backtest.get("slippage_ticks", 0.0),
+                                      exit_on_opposite_signal=cfg.backtest.get("exit_on_opposite_signal", False))
+    sink.write_columns(ts, mid, imb, bs, asl, rate, direction, strength, cumulative_pnl(evals, ts.shape[0]))
+    return summary
+
 def main():
     args = parse_args()
     cfg = load_config(args.config)
 
-    ing = ReplayIngestor(cfg.replay["file"], speedup=cfg.replay.get("speedup", 0.0))
+    ing = ReplayIngestor(cfg.replay["file"], speedup=cfg.replay.get("speedup", 0.0),
+                         pacing=cfg.replay.get("pacing", "sleep"),
+                         start_ts=args.start_ts or cfg.replay.get("start_ts"),
+                         end_ts=args.end_ts or cfg.replay.get("end_ts"))
     fe = FeatureEngine(window_size=cfg.features["window_size"],
                        update_rate_window=cfg.features["update_rate_window"],
-                       depth_levels=cfg.levels)
+                       depth_levels=cfg.levels,
+                       mid_ewma_alpha=cfg.features.get("mid_ewma_alpha", 0.1),
+                       library=library_from_config(cfg))
     se = ThresholdSignalEngine(imbalance_threshold=cfg.signals["imbalance_threshold"],
                                min_update_rate=cfg.signals["min_update_rate"],
                                confirm_n=cfg.signals["confirm_n"])
     bt = RollingBacktester(tick_size=cfg.tick_size, horizon_seconds=cfg.backtest["horizon_seconds"],
                            exit_on_opposite_signal=cfg.backtest.get("exit_on_opposite_signal", False),
                            slippage_ticks=cfg.backtest.get("slippage_ticks", 0.0))
+    prof = profiler_from_config(cfg, force=args.profile)
+    prof.instrument(fe, se, bt)
 
     out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate", "signal", "strength", "cum_pnl_ticks"])
+    cache = None if args.no_cache else cache_from_config(cfg)
+    sink = open_sink(out_path, args.format, chunk_rows=args.chunk_rows, threaded=args.writer_thread)
+    conf = conflator_from_config(cfg)
+    bus = bus_from_config(cfg, args.bus_shared)
+    if bus is not None and bus.shared is not None:
+        print(f"Publishing to shared ring {bus.shared.name!r}")
+    # cached features cover every row of the whole file; a time range, conflation or
+    # an event bus replays through the engines
+    if (cache is not None and not ing.clock.speedup and not prof.enabled and not ing.ranged and conf is None
+            and bus is None):
+        with sink:
+            print("Summary:", run_cached(cfg, cache, fe, sink))
+        print(f"Wrote results to {out_path}")
+        return
+    with sink:
         cum = 0.0
-        for snap in ing.iter():
+        snaps = prof.iter(ing.iter(), "ingest", counter="snapshots")
+        for snap, skipped in conf.iter(snaps) if conf is not None else ((s, ()) for s in snaps):
+            if skipped:
+                fe.skip(skipped)
             fv = fe.push(snap)
             sig = se.evaluate(fv)
             if sig:
                 bt.on_signal(snap, sig)
-            ev = bt.on_snapshot(snap)
-            if ev:
+            evs = bt.on_snapshot(snap)
+            for ev in evs:
                 cum += ev.pnl_ticks
-            w.writerow([snap.ts, snap.mid, fv.imbalance, fv.bid_slope, fv.ask_slope, fv.update_rate, getattr(sig, "kind", ""), getattr(sig, "strength", ""), cum])
+            if bus is not None:
+                bus.publish_step(snap, fv, sig, evs)
+            sink.write_row(snap.ts, snap.mid, fv.imbalance, fv.bid_slope, fv.ask_slope, fv.update_rate,
+                           sig.kind if sig else "", sig.strength if sig else np.nan, cum)
 
     print("Summary:", bt.summary())
+    if conf is not None:
+        print("Conflation:", conf.stats.as_dict())
+    if bus is not None:
+        print("Bus:", bus.stats())
+        bus.close()
+    if prof.enabled:
+        print(prof.format())
     print(f"Wrote results to {out_path}")
 
 if __name__ == "__main__":
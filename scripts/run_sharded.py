@@ -0,0 +1,47 @@
+"""
+Multi-symbol run: shards cfg.symbols across worker processes and prints
+signals plus a per-shard health/lag report.
+Usage:
+    python scripts/run_sharded.py --config configs/default.yaml --symbols btcusdt ethusdt solusdt --workers 2
+"""
+from __future__ import annotations
+import argparse
+
+from moa.config import load_config
+from moa.shards import run_sharded
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", type=str, default="configs/default.yaml")
+    p.add_argument("--symbols", type=str, nargs="+", default=None, help="overrides cfg.symbols")
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--max-snapshots", type=int, default=None, help="per symbol")
+    p.add_argument("--quiet", action="store_true")
+    return p.parse_args()
+
+def print_health(rows):
+    print(f"{'shard':>5} {'symbol':<10} {'processed':>9} {'rate/s':>9} {'dropped':>7} {'queued':>6} {'p99 ms':>8} {'lag':>10}")
+    for r in rows:
+        lag = r.get("pacing_lag_p99_ms", r.get("data_lag_s"))
+        print(f"{r['shard']:>5} {r['symbol']:<10} {r['processed']:>9} {r['rate']:>9.1f} {r['dropped']:>7} "
+              f"{r['queued']:>6} {r['latency_p99_ms']:>8.3f} {lag if lag is not None else '':>10.4}")
+
+def main():
+    args = parse_args()
+    cfg = load_config(args.config)
+    if args.symbols:
+        cfg.symbols = args.symbols
+
+    def on_record(rec):
+        if not args.quiet and rec[0] == "signal":
+            print(f"[{rec[1]}] {rec[2]:.3f} {rec[3]} strength={rec[4]:.3f}")
+
+    res = run_sharded(cfg, workers=args.workers, on_record=on_record, max_snapshots=args.max_snapshots)
+    print(f"{len(cfg.symbol_list())} symbols on {len(res.shards)} shards in {res.elapsed_s:.2f}s: "
+          f"{res.signals} signals, {res.evaluations} evaluations")
+    print_health(res.health_table())
+    for sym, summary in sorted(res.summaries.items()):
+        print(sym, summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Grid-search signal/backtest parameters over one replay file.
+Features are computed once and shared with a process pool.
+Usage:
+    python scripts/run_sweep.py --config configs/default.yaml \
+        --imbalance-threshold 0.05 0.1 0.15 0.2 --confirm-n 1 2 3 --horizon-seconds 2 5 10
+"""
+from __future__ import annotations
+import argparse
+import time
+
+from moa.config import load_config
+from moa.ingest import ReplayIngestor
+from moa.features import FeatureEngine
+from moa.sweep import feature_table, expand_grid, run_sweep, write_results
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", type=str, default="configs/default.yaml")
+    p.add_argument("--out", type=str, default="data/tmp/sweep_results.csv")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--sort-by", type=str, default="avg_pnl_ticks")
+    p.add_argument("--imbalance-threshold", type=float, nargs="+")
+    p.add_argument("--min-update-rate", type=float, nargs="+")
+    p.add_argument("--confirm-n", type=int, nargs="+")
+    p.add_argument("--horizon-seconds", type=float, nargs="+")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    cfg = load_config(args.config)
+
+    fe = FeatureEngine(window_size=cfg.features["window_size"],
+                       update_rate_window=cfg.features["update_rate_window"],
+                       depth_levels=cfg.levels,
+                       mid_ewma_alpha=cfg.features.get("mid_ewma_alpha", 0.1))
+    t0 = time.perf_counter()
+    table = feature_table(*ReplayIngestor(cfg.replay["file"], start_ts=cfg.replay.get("start_ts"),
+                                              end_ts=cfg.replay.get("end_ts")).arrays(), fe)
+    print(f"Features for {table.shape[1]} snapshots in {time.perf_counter() - t0:.2f}s")
+
+    grid = expand_grid({
+        "imbalance_threshold": args.imbalance_threshold or [cfg.signals["imbalance_threshold"]],
+        "min_update_rate": args.min_update_rate or [cfg.signals["min_update_rate"]],
+        "confirm_n": args.confirm_n or [cfg.signals["confirm_n"]],
+        "horizon_seconds": args.horizon_seconds or [cfg.backtest["horizon_seconds"]],
+        "exit_on_opposite_signal": [cfg.backtest.get("exit_on_opposite_signal", False)],
+        "slippage_ticks": [cfg.backtest.get("slippage_ticks", 0.0)],
+    })
+    t0 = time.perf_counter()
+    results = run_sweep(table, grid, tick_size=cfg.tick_size, workers=args.workers, sort_by=args.sort_by)
+    print(f"Evaluated {len(grid)} parameter sets in {time.perf_counter() - t0:.2f}s")
+
+    out = write_results(results, args.out)
+    for r in results[:5]:
+        print(r)
+    print(f"Wrote ranked results to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Walk-forward evaluation of the threshold strategy over one replay file:
+choose signal parameters on each train window, score them on the next block.
+Usage:
+    python scripts/run_walkforward.py --config configs/default.yaml --folds 5 --workers 4
+    python scripts/run_walkforward.py --folds 8 --anchored --imbalance-threshold 0.05 0.1 0.2 --confirm-n 1 2 3
+"""
+from __future__ import annotations
+import argparse
+import csv
+import time
+from pathlib import Path
+
+from moa.config import load_config
+from moa.ingest import ReplayIngestor
+from moa.sweep import expand_grid
+from moa.walkforward import fold_rows, run_walkforward
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", type=str, default="configs/default.yaml")
+    p.add_argument("--out", type=str, default="data/tmp/walkforward.csv")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--folds", type=int, default=None)
+    p.add_argument("--train-blocks", type=int, default=None)
+    p.add_argument("--anchored", action="store_true", default=None, help="train on every block before the test block")
+    p.add_argument("--objective", type=str, default=None)
+    p.add_argument("--min-trades", type=int, default=None)
+    p.add_argument("--imbalance-threshold", type=float, nargs="+")
+    p.add_argument("--min-update-rate", type=float, nargs="+")
+    p.add_argument("--confirm-n", type=int, nargs="+")
+    p.add_argument("--horizon-seconds", type=float, nargs="+")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    cfg = load_config(args.config)
+    wf = cfg.walkforward
+    grid_cfg = wf.get("grid", {})
+    def axis(cli, key, default):
+        return cli or grid_cfg.get(key) or [default]
+    grid = expand_grid({
+        "imbalance_threshold": axis(args.imbalance_threshold, "imbalance_threshold", cfg.signals["imbalance_threshold"]),
+        "min_update_rate": axis(args.min_update_rate, "min_update_rate", cfg.signals["min_update_rate"]),
+        "confirm_n": axis(args.confirm_n, "confirm_n", cfg.signals["confirm_n"]),
+        "horizon_seconds": axis(args.horizon_seconds, "horizon_seconds", cfg.backtest["horizon_seconds"]),
+        "exit_on_opposite_signal": [cfg.backtest.get("exit_on_opposite_signal", False)],
+        "slippage_ticks": [cfg.backtest.get("slippage_ticks", 0.0)],
+    })
+    fe_params = {"window_size": cfg.features["window_size"], "update_rate_window": cfg.features["update_rate_window"],
+                 "depth_levels": cfg.levels, "mid_ewma_alpha": cfg.features.get("mid_ewma_alpha", 0.1)}
+
+    min_trades = args.min_trades if args.min_trades is not None else wf.get("min_trades", 10)
+    path = cfg.replay["file"]
+    t0 = time.perf_counter()
+    ing = ReplayIngestor(path, start_ts=cfg.replay.get("start_ts"), end_ts=cfg.replay.get("end_ts"))
+    ts, bids, asks = ing.arrays()
+    print(f"Loaded {ts.shape[0]} snapshots in {time.perf_counter() - t0:.2f}s")
+    t0 = time.perf_counter()
+    result = run_walkforward(ts, bids, asks, fe_params, grid,
+                             n_folds=args.folds or wf.get("folds", 5),
+                             train_blocks=args.train_blocks or wf.get("train_blocks", 1),
+                             anchored=wf.get("anchored", False) if args.anchored is None else args.anchored,
+                             tick_size=cfg.tick_size,
+                             objective=args.objective or wf.get("objective", "sharpe_ticks"),
+                             min_trades=min_trades,
+                             workers=args.workers, source=None if ing.ranged else path)
+    print(f"Evaluated {len(result['folds'])} folds x {len(grid)} parameter sets in {time.perf_counter() - t0:.2f}s\n")
+
+    rows = fold_rows(result)
+    cols = ("fold", "trades", "total_pnl_ticks", "sharpe_ticks", "max_drawdown_ticks", "turnover_per_hour",
+            "pnl_p05", "pnl_p50", "pnl_p95")
+    print(" ".join(f"{c:>18}" for c in cols))
+    for r in rows:
+        print(" ".join(f"{r.get(c, ''):>18.3f}" if isinstance(r.get(c), float) else f"{r.get(c, ''):>18}" for c in cols))
+    varying = [k for k in grid[0] if len({p[k] for p in grid}) > 1]
+    for r in result["folds"]:
+        chosen = {k: r["params"][k] for k in varying} if r["params"] else f"none with >= {min_trades} train trades"
+        print(f"fold {r['fold']} params: {chosen}")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    fields = list(dict.fromkeys(k for r in rows for k in r))
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(rows)
+    print(f"Wrote per-fold results to {out}")
+
+if __name__ == "__main__":
+    main()
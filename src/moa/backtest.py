@@ -1,22 +1,83 @@
 from __future__ import annotations
-from collections import deque
-from typing import Deque, Optional, Tuple
+import heapq
+from typing import List, Sequence, Tuple
 import numpy as np
-from .schemas import BookSnapshot, Signal, Evaluation
+from .jit import kernel
+from .schemas import BookSnapshot, Signal, Evaluation, EvaluationBatch
+
+def summarize(pnl_ticks: Sequence[float] | np.ndarray, buy_signals: int, sell_signals: int) -> dict:
+    arr = np.asarray(pnl_ticks, dtype=float)
+    return {
+        "trades": int(arr.size),
+        "avg_pnl_ticks": float(arr.mean()) if arr.size else 0.0,
+        "win_rate": float((arr > 0).mean()) if arr.size else 0.0,
+        "buy_signals": int(buy_signals),
+        "sell_signals": int(sell_signals),
+    }
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def trade_stats(pnl_ticks: Sequence[float] | np.ndarray, span_seconds: float, quantiles: Sequence[float] = QUANTILES) -> dict:
+    """
+    Performance of a sequence of closed trades (P&L in ticks, in exit order)
+    over `span_seconds` of data: per-trade Sharpe (mean / sample std), max
+    drawdown of the cumulative P&L, turnover as round trips per hour, and
+    P&L quantiles.
+    """
+    arr = np.asarray(pnl_ticks, dtype=float)
+    n = arr.size
+    std = float(arr.std(ddof=1)) if n > 1 else 0.0
+    cum = np.cumsum(arr)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], cum)))[1:]
+    hours = span_seconds / 3600.0
+    out = {
+        "trades": int(n),
+        "total_pnl_ticks": float(cum[-1]) if n else 0.0,
+        "avg_pnl_ticks": float(arr.mean()) if n else 0.0,
+        "win_rate": float((arr > 0).mean()) if n else 0.0,
+        "sharpe_ticks": float(arr.mean() / std) if std > 0 else 0.0,
+        "max_drawdown_ticks": float((peak - cum).max()) if n else 0.0,
+        "turnover_per_hour": n / hours if hours > 0 else 0.0,
+    }
+    qs = np.quantile(arr, quantiles) if n else np.zeros(len(quantiles))
+    out.update({f"pnl_p{round(q * 100):02d}": float(v) for q, v in zip(quantiles, qs)})
+    return out
 
 class RollingBacktester:
+    """
+    Opens a position per signal and closes it at the first snapshot at least
+    `horizon_seconds` later. Open positions sit in per-direction heaps keyed by
+    signal time, so every position due on a snapshot matures in one pass at
+    O(matured) heap pops. With `exit_on_opposite_signal`, a signal also closes
+    all open positions of the other direction at that snapshot's mid.
+    """
     def __init__(self, tick_size: float = 0.1, horizon_seconds: float = 5.0, exit_on_opposite_signal: bool = False, slippage_ticks: float = 0.0):
         self.tick_size = tick_size
         self.horizon = horizon_seconds
         self.exit_on_opposite = exit_on_opposite_signal
         self.slippage = slippage_ticks
-        self.pending: Deque[Tuple[Signal, float]] = deque()  # (signal, entry_mid)
+        # heap entries: (signal ts, seq, signal, entry_mid)
+        self.open_buys: List[Tuple[float, int, Signal, float]] = []
+        self.open_sells: List[Tuple[float, int, Signal, float]] = []
+        self._seq = 0
+        self._closed: List[Evaluation] = []  # closed by an opposite signal, reported on the next on_snapshot
 
         # Metrics
         self.pnl_ticks_list = []
         self.count_buy = 0
         self.count_sell = 0
 
+    @property
+    def open_positions(self) -> int:
+        return len(self.open_buys) + len(self.open_sells)
+
+    def _close(self, item: Tuple[float, int, Signal, float], ts: float, exit_mid: float) -> Evaluation:
+        _, _, sig, entry = item
+        direction = 1.0 if sig.kind == "BUY_PRESSURE" else -1.0
+        pnl_ticks = (exit_mid - entry) * direction / self.tick_size
+        self.pnl_ticks_list.append(pnl_ticks)
+        return Evaluation(ts=ts, signal_kind=sig.kind, entry_mid=float(entry), exit_mid=float(exit_mid), pnl_ticks=float(pnl_ticks))
+
     def on_signal(self, snap: BookSnapshot, sig: Signal) -> None:
         entry = snap.mid
         if not np.isfinite(entry):
@@ -25,33 +86,125 @@ class RollingBacktester:
         if sig.kind == "BUY_PRESSURE":
             entry += self.slippage * self.tick_size
             self.count_buy += 1
+            book, opposite = self.open_buys, self.open_sells
         else:
             entry -= self.slippage * self.tick_size
             self.count_sell += 1
-        self.pending.append((sig, entry))
-
-    def on_snapshot(self, snap: BookSnapshot) -> Optional[Evaluation]:
-        # Mature any positions beyond horizon
-        if not self.pending:
-            return None
-        sig, entry = self.pending[0]
-        if (snap.ts - sig.ts) >= self.horizon:
-            exit_mid = snap.mid
-            if not np.isfinite(exit_mid):
-                return None
-            direction = 1.0 if sig.kind == "BUY_PRESSURE" else -1.0
-            pnl_ticks = (exit_mid - entry) * direction / self.tick_size
-            self.pnl_ticks_list.append(pnl_ticks)
-            self.pending.popleft()
-            return Evaluation(ts=snap.ts, signal_kind=sig.kind, entry_mid=float(entry), exit_mid=float(exit_mid), pnl_ticks=float(pnl_ticks))
-        return None
+            book, opposite = self.open_sells, self.open_buys
+        if self.exit_on_opposite:
+            while opposite:
+                self._closed.append(self._close(heapq.heappop(opposite), snap.ts, snap.mid))
+        heapq.heappush(book, (sig.ts, self._seq, sig, entry))
+        self._seq += 1
+
+    def on_snapshot(self, snap: BookSnapshot) -> List[Evaluation]:
+        """Mature every position whose horizon has elapsed; returns them oldest first."""
+        out, self._closed = self._closed, []
+        exit_mid = snap.mid
+        if not np.isfinite(exit_mid):
+            return out
+        buys, sells, horizon = self.open_buys, self.open_sells, self.horizon
+        while True:
+            due_b = bool(buys) and (snap.ts - buys[0][0]) >= horizon
+            due_s = bool(sells) and (snap.ts - sells[0][0]) >= horizon
+            if due_b and (not due_s or buys[0][:2] < sells[0][:2]):
+                out.append(self._close(heapq.heappop(buys), snap.ts, exit_mid))
+            elif due_s:
+                out.append(self._close(heapq.heappop(sells), snap.ts, exit_mid))
+            else:
+                return out
 
     def summary(self) -> dict:
-        arr = np.array(self.pnl_ticks_list, dtype=float) if self.pnl_ticks_list else np.array([], dtype=float)
-        return {
-            "trades": int(arr.size),
-            "avg_pnl_ticks": float(arr.mean()) if arr.size else 0.0,
-            "win_rate": float((arr > 0).mean()) if arr.size else 0.0,
-            "buy_signals": self.count_buy,
-            "sell_signals": self.count_sell,
-        }
+        return summarize(self.pnl_ticks_list, self.count_buy, self.count_sell)
+
+def _horizon_exits_numpy(ts, finite, sig_idx, first_due, horizon):
+    """_horizon_exits in NumPy: the same corrections, applied to all entries at once."""
+    n = ts.shape[0]
+    t0 = ts[sig_idx]
+    s = np.maximum(first_due, sig_idx)
+    while True:  # searchsorted may overshoot the streaming comparison by a row or two
+        back = (s - 1 >= sig_idx) & ((ts[np.maximum(s - 1, 0)] - t0) >= horizon)
+        if not back.any():
+            break
+        s = s - back
+    while True:
+        fwd = (s < n) & ((ts[np.minimum(s, n - 1)] - t0) < horizon)
+        if not fwd.any():
+            break
+        s = s + fwd
+    # ts - t0 >= horizon holds from s on, so the exit is the next finite mid
+    nxt = np.append(np.where(finite, np.arange(n), n), n)
+    nxt = np.minimum.accumulate(nxt[::-1])[::-1]
+    exits = nxt[s]
+    return np.where(exits < n, exits, -1).astype(np.int64)
+
+@kernel(fallback=_horizon_exits_numpy,
+        warm=lambda: (np.zeros(2), np.ones(2, dtype=np.bool_), np.zeros(1, dtype=np.int64), np.ones(1, dtype=np.int64), 5.0))
+def _horizon_exits(ts, finite, sig_idx, first_due, horizon):
+    """
+    First snapshot at or after each entry with ts - entry_ts >= horizon and a
+    finite mid; -1 if the series ends first. `first_due` is a searchsorted guess
+    that is corrected to the exact streaming comparison.
+    """
+    n = ts.shape[0]
+    m = sig_idx.shape[0]
+    exits = np.full(m, -1, dtype=np.int64)
+    for k in range(m):
+        lo = sig_idx[k]
+        t0 = ts[lo]
+        s = max(first_due[k], lo)
+        while s - 1 >= lo and (ts[s - 1] - t0) >= horizon:
+            s -= 1
+        while s < n and not ((ts[s] - t0) >= horizon and finite[s]):
+            s += 1
+        if s < n:
+            exits[k] = s
+    return exits
+
+def backtest_signals(ts: np.ndarray, mid: np.ndarray, direction: np.ndarray, tick_size: float = 0.1,
+                     horizon_seconds: float = 5.0, slippage_ticks: float = 0.0,
+                     exit_on_opposite_signal: bool = False) -> Tuple[EvaluationBatch, dict]:
+    """
+    Array equivalent of driving RollingBacktester with on_signal/on_snapshot
+    for every row. `direction` is the output of signals.generate_signals.
+    Returns the matured trades, in the order the streaming class emits them,
+    and the same dict as RollingBacktester.summary(). `ts` must be non-decreasing.
+    """
+    ts = np.ascontiguousarray(ts, dtype=np.float64)
+    mid = np.ascontiguousarray(mid, dtype=np.float64)
+    direction = np.asarray(direction)
+    finite = np.isfinite(mid)
+    sig_idx = np.flatnonzero((direction != 0) & finite)
+    sig_dir = direction[sig_idx].astype(np.float64)
+    entry = mid[sig_idx] + sig_dir * (slippage_ticks * tick_size)
+    first_due = np.searchsorted(ts, ts[sig_idx] + horizon_seconds, side="left").astype(np.int64)
+    exits = _horizon_exits(ts, finite, sig_idx.astype(np.int64), first_due, float(horizon_seconds))
+    n = ts.shape[0]
+    exits = np.where(exits < 0, n, exits)
+    by_opp = np.zeros(sig_idx.shape[0], dtype=bool)
+    if exit_on_opposite_signal and sig_idx.size:
+        # next accepted signal of the other direction closes the position
+        opp = np.full(sig_idx.shape[0], n, dtype=np.int64)
+        for d in (1.0, -1.0):
+            mine = sig_dir == d
+            theirs = sig_idx[sig_dir == -d]
+            pos = np.searchsorted(theirs, sig_idx[mine], side="right")
+            opp[mine] = np.append(theirs, n)[pos]
+        by_opp = opp <= exits
+        exits = np.minimum(exits, opp)
+    done = exits < n
+    e, d_entry, d_dir = exits[done], entry[done], sig_dir[done]
+    # streaming order: opposite-signal closes first, then horizon exits, oldest entry first
+    order = np.lexsort((sig_idx[done], ~by_opp[done], e))
+    e, d_entry, d_dir, e_idx = e[order], d_entry[order], d_dir[order], sig_idx[done][order]
+    exit_mid = mid[e]
+    pnl = (exit_mid - d_entry) * d_dir / tick_size
+    batch = EvaluationBatch(entry_idx=e_idx, exit_idx=e, ts=ts[e], direction=d_dir.astype(np.int8),
+                            entry_mid=d_entry, exit_mid=exit_mid, pnl_ticks=pnl)
+    return batch, summarize(pnl, int((sig_dir > 0).sum()), int((sig_dir < 0).sum()))
+
+def cumulative_pnl(batch: EvaluationBatch, n: int) -> np.ndarray:
+    """Running P&L (ticks) after each of `n` snapshots, summed in emission order like the streaming loop."""
+    cum = np.cumsum(batch.pnl_ticks)
+    last = np.searchsorted(batch.exit_idx, np.arange(n), side="right") - 1
+    return np.where(last >= 0, cum[np.maximum(last, 0)] if cum.size else 0.0, 0.0)
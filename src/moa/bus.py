@@ -0,0 +1,389 @@
+"""
+Publish/subscribe event bus for snapshots, features, signals and evaluations.
+
+One producer (the replay loop or the pipeline's signal stage) publishes into a
+preallocated ring; any number of consumers (dashboard, recorder, alerting,
+paper trading) subscribe with their own cursor:
+- publish() is O(1) whatever the number of subscribers: it stores a reference
+  in the next slot and advances the head. Nothing is copied, so every
+  in-process subscriber sees the producer's own objects (treat them as
+  read-only, as BookSnapshot already asks).
+- poll() returns the events between a subscriber's cursor and the head. A
+  subscriber more than `capacity` events behind has been lapped: it skips to
+  the oldest event still held and counts the rest in `missed`. The producer
+  never waits for anyone.
+- topics are stored as one-byte codes next to the slots, so a subscriber to rare
+  topics (signals) filters a batch with one numpy lookup.
+
+EventBus.share() mirrors chosen topics into a SharedRing: fixed-size slots in
+multiprocessing.shared_memory holding pickled events, with a sequence number
+per slot. Other processes attach by name (SharedRing.attach) and subscribe the
+same way. A slot's sequence number is cleared before it is rewritten and set
+after, and a reader checks it again after copying, so an event overwritten
+mid-read is counted as missed, never returned torn.
+"""
+from __future__ import annotations
+import asyncio
+import pickle
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from .schemas import BookSnapshot, Evaluation, FeatureVector, Signal
+
+TOPICS = ("snapshot", "features", "signal", "evaluation")
+_CODES = {t: i for i, t in enumerate(TOPICS)}
+
+Event = Tuple[str, Any]  # (topic, payload)
+
+_MAGIC = b"MOABUS1\0"
+_HEADER = 64    # magic, capacity, slot_size, head; slots start here
+_SLOT_HEAD = 16  # per slot: seq (u8, event number + 1; 0 while written), topic code (u4), length (u4)
+
+
+def _pow2(n: int) -> int:
+    return 1 << max(int(n) - 1, 1).bit_length()
+
+
+def _topic_mask(topics: Optional[Iterable[str]]) -> np.ndarray:
+    want = np.zeros(len(TOPICS), dtype=bool)
+    for t in TOPICS if topics is None else topics:
+        if t not in _CODES:
+            raise ValueError(f"unknown topic {t!r}; expected one of {TOPICS}")
+        want[_CODES[t]] = True
+    return want
+
+
+class _Consumer:
+    """Draining helpers shared by local and shared-memory subscriptions (both implement poll)."""
+    name = ""
+    _stop: Optional[threading.Event] = None
+    _thread: Optional[threading.Thread] = None
+
+    def poll(self, max_items: int = 4096) -> List[Event]:
+        raise NotImplementedError
+
+    def start(self, handler: Callable[[str, Any], None], idle_s: float = 0.001,
+              batch: int = 4096) -> threading.Thread:
+        """Call handler(topic, event) for every event on a background thread until stop()."""
+        self._stop = stop = threading.Event()
+
+        def loop() -> None:
+            while True:
+                stopping = stop.is_set()
+                items = self.poll(batch)
+                for topic, ev in items:
+                    handler(topic, ev)
+                if not items:
+                    if stopping:  # drained everything published before stop()
+                        return
+                    stop.wait(idle_s)
+
+        self._thread = threading.Thread(target=loop, name=f"bus-{self.name or 'subscriber'}", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+            self._thread.join()
+            self._stop = self._thread = None
+
+    async def stream(self, idle_s: float = 0.001, batch: int = 4096) -> AsyncIterator[Event]:
+        """Async iterator over events; sleeps idle_s whenever it has caught up."""
+        while True:
+            items = self.poll(batch)
+            if not items:
+                await asyncio.sleep(idle_s)
+                continue
+            for item in items:
+                yield item
+
+
+class Subscription(_Consumer):
+    def __init__(self, bus: "EventBus", topics: Optional[Iterable[str]], name: str, cursor: int):
+        self.bus = bus
+        self.name = name
+        self.want = _topic_mask(topics)
+        self.every = bool(self.want.all())
+        self.cursor = cursor
+        self.received = 0
+        self.missed = 0  # events overwritten before this subscriber read them
+
+    @property
+    def lag(self) -> int:
+        """Events published and not yet polled."""
+        return self.bus.head - self.cursor
+
+    def poll(self, max_items: int = 4096) -> List[Event]:
+        bus = self.bus
+        cap = bus.capacity
+        head, cursor = bus.head, self.cursor
+        if head - cursor > cap:
+            self.missed += head - cap - cursor
+            cursor = head - cap
+        n = min(head - cursor, max_items)
+        if n <= 0:
+            return []
+        start = cursor & bus.mask
+        if start + n <= cap:
+            slots, codes = bus.slots[start:start + n], bus._codes[start:start + n].copy()
+        else:
+            wrap = start + n - cap
+            slots, codes = bus.slots[start:] + bus.slots[:wrap], np.concatenate((bus._codes[start:], bus._codes[:wrap]))
+        over = bus.head - cap - cursor  # a producer on another thread may have lapped the copy
+        if over > 0:
+            slots, codes = slots[over:], codes[over:]
+            self.missed += min(over, n)
+        self.cursor = cursor + n
+        if not self.every:
+            keep = np.flatnonzero(self.want[codes])
+            slots, codes = [slots[i] for i in keep], codes[keep]
+        self.received += len(slots)
+        return list(zip([TOPICS[c] for c in codes.tolist()], slots))
+
+    def close(self) -> None:
+        self.stop()
+        if self in self.bus.subscribers:
+            self.bus.subscribers.remove(self)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"received": self.received, "missed": self.missed, "lag": self.lag}
+
+
+class EventBus:
+    """
+    Single-producer ring of (topic, event) references. `capacity` is rounded
+    up to a power of two; it bounds how far a subscriber may fall behind and
+    how many events stay referenced.
+    """
+    def __init__(self, capacity: int = 1 << 14):
+        self.capacity = _pow2(capacity)
+        self.mask = self.capacity - 1
+        self.slots: List[Any] = [None] * self.capacity
+        self.codes = bytearray(self.capacity)  # topic code per slot; cheaper to write one item than numpy
+        self._codes = np.frombuffer(self.codes, dtype=np.uint8)
+        self.head = 0  # events published; the next goes to slot head & mask
+        self.subscribers: List[Subscription] = []
+        self.shared: Optional[SharedRing] = None
+        self._share_want: Tuple[bool, ...] = (False,) * len(TOPICS)
+
+    def publish(self, topic: str, event: Any) -> None:
+        code = _CODES[topic]
+        i = self.head & self.mask
+        self.slots[i] = event
+        self.codes[i] = code
+        self.head += 1
+        if self.shared is not None and self._share_want[code]:
+            self.shared.publish(code, event)
+
+    def publish_step(self, snap: BookSnapshot, fv: FeatureVector, sig: Optional[Signal],
+                     evaluations: Sequence[Evaluation]) -> None:
+        """Everything one snapshot produced, in pipeline order."""
+        self.publish("snapshot", snap)
+        self.publish("features", fv)
+        if sig is not None:
+            self.publish("signal", sig)
+        for ev in evaluations:
+            self.publish("evaluation", ev)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, name: str = "",
+                  from_oldest: bool = False) -> Subscription:
+        """Events from now on (or from the oldest still held), of `topics` (default: all)."""
+        cursor = max(self.head - self.capacity, 0) if from_oldest else self.head
+        sub = Subscription(self, topics, name or f"sub{len(self.subscribers)}", cursor)
+        self.subscribers.append(sub)
+        return sub
+
+    def share(self, name: Optional[str] = None, topics: Optional[Iterable[str]] = None,
+              capacity: int = 8192, slot_size: int = 2048) -> "SharedRing":
+        """Also publish `topics` (default: all) to a shared-memory ring other processes can attach to."""
+        if self.shared is not None:
+            self.shared.close()
+        self.shared = SharedRing.create(name, capacity, slot_size)
+        self._share_want = tuple(_topic_mask(topics).tolist())
+        return self.shared
+
+    def close(self) -> None:
+        for sub in list(self.subscribers):
+            sub.close()
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"published": self.head, "subscribers": {s.name: s.as_dict() for s in self.subscribers}}
+        if self.shared is not None:
+            out["shared"] = self.shared.as_dict()
+        return out
+
+    def __enter__(self) -> "EventBus":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    # Before Python 3.13 attaching registers the segment with this process's
+    # resource tracker, which unlinks it when the process exits, under the
+    # producer's feet. Only the creator owns (and unlinks) the segment.
+    register = resource_tracker.register
+    resource_tracker.register = lambda *a, **k: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedRing:
+    """
+    Cross-process ring of pickled events in one shared-memory segment. The
+    creating process publishes and unlinks it on close(); others attach() by
+    name and subscribe(). Events larger than slot_size are counted in
+    `oversize` and not published.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+        head = np.ndarray((3,), dtype="<u8", buffer=shm.buf, offset=8)
+        self.capacity, self.slot_size = int(head[0]), int(head[1])
+        self.mask = self.capacity - 1
+        self.stride = _SLOT_HEAD + (self.slot_size + 7) // 8 * 8
+        self._head = head[2:]
+        self._seq = np.ndarray((self.capacity,), dtype="<u8", buffer=shm.buf, offset=_HEADER, strides=(self.stride,))
+        self._code = np.ndarray((self.capacity,), dtype="<u4", buffer=shm.buf, offset=_HEADER + 8,
+                                strides=(self.stride,))
+        self._len = np.ndarray((self.capacity,), dtype="<u4", buffer=shm.buf, offset=_HEADER + 12,
+                               strides=(self.stride,))
+        self.published = 0
+        self.oversize = 0
+
+    @classmethod
+    def create(cls, name: Optional[str] = None, capacity: int = 8192, slot_size: int = 2048) -> "SharedRing":
+        capacity = _pow2(capacity)
+        size = _HEADER + capacity * (_SLOT_HEAD + (int(slot_size) + 7) // 8 * 8)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:  # left behind by a producer that did not exit cleanly
+            stale = _attach_untracked(name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:_HEADER] = bytes(_HEADER)
+        np.ndarray((3,), dtype="<u8", buffer=shm.buf, offset=8)[:] = (capacity, int(slot_size), 0)
+        shm.buf[:8] = _MAGIC
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedRing":
+        shm = _attach_untracked(name)
+        if bytes(shm.buf[:8]) != _MAGIC:
+            shm.close()
+            raise ValueError(f"shared memory {name!r} is not an event bus ring")
+        return cls(shm, owner=False)
+
+    @property
+    def head(self) -> int:
+        return int(self._head[0])
+
+    def publish(self, code: int, event: Any) -> None:
+        data = pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL)
+        n = len(data)
+        if n > self.slot_size:
+            self.oversize += 1
+            return
+        seq = self.published
+        i = seq & self.mask
+        off = _HEADER + i * self.stride + _SLOT_HEAD
+        self._seq[i] = 0
+        self.shm.buf[off:off + n] = data
+        self._code[i] = code
+        self._len[i] = n
+        self._seq[i] = seq + 1
+        self.published = seq + 1
+        self._head[0] = seq + 1
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, name: str = "",
+                  from_oldest: bool = False) -> "SharedSubscription":
+        head = self.head
+        return SharedSubscription(self, topics, name, max(head - self.capacity, 0) if from_oldest else head)
+
+    def close(self) -> None:
+        if self.shm is None:
+            return
+        # drop our numpy views first: the mapping cannot close while they export its buffer
+        self._head = self._seq = self._code = self._len = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "published": self.published, "oversize": self.oversize}
+
+    def __enter__(self) -> "SharedRing":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SharedSubscription(_Consumer):
+    def __init__(self, ring: SharedRing, topics: Optional[Iterable[str]], name: str, cursor: int):
+        self.ring = ring
+        self.name = name
+        self.want = _topic_mask(topics)
+        self.cursor = cursor
+        self.received = 0
+        self.missed = 0
+
+    @property
+    def lag(self) -> int:
+        return self.ring.head - self.cursor
+
+    def poll(self, max_items: int = 4096) -> List[Event]:
+        r = self.ring
+        seqs, codes, lens, buf, want = r._seq, r._code, r._len, r.shm.buf, self.want
+        head, cursor = r.head, self.cursor
+        if head - cursor > r.capacity:
+            self.missed += head - r.capacity - cursor
+            cursor = head - r.capacity
+        stop = min(head, cursor + max_items)
+        out: List[Event] = []
+        while cursor < stop:
+            i = cursor & r.mask
+            code = int(codes[i])
+            data = None
+            if int(seqs[i]) == cursor + 1 and code < len(TOPICS) and want[code]:
+                off = _HEADER + i * r.stride + _SLOT_HEAD
+                data = bytes(buf[off:off + int(lens[i])])
+            if int(seqs[i]) != cursor + 1:  # rewritten by a later lap while we looked
+                self.missed += 1
+            elif data is not None:
+                out.append((TOPICS[code], pickle.loads(data)))
+            cursor += 1
+        self.cursor = cursor
+        self.received += len(out)
+        return out
+
+    def close(self) -> None:
+        self.stop()
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"received": self.received, "missed": self.missed, "lag": self.lag}
+
+
+def bus_from_config(cfg, shared_name: Optional[str] = None) -> Optional[EventBus]:
+    """The configured bus; a `shared_name` (e.g. from --bus-shared) enables it and its shared ring."""
+    b = cfg.bus
+    if not b.get("enabled", False) and shared_name is None:
+        return None
+    bus = EventBus(capacity=b.get("capacity", 1 << 14))
+    sh = b.get("shared") or {}
+    if sh.get("enabled", False) or shared_name is not None:
+        bus.share(name=shared_name or sh.get("name"), topics=sh.get("topics"), capacity=sh.get("capacity", 8192),
+                  slot_size=sh.get("slot_size", 2048))
+    return bus
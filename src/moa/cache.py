@@ -0,0 +1,142 @@
+"""
+On-disk feature cache.
+
+Entries are keyed by the replay file's content hash plus the FeatureEngine
+parameters, so a changed file or window gives a new key and stale entries
+simply stop being read. Each entry is one (len(CACHE_COLUMNS), N) float64 .npy
+file opened memory-mapped. The directory is kept under a byte budget by
+evicting the least recently used entries (file mtime is bumped on every hit).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from .features import FeatureEngine, batch_mid
+from .ingest import ReplayIngestor
+from .segments import replay_segments
+from .schemas import FeatureBatch
+
+CACHE_VERSION = 1
+CACHE_COLUMNS = ("ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate",
+                 "imbalance_mean", "imbalance_var", "mid_ewma")  # starts with sweep.COLUMNS
+
+
+def file_digest(path: str | Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(chunk)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+
+def feature_params(fe: FeatureEngine) -> Dict[str, float]:
+    return {"window_size": fe.window_size, "update_rate_window": fe.update_rate_window,
+            "depth_levels": fe.depth_levels, "mid_ewma_alpha": fe.mid_ewma_alpha}
+
+
+def table_to_batch(table: np.ndarray) -> Tuple[FeatureBatch, np.ndarray]:
+    """Split a cached table into (FeatureBatch, mid); columns stay memory-mapped."""
+    cols = dict(zip(CACHE_COLUMNS, table))
+    mid = cols.pop("mid")
+    return FeatureBatch(**cols), mid
+
+
+class FeatureCache:
+    def __init__(self, root: str | Path = "data/cache/features", max_bytes: int = 2 << 30):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self._digests: Dict[Tuple[str, int, int], str] = {}  # (path, size, mtime_ns) -> content hash
+
+    def _digest(self, path: Path) -> str:
+        digests = []
+        for seg in replay_segments(path):
+            st = seg.stat()
+            memo = (str(seg.resolve()), st.st_size, st.st_mtime_ns)
+            d = self._digests.get(memo)
+            if d is None:
+                d = self._digests[memo] = file_digest(seg)
+            digests.append(d)
+        if len(digests) == 1:
+            return digests[0]
+        return hashlib.blake2b("".join(digests).encode(), digest_size=16).hexdigest()
+
+    def key(self, path: str | Path, fe: FeatureEngine) -> str:
+        params = json.dumps({"v": CACHE_VERSION, **feature_params(fe)}, sort_keys=True)
+        h = hashlib.blake2b(params.encode(), digest_size=8).hexdigest()
+        return f"{self._digest(Path(path))}-{h}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.npy"
+
+    def get(self, path: str | Path, fe: FeatureEngine) -> Optional[np.ndarray]:
+        p = self._path(self.key(path, fe))
+        try:
+            table = np.load(p, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        if table.ndim != 2 or table.shape[0] != len(CACHE_COLUMNS):
+            return None
+        os.utime(p)  # LRU clock
+        return table
+
+    def put(self, path: str | Path, fe: FeatureEngine, table: np.ndarray) -> np.ndarray:
+        self.root.mkdir(parents=True, exist_ok=True)
+        p = self._path(self.key(path, fe))
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(table, dtype=np.float64))
+        os.replace(tmp, p)
+        self.evict(keep=p)
+        return np.load(p, mmap_mode="r")
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """Drop least recently used entries until the cache fits max_bytes; returns bytes freed."""
+        entries = []
+        for p in self.root.glob("*.npy"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, p))
+        total = sum(e[1] for e in entries)
+        freed = 0
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total - freed <= self.max_bytes:
+                break
+            if keep is not None and p == keep:
+                continue
+            try:
+                p.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def load_or_compute(self, path: str | Path, fe: FeatureEngine) -> Tuple[np.ndarray, bool]:
+        """(table, hit): the cached feature table for `path`, computing and storing it on a miss."""
+        table = self.get(path, fe)
+        if table is not None:
+            return table, True
+        return self.put(path, fe, compute_table(path, fe)), False
+
+
+def compute_table(path: str | Path, fe: FeatureEngine) -> np.ndarray:
+    ts, bids, asks = ReplayIngestor(path).arrays()
+    fb = fe.batch(ts, bids, asks)
+    mid = batch_mid(np.asarray(bids), np.asarray(asks))
+    return np.stack([fb.ts, mid, fb.imbalance, fb.bid_slope, fb.ask_slope, fb.update_rate,
+                     fb.imbalance_mean, fb.imbalance_var, fb.mid_ewma])
+
+
+def cache_from_config(cfg) -> Optional[FeatureCache]:
+    c = cfg.cache
+    if not c.get("enabled", False):
+        return None
+    return FeatureCache(c.get("dir", "data/cache/features"), int(float(c.get("max_mb", 2048)) * (1 << 20)))
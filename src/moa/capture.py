@@ -0,0 +1,344 @@
+"""
+Depth capture to rotating, optionally compressed segments.
+
+The receive loop only appends raw message bodies to an in-memory batch; a
+background task hands each batch to a worker thread that formats, compresses
+and writes it. Segments rotate by size or by the span of data they cover and
+are named base.00000.jsonl[.gz|.zst], base.00001..., which ReplayIngestor
+chains transparently (see moa.segments). With fmt="columnar" each segment is
+written in the memory-mapped replay layout of moa.columnar instead: the open
+segment is a preallocated base.NNNNN.moab.tmp, sized for `rotate_bytes`, that
+every batch is written into, with the count of valid rows kept in its header
+on each flush. Rotation renames it (compacting a partly filled one); a
+writer started after a crash first finishes any .tmp segment left behind.
+"""
+from __future__ import annotations
+import asyncio
+import gzip
+import io
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from .columnar import ColumnarBook, allocate_columnar, set_filled, write_columnar
+from .ingest import _loads, decode_payload
+from .schemas import BookSnapshot
+from .segments import segment_name
+
+FORMATS = ("jsonl", "columnar")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+def payload_line(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    One replay JSONL line for a depth message body. Prices and sizes are
+    copied as the venue sent them, without a float round trip.
+    """
+    b, a = payload.get("b"), payload.get("a")
+    if not b or not a:
+        return None
+    ts = float(payload.get("E", payload.get("T", 0))) / 1000.0
+    bids = ",".join(f"[{p},{q}]" for p, q in b)
+    asks = ",".join(f"[{p},{q}]" for p, q in a)
+    return f'{{"ts": {ts!r}, "bids": [{bids}], "asks": [{asks}]}}'
+
+
+class SegmentWriter:
+    """
+    Synchronous writer behind CaptureWriter (one call at a time). A segment is
+    closed once it holds `rotate_bytes` of uncompressed data or spans
+    `rotate_s` seconds of message time.
+    """
+    def __init__(self, base: str | Path, fmt: str = "jsonl", compression: str = "none",
+                 rotate_bytes: int = 256 << 20, rotate_s: float = 3600.0, levels: int = 20, compresslevel: int = 3):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown capture format {fmt!r}; expected one of {FORMATS}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"unknown compression {compression!r}; expected one of {COMPRESSIONS}")
+        if fmt == "columnar" and compression != "none":
+            raise ValueError("columnar segments are memory-mapped on replay and cannot be compressed")
+        self.base = Path(base)
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.compression = compression
+        self.rotate_bytes = int(rotate_bytes)
+        self.rotate_s = float(rotate_s)
+        self.levels = levels
+        self.compresslevel = compresslevel
+        self.segments: List[Path] = []
+        self.rows = 0
+        self._seq = 0
+        self._f = None
+        self._seg_bytes = 0
+        self._seg_t0: Optional[float] = None
+        # columnar: the open segment's preallocated file and rows written into it
+        self._row_bytes = 16 + 32 * levels
+        self._capacity = max(1, -(-self.rotate_bytes // self._row_bytes))
+        self._book: Optional[ColumnarBook] = None
+        self._book_path: Optional[Path] = None
+        self._filled = 0
+        if fmt == "columnar":
+            for tmp in sorted(self.base.parent.glob(f"{self.base.stem}.[0-9][0-9][0-9][0-9][0-9]{self.base.suffix}.tmp")):
+                finish_columnar(tmp)
+
+    # --- segment lifecycle -------------------------------------------------
+
+    def _next_path(self) -> Path:
+        while True:  # never overwrite segments from an earlier run
+            p = segment_name(self.base, self._seq, None if self.fmt == "columnar" else self.compression)
+            self._seq += 1
+            if not p.exists() and not _tmp(p).exists():
+                return p
+
+    def _open(self, ts: float) -> None:
+        self._seg_bytes = 0
+        self._seg_t0 = ts
+        p = self._next_path()
+        if self.fmt == "columnar":
+            self._book_path = p
+            self._book = allocate_columnar(_tmp(p), self._capacity, self.levels, fill=False)
+            self._filled = 0
+            return
+        if self.compression == "gzip":
+            self._f = gzip.open(p, "wt", encoding="utf-8", compresslevel=self.compresslevel)
+        elif self.compression == "zstd":
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError("zstd capture needs zstandard (pip install 'market-order-app[zstd]')") from e
+            raw = open(p, "wb")
+            self._f = io.TextIOWrapper(zstandard.ZstdCompressor(level=self.compresslevel).stream_writer(raw, closefd=True),
+                                       encoding="utf-8")
+        else:
+            self._f = open(p, "w", encoding="utf-8")
+        self.segments.append(p)
+
+    def _close_segment(self) -> None:
+        if self.fmt == "columnar":
+            if self._book is not None:
+                self.flush()
+                self._book = None  # release the maps before the file is renamed or compacted
+                p = finish_columnar(_tmp(self._book_path))
+                if p is not None:
+                    self.segments.append(p)
+        elif self._f is not None:
+            self._f.close()
+            self._f = None
+        self._seg_t0 = None
+
+    def _put_rows(self, snaps: List[BookSnapshot]) -> None:
+        """Write snapshots into the open columnar segment as one block of rows."""
+        k, L, r = len(snaps), self.levels, self._filled
+        ts = np.array([s.ts for s in snaps])
+        bids = np.full((k, L, 2), np.nan)
+        asks = np.full((k, L, 2), np.nan)
+        nb = np.array([s.bids.shape[0] for s in snaps], dtype=np.int32)
+        na = np.array([s.asks.shape[0] for s in snaps], dtype=np.int32)
+        for i, s in enumerate(snaps):
+            bids[i, :nb[i]] = s.bids
+            asks[i, :na[i]] = s.asks
+        book = self._book
+        book.ts[r:r + k] = ts
+        book.n_bids[r:r + k] = nb
+        book.n_asks[r:r + k] = na
+        book.bids[r:r + k] = bids
+        book.asks[r:r + k] = asks
+        self._filled = r + k
+
+    def _due(self, ts: float) -> bool:
+        return self._seg_bytes >= self.rotate_bytes or (ts - self._seg_t0) >= self.rotate_s
+
+    # --- writing -------------------------------------------------------------
+
+    def write(self, payloads: List[Dict[str, Any]]) -> None:
+        if self.fmt == "columnar":
+            self._write_columnar(payloads)
+            return
+        pending: List[str] = []
+        for payload in payloads:
+            line = payload_line(payload)
+            if line is None:
+                continue
+            ts = float(payload.get("E", payload.get("T", 0))) / 1000.0
+            if self._seg_t0 is not None and self._due(ts):
+                if pending:
+                    self._f.write("\n".join(pending) + "\n")
+                    pending = []
+                self._close_segment()
+            if self._seg_t0 is None:
+                self._open(ts)
+            pending.append(line)
+            self._seg_bytes += len(line) + 1
+            self.rows += 1
+        if pending:
+            self._f.write("\n".join(pending) + "\n")
+
+    def _write_columnar(self, payloads: List[Dict[str, Any]]) -> None:
+        pending: List[BookSnapshot] = []
+        for payload in payloads:
+            snap = decode_payload(payload, self.levels)
+            if snap is None:
+                continue
+            if self._seg_t0 is not None and self._due(snap.ts):
+                if pending:
+                    self._put_rows(pending)
+                    pending = []
+                self._close_segment()
+            if self._seg_t0 is None:
+                self._open(snap.ts)
+            pending.append(snap)
+            self._seg_bytes += self._row_bytes
+            self.rows += 1
+        if pending:
+            self._put_rows(pending)
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+        if self._book is not None:
+            b = self._book
+            for a in (b.ts, b.n_bids, b.n_asks, b.bids, b.asks):
+                a.flush()
+            set_filled(_tmp(self._book_path), self._filled)  # after the rows it counts are on disk
+
+    def close(self) -> None:
+        self._close_segment()
+
+
+def _tmp(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
+def finish_columnar(tmp: Path) -> Optional[Path]:
+    """
+    Turn an open columnar capture segment (`<segment>.tmp`, its header's
+    `filled` rows valid) into the complete segment. Returns None (and removes
+    the file) if no row was written.
+    """
+    final = tmp.with_name(tmp.name[:-len(".tmp")])
+    book = ColumnarBook(tmp)
+    k = book.filled
+    if k == 0:
+        del book
+        tmp.unlink()
+        return None
+    if k == book.rows:
+        del book
+        set_filled(tmp, 0)
+        os.replace(tmp, final)
+        return final
+    part = _tmp(final.with_name(final.name + ".part"))
+    write_columnar(part, book.ts[:k], book.bids[:k], book.asks[:k], book.n_bids[:k], book.n_asks[:k])
+    del book
+    os.replace(part, final)  # readers never see a half-written segment
+    tmp.unlink()
+    return final
+
+
+class CaptureWriter:
+    """
+    Async front end: add() buffers message bodies and returns immediately;
+    every `flush_s` the batch is written by a SegmentWriter on a worker
+    thread. Use as an async context manager.
+    """
+    def __init__(self, base: str | Path, flush_s: float = 1.0, **segment_kwargs):
+        self.seg = SegmentWriter(base, **segment_kwargs)
+        self.flush_s = flush_s
+        self.received = 0
+        self._buf: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def segments(self) -> List[Path]:
+        return self.seg.segments
+
+    def add(self, payload: Dict[str, Any]) -> None:
+        self._buf.append(payload)
+        self.received += 1
+
+    async def flush(self) -> None:
+        async with self._lock:
+            batch, self._buf = self._buf, []
+            if batch:
+                await asyncio.to_thread(self.seg.write, batch)
+            await asyncio.to_thread(self.seg.flush)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_s)
+            await self.flush()
+
+    async def __aenter__(self) -> "CaptureWriter":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        await asyncio.to_thread(self.seg.close)
+
+
+def stream_symbol(stream: Optional[str]) -> Optional[str]:
+    """'btcusdt@depth20@100ms' -> 'btcusdt'"""
+    return stream.split("@", 1)[0].lower() if stream else None
+
+
+async def capture(url: str, writers: Dict[str, CaptureWriter], duration_s: Optional[float] = None,
+                  max_messages: Optional[int] = None, reconnect_s: float = 1.0, max_reconnect_s: float = 30.0,
+                  open_timeout: float = 10.0) -> Dict[str, int]:
+    """
+    Receive depth messages from `url` into per-symbol writers until
+    `duration_s` of wall time (checked even while the socket is idle) or
+    `max_messages` have been received. Dropped connections, failed or stalled
+    handshakes (`open_timeout`) are retried with exponential backoff. A
+    message whose stream is not in `writers` goes to the only writer if there
+    is exactly one.
+    """
+    import websockets  # lazy import so offline code paths don't need it
+    loop = asyncio.get_running_loop()
+    deadline = None if duration_s is None else loop.time() + duration_s
+    only = next(iter(writers.values())) if len(writers) == 1 else None
+    stats = {"messages": 0, "reconnects": 0, "unrouted": 0}
+
+    def remaining() -> Optional[float]:
+        return None if deadline is None else deadline - loop.time()
+
+    delay = reconnect_s
+    while True:
+        left = remaining()
+        if left is not None and left <= 0:
+            return stats
+        try:
+            # close_timeout: on the way out, don't wait 10s for a close frame queued behind unread depth messages
+            async with websockets.connect(url, max_size=2**22, open_timeout=open_timeout, close_timeout=1.0) as ws:
+                delay = reconnect_s
+                while True:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        return stats
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=left)
+                    except asyncio.TimeoutError:  # the capture deadline passed on an idle socket
+                        return stats
+                    d = _loads(msg)
+                    w = writers.get(stream_symbol(d.get("stream")), only)
+                    if w is None:
+                        stats["unrouted"] += 1
+                        continue
+                    w.add(d.get("data", d))
+                    stats["messages"] += 1
+                    if max_messages is not None and stats["messages"] >= max_messages:
+                        return stats
+        # a handshake over open_timeout raises asyncio.TimeoutError, an OSError only from 3.11: reconnect, don't stop
+        except (OSError, asyncio.TimeoutError, websockets.ConnectionClosed, websockets.InvalidHandshake):
+            stats["reconnects"] += 1
+            left = remaining()
+            await asyncio.sleep(delay if left is None else max(0.0, min(delay, left)))
+            delay = min(delay * 2, max_reconnect_s)
@@ -0,0 +1,189 @@
+"""
+Columnar binary replay format.
+
+Layout (little-endian, all blocks 8-byte aligned):
+    header  64 bytes: magic, version, levels, rows, filled
+    ts      float64[rows]
+    n_bids  int32[rows]      number of valid bid levels per row
+    n_asks  int32[rows]
+    bids    float64[rows, levels, 2]   [price, size], padded with NaN
+    asks    float64[rows, levels, 2]
+
+Files are opened with np.memmap so replay needs no per-row parse and
+snapshots are views into the mapped file. `filled` is nonzero only while a
+capture is still writing the file: the rows written so far (moa.capture).
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import numpy as np
+from .schemas import BookSnapshot
+from .segments import open_text, replay_segments
+
+MAGIC = b"MOACOLv1"
+VERSION = 1
+HEADER_SIZE = 64
+ITER_BLOCK = 1 << 16  # rows per pull of the per-row columns in ColumnarBook.iter
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("levels", "<u4"), ("rows", "<u8"), ("filled", "<u8")])
+_FILLED_AT = HEADER_DTYPE.fields["filled"][1]
+
+
+def is_columnar(path: str | Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _offsets(rows: int, levels: int) -> dict:
+    off = {"ts": HEADER_SIZE}
+    off["n_bids"] = off["ts"] + 8 * rows
+    off["n_asks"] = off["n_bids"] + 4 * rows
+    off["bids"] = off["n_asks"] + 4 * rows
+    off["bids"] += (-off["bids"]) % 8
+    off["asks"] = off["bids"] + 16 * rows * levels
+    off["end"] = off["asks"] + 16 * rows * levels
+    return off
+
+
+class ColumnarBook:
+    """
+    Memory-mapped view of a columnar replay file.
+    `bids`/`asks` have shape (rows, levels, 2); rows shallower than `levels`
+    are NaN-padded and `n_bids`/`n_asks` hold the real depth.
+    """
+    def __init__(self, file_path: str | Path, mode: str = "r"):
+        self.file_path = Path(file_path)
+        hdr = np.fromfile(self.file_path, dtype=HEADER_DTYPE, count=1)
+        if hdr.size == 0 or hdr["magic"][0] != MAGIC:
+            raise ValueError(f"{self.file_path} is not a columnar replay file")
+        if int(hdr["version"][0]) != VERSION:
+            raise ValueError(f"unsupported columnar version {int(hdr['version'][0])}")
+        self.levels = int(hdr["levels"][0])
+        self.rows = int(hdr["rows"][0])
+        self.filled = int(hdr["filled"][0])
+        off = _offsets(self.rows, self.levels)
+        n, L = self.rows, self.levels
+        def mm(dtype, key, shape):
+            if n == 0:
+                return np.empty(shape, dtype=dtype)
+            return np.memmap(self.file_path, dtype=dtype, mode=mode, offset=off[key], shape=shape)
+        self.ts = mm("<f8", "ts", (n,))
+        self.n_bids = mm("<i4", "n_bids", (n,))
+        self.n_asks = mm("<i4", "n_asks", (n,))
+        self.bids = mm("<f8", "bids", (n, L, 2))
+        self.asks = mm("<f8", "asks", (n, L, 2))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def snapshot(self, i: int) -> BookSnapshot:
+        return BookSnapshot(ts=float(self.ts[i]), bids=self.bids[i, :self.n_bids[i]], asks=self.asks[i, :self.n_asks[i]])
+
+    def range(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> Tuple[int, int]:
+        """Row span [i0, i1) with start_ts <= ts < end_ts, by binary search over the mapped ts column."""
+        i0 = 0 if start_ts is None else int(np.searchsorted(self.ts, start_ts, side="left"))
+        i1 = self.rows if end_ts is None else int(np.searchsorted(self.ts, end_ts, side="left"))
+        return i0, max(i0, i1)
+
+    def iter(self, start: int = 0, stop: Optional[int] = None) -> Iterator[BookSnapshot]:
+        stop = self.rows if stop is None else min(stop, self.rows)
+        # plain ndarray views over the map: slicing skips memmap bookkeeping
+        bids, asks = np.asarray(self.bids), np.asarray(self.asks)
+        # pull the small per-row columns a block at a time (the first snapshot
+        # of a seek shouldn't wait on the rest of the file); bid/ask blocks stay mapped
+        for b0 in range(start, stop, ITER_BLOCK):
+            b1 = min(b0 + ITER_BLOCK, stop)
+            ts = np.asarray(self.ts[b0:b1]).tolist()
+            nb = np.asarray(self.n_bids[b0:b1]).tolist()
+            na = np.asarray(self.n_asks[b0:b1]).tolist()
+            for k, i in enumerate(range(b0, b1)):
+                yield BookSnapshot(ts=ts[k], bids=bids[i, :nb[k]], asks=asks[i, :na[k]])
+
+
+def allocate_columnar(out_path: str | Path, rows: int, levels: int, fill: bool = True) -> ColumnarBook:
+    """
+    Create a columnar file of the given shape and open it for writing. With
+    fill=False the book sides are left unwritten (a sparse file) instead of
+    NaN-filled; the writer pads every row it writes.
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    off = _offsets(rows, levels)
+    hdr = np.zeros(1, dtype=HEADER_DTYPE)
+    hdr["magic"], hdr["version"], hdr["levels"], hdr["rows"] = MAGIC, VERSION, levels, rows
+    with open(out_path, "wb") as f:
+        f.write(hdr.tobytes().ljust(HEADER_SIZE, b"\x00"))
+        f.truncate(off["end"])
+    book = ColumnarBook(out_path, mode="r+")
+    if rows and fill:
+        book.bids[:] = np.nan
+        book.asks[:] = np.nan
+    return book
+
+
+def set_filled(path: str | Path, rows: int) -> None:
+    """Record in the header how many rows of a file still being written are valid."""
+    with open(path, "r+b") as f:
+        f.seek(_FILLED_AT)
+        f.write(np.array(rows, dtype="<u8").tobytes())
+
+
+def write_columnar(out_path: str | Path, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray,
+                   n_bids: Optional[np.ndarray] = None, n_asks: Optional[np.ndarray] = None) -> Path:
+    """Write stacked arrays: ts (N,), bids/asks (N, L, 2)."""
+    rows, levels = bids.shape[0], bids.shape[1]
+    book = allocate_columnar(out_path, rows, levels)
+    if rows:
+        book.ts[:] = ts
+        book.bids[:] = bids
+        book.asks[:] = asks
+        book.n_bids[:] = levels if n_bids is None else n_bids
+        book.n_asks[:] = levels if n_asks is None else n_asks
+        for a in (book.ts, book.n_bids, book.n_asks, book.bids, book.asks):
+            a.flush()
+    return Path(out_path)
+
+
+def _lines(in_path: str | Path) -> Iterator[str]:
+    """Non-blank lines of a file, a directory of segments or a rotated capture's base path."""
+    for seg in replay_segments(in_path):
+        with open_text(seg) as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def convert_jsonl(in_path: str | Path, out_path: str | Path, levels: Optional[int] = None) -> Path:
+    """
+    Convert a JSONL capture (one file, or the ordered segments of a rotated
+    one) into the columnar format in two streaming passes (count rows, then
+    fill the mapped file) so memory use stays flat.
+    `levels` defaults to the depth of the first row; deeper rows raise.
+    """
+    rows = 0
+    for line in _lines(in_path):
+        if levels is None:
+            d = json.loads(line)
+            levels = max(len(d["bids"]), len(d["asks"]))
+        rows += 1
+    book = allocate_columnar(out_path, rows, levels or 0)
+    i = 0
+    for line in _lines(in_path):
+        d = json.loads(line)
+        nb, na = len(d["bids"]), len(d["asks"])
+        if nb > book.levels or na > book.levels:
+            raise ValueError(f"row {i} has {max(nb, na)} levels, file allows {book.levels}; pass levels=")
+        book.ts[i] = float(d["ts"])
+        book.n_bids[i], book.n_asks[i] = nb, na
+        if nb:
+            book.bids[i, :nb] = d["bids"]
+        if na:
+            book.asks[i, :na] = d["asks"]
+        i += 1
+    if rows:
+        for a in (book.ts, book.n_bids, book.n_asks, book.bids, book.asks):
+            a.flush()
+    return Path(out_path)
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 import yaml
 from pathlib import Path
 
@@ -17,6 +17,35 @@ class Config:
     features: Dict[str, Any]
     signals: Dict[str, Any]
     backtest: Dict[str, Any]
+    pipeline: Dict[str, Any] = field(default_factory=dict)
+    symbols: List[str] = field(default_factory=list)  # multi-symbol mode; empty = [symbol]
+    ui: Dict[str, Any] = field(default_factory=dict)
+    profiling: Dict[str, Any] = field(default_factory=dict)
+    cache: Dict[str, Any] = field(default_factory=dict)
+    orderbook: Dict[str, Any] = field(default_factory=dict)
+    walkforward: Dict[str, Any] = field(default_factory=dict)
+    conflation: Dict[str, Any] = field(default_factory=dict)
+    bus: Dict[str, Any] = field(default_factory=dict)
+
+    def symbol_list(self) -> List[str]:
+        return list(self.symbols) if self.symbols else [self.symbol]
+
+    def replay_file(self, symbol: str) -> str:
+        """replay.files[symbol] if given, else replay.file with {symbol} substituted."""
+        files = self.replay.get("files") or {}
+        if symbol in files:
+            return files[symbol]
+        return self.replay["file"].replace("{symbol}", symbol)
+
+    def ws_url_for(self, symbol: str) -> str:
+        """ws_url with {symbol} (or else the configured symbol) replaced; stream names are lower-case."""
+        sym = symbol.lower()
+        if "{symbol}" in self.ws_url:
+            return self.ws_url.replace("{symbol}", sym)
+        own = self.symbol.lower()
+        if not own or own not in self.ws_url:
+            raise ValueError(f"ws_url {self.ws_url!r} has neither {{symbol}} nor {self.symbol!r} to substitute for {symbol!r}")
+        return self.ws_url.replace(own, sym)
 
 def load_config(path: str | Path) -> Config:
     with open(path, "r", encoding="utf-8") as f:
@@ -0,0 +1,146 @@
+"""
+Conflation between ingest and features.
+
+Many consecutive depth snapshots leave the top of the book untouched, and a
+consumer that falls behind only needs the latest book. A Conflator drops
+snapshots before FeatureEngine sees them:
+- dedupe: a snapshot whose top `levels` (prices and sizes, both sides) are
+  byte-identical to the last one forwarded is dropped.
+- bucket_ms: only the last snapshot of each `bucket_ms` time bucket is
+  forwarded. It goes out when the first snapshot of a later bucket arrives,
+  or at the end of the stream.
+
+Each forwarded snapshot carries the timestamps of the snapshots dropped
+since the previous one. FeatureEngine.skip counts them toward update_rate,
+so the rate still measures venue updates and matches the unconflated
+stream at every forwarded snapshot. Features of the current book alone
+(imbalance, slopes) are unchanged too. Rolling statistics, signal
+confirmation and the backtester run on the conflated stream.
+
+`conflate_index` applies the same rules to stacked arrays.
+"""
+from __future__ import annotations
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
+import numpy as np
+
+from .schemas import BookSnapshot
+
+Conflated = Tuple[BookSnapshot, Tuple[float, ...]]  # (snapshot, timestamps dropped before it)
+
+
+@dataclass
+class ConflationStats:
+    received: int = 0
+    forwarded: int = 0
+    unchanged: int = 0   # dropped by change detection
+    bucketed: int = 0    # superseded by a later snapshot in the same bucket
+
+    @property
+    def saved(self) -> float:
+        """Fraction of received snapshots that never reached the features stage."""
+        return 1.0 - self.forwarded / self.received if self.received else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"received": self.received, "forwarded": self.forwarded, "unchanged": self.unchanged,
+                "bucketed": self.bucketed, "saved": round(self.saved, 4)}
+
+
+class Conflator:
+    """
+    Streaming conflation: offer() each snapshot in order, then flush() at the
+    end. Both return a (snapshot, dropped timestamps) pair or None. Only the
+    last `keep_ts` dropped timestamps are kept per gap; a FeatureEngine
+    needs no more than its update_rate_window.
+    """
+    def __init__(self, levels: int = 5, dedupe: bool = True, bucket_ms: float = 0.0, keep_ts: int = 1024):
+        self.levels = levels
+        self.dedupe = dedupe
+        self.bucket_s = bucket_ms / 1000.0
+        self.skipped: Deque[float] = deque(maxlen=max(keep_ts, 1))
+        self.stats = ConflationStats()
+        self._key: Optional[Tuple[bytes, bytes]] = None
+        self._held: Optional[BookSnapshot] = None
+        self._bucket = 0
+
+    def _forward(self, snap: BookSnapshot) -> Optional[Conflated]:
+        if self.dedupe:
+            k = self.levels
+            key = (snap.bids[:k].tobytes(), snap.asks[:k].tobytes())
+            if key == self._key:
+                self.stats.unchanged += 1
+                self.skipped.append(snap.ts)
+                return None
+            self._key = key
+        self.stats.forwarded += 1
+        if not self.skipped:
+            return snap, ()
+        skipped = tuple(self.skipped)
+        self.skipped.clear()
+        return snap, skipped
+
+    def offer(self, snap: BookSnapshot) -> Optional[Conflated]:
+        self.stats.received += 1
+        if not self.bucket_s:
+            return self._forward(snap)
+        bucket = math.floor(snap.ts / self.bucket_s)
+        held, self._held = self._held, snap
+        if held is None:
+            self._bucket = bucket
+            return None
+        if bucket == self._bucket:
+            self.stats.bucketed += 1
+            self.skipped.append(held.ts)
+            return None
+        self._bucket = bucket
+        return self._forward(held)
+
+    def flush(self) -> Optional[Conflated]:
+        """Forward the snapshot held for the current bucket, if any."""
+        held, self._held = self._held, None
+        return self._forward(held) if held is not None else None
+
+    def iter(self, snaps: Iterable[BookSnapshot]) -> Iterator[Conflated]:
+        for snap in snaps:
+            out = self.offer(snap)
+            if out is not None:
+                yield out
+        out = self.flush()
+        if out is not None:
+            yield out
+
+
+def conflator_from_config(cfg) -> Optional[Conflator]:
+    c = cfg.conflation
+    if not c.get("enabled", False):
+        return None
+    return Conflator(levels=c.get("levels") or cfg.levels, dedupe=c.get("dedupe", True),
+                     bucket_ms=float(c.get("bucket_ms", 0.0)), keep_ts=cfg.features["update_rate_window"])
+
+
+def _same_rows(a: np.ndarray, levels: int) -> np.ndarray:
+    """(N-1,) row i+1 has the same top `levels` as row i; NaN padding compares equal."""
+    x, y = a[1:, :levels], a[:-1, :levels]
+    return ((x == y) | (np.isnan(x) & np.isnan(y))).all(axis=(1, 2))
+
+
+def conflate_index(ts: np.ndarray, bids: np.ndarray, asks: np.ndarray, levels: int = 5, dedupe: bool = True,
+                   bucket_ms: float = 0.0) -> np.ndarray:
+    """
+    Rows a Conflator would forward, for stacked arrays (ts (N,), bids/asks (N, L, 2)).
+    Feature columns computed over all rows (update rate included) can be
+    indexed with the result directly.
+    """
+    ts = np.asarray(ts, dtype=float)
+    keep = np.arange(ts.shape[0])
+    if bucket_ms and keep.size:
+        b = np.floor(ts / (bucket_ms / 1000.0))
+        keep = np.flatnonzero(np.append(b[1:] != b[:-1], True))
+    if dedupe and keep.size > 1:
+        bids, asks = np.asarray(bids)[keep], np.asarray(asks)[keep]
+        same = _same_rows(bids, levels) & _same_rows(asks, levels)
+        # a run of identical books keeps its first row (each is compared to the last forwarded one)
+        keep = keep[np.append(True, ~same)]
+    return keep
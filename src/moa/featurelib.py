@@ -0,0 +1,326 @@
+"""
+Pluggable order-book feature library compiled into one fused kernel.
+
+Each registered feature contributes small source snippets: per-row setup, a
+body run inside a single pass over the book levels, and a final value. A
+FeatureLibrary stitches the selected features into one generated function
+(written to a kernel directory so numba's on-disk cache applies), adds an
+EWMA per lookback horizon, and runs it for one snapshot (streaming) or a
+whole (N, L, 2) series (batch) with the same per-stream state, so both paths
+give identical values.
+
+Snippet names available to features: r (row), i (level, inside the loop),
+b0p/b0q/a0p/a0q (touch price/size), bp/bq/ap/aq (level i price/size; price
+NaN and size 0 when the level is missing), state, nan, plus the names the
+feature was given: v (its value variable and local prefix), s (first state
+slot) and tick (tick size).
+"""
+from __future__ import annotations
+import hashlib
+import importlib.util
+import math
+import os
+import sys
+import textwrap
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from .schemas import BookSnapshot
+
+
+@dataclass(frozen=True)
+class FeatureCode:
+    name: str
+    value: str                # statements that assign {v}
+    depth: int = 0            # levels visited by `level` (0 = touch only)
+    init: str = ""            # per-row setup, before the level loop
+    level: str = ""           # run for i < depth
+    state: Tuple[float, ...] = ()  # initial per-stream state
+    consts: Dict[str, Tuple[float, ...]] = field(default_factory=dict)
+
+
+REGISTRY: Dict[str, Callable[..., FeatureCode]] = {}
+
+
+def register(name: str):
+    """Decorator: `factory(v, s, tick, **params) -> FeatureCode` becomes feature `name`."""
+    def deco(factory):
+        REGISTRY[name] = factory
+        return factory
+    return deco
+
+
+@register("mid")
+def _mid(v, s, tick):
+    return FeatureCode("mid", f"{v} = 0.5 * (b0p + a0p)")
+
+
+@register("spread_ticks")
+def _spread_ticks(v, s, tick):
+    return FeatureCode("spread_ticks", f"{v} = (a0p - b0p) / {tick!r}")
+
+
+def _micro(v):
+    return (f"{v}_d = b0q + a0q\n"
+            f"{v}_m = (b0p * a0q + a0p * b0q) / {v}_d if {v}_d > 1e-12 else 0.5 * (b0p + a0p)")
+
+
+@register("microprice")
+def _microprice(v, s, tick):
+    return FeatureCode("microprice", f"{_micro(v)}\n{v} = {v}_m")
+
+
+@register("microprice_offset")
+def _microprice_offset(v, s, tick):
+    """Microprice minus mid, in ticks."""
+    return FeatureCode("microprice_offset", f"{_micro(v)}\n{v} = ({v}_m - 0.5 * (b0p + a0p)) / {tick!r}")
+
+
+@register("depth_mid")
+def _depth_mid(v, s, tick, depth=5):
+    """Microprice over `depth` levels: each side's VWAP, weighted by the opposite side's size."""
+    return FeatureCode(
+        f"depth_mid_{depth}", depth=depth,
+        init=f"{v}_bpq = 0.0\n{v}_bq = 0.0\n{v}_apq = 0.0\n{v}_aq = 0.0",
+        level=(f"if bq > 0.0:\n    {v}_bpq += bp * bq\n    {v}_bq += bq\n"
+               f"if aq > 0.0:\n    {v}_apq += ap * aq\n    {v}_aq += aq"),
+        value=(f"if {v}_bq > 0.0 and {v}_aq > 0.0:\n"
+               f"    {v} = ({v}_bpq / {v}_bq * {v}_aq + {v}_apq / {v}_aq * {v}_bq) / ({v}_bq + {v}_aq)\n"
+               f"else:\n    {v} = nan"))
+
+
+@register("imbalance")
+def _imbalance(v, s, tick, depth=5):
+    """(bid size - ask size) / total over the first `depth` levels, as features.compute_imbalance."""
+    return FeatureCode(
+        f"imbalance_{depth}", depth=depth,
+        init=f"{v}_b = 0.0\n{v}_a = 0.0",
+        level=f"{v}_b += bq\n{v}_a += aq",
+        value=f"{v}_d = {v}_b + {v}_a\n{v} = ({v}_b - {v}_a) / {v}_d if {v}_d > 1e-12 else 0.0")
+
+
+@register("decay_imbalance")
+def _decay_imbalance(v, s, tick, decay=0.5, depth=10):
+    """Imbalance with level i weighted by exp(-decay * i)."""
+    return FeatureCode(
+        f"decay_imbalance_{decay:g}", depth=depth,
+        init=f"{v}_b = 0.0\n{v}_a = 0.0",
+        level=f"{v}_b += {v.upper()}_W[i] * bq\n{v}_a += {v.upper()}_W[i] * aq",
+        value=f"{v}_d = {v}_b + {v}_a\n{v} = ({v}_b - {v}_a) / {v}_d if {v}_d > 1e-12 else 0.0",
+        consts={f"{v.upper()}_W": tuple(math.exp(-decay * i) for i in range(depth))})
+
+
+@register("ofi")
+def _ofi(v, s, tick, depth=1):
+    """
+    Order-flow imbalance (Cont, Kukanov & Stoikov) against the previous
+    snapshot, summed over the first `depth` levels.
+    """
+    return FeatureCode(
+        "ofi" if depth == 1 else f"ofi_{depth}", depth=depth,
+        init=f"{v} = 0.0",
+        level=(f"{v}_o = {s} + 4 * i\n"
+               f"if bp >= state[{v}_o]:\n    {v} += bq\n"
+               f"if bp <= state[{v}_o]:\n    {v} -= state[{v}_o + 1]\n"
+               f"if ap <= state[{v}_o + 2]:\n    {v} -= aq\n"
+               f"if ap >= state[{v}_o + 2]:\n    {v} += state[{v}_o + 3]\n"
+               f"state[{v}_o] = bp\nstate[{v}_o + 1] = bq\nstate[{v}_o + 2] = ap\nstate[{v}_o + 3] = aq"),
+        value="",
+        state=(np.nan, 0.0, np.nan, 0.0) * depth)
+
+
+@register("mid_change")
+def _mid_change(v, s, tick):
+    """Mid move since the previous snapshot with a mid, in ticks."""
+    return FeatureCode(
+        "mid_change", state=(np.nan,),
+        value=(f"{v}_m = 0.5 * (b0p + a0p)\n"
+               f"{v} = ({v}_m - state[{s}]) / {tick!r} if {v}_m == {v}_m and state[{s}] == state[{s}] else 0.0\n"
+               f"if {v}_m == {v}_m:\n    state[{s}] = {v}_m"))
+
+
+def parse_spec(spec: Any) -> Tuple[str, Dict[str, Any]]:
+    """'ofi' or {'name': 'imbalance', 'depth': 3, 'horizons': [1, 10]} -> (name, params)."""
+    if isinstance(spec, str):
+        return spec, {}
+    params = dict(spec)
+    return params.pop("name"), params
+
+
+_HEADER = '''\
+# generated by moa.featurelib; do not edit
+import numpy as np
+try:
+    from numba import njit
+except Exception:  # pragma: no cover
+    def njit(*args, **kwargs):
+        def wrap(f): return f
+        return wrap
+
+'''
+
+_ROW = '''\
+@njit(cache=True)
+def kernel(bids, asks, state, out):
+    nan = np.nan
+    lb = bids.shape[1]
+    la = asks.shape[1]
+    for r in range(bids.shape[0]):
+        b0p = nan
+        b0q = 0.0
+        if lb > 0 and bids[r, 0, 1] == bids[r, 0, 1]:
+            b0p = bids[r, 0, 0]
+            b0q = bids[r, 0, 1]
+        a0p = nan
+        a0q = 0.0
+        if la > 0 and asks[r, 0, 1] == asks[r, 0, 1]:
+            a0p = asks[r, 0, 0]
+            a0q = asks[r, 0, 1]
+'''
+
+_LEVEL = '''\
+for i in range({depth}):
+    bp = nan
+    bq = 0.0
+    if i < lb and bids[r, i, 1] == bids[r, i, 1]:
+        bp = bids[r, i, 0]
+        bq = bids[r, i, 1]
+    ap = nan
+    aq = 0.0
+    if i < la and asks[r, i, 1] == asks[r, i, 1]:
+        ap = asks[r, i, 0]
+        aq = asks[r, i, 1]
+'''
+
+_EWMA = '''\
+{p} = state[{s}]
+if {x} == {x}:
+    {p} = {p} + {a!r} * ({x} - {p}) if {p} == {p} else {x}
+    state[{s}] = {p}
+out[r, {c}] = {p}
+'''
+
+
+def kernel_dir() -> Path:
+    return Path(os.environ.get("MOA_KERNEL_DIR", Path.home() / ".cache" / "moa" / "kernels"))
+
+
+def _load_kernel(source: str) -> Callable:
+    """Import the generated source from a content-addressed file (so numba can cache it); exec as a fallback."""
+    digest = hashlib.blake2b(source.encode(), digest_size=10).hexdigest()
+    name = f"moa_features_{digest}"
+    try:
+        d = kernel_dir()
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{name}.py"
+        if not path.exists():
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(source, encoding="utf-8")
+            os.replace(tmp, path)
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod  # numba's cache re-imports the defining module by name
+        spec.loader.exec_module(mod)
+        return mod.kernel
+    except OSError:
+        ns: Dict[str, Any] = {}
+        exec(compile(source.replace("cache=True", "cache=False"), name, "exec"), ns)
+        return ns["kernel"]
+
+
+class FeatureLibrary:
+    """
+    A compiled set of registry features. `specs` are names or dicts (see
+    parse_spec); each feature is emitted once per lookback horizon as an
+    EWMA with span h (h=1 is the raw value, named plainly; others get an
+    `_ewm<h>` suffix). Column names are in `names`.
+    """
+    def __init__(self, specs: Sequence[Any], tick_size: float, horizons: Sequence[int] = (1,)):
+        self.tick_size = float(tick_size)
+        self.horizons = tuple(int(h) for h in horizons)
+        self.specs = [parse_spec(s) for s in specs]
+        self.names: List[str] = []
+        state: List[float] = []
+        consts: Dict[str, Tuple[float, ...]] = {}
+        init, values, outputs = [], [], []
+        levels: Dict[int, List[str]] = {}
+        for k, (name, params) in enumerate(self.specs):
+            if name not in REGISTRY:
+                raise ValueError(f"unknown feature {name!r}; registered: {sorted(REGISTRY)}")
+            params = dict(params)
+            horizons = tuple(int(h) for h in params.pop("horizons", self.horizons))
+            v = f"f{k}"
+            code = REGISTRY[name](v, len(state), self.tick_size, **params)
+            state.extend(code.state)
+            consts.update(code.consts)
+            init.append(code.init)
+            if code.level:
+                levels.setdefault(code.depth, []).append(code.level)
+            values.append(code.value)
+            for h in horizons:
+                c = len(self.names)
+                self.names.append(code.name if h == 1 else f"{code.name}_ewm{h}")
+                if h == 1:
+                    outputs.append(f"out[r, {c}] = {v}")
+                else:
+                    outputs.append(_EWMA.format(p=f"{v}_h{h}", s=len(state), x=v, a=2.0 / (h + 1), c=c).rstrip("\n"))
+                    state.append(np.nan)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"duplicate feature columns in {self.names}")
+        self._state0 = np.array(state, dtype=np.float64) if state else np.zeros(1)
+        self.source = self._generate(consts, init, levels, values, outputs)
+        self.kernel = _load_kernel(self.source)
+
+    def _generate(self, consts, init, levels, values, outputs) -> str:
+        src = [_HEADER]
+        for cname, vals in consts.items():
+            src.append(f"{cname} = np.array({list(vals)!r})\n")
+        body = [s for s in init if s]
+        if levels:
+            deepest = max(levels)
+            loop = [_LEVEL.format(depth=deepest).rstrip("\n")]
+            for depth, snippets in sorted(levels.items()):
+                if depth == deepest:
+                    loop.append(textwrap.indent("\n".join(snippets), " " * 4))
+                else:
+                    loop.append(f"    if i < {depth}:\n" + textwrap.indent("\n".join(snippets), " " * 8))
+            body.append("\n".join(loop))
+        body.extend(s for s in values if s)
+        body.extend(outputs)
+        src.append(_ROW + textwrap.indent("\n".join(body), " " * 8) + "\n")
+        return "\n".join(src)
+
+    @property
+    def width(self) -> int:
+        return len(self.names)
+
+    def new_state(self) -> np.ndarray:
+        return self._state0.copy()
+
+    def step(self, snap: BookSnapshot, state: np.ndarray) -> np.ndarray:
+        """Feature row for one snapshot, advancing `state`."""
+        out = np.empty((1, len(self.names)))
+        self.kernel(_one_row(snap.bids), _one_row(snap.asks), state, out)
+        return out[0]
+
+    def compute(self, bids: np.ndarray, asks: np.ndarray, state: Optional[np.ndarray] = None) -> np.ndarray:
+        """(N, width) features for NaN-padded (N, L, 2) sides; starts from a fresh state unless one is given."""
+        state = self.new_state() if state is None else state
+        out = np.empty((bids.shape[0], len(self.names)))
+        self.kernel(np.asarray(bids, dtype=np.float64), np.asarray(asks, dtype=np.float64), state, out)
+        return out
+
+
+def _one_row(side) -> np.ndarray:
+    """(L, 2) side -> (1, L, 2) float64; an empty side (shape (0,)) becomes (1, 0, 2)."""
+    side = np.asarray(side, dtype=np.float64)
+    return (side if side.ndim == 2 else side.reshape(-1, 2))[None]
+
+
+def library_from_config(cfg) -> Optional[FeatureLibrary]:
+    lib = cfg.features.get("library") or {}
+    if not lib.get("enabled", False):
+        return None
+    return FeatureLibrary(lib.get("specs", []), cfg.tick_size, lib.get("horizons", [1]))
@@ -1,17 +1,18 @@
 from __future__ import annotations
 import numpy as np
 from collections import deque
-from typing import Deque, List
-try:
-    from numba import njit
-except Exception:  # pragma: no cover
-    def njit(*args, **kwargs):
-        def wrap(f): return f
-        return wrap
+from typing import Deque, Iterable, List, Optional
 
-from .schemas import BookSnapshot, FeatureVector
+from .featurelib import FeatureLibrary
+from .jit import kernel
+from .schemas import BookSnapshot, FeatureVector, FeatureBatch, SnapshotBatch
 
-@njit(cache=True)
+def _readonly(a: np.ndarray) -> np.ndarray:
+    a.setflags(write=False)
+    return a
+
+# snapshots from columnar files are read-only views, which numba types separately
+@kernel(warm=lambda: [(np.zeros((5, 2)), 5), (_readonly(np.zeros((5, 2))), 5)])
 def _sum_depth_side(levels: np.ndarray, upto: int) -> float:
     s = 0.0
     n = min(upto, levels.shape[0])
@@ -41,25 +42,216 @@ def _slope(levels: np.ndarray) -> float:
     return float(v1 / avg)
 
 def compute_update_rate(ts_window: Deque[float]) -> float:
-    if len(ts_window) < 2:
+    n = len(ts_window)
+    if n < 2:
         return 0.0
-    dts = np.diff(np.array(ts_window, dtype=float))
-    mean_dt = float(np.mean(dts)) if dts.size else 0.0
+    # mean of consecutive diffs telescopes to (last - first) / (n - 1)
+    mean_dt = (ts_window[-1] - ts_window[0]) / (n - 1)
     if mean_dt <= 1e-9:
         return 0.0
     return 1.0 / mean_dt
 
+class RollingMoments:
+    """
+    O(1) rolling mean/variance over the last `window` values (sliding Welford).
+    Variance is the population variance, matching np.var.
+    """
+    def __init__(self, window: int):
+        self.values: Deque[float] = deque(maxlen=max(int(window), 1))
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x: float) -> None:
+        vals = self.values
+        if len(vals) == vals.maxlen:
+            y = vals[0]
+            n = len(vals) - 1
+            if n == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                d = y - self.mean
+                self.mean -= d / n
+                self.m2 -= d * (y - self.mean)
+        vals.append(x)
+        n = len(vals)
+        d = x - self.mean
+        self.mean += d / n
+        self.m2 += d * (x - self.mean)
+        if self.m2 < 0.0:
+            self.m2 = 0.0
+
+    @property
+    def var(self) -> float:
+        n = len(self.values)
+        return self.m2 / n if n else 0.0
+
+def _ewma_step(prev: float, x: float, alpha: float) -> float:
+    if not np.isfinite(x):
+        return prev
+    if not np.isfinite(prev):
+        return x
+    return prev + alpha * (x - prev)
+
+def _sizes(levels: np.ndarray, depth_levels: int) -> tuple[np.ndarray, np.ndarray]:
+    """(N, L, 2) -> sizes (N, D) with NaN padding zeroed, plus valid mask."""
+    sizes = levels[:, :depth_levels, 1]
+    valid = np.isfinite(sizes)
+    return np.where(valid, sizes, 0.0), valid
+
+def batch_imbalance(bids: np.ndarray, asks: np.ndarray, depth_levels: int = 5) -> np.ndarray:
+    bq, _ = _sizes(bids, depth_levels)
+    aq, _ = _sizes(asks, depth_levels)
+    # accumulate level by level to keep the streaming summation order
+    bid_vol = np.zeros(bq.shape[0])
+    ask_vol = np.zeros(aq.shape[0])
+    for i in range(bq.shape[1]):
+        bid_vol += bq[:, i]
+    for i in range(aq.shape[1]):
+        ask_vol += aq[:, i]
+    denom = bid_vol + ask_vol
+    out = np.zeros_like(denom)
+    ok = denom > 1e-12
+    np.divide(bid_vol - ask_vol, denom, out=out, where=ok)
+    return out
+
+def batch_slope(levels: np.ndarray, depth_levels: int = 5) -> np.ndarray:
+    sizes, valid = _sizes(levels, depth_levels)
+    n = valid.sum(axis=1)
+    out = np.zeros(sizes.shape[0])
+    if sizes.shape[1] == 0:
+        return out
+    avg = np.zeros_like(out)
+    np.divide(sizes.sum(axis=1), n, out=avg, where=n > 0)
+    ok = (n > 0) & (avg > 1e-12)
+    np.divide(sizes[:, 0], avg, out=out, where=ok)
+    return out
+
+def batch_update_rate(ts: np.ndarray, update_rate_window: int = 30) -> np.ndarray:
+    """Rolling update rate identical to feeding `ts` through compute_update_rate."""
+    ts = np.asarray(ts, dtype=float)
+    n = ts.shape[0]
+    out = np.zeros(n)
+    if n < 2 or update_rate_window < 2:
+        return out
+    idx = np.arange(n)
+    lag = np.minimum(idx, update_rate_window - 1)
+    mean_dt = np.zeros(n)
+    mean_dt[1:] = (ts[1:] - ts[idx[1:] - lag[1:]]) / lag[1:]
+    ok = mean_dt > 1e-9
+    np.divide(1.0, mean_dt, out=out, where=ok)
+    return out
+
+@kernel(warm=lambda: (np.zeros(2), np.zeros(2), 20, 0.1))
+def _rolling_kernel(imb: np.ndarray, mid: np.ndarray, window: int, alpha: float):
+    """Same recurrences as RollingMoments / _ewma_step, run over a whole series."""
+    n = imb.shape[0]
+    mean_out = np.zeros(n)
+    var_out = np.zeros(n)
+    ewma_out = np.empty(n)
+    window = max(window, 1)
+    mean = 0.0
+    m2 = 0.0
+    ewma = np.nan
+    for i in range(n):
+        if i >= window:
+            y = imb[i - window]
+            k = window - 1
+            if k == 0:
+                mean = 0.0
+                m2 = 0.0
+            else:
+                d = y - mean
+                mean -= d / k
+                m2 -= d * (y - mean)
+        cnt = min(i + 1, window)
+        x = imb[i]
+        d = x - mean
+        mean += d / cnt
+        m2 += d * (x - mean)
+        if m2 < 0.0:
+            m2 = 0.0
+        mean_out[i] = mean
+        var_out[i] = m2 / cnt
+        m = mid[i]
+        if np.isfinite(m):
+            if np.isfinite(ewma):
+                ewma = ewma + alpha * (m - ewma)
+            else:
+                ewma = m
+        ewma_out[i] = ewma
+    return mean_out, var_out, ewma_out
+
+def batch_mid(bids: np.ndarray, asks: np.ndarray) -> np.ndarray:
+    if bids.shape[1] == 0 or asks.shape[1] == 0:
+        return np.full(bids.shape[0], np.nan)
+    return (bids[:, 0, 0] + asks[:, 0, 0]) / 2.0
+
+def compute_features_batch(ts: np.ndarray, bids: np.ndarray, asks: np.ndarray,
+                           update_rate_window: int = 30, depth_levels: int = 5,
+                           window_size: int = 20, mid_ewma_alpha: float = 0.1) -> FeatureBatch:
+    """
+    Vectorized equivalent of pushing every row through a fresh FeatureEngine.
+    bids/asks are stacked (N, L, 2) arrays; NaN-padded levels are ignored.
+    """
+    ts = np.asarray(ts, dtype=float)
+    bids = np.asarray(bids, dtype=float)
+    asks = np.asarray(asks, dtype=float)
+    imb = batch_imbalance(bids, asks, depth_levels)
+    imb_mean, imb_var, mid_ewma = _rolling_kernel(imb, batch_mid(bids, asks), int(window_size), float(mid_ewma_alpha))
+    return FeatureBatch(
+        ts=ts,
+        imbalance=imb,
+        bid_slope=batch_slope(bids, depth_levels),
+        ask_slope=batch_slope(asks, depth_levels),
+        update_rate=batch_update_rate(ts, update_rate_window),
+        imbalance_mean=imb_mean,
+        imbalance_var=imb_var,
+        mid_ewma=mid_ewma,
+    )
+
 class FeatureEngine:
-    def __init__(self, window_size: int = 20, update_rate_window: int = 30, depth_levels: int = 5):
+    """
+    Streaming features per snapshot. An optional FeatureLibrary adds its
+    columns as FeatureVector.extra / FeatureBatch.extra. With keep_snapshots,
+    the last `window_size` snapshots are retained in `snaps` (a ring
+    SnapshotBatch) for callers that want them; the features never read it.
+    """
+    def __init__(self, window_size: int = 20, update_rate_window: int = 30, depth_levels: int = 5,
+                 mid_ewma_alpha: float = 0.1, library: Optional[FeatureLibrary] = None, keep_snapshots: bool = False):
         self.depth_levels = depth_levels
-        self.snaps: Deque[BookSnapshot] = deque(maxlen=window_size)
+        self.window_size = window_size
+        self.update_rate_window = update_rate_window
+        self.mid_ewma_alpha = mid_ewma_alpha
+        self.snaps = SnapshotBatch(window_size, depth_levels, ring=True) if keep_snapshots else None
         self.ts_window: Deque[float] = deque(maxlen=update_rate_window)
+        self.imb_stats = RollingMoments(window_size)
+        self.mid_ewma = np.nan
+        self.library = library
+        self.library_state = library.new_state() if library is not None else None
 
     def push(self, snap: BookSnapshot) -> FeatureVector:
-        self.snaps.append(snap)
+        if self.snaps is not None:
+            self.snaps.append(snap)
         self.ts_window.append(snap.ts)
         imb = compute_imbalance(snap, self.depth_levels)
         bid_s = _slope(snap.bids[:self.depth_levels])
         ask_s = _slope(snap.asks[:self.depth_levels])
         rate = compute_update_rate(self.ts_window)
-        return FeatureVector(ts=snap.ts, imbalance=float(imb), bid_slope=float(bid_s), ask_slope=float(ask_s), update_rate=float(rate))
+        self.imb_stats.push(float(imb))
+        self.mid_ewma = _ewma_step(self.mid_ewma, snap.mid, self.mid_ewma_alpha)
+        extra = self.library.step(snap, self.library_state) if self.library is not None else None
+        return FeatureVector(ts=snap.ts, imbalance=float(imb), bid_slope=float(bid_s), ask_slope=float(ask_s), update_rate=float(rate),
+                             imbalance_mean=self.imb_stats.mean, imbalance_var=self.imb_stats.var, mid_ewma=float(self.mid_ewma),
+                             extra=extra)
+
+    def skip(self, ts: Iterable[float]) -> None:
+        """Count snapshots dropped upstream (moa.conflate) toward update_rate; nothing else changes."""
+        self.ts_window.extend(ts)
+
+    def batch(self, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray) -> FeatureBatch:
+        """Features for a whole series at once; does not touch streaming state."""
+        fb = compute_features_batch(ts, bids, asks, self.update_rate_window, self.depth_levels,
+                                    self.window_size, self.mid_ewma_alpha)
+        if self.library is not None:
+            fb.extra = self.library.compute(bids, asks)
+        return fb
@@ -1,56 +1,200 @@
 from __future__ import annotations
-import asyncio
 import json
+import multiprocessing as mp
+from itertools import chain
 from pathlib import Path
-from typing import AsyncIterator, Iterator, Optional
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Tuple
 import numpy as np
 from .schemas import BookSnapshot
+from .columnar import ColumnarBook, is_columnar
+from .pacing import PacingClock
+from .seekindex import compressed, iter_records, load_index, parse_ts
+from .segments import open_text, replay_segments
+
+try:  # optional faster JSON parser for the live decode path
+    from orjson import loads as _loads
+except ImportError:  # pragma: no cover
+    _loads = json.loads
 
 class ReplayIngestor:
     """
     Reads JSONL snapshots produced by capture_ws.py or synthetic samples.
     Each line must be a JSON object: {"ts": float, "bids": [[p, q],...], "asks": [[p,q],...]}
+    Files in the columnar binary format (see moa.columnar) are detected by
+    their header and memory-mapped instead; snapshots are then views into the file.
+    Rotated and gzip/zstd-compressed capture segments are chained in order
+    (see moa.segments).
+    With start_ts / end_ts (epoch seconds or ISO-8601) only snapshots with
+    start_ts <= ts < end_ts are replayed, reached by binary search over the
+    seek index (see moa.seekindex) instead of a parse from the start.
     """
-    def __init__(self, file_path: str | Path, speedup: float = 0.0):
+    def __init__(self, file_path: str | Path, speedup: float = 0.0, pacing: str = "sleep",
+                 start_ts=None, end_ts=None):
         self.file_path = Path(file_path)
         self.speedup = speedup if speedup is not None else 0.0
+        self.start_ts = parse_ts(start_ts)
+        self.end_ts = parse_ts(end_ts)
+        # shared by iter() and stream(); lag_stats() reports the last run
+        self.clock = PacingClock(self.speedup, mode=pacing)
+
+    def segments(self):
+        return replay_segments(self.file_path)
+
+    @property
+    def ranged(self) -> bool:
+        return self.start_ts is not None or self.end_ts is not None
+
+    def _snapshots(self) -> Iterator[BookSnapshot]:
+        start, end = self.start_ts, self.end_ts
+        for seg in self.segments():
+            if is_columnar(seg):
+                book = ColumnarBook(seg)
+                i0, i1 = book.range(start, end)
+                yield from book.iter(i0, i1)
+                if i1 < len(book):
+                    return
+                continue
+            if self.ranged:
+                idx = load_index(seg)
+                if idx.overlaps(start, end):
+                    for d in iter_records(seg, start, end, index=idx):
+                        yield BookSnapshot(ts=float(d["ts"]), bids=np.array(d["bids"], dtype=float),
+                                           asks=np.array(d["asks"], dtype=float))
+                if end is not None and idx.last_ts >= end:
+                    return
+                continue
+            with open_text(seg) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    d = json.loads(line)
+                    ts = float(d["ts"])
+                    bids = np.array(d["bids"], dtype=float)
+                    asks = np.array(d["asks"], dtype=float)
+                    yield BookSnapshot(ts=ts, bids=bids, asks=asks)
+
+    def arrays(self, workers: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Whole file (or the start_ts/end_ts range) as stacked arrays (ts (N,), bids (N, L, 2), asks (N, L, 2)).
+        A single columnar file returns its memory maps; otherwise rows are NaN-padded to the deepest row.
+        workers > 1 parses JSONL in that many processes, each taking byte chunks
+        cut at seek-index samples; chunks are merged back in file order.
+        """
+        segs = self.segments()
+        if len(segs) == 1 and is_columnar(segs[0]):
+            book = ColumnarBook(segs[0])
+            if not self.ranged:
+                return book.ts, book.bids, book.asks
+            i0, i1 = book.range(self.start_ts, self.end_ts)
+            return book.ts[i0:i1], book.bids[i0:i1], book.asks[i0:i1]
+        if workers > 1 and not any(is_columnar(s) for s in segs):
+            return self._parallel_arrays(segs, workers)
+        snaps = list(self._snapshots())
+        return stack_rows([s.ts for s in snaps], [s.bids for s in snaps], [s.asks for s in snaps])
+
+    def chunks(self, workers: int) -> List[Tuple[str, int, int]]:
+        """(segment, lo, hi) byte ranges covering the replay range, about 4 per worker in all."""
+        start, end = self.start_ts, self.end_ts
+        spans = []
+        for seg in self.segments():
+            idx = load_index(seg)
+            if idx.overlaps(start, end):
+                spans.append((seg, idx, idx.stop(end) - idx.seek(start)))
+            if end is not None and idx.last_ts >= end:
+                break
+        total = max(sum(n for _, _, n in spans), 1)
+        jobs = []
+        for seg, idx, n in spans:
+            # a compressed segment can only be read from its start; give it to one worker whole
+            pieces = 1 if compressed(seg) else max(1, round(4 * workers * n / total))
+            jobs += [(str(seg), lo, hi) for lo, hi in idx.chunks(start, end, pieces)]
+        return jobs
+
+    def _parallel_arrays(self, segs, workers: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        jobs = [(seg, lo, hi, self.start_ts, self.end_ts) for seg, lo, hi in self.chunks(workers)]
+        with mp.get_context("spawn").Pool(min(workers, max(len(jobs), 1))) as pool:
+            parts = pool.map(_parse_chunk, jobs, chunksize=1)
+        return concat_rows(parts)
 
     def iter(self) -> Iterator[BookSnapshot]:
-        last_ts = None
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                d = json.loads(line)
-                ts = float(d["ts"])
-                bids = np.array(d["bids"], dtype=float)
-                asks = np.array(d["asks"], dtype=float)
-                snap = BookSnapshot(ts=ts, bids=bids, asks=asks)
-                if self.speedup > 0 and last_ts is not None:
-                    dt = ts - last_ts
-                    if dt > 0:
-                        asyncio.run(asyncio.sleep(dt / self.speedup))
-                last_ts = ts
-                yield snap
+        clock = self.clock
+        clock.reset()
+        for snap in self._snapshots():
+            clock.wait(snap.ts)
+            yield snap
 
     async def stream(self) -> AsyncIterator[BookSnapshot]:
-        last_ts = None
-        loop = asyncio.get_event_loop()
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                d = json.loads(line)
-                ts = float(d["ts"])
-                bids = np.array(d["bids"], dtype=float)
-                asks = np.array(d["asks"], dtype=float)
-                snap = BookSnapshot(ts=ts, bids=bids, asks=asks)
-                if self.speedup > 0 and last_ts is not None:
-                    dt = ts - last_ts
-                    if dt > 0:
-                        await asyncio.sleep(dt / self.speedup)
-                last_ts = ts
-                yield snap
+        clock = self.clock
+        clock.reset()
+        for snap in self._snapshots():
+            await clock.wait_async(snap.ts)
+            yield snap
+
+def stack_rows(ts: Sequence[float], bids: Sequence[np.ndarray],
+               asks: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-row arrays -> (ts (N,), bids (N, L, 2), asks (N, L, 2)), NaN-padded to the deepest row."""
+    n = len(ts)
+    levels = max([max(b.shape[0], a.shape[0]) for b, a in zip(bids, asks)], default=0)
+    out_bids = np.full((n, levels, 2), np.nan)
+    out_asks = np.full((n, levels, 2), np.nan)
+    for i, (b, a) in enumerate(zip(bids, asks)):
+        if b.size:
+            out_bids[i, :b.shape[0]] = b
+        if a.size:
+            out_asks[i, :a.shape[0]] = a
+    return np.array(ts, dtype=float), out_bids, out_asks
+
+def concat_rows(parts: Sequence[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenate stack_rows outputs in order, re-padding to the deepest part."""
+    n = sum(p[0].shape[0] for p in parts)
+    levels = max([max(p[1].shape[1], p[2].shape[1]) for p in parts], default=0)
+    ts = np.empty(n)
+    bids = np.full((n, levels, 2), np.nan)
+    asks = np.full((n, levels, 2), np.nan)
+    i = 0
+    for t, b, a in parts:
+        j = i + t.shape[0]
+        ts[i:j] = t
+        bids[i:j, :b.shape[1]] = b
+        asks[i:j, :a.shape[1]] = a
+        i = j
+    return ts, bids, asks
+
+def _parse_chunk(job) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    seg, lo, hi, start_ts, end_ts = job
+    ts, bids, asks = [], [], []
+    for d in iter_records(seg, start_ts, end_ts, lo, hi):
+        ts.append(float(d["ts"]))
+        bids.append(np.array(d["bids"], dtype=float))
+        asks.append(np.array(d["asks"], dtype=float))
+    return stack_rows(ts, bids, asks)
+
+def decode_depth(msg: str | bytes, levels: int = 5) -> Optional[BookSnapshot]:
+    """
+    Decode one Binance depth message into a BookSnapshot (None if a side is empty).
+    Both sides are parsed into a single float64 buffer in one pass and only
+    re-sorted when the venue's best-first ordering is actually violated.
+    """
+    d = _loads(msg)
+    return decode_payload(d.get("data", d), levels)
+
+def decode_payload(payload: dict, levels: int = 5) -> Optional[BookSnapshot]:
+    """decode_depth for an already-parsed message body."""
+    # Binance depth stream fields: 'b' bids [price, qty], 'a' asks
+    b = payload.get("b", [])[:levels]
+    a = payload.get("a", [])[:levels]
+    if not b or not a:
+        return None
+    nb, na = len(b), len(a)
+    buf = np.fromiter(map(float, chain(chain.from_iterable(b), chain.from_iterable(a))),
+                      dtype=np.float64, count=2 * (nb + na)).reshape(nb + na, 2)
+    bids, asks = buf[:nb], buf[nb:]
+    if nb > 1 and (bids[1:, 0] > bids[:-1, 0]).any():
+        bids = bids[np.argsort(-bids[:, 0], kind="stable")]
+    if na > 1 and (asks[1:, 0] < asks[:-1, 0]).any():
+        asks = asks[np.argsort(asks[:, 0], kind="stable")]
+    ts = float(payload.get("E", payload.get("T", 0))) / 1000.0
+    return BookSnapshot(ts=ts, bids=bids, asks=asks)
 
 class BinanceIngestor:
     """
@@ -63,17 +207,9 @@ class BinanceIngestor:
 
     async def stream(self) -> AsyncIterator[BookSnapshot]:
         import websockets  # lazy import so unit tests don't need it
+        levels = self.levels
         async with websockets.connect(self.ws_url, max_size=2**22) as ws:
             async for msg in ws:
-                d = json.loads(msg)
-                payload = d.get("data", d)
-                # Binance depth stream fields: 'b' bids [price, qty], 'a' asks
-                bids = np.array([[float(p), float(q)] for p, q in payload.get("b", [])[:self.levels]], dtype=float)
-                asks = np.array([[float(p), float(q)] for p, q in payload.get("a", [])[:self.levels]], dtype=float)
-                ts = float(payload.get("E", payload.get("T", 0))) / 1000.0
-                if bids.size == 0 or asks.size == 0:
-                    continue
-                # ensure best-first order
-                bids = bids[np.argsort(-bids[:,0])]
-                asks = asks[np.argsort(asks[:,0])]
-                yield BookSnapshot(ts=ts, bids=bids, asks=asks)
+                snap = decode_depth(msg, levels)
+                if snap is not None:
+                    yield snap
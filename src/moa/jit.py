@@ -0,0 +1,178 @@
+"""
+Lazily compiled numba kernels.
+
+`@kernel` replaces `@njit(cache=True)`. Importing a module that defines
+kernels no longer imports numba. Until a kernel is compiled, a call either
+runs a fallback or compiles on the spot:
+- Small calls run the NumPy `fallback` given to the decorator, or else the
+  undecorated Python body (a handful of book levels costs microseconds).
+- Larger calls compile, and wait if a warm-up is already compiling the kernel.
+The first fallback call starts a background thread that imports numba and
+compiles (or loads from numba's on-disk cache) every kernel defined so far,
+calling each with its `warm` arguments. Once a kernel is compiled, it replaces
+its own name in the defining module, so steady-state calls go straight to
+the numba dispatcher.
+
+MOA_JIT selects the mode:
+- "lazy" (default): as described above.
+- "eager": wrap with numba at import, as `@njit(cache=True)` used to;
+  each kernel compiles (or loads from cache) on its first call.
+- "off": never use numba; the fallbacks and Python bodies always run.
+"""
+from __future__ import annotations
+import os
+import threading
+import warnings
+from typing import Any, Callable, List, Optional, Tuple
+
+MODES = ("lazy", "eager", "off")
+SMALL = 4096  # rows below which a not-yet-compiled kernel runs its fallback
+
+_kernels: List["LazyKernel"] = []
+_warm_thread: Optional[threading.Thread] = None
+_warm_lock = threading.Lock()
+
+
+def _mode() -> str:
+    m = os.environ.get("MOA_JIT", "lazy").lower()
+    if m not in MODES:
+        raise ValueError(f"MOA_JIT={m!r}; expected one of {MODES}")
+    return m
+
+
+MODE = _mode()
+
+
+def _njit(options):
+    try:
+        from numba import njit
+    except Exception:  # pragma: no cover
+        return None
+    return njit(**options)
+
+
+def _rows(args) -> int:
+    """Default work estimate: the longest leading dimension among the array arguments."""
+    n = 0
+    for a in args:
+        shape = getattr(a, "shape", None)
+        if shape:
+            n = max(n, shape[0])
+    return n
+
+
+class LazyKernel:
+    def __init__(self, py_func: Callable, fallback: Optional[Callable] = None,
+                 warm: Optional[Callable[[], Tuple[Any, ...]]] = None,
+                 size: Optional[Callable[..., int]] = None, options: Optional[dict] = None):
+        self.py_func = py_func
+        self.fallback = fallback
+        self.warm = warm
+        self.size = size or (lambda *args: _rows(args))
+        self.options = {"cache": True, **(options or {})}
+        self.dispatcher: Optional[Callable] = None
+        self._lock = threading.Lock()
+        self._requested = False
+        self.__name__ = py_func.__name__
+        self.__qualname__ = py_func.__qualname__
+        self.__doc__ = py_func.__doc__
+        self.__wrapped__ = py_func
+
+    def __repr__(self) -> str:
+        state = "compiled" if self.ready else "pending"
+        return f"<kernel {self.py_func.__module__}.{self.__name__} ({state})>"
+
+    @property
+    def ready(self) -> bool:
+        return self.dispatcher is not None
+
+    def compile(self, warm: bool = True) -> Callable:
+        """
+        Compile (or load from cache) and warm this kernel; blocks while another
+        thread is doing it. With warm=False numba compiles on the first call instead.
+        """
+        with self._lock:
+            if self.dispatcher is None:
+                fn = None if MODE == "off" else _njit(self.options)
+                if fn is None:
+                    self.dispatcher = self.fallback or self.py_func
+                else:
+                    d = fn(self.py_func)
+                    if warm and self.warm is not None:
+                        examples = self.warm()
+                        for args in examples if isinstance(examples, list) else [examples]:
+                            d(*args)
+                    self.dispatcher = d
+                    # later calls through the module global skip this wrapper
+                    g = self.py_func.__globals__
+                    if g.get(self.__name__) is self:
+                        g[self.__name__] = d
+        return self.dispatcher
+
+    def __call__(self, *args):
+        d = self.dispatcher
+        if d is not None:
+            return d(*args)
+        if self.fallback is not None or self.size(*args) < SMALL:
+            if not self._requested:
+                self._requested = True
+                if MODE == "lazy":
+                    warm_up()
+            return (self.fallback or self.py_func)(*args)
+        return self.compile()(*args)
+
+
+def kernel(fn: Optional[Callable] = None, *, fallback: Optional[Callable] = None,
+           warm: Optional[Callable[[], Tuple[Any, ...]]] = None, size: Optional[Callable[..., int]] = None,
+           **options):
+    """
+    Decorator for a numba kernel. `warm` returns example arguments (a tuple,
+    or a list of tuples for several signatures) that compilation is warmed with. `size(*args)` estimates the work in a
+    call, defaulting to the longest array; calls below SMALL take the fallback
+    while the kernel is not compiled yet. Other keyword arguments go to njit
+    (cache=True is the default).
+    """
+    def wrap(f):
+        k = LazyKernel(f, fallback=fallback, warm=warm, size=size, options=options)
+        _kernels.append(k)
+        if MODE == "eager":
+            k.compile(warm=False)
+        return k
+    return wrap(fn) if fn is not None else wrap
+
+
+def _warm_all() -> None:
+    i = 0
+    while i < len(_kernels):  # kernels defined while warming are picked up too
+        k = _kernels[i]
+        if not k.ready:
+            try:
+                k.compile()
+            except Exception as e:  # keep running the fallback rather than retrying every call
+                warnings.warn(f"numba could not compile {k.__qualname__}: {e}; using the Python version")
+                k.dispatcher = k.fallback or k.py_func
+        i += 1
+
+
+def warm_up(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Compile every kernel defined so far. With background=True this starts a
+    daemon thread (at most one at a time) and returns it; otherwise it
+    compiles before returning.
+    """
+    global _warm_thread
+    if not background:
+        _warm_all()
+        return None
+    with _warm_lock:
+        if _warm_thread is None or not _warm_thread.is_alive():
+            if all(k.ready for k in _kernels):
+                return None
+            _warm_thread = threading.Thread(target=_warm_all, name="moa-jit-warmup", daemon=True)
+            _warm_thread.start()
+        return _warm_thread
+
+
+def ready() -> bool:
+    """True once every kernel defined so far is compiled."""
+    return all(k.ready for k in _kernels)
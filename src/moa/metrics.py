@@ -0,0 +1,160 @@
+"""
+Hot-path instrumentation: fixed-memory latency histograms and counters.
+
+Profiler.wrap() swaps a timed wrapper onto an engine *instance*, so nothing
+changes (and nothing is paid) unless profiling is switched on.
+"""
+from __future__ import annotations
+import time
+from functools import wraps
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of nanosecond durations: 2**sub_bits linear
+    sub-buckets per power of two (~3% relative error at sub_bits=5), values
+    above 2**max_bits ns are clamped. Memory is fixed at construction.
+    """
+    def __init__(self, sub_bits: int = 5, max_bits: int = 40):
+        self.sub_bits = sub_bits
+        self.half = 1 << (sub_bits - 1)
+        self.max_value = (1 << max_bits) - 1
+        self.counts: List[int] = [0] * self._index(self.max_value) + [0]
+        self.total = 0
+        self.min = 0
+        self.max = 0
+        self.sum = 0
+
+    def _index(self, v: int) -> int:
+        if v < (1 << self.sub_bits):
+            return v
+        e = v.bit_length() - self.sub_bits
+        return self.half * e + (v >> e)
+
+    def _value(self, idx: int) -> int:
+        """Midpoint of bucket `idx`."""
+        if idx < (1 << self.sub_bits):
+            return idx
+        e = idx // self.half - 1
+        top = idx - self.half * e
+        return (top << e) + (1 << e) // 2
+
+    def record(self, ns: int) -> None:
+        if ns < 0:
+            ns = 0
+        elif ns > self.max_value:
+            ns = self.max_value
+        self.counts[self._index(ns)] += 1
+        if not self.total or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.total += 1
+        self.sum += ns
+
+    def percentile(self, q: float) -> int:
+        if not self.total:
+            return 0
+        rank = max(1, int(round(q / 100.0 * self.total)))
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(max(self._value(idx), self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Count plus mean/p50/p99/p999/max in microseconds."""
+        us = 1e-3
+        return {"count": self.total, "mean_us": (self.sum / self.total * us) if self.total else 0.0,
+                "p50_us": self.percentile(50) * us, "p99_us": self.percentile(99) * us,
+                "p999_us": self.percentile(99.9) * us, "max_us": self.max * us}
+
+
+class Profiler:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def hist(self, stage: str) -> LatencyHistogram:
+        h = self.stages.get(stage)
+        if h is None:
+            h = self.stages[stage] = LatencyHistogram()
+        return h
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def wrap(self, obj: Any, method: str, stage: str, count_truthy: Optional[str] = None) -> Any:
+        """
+        Time `obj.method` into histogram `stage` (no-op when disabled). With
+        `count_truthy`, also count calls whose result is truthy under that name.
+        """
+        if not self.enabled:
+            return obj
+        fn = getattr(obj, method)
+        h = self.hist(stage)
+        clock = time.perf_counter_ns
+        counters = self.counters
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            t0 = clock()
+            out = fn(*args, **kwargs)
+            h.record(clock() - t0)
+            if count_truthy is not None and out:
+                counters[count_truthy] = counters.get(count_truthy, 0) + 1
+            return out
+
+        setattr(obj, method, timed)
+        return obj
+
+    def iter(self, it: Iterable[T], stage: str, counter: Optional[str] = None) -> Iterator[T] | Iterable[T]:
+        """Time each next() of an iterator (e.g. ingest/parse) into `stage`."""
+        if not self.enabled:
+            return it
+        return self._timed_iter(iter(it), self.hist(stage), counter)
+
+    def _timed_iter(self, it: Iterator[T], h: LatencyHistogram, counter: Optional[str]) -> Iterator[T]:
+        clock = time.perf_counter_ns
+        while True:
+            t0 = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            h.record(clock() - t0)
+            if counter is not None:
+                self.counters[counter] = self.counters.get(counter, 0) + 1
+            yield item
+
+    def instrument(self, fe=None, se=None, bt=None) -> None:
+        """Wrap the standard engines: features, signals (+ signal count) and backtest."""
+        if fe is not None:
+            self.wrap(fe, "push", "features")
+        if se is not None:
+            self.wrap(se, "evaluate", "signals", count_truthy="signals")
+        if bt is not None:
+            self.wrap(bt, "on_snapshot", "backtest")
+
+    def report(self) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        rows = [{"stage": name, **h.summary()} for name, h in self.stages.items()]
+        return rows, dict(self.counters)
+
+    def format(self) -> str:
+        rows, counters = self.report()
+        lines = [f"{'stage':<10} {'count':>9} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'p999 us':>9} {'max us':>10}"]
+        for r in rows:
+            lines.append(f"{r['stage']:<10} {r['count']:>9} {r['mean_us']:>9.2f} {r['p50_us']:>9.2f} "
+                         f"{r['p99_us']:>9.2f} {r['p999_us']:>9.2f} {r['max_us']:>10.2f}")
+        if counters:
+            lines.append("counters: " + ", ".join(f"{k}={v}" for k, v in sorted(counters.items())))
+        return "\n".join(lines)
+
+
+def profiler_from_config(cfg, force: bool = False) -> Profiler:
+    return Profiler(enabled=force or bool(cfg.profiling.get("enabled", False)))
@@ -0,0 +1,421 @@
+"""
+Full-depth local order book maintained from diff-depth streams.
+
+Sizes live in two float64 arrays indexed by price tick (price / tick_size)
+relative to a movable origin, so applying one level update is a single array
+store and reading the top K levels walks outward from the cached best index.
+Prices are rebuilt from integer ticks as (tick * tick_units) / 10**price_decimals,
+which is the same double float() gives for the venue's decimal string.
+
+DiffDepthSync applies Binance's sequencing rules (buffer until a REST snapshot
+is loaded, then check U/u/pu continuity) and asks for a new snapshot on any gap.
+"""
+from __future__ import annotations
+import asyncio
+import json
+from collections import deque
+from itertools import chain
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import numpy as np
+
+from .ingest import _loads
+from .jit import kernel
+from .schemas import BookSnapshot
+
+_EMPTY = np.empty((0, 2))
+
+
+def _example_levels():
+    return np.array([[100.0, 1.0]])
+
+
+@kernel(warm=lambda: (_example_levels(), 0, 1 << 16, 10.0, 1.0))
+def _fits(levels, lo, cap, scale, units):
+    for i in range(levels.shape[0]):
+        if levels[i, 1] > 0.0:
+            j = np.int64(np.rint(levels[i, 0] * scale / units)) - lo
+            if j < 0 or j >= cap:
+                return False
+    return True
+
+
+@kernel(warm=lambda: (np.zeros(16), _example_levels(), 0, 10.0, 1.0, -1, True),
+        size=lambda sz, levels, *rest: levels.shape[0])
+def _apply_side(sz, levels, lo, scale, units, best, is_bid):
+    """Store each [price, qty] (qty 0 deletes) and return the new best index (-1 = side empty)."""
+    cap = sz.shape[0]
+    for i in range(levels.shape[0]):
+        j = np.int64(np.rint(levels[i, 0] * scale / units)) - lo
+        if j < 0 or j >= cap:  # deleting a level outside the grid: nothing stored there
+            continue
+        q = levels[i, 1]
+        sz[j] = q
+        if q > 0.0:
+            if best < 0 or (j > best if is_bid else j < best):
+                best = j
+        elif j == best:
+            if is_bid:
+                k = j - 1
+                while k >= 0 and sz[k] == 0.0:
+                    k -= 1
+            else:
+                k = j + 1
+                while k < cap and sz[k] == 0.0:
+                    k += 1
+                if k == cap:
+                    k = -1
+            best = k
+    return best
+
+
+@kernel(warm=lambda: (np.zeros(4), 0, 1, 2, 0, 10.0, 1.0, np.empty((2, 2))),
+        size=lambda sz, best, step, k, *rest: k)
+def _collect(sz, best, step, k, lo, scale, units, out):
+    """Fill out[:n] with the first k non-empty [price, size] levels from best; returns n."""
+    n = 0
+    j = best
+    cap = sz.shape[0]
+    while j >= 0 and j < cap and n < k:
+        q = sz[j]
+        if q > 0.0:
+            out[n, 0] = ((lo + j) * units) / scale
+            out[n, 1] = q
+            n += 1
+        j += step
+    return n
+
+
+def parse_levels(side) -> np.ndarray:
+    """[["67000.1", "0.5"], ...] (strings or numbers) -> (n, 2) float64."""
+    if not len(side):
+        return _EMPTY
+    return np.fromiter(map(float, chain.from_iterable(side)), dtype=np.float64, count=2 * len(side)).reshape(-1, 2)
+
+
+class LocalOrderBook:
+    """
+    Price-indexed book on the tick grid. The grid starts with `capacity`
+    ticks centred on the first snapshot and is recentred (doubling as
+    needed, up to `max_capacity`) when a non-zero level falls outside it.
+    """
+    def __init__(self, tick_size: float, price_decimals: int, capacity: int = 1 << 16, max_capacity: int = 1 << 24):
+        self.tick_size = tick_size
+        self.price_decimals = price_decimals
+        self.scale = 10.0 ** price_decimals
+        self.units = float(round(tick_size * self.scale))  # tick size in units of 10**-price_decimals
+        if self.units < 1 or abs(self.units / self.scale - tick_size) > 1e-9 * tick_size:
+            raise ValueError(f"tick_size {tick_size} is not representable with {price_decimals} decimals")
+        self.max_capacity = int(max_capacity)
+        self.capacity = int(capacity)
+        self.lo = 0  # tick at index 0
+        self.bid_sz = np.zeros(self.capacity)
+        self.ask_sz = np.zeros(self.capacity)
+        self.best_bid_idx = -1
+        self.best_ask_idx = -1
+        self.updates = 0  # level updates applied
+
+    @classmethod
+    def from_config(cls, cfg, **kw) -> "LocalOrderBook":
+        return cls(cfg.tick_size, cfg.price_decimals, **kw)
+
+    def tick(self, price: float) -> int:
+        return int(np.rint(price * self.scale / self.units))
+
+    def price(self, tick: int) -> float:
+        return (tick * self.units) / self.scale
+
+    # --- updates -------------------------------------------------------------
+
+    def clear(self) -> None:
+        self.bid_sz[:] = 0.0
+        self.ask_sz[:] = 0.0
+        self.best_bid_idx = self.best_ask_idx = -1
+
+    def load_snapshot(self, bids, asks) -> None:
+        """Replace the book with a full snapshot; sides as [[price, qty], ...]."""
+        bids, asks = np.asarray(bids, dtype=np.float64).reshape(-1, 2), np.asarray(asks, dtype=np.float64).reshape(-1, 2)
+        self.clear()
+        both = np.concatenate([bids, asks])
+        if both.shape[0]:
+            ticks = np.rint(both[:, 0] * self.scale / self.units).astype(np.int64)
+            self.lo = int((ticks.min() + ticks.max()) // 2) - self.capacity // 2
+        self.apply(bids, asks)
+
+    def apply(self, bids: np.ndarray, asks: np.ndarray) -> None:
+        """Apply one diff event; (n, 2) float arrays of [price, qty], qty 0 removes the level."""
+        if not (_fits(bids, self.lo, self.capacity, self.scale, self.units)
+                and _fits(asks, self.lo, self.capacity, self.scale, self.units)):
+            self._regrid(np.concatenate([bids[bids[:, 1] > 0, 0], asks[asks[:, 1] > 0, 0]]))
+        self.best_bid_idx = _apply_side(self.bid_sz, bids, self.lo, self.scale, self.units, self.best_bid_idx, True)
+        self.best_ask_idx = _apply_side(self.ask_sz, asks, self.lo, self.scale, self.units, self.best_ask_idx, False)
+        self.updates += bids.shape[0] + asks.shape[0]
+
+    def _regrid(self, prices: np.ndarray) -> None:
+        """Recentre (and grow if needed) so every live level and `prices` fit on the grid."""
+        ticks = np.rint(prices * self.scale / self.units).astype(np.int64)
+        live = np.flatnonzero((self.bid_sz > 0) | (self.ask_sz > 0))
+        lo_t, hi_t = int(ticks.min()), int(ticks.max())
+        if live.size:
+            lo_t, hi_t = min(lo_t, self.lo + int(live[0])), max(hi_t, self.lo + int(live[-1]))
+        cap = self.capacity
+        while cap < 2 * (hi_t - lo_t + 1):
+            cap *= 2
+        if cap > self.max_capacity:
+            raise ValueError(f"book spans {hi_t - lo_t + 1} ticks, more than max_capacity={self.max_capacity}")
+        lo = (lo_t + hi_t) // 2 - cap // 2
+        shift = self.lo - lo
+        for name in ("bid_sz", "ask_sz"):
+            new = np.zeros(cap)
+            new[live + shift] = getattr(self, name)[live]
+            setattr(self, name, new)
+        if self.best_bid_idx >= 0:
+            self.best_bid_idx += shift
+        if self.best_ask_idx >= 0:
+            self.best_ask_idx += shift
+        self.lo, self.capacity = lo, cap
+
+    # --- reads ---------------------------------------------------------------
+
+    @property
+    def best_bid(self) -> float:
+        return self.price(self.lo + self.best_bid_idx) if self.best_bid_idx >= 0 else np.nan
+
+    @property
+    def best_ask(self) -> float:
+        return self.price(self.lo + self.best_ask_idx) if self.best_ask_idx >= 0 else np.nan
+
+    def depth(self) -> tuple:
+        """(bid levels, ask levels) currently in the book."""
+        return int(np.count_nonzero(self.bid_sz)), int(np.count_nonzero(self.ask_sz))
+
+    def top(self, k: Optional[int] = None) -> tuple:
+        """Best-first (bids, asks), each (<=k, 2) [price, size]; k=None returns the full depth."""
+        kb, ka = (self.depth() if k is None else (k, k))
+        bids, asks = np.empty((kb, 2)), np.empty((ka, 2))
+        nb = _collect(self.bid_sz, self.best_bid_idx, -1, kb, self.lo, self.scale, self.units, bids)
+        na = _collect(self.ask_sz, self.best_ask_idx, 1, ka, self.lo, self.scale, self.units, asks)
+        return bids[:nb], asks[:na]
+
+    def snapshot(self, ts: float, levels: Optional[int] = None) -> BookSnapshot:
+        bids, asks = self.top(levels)
+        return BookSnapshot(ts=ts, bids=bids, asks=asks)
+
+
+class DiffDepthSync:
+    """
+    Sequencing for Binance diff-depth events ({"U", "u", "pu"?, "b", "a"}).
+    Events are buffered while no snapshot is loaded; after load_snapshot()
+    stale events are dropped, the first applied one must straddle (or
+    directly follow) lastUpdateId, and each later one must continue the previous (pu == last u
+    on futures, U == last u + 1 on spot). A break clears the snapshot so the
+    caller fetches a new one; `gaps` counts them.
+    """
+    def __init__(self, book: LocalOrderBook, max_buffer: int = 10_000):
+        self.book = book
+        self.last_id: Optional[int] = None  # snapshot lastUpdateId, None = need a snapshot
+        self.prev_u: Optional[int] = None
+        self.buffer: deque = deque(maxlen=max_buffer)
+        self.gaps = 0
+        self.applied = 0
+
+    @property
+    def needs_snapshot(self) -> bool:
+        return self.last_id is None
+
+    def load_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Load a REST depth snapshot {"lastUpdateId", "bids", "asks"} and replay buffered events."""
+        self.book.load_snapshot(parse_levels(snapshot["bids"]), parse_levels(snapshot["asks"]))
+        self.last_id = int(snapshot["lastUpdateId"])
+        self.prev_u = None
+        pending, self.buffer = list(self.buffer), deque(maxlen=self.buffer.maxlen)
+        for ev in pending:
+            self.on_event(ev)
+
+    def _gap(self, event: Dict[str, Any]) -> None:
+        self.gaps += 1
+        self.last_id = self.prev_u = None
+        self.buffer.clear()
+        self.buffer.append(event)
+
+    def on_event(self, event: Dict[str, Any]) -> bool:
+        """Apply one event if it is in sequence; True when the book changed."""
+        if self.last_id is None:
+            self.buffer.append(event)
+            return False
+        U, u, pu = int(event["U"]), int(event["u"]), event.get("pu")
+        if self.prev_u is None:
+            spot = pu is None  # spot ids start right after lastUpdateId, futures may straddle it
+            if u < self.last_id + spot:
+                return False
+            if U > self.last_id + spot and (spot or int(pu) != self.last_id):
+                self._gap(event)
+                return False
+        elif (int(pu) != self.prev_u) if pu is not None else (U != self.prev_u + 1):
+            self._gap(event)
+            return False
+        self.book.apply(parse_levels(event.get("b", ())), parse_levels(event.get("a", ())))
+        self.prev_u = u
+        self.applied += 1
+        return True
+
+
+def fetch_depth_snapshot(url: str, timeout: float = 10.0) -> Dict[str, Any]:
+    """GET a REST depth snapshot, e.g. https://fapi.binance.com/fapi/v1/depth?symbol=BTCUSDT&limit=1000."""
+    from urllib.request import urlopen
+    with urlopen(url, timeout=timeout) as r:
+        return json.loads(r.read())
+
+
+class DiffDepthIngestor:
+    """
+    Live full-depth ingestor: subscribes to a diff-depth stream
+    (<symbol>@depth@100ms), fetches a REST snapshot on a worker thread once
+    the socket is open (and again after every sequence gap), and yields a
+    BookSnapshot of the top `levels` for each applied event (levels=None
+    gives the whole book). `fetch` overrides the REST call, e.g. for tests.
+    A failed fetch (HTTP error, timeout, bad JSON) is counted in
+    `fetch_errors` and retried with exponential backoff from `retry_s`;
+    events keep buffering in the sync meanwhile.
+    """
+    def __init__(self, ws_url: str, snapshot_url: Optional[str] = None, tick_size: float = 0.1, price_decimals: int = 1,
+                 levels: Optional[int] = 5, fetch: Optional[Callable[[], Dict[str, Any]]] = None,
+                 retry_s: float = 0.5, max_retry_s: float = 30.0, **book_kw):
+        if fetch is None and snapshot_url is None:
+            raise ValueError("DiffDepthIngestor needs a snapshot_url or a fetch callable")
+        self.ws_url = ws_url
+        self.levels = levels
+        self.fetch = fetch or (lambda: fetch_depth_snapshot(snapshot_url))
+        self.book = LocalOrderBook(tick_size, price_decimals, **book_kw)
+        self.sync = DiffDepthSync(self.book)
+        self.retry_s = retry_s
+        self.max_retry_s = max_retry_s
+        self.resyncs = 0  # snapshots loaded
+        self.fetch_errors = 0
+
+    async def _fetch(self, delay: float = 0.0) -> Dict[str, Any]:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await asyncio.to_thread(self.fetch)
+
+    async def stream(self) -> AsyncIterator[BookSnapshot]:
+        import websockets  # lazy import so offline code paths don't need it
+        sync, book, levels = self.sync, self.book, self.levels
+        async with websockets.connect(self.ws_url, max_size=2**22) as ws:
+            pending: Optional[asyncio.Task] = asyncio.create_task(self._fetch())
+            delay = self.retry_s
+            try:
+                async for msg in ws:
+                    d = _loads(msg)
+                    event = d.get("data", d)
+                    if "u" not in event:
+                        continue
+                    ts = float(event.get("E", event.get("T", 0))) / 1000.0
+                    if pending is not None and pending.done():
+                        try:
+                            snapshot = pending.result()
+                        except Exception:  # the sync keeps buffering; ask again after a backoff
+                            self.fetch_errors += 1
+                            pending = asyncio.create_task(self._fetch(delay))
+                            delay = min(delay * 2, self.max_retry_s)
+                        else:
+                            sync.load_snapshot(snapshot)
+                            self.resyncs += 1
+                            pending, delay = None, self.retry_s
+                            if not sync.needs_snapshot and sync.prev_u is not None:  # buffered events brought it level
+                                yield book.snapshot(ts, levels)
+                    if sync.on_event(event):
+                        yield book.snapshot(ts, levels)
+                    if sync.needs_snapshot and pending is None:
+                        pending = asyncio.create_task(self._fetch())
+            finally:
+                if pending is not None:
+                    pending.cancel()
+
+
+class SyntheticDiffFeed:
+    """
+    Offline diff-depth source: a random-walk book of about `levels` ticks a
+    side that emits Binance futures-shaped events (string prices, U/u/pu ids)
+    and keeps a plain dict reference book to check a LocalOrderBook against.
+    Deterministic for a given seed.
+    """
+    def __init__(self, levels: int = 1000, tick_size: float = 0.1, price_decimals: int = 1, mid: float = 67000.0,
+                 updates: int = 10, p_delete: float = 0.3, p_move: float = 0.05, seed: int = 0, spot: bool = False):
+        self.rng = np.random.default_rng(seed)
+        self.levels = levels
+        self.decimals = price_decimals
+        self.units = round(tick_size * 10 ** price_decimals)
+        self.updates = updates
+        self.p_delete = p_delete
+        self.p_move = p_move
+        self.spot = spot
+        self.centre = int(round(mid / tick_size))  # asks at >= centre, bids below
+        self.bids: Dict[int, float] = {}
+        self.asks: Dict[int, float] = {}
+        self.last_u = 1000
+        self.ts_ms = 1_700_000_000_000
+        for off in range(levels):
+            self.bids[self.centre - 1 - off] = self._qty()
+            self.asks[self.centre + off] = self._qty()
+
+    def _qty(self) -> float:
+        return round(float(self.rng.uniform(0.001, 5.0)), 3)
+
+    def _fmt(self, tick: int) -> str:
+        return f"{tick * self.units / 10 ** self.decimals:.{self.decimals}f}"
+
+    def snapshot(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """REST-shaped snapshot of the current reference book."""
+        bids = sorted(self.bids.items(), reverse=True)[:limit]
+        asks = sorted(self.asks.items())[:limit]
+        return {"lastUpdateId": self.last_u,
+                "bids": [[self._fmt(t), repr(q)] for t, q in bids],
+                "asks": [[self._fmt(t), repr(q)] for t, q in asks]}
+
+    def event(self) -> Dict[str, Any]:
+        rng = self.rng
+        b: Dict[int, float] = {}
+        a: Dict[int, float] = {}
+        if rng.random() < self.p_move:  # the touch moves one tick; the crossed level changes side
+            c = self.centre
+            if rng.random() < 0.5:
+                a[c] = 0.0
+                b[c] = self._qty()
+                self.centre = c + 1
+            else:
+                b[c - 1] = 0.0
+                a[c - 1] = self._qty()
+                self.centre = c - 1
+        offs = np.minimum(rng.geometric(min(1.0, 8.0 / self.levels), self.updates) - 1, 2 * self.levels)
+        for off, side, delete in zip(offs, rng.random(self.updates) < 0.5, rng.random(self.updates) < self.p_delete):
+            if side:
+                b[self.centre - 1 - int(off)] = 0.0 if delete else self._qty()
+            else:
+                a[self.centre + int(off)] = 0.0 if delete else self._qty()
+        for ref, upd in ((self.bids, b), (self.asks, a)):
+            for t, q in upd.items():
+                if q > 0:
+                    ref[t] = q
+                else:
+                    ref.pop(t, None)
+        n = len(b) + len(a)
+        U, u = self.last_u + 1, self.last_u + n
+        self.ts_ms += 100
+        ev = {"e": "depthUpdate", "E": self.ts_ms, "T": self.ts_ms, "U": U, "u": u,
+              "b": [[self._fmt(t), repr(q)] for t, q in b.items()],
+              "a": [[self._fmt(t), repr(q)] for t, q in a.items()]}
+        if not self.spot:
+            ev["pu"] = self.last_u
+        self.last_u = u
+        return ev
+
+    def events(self, n: int) -> List[Dict[str, Any]]:
+        return [self.event() for _ in range(n)]
+
+    def reference_top(self, k: Optional[int] = None) -> tuple:
+        """Best-first (bids, asks) of the reference book, same layout as LocalOrderBook.top()."""
+        scale = 10.0 ** self.decimals
+        bids = sorted(self.bids.items(), reverse=True)[:k]
+        asks = sorted(self.asks.items())[:k]
+        return (np.array([[t * self.units / scale, q] for t, q in bids]).reshape(-1, 2),
+                np.array([[t * self.units / scale, q] for t, q in asks]).reshape(-1, 2))
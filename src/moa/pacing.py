@@ -0,0 +1,92 @@
+"""
+Replay pacing against absolute target times.
+
+Each snapshot's release time is anchor_wall + (ts - anchor_ts) / speedup, so
+per-sleep overshoot never accumulates into drift. "hybrid" mode sleeps until
+`spin_s` before the target and busy-waits the rest for sub-millisecond accuracy;
+wait_async() polls with `await asyncio.sleep(0)` instead, so other tasks on the
+loop keep running through the final stretch.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+import numpy as np
+
+MODES = ("sleep", "hybrid")
+
+
+class PacingClock:
+    def __init__(self, speedup: float, mode: str = "sleep", spin_s: float = 0.002,
+                 max_lag_s: Optional[float] = None, history: int = 100_000):
+        if mode not in MODES:
+            raise ValueError(f"unknown pacing mode {mode!r}; expected one of {MODES}")
+        self.speedup = speedup
+        self.mode = mode
+        self.spin_s = spin_s if mode == "hybrid" else 0.0
+        self.max_lag_s = max_lag_s  # re-anchor instead of catching up when this far behind
+        self.anchor_wall: Optional[float] = None
+        self.anchor_ts = 0.0
+        self.lags: Deque[float] = deque(maxlen=history)
+        self.resyncs = 0
+
+    def reset(self) -> None:
+        self.anchor_wall = None
+        self.lags.clear()
+        self.resyncs = 0
+
+    def _remaining(self, ts: float) -> float:
+        """Seconds until `ts` is due (negative when late); anchors on the first call."""
+        now = time.perf_counter()
+        if self.anchor_wall is None:
+            self.anchor_wall, self.anchor_ts = now, ts
+            return 0.0
+        return self.anchor_wall + (ts - self.anchor_ts) / self.speedup - now
+
+    def _spin(self, ts: float) -> None:
+        target = self.anchor_wall + (ts - self.anchor_ts) / self.speedup
+        clock = time.perf_counter
+        while clock() < target:
+            pass
+
+    def _record(self, ts: float) -> None:
+        lag = time.perf_counter() - (self.anchor_wall + (ts - self.anchor_ts) / self.speedup)
+        self.lags.append(lag)
+        if self.max_lag_s is not None and lag > self.max_lag_s:
+            self.anchor_wall, self.anchor_ts = time.perf_counter(), ts
+            self.resyncs += 1
+
+    def wait(self, ts: float) -> None:
+        """Block until the snapshot stamped `ts` is due."""
+        if self.speedup <= 0:
+            return
+        rem = self._remaining(ts)
+        if rem > self.spin_s:
+            time.sleep(rem - self.spin_s)
+        if self.spin_s and rem > 0:
+            self._spin(ts)
+        self._record(ts)
+
+    async def wait_async(self, ts: float) -> None:
+        """Event-loop friendly variant of wait(); the final `spin_s` yields to the loop instead of spinning."""
+        if self.speedup <= 0:
+            return
+        rem = self._remaining(ts)
+        if rem > self.spin_s:
+            await asyncio.sleep(rem - self.spin_s)
+        if self.spin_s and rem > 0:
+            target = self.anchor_wall + (ts - self.anchor_ts) / self.speedup
+            clock = time.perf_counter
+            while clock() < target:
+                await asyncio.sleep(0)
+        self._record(ts)
+
+    def lag_stats(self) -> Dict[str, float]:
+        """Release lag (actual - target) in milliseconds over the retained history."""
+        if not self.lags:
+            return {"n": 0}
+        arr = np.fromiter(self.lags, dtype=float) * 1e3
+        p50, p99 = np.percentile(arr, [50, 99])
+        return {"n": int(arr.size), "mean_ms": float(arr.mean()), "p50_ms": float(p50), "p99_ms": float(p99),
+                "max_ms": float(arr.max()), "final_ms": float(arr[-1]), "resyncs": self.resyncs}
@@ -0,0 +1,213 @@
+"""
+Asyncio pipeline: ingest -> FeatureEngine -> ThresholdSignalEngine + RollingBacktester.
+
+Stages are separate tasks joined by bounded queues. When a queue is full the
+configured overflow policy decides what happens, so a slow downstream stage
+never stalls the websocket read loop (except with policy "block", which
+applies backpressure all the way up).
+"""
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+
+from .schemas import BookSnapshot, FeatureVector, Signal, Evaluation
+from .bus import EventBus
+from .conflate import Conflator
+from .features import FeatureEngine
+from .signals import ThresholdSignalEngine
+from .backtest import RollingBacktester
+
+POLICIES = ("drop_oldest", "drop_newest", "conflate", "block")
+_DONE = object()
+
+
+class BoundedQueue:
+    """
+    Small asyncio queue with an overflow policy:
+      drop_oldest  evict the head to make room
+      drop_newest  discard the incoming item
+      conflate     overwrite the most recent queued item (latest state wins)
+      block        wait for room (backpressure)
+    """
+    def __init__(self, maxsize: int = 1024, policy: str = "drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r}; expected one of {POLICIES}")
+        self.maxsize = max(int(maxsize), 1)
+        self.policy = policy
+        self.items: Deque[Any] = deque()
+        self.dropped = 0
+        self.high_water = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    async def put(self, item: Any) -> None:
+        if item is _DONE:
+            # the end marker is never dropped
+            self.items.append(item)
+            self._not_empty.set()
+            return
+        if len(self.items) >= self.maxsize:
+            if self.policy == "block":
+                while len(self.items) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            elif self.policy == "drop_newest":
+                self.dropped += 1
+                return
+            elif self.policy == "drop_oldest":
+                self.items.popleft()
+                self.dropped += 1
+            else:  # conflate
+                self.items[-1] = item
+                self.dropped += 1
+                return
+        self.items.append(item)
+        self.high_water = max(self.high_water, len(self.items))
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        while not self.items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        item = self.items.popleft()
+        self._not_full.set()
+        return item
+
+
+@dataclass
+class PipelineEvent:
+    snap: BookSnapshot
+    features: FeatureVector
+    signal: Optional[Signal]
+    evaluations: List[Evaluation]
+    latency_s: float  # receive -> end of backtest stage
+
+
+@dataclass
+class PipelineStats:
+    received: int = 0
+    processed: int = 0
+    signals: int = 0
+    evaluations: int = 0
+    dropped: Dict[str, int] = field(default_factory=dict)
+    high_water: Dict[str, int] = field(default_factory=dict)
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=100_000))
+    conflation: Optional[Dict[str, Any]] = None
+    bus: Optional[Dict[str, Any]] = None
+
+    def latency_percentiles(self, qs: Tuple[float, ...] = (50, 90, 99, 99.9)) -> Dict[str, float]:
+        """End-to-end per-snapshot latency in milliseconds over the retained window."""
+        if not self.latencies:
+            return {}
+        arr = np.fromiter(self.latencies, dtype=float) * 1e3
+        out = {f"p{q:g}": float(v) for q, v in zip(qs, np.percentile(arr, qs))}
+        out["max"] = float(arr.max())
+        return out
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"received": self.received, "processed": self.processed, "signals": self.signals,
+                "evaluations": self.evaluations, "dropped": dict(self.dropped),
+                "high_water": dict(self.high_water), "latency_ms": self.latency_percentiles(),
+                **({"conflation": self.conflation} if self.conflation is not None else {}),
+                **({"bus": self.bus} if self.bus is not None else {})}
+
+
+class PipelineRunner:
+    def __init__(self, source: AsyncIterator[BookSnapshot], fe: FeatureEngine, se: ThresholdSignalEngine,
+                 bt: RollingBacktester, queue_size: int = 1024, policy: str = "drop_oldest",
+                 on_event: Optional[Callable[[PipelineEvent], None]] = None,
+                 conflator: Optional[Conflator] = None, bus: Optional[EventBus] = None):
+        self.source = source
+        self.fe, self.se, self.bt = fe, se, bt
+        self.on_event = on_event
+        self.conflator = conflator
+        self.bus = bus
+        self.snap_q = BoundedQueue(queue_size, policy)
+        self.feat_q = BoundedQueue(queue_size, policy)
+        self.stats = PipelineStats()
+
+    async def _ingest(self, stop_after: Optional[int]) -> None:
+        clock = time.perf_counter
+        conf = self.conflator
+        t_held = 0.0  # receive time of the snapshot a bucketing conflator is holding
+        try:
+            async for snap in self.source:
+                self.stats.received += 1
+                if conf is None:
+                    await self.snap_q.put((clock(), snap, ()))
+                else:
+                    t = clock()
+                    out = conf.offer(snap)
+                    if out is not None:
+                        await self.snap_q.put((t if out[0] is snap else t_held, *out))
+                    t_held = t
+                if stop_after is not None and self.stats.received >= stop_after:
+                    break
+        finally:
+            out = conf.flush() if conf is not None else None
+            if out is not None:
+                await self.snap_q.put((t_held, *out))
+            await self.snap_q.put(_DONE)
+
+    async def _features(self) -> None:
+        fe, q_in, q_out = self.fe, self.snap_q, self.feat_q
+        while True:
+            item = await q_in.get()
+            if item is _DONE:
+                await q_out.put(_DONE)
+                return
+            t_recv, snap, skipped = item
+            if skipped:
+                fe.skip(skipped)
+            await q_out.put((t_recv, snap, fe.push(snap)))
+            await asyncio.sleep(0)  # let the reader run between items
+
+    async def _signals(self) -> None:
+        se, bt, q_in, stats = self.se, self.bt, self.feat_q, self.stats
+        clock = time.perf_counter
+        while True:
+            item = await q_in.get()
+            if item is _DONE:
+                return
+            t_recv, snap, fv = item
+            sig = se.evaluate(fv)
+            if sig:
+                stats.signals += 1
+                bt.on_signal(snap, sig)
+            evs = bt.on_snapshot(snap)
+            stats.evaluations += len(evs)
+            stats.processed += 1
+            latency = clock() - t_recv
+            stats.latencies.append(latency)
+            if self.bus is not None:
+                self.bus.publish_step(snap, fv, sig, evs)
+            if self.on_event is not None:
+                self.on_event(PipelineEvent(snap=snap, features=fv, signal=sig, evaluations=evs, latency_s=latency))
+            await asyncio.sleep(0)
+
+    async def run(self, stop_after: Optional[int] = None) -> PipelineStats:
+        """Run until the source is exhausted (or `stop_after` snapshots were read)."""
+        tasks = [asyncio.create_task(self._ingest(stop_after)),
+                 asyncio.create_task(self._features()),
+                 asyncio.create_task(self._signals())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+        for name, q in (("snapshots", self.snap_q), ("features", self.feat_q)):
+            self.stats.dropped[name] = q.dropped
+            self.stats.high_water[name] = q.high_water
+        if self.conflator is not None:
+            self.stats.conflation = self.conflator.stats.as_dict()
+        if self.bus is not None:
+            self.stats.bus = self.bus.stats()
+        return self.stats
@@ -1,44 +1,183 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+import math
+from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple, Optional
 import numpy as np
 
-@dataclass
+@dataclass(slots=True)
 class BookSnapshot:
     ts: float  # unix timestamp seconds
     bids: np.ndarray  # shape (L, 2): [price, size]
     asks: np.ndarray  # shape (L, 2): [price, size]
+    # (best_bid, best_ask, mid), filled on first access; treat bids/asks as read-only after that
+    _top: Optional[Tuple[float, float, float]] = field(default=None, init=False, repr=False, compare=False)
+
+    def _touch(self) -> Tuple[float, float, float]:
+        top = self._top
+        if top is None:
+            bb = float(self.bids[0, 0]) if self.bids.size else np.nan
+            ba = float(self.asks[0, 0]) if self.asks.size else np.nan
+            mid = (bb + ba) / 2.0 if math.isfinite(bb) and math.isfinite(ba) else np.nan
+            top = self._top = (bb, ba, mid)
+        return top
 
     @property
     def best_bid(self) -> float:
-        return float(self.bids[0,0]) if self.bids.size else np.nan
+        return self._touch()[0]
 
     @property
     def best_ask(self) -> float:
-        return float(self.asks[0,0]) if self.asks.size else np.nan
+        return self._touch()[1]
 
     @property
     def mid(self) -> float:
-        bb, ba = self.best_bid, self.best_ask
-        if np.isfinite(bb) and np.isfinite(ba):
-            return (bb + ba) / 2.0
-        return np.nan
+        return self._touch()[2]
 
-@dataclass
+def snapshot_dtype(levels: int) -> np.dtype:
+    """One packed snapshot per row; depth beyond n_bids/n_asks is NaN-padded."""
+    return np.dtype([("ts", "<f8"), ("n_bids", "<u2"), ("n_asks", "<u2"),
+                     ("bids", "<f8", (levels, 2)), ("asks", "<f8", (levels, 2))])
+
+class SnapshotBatch:
+    """
+    Snapshots stored contiguously in one structured array of fixed capacity.
+    With ring=True, appends past capacity overwrite the oldest row, so it can
+    back a sliding window. Rows are indexed oldest first; indexing returns a
+    BookSnapshot whose bids/asks are views into the batch.
+    """
+    __slots__ = ("levels", "capacity", "ring", "data", "n", "_ts", "_nb", "_na", "_bids", "_asks")
+
+    def __init__(self, capacity: int, levels: int, ring: bool = False):
+        self.levels = levels
+        self.capacity = max(int(capacity), 1)
+        self.ring = ring
+        self.data = np.zeros(self.capacity, dtype=snapshot_dtype(levels))
+        self.data["bids"] = np.nan
+        self.data["asks"] = np.nan
+        self.n = 0  # total appended
+        d = self.data
+        self._ts, self._nb, self._na = d["ts"], d["n_bids"], d["n_asks"]
+        self._bids, self._asks = d["bids"], d["asks"]
+
+    @classmethod
+    def from_arrays(cls, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray) -> "SnapshotBatch":
+        """From NaN-padded (N,) / (N, L, 2) arrays, e.g. ReplayIngestor.arrays()."""
+        n, levels = bids.shape[0], bids.shape[1]
+        b = cls(n, levels)
+        b._ts[:] = ts
+        b._bids[:] = bids
+        b._asks[:] = asks
+        b._nb[:] = np.sum(~np.isnan(bids[:, :, 0]), axis=1)
+        b._na[:] = np.sum(~np.isnan(asks[:, :, 0]), axis=1)
+        b.n = n
+        return b
+
+    def __len__(self) -> int:
+        return min(self.n, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def append(self, snap: BookSnapshot) -> None:
+        if self.n >= self.capacity and not self.ring:
+            raise IndexError("SnapshotBatch is full")
+        k = self.n % self.capacity
+        L = self.levels
+        bids, asks = snap.bids, snap.asks
+        nb, na = min(bids.shape[0], L), min(asks.shape[0], L)
+        if nb == L == na and bids.shape[0] == asks.shape[0] == L:
+            self.data[k] = (snap.ts, nb, na, bids, asks)  # one record write
+        else:
+            self._ts[k] = snap.ts
+            self._nb[k] = nb
+            self._na[k] = na
+            self._fill(self._bids[k], bids, nb)
+            self._fill(self._asks[k], asks, na)
+        self.n += 1
+
+    @staticmethod
+    def _fill(row: np.ndarray, side: np.ndarray, m: int) -> None:
+        row[:m] = side[:m]
+        row[m:] = np.nan
+
+    def _row(self, i: int) -> int:
+        m = len(self)
+        if i < 0:
+            i += m
+        if not 0 <= i < m:
+            raise IndexError(i)
+        return (self.n - m + i) % self.capacity
+
+    def __getitem__(self, i: int) -> BookSnapshot:
+        k = self._row(i)
+        return BookSnapshot(ts=float(self._ts[k]), bids=self._bids[k, :self._nb[k]], asks=self._asks[k, :self._na[k]])
+
+    def __iter__(self) -> Iterator[BookSnapshot]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def _ordered(self, a: np.ndarray) -> np.ndarray:
+        if self.n <= self.capacity:
+            return a[:self.n]
+        k = self.n % self.capacity
+        return np.concatenate([a[k:], a[:k]])
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(ts, bids, asks) oldest first, in the layout compute_features_batch takes."""
+        return self._ordered(self._ts), self._ordered(self._bids), self._ordered(self._asks)
+
+    @property
+    def ts(self) -> np.ndarray:
+        return self._ordered(self._ts)
+
+    @property
+    def mid(self) -> np.ndarray:
+        """Same values as BookSnapshot.mid, per row."""
+        bb, ba = self._ordered(self._bids[:, 0, 0]), self._ordered(self._asks[:, 0, 0])
+        return np.where(np.isfinite(bb) & np.isfinite(ba), (bb + ba) / 2.0, np.nan)
+
+@dataclass(slots=True)
 class FeatureVector:
     ts: float
     imbalance: float
     bid_slope: float
     ask_slope: float
     update_rate: float  # events per second
+    imbalance_mean: float = 0.0  # rolling over window_size snapshots
+    imbalance_var: float = 0.0
+    mid_ewma: float = np.nan
+    extra: Optional[np.ndarray] = None  # FeatureLibrary row, columns named by FeatureLibrary.names
 
 @dataclass
+class FeatureBatch:
+    """Column-wise FeatureVector fields for a whole series, each shape (N,)."""
+    ts: np.ndarray
+    imbalance: np.ndarray
+    bid_slope: np.ndarray
+    ask_slope: np.ndarray
+    update_rate: np.ndarray
+    imbalance_mean: np.ndarray
+    imbalance_var: np.ndarray
+    mid_ewma: np.ndarray
+    extra: Optional[np.ndarray] = None  # (N, FeatureLibrary.width)
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    def row(self, i: int) -> FeatureVector:
+        return FeatureVector(ts=float(self.ts[i]), imbalance=float(self.imbalance[i]), bid_slope=float(self.bid_slope[i]),
+                             ask_slope=float(self.ask_slope[i]), update_rate=float(self.update_rate[i]),
+                             imbalance_mean=float(self.imbalance_mean[i]), imbalance_var=float(self.imbalance_var[i]),
+                             mid_ewma=float(self.mid_ewma[i]), extra=None if self.extra is None else self.extra[i])
+
+@dataclass(slots=True)
 class Signal:
     ts: float
     kind: str   # "BUY_PRESSURE", "SELL_PRESSURE"
     strength: float
 
-@dataclass
+@dataclass(slots=True)
 class Evaluation:
     ts: float
     signal_kind: str
@@ -46,3 +185,21 @@ class Evaluation:
     exit_mid: float
     pnl_ticks: float
 
+@dataclass
+class EvaluationBatch:
+    """Column-wise Evaluation records plus the snapshot indices of entry and exit."""
+    entry_idx: np.ndarray
+    exit_idx: np.ndarray
+    ts: np.ndarray
+    direction: np.ndarray  # +1 BUY_PRESSURE, -1 SELL_PRESSURE
+    entry_mid: np.ndarray
+    exit_mid: np.ndarray
+    pnl_ticks: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    def row(self, i: int) -> Evaluation:
+        kind = "BUY_PRESSURE" if self.direction[i] > 0 else "SELL_PRESSURE"
+        return Evaluation(ts=float(self.ts[i]), signal_kind=kind, entry_mid=float(self.entry_mid[i]),
+                          exit_mid=float(self.exit_mid[i]), pnl_ticks=float(self.pnl_ticks[i]))
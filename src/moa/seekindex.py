@@ -0,0 +1,300 @@
+"""
+Time-range seek index for JSONL replay segments.
+
+Each segment gets a sparse sidecar, `.<name>.idx.npz` next to it (hidden, so
+directory replays don't pick it up as a segment). The sidecar records:
+- the timestamp and byte offset of every `stride`-th line
+- the segment's first and last timestamp
+- the line and byte counts
+
+It is built in one pass the first time a range is asked for. It is rebuilt
+only when the segment's size or mtime changes. Seeking to a time then takes:
+- a binary search over the samples
+- one seek
+- a binary search over the lines of one sampled block, parsing about
+  log2(stride) of them
+
+For .gz/.zst segments, offsets are positions in the decompressed stream.
+Reaching an offset still decompresses everything before it, but no JSON is
+parsed. A segment whose [first, last] span misses the range is not opened.
+Columnar files need no sidecar: their memory-mapped ts column is searched
+directly (ColumnarBook.range).
+
+Timestamps are assumed non-decreasing, as they are in captures. Ranges are
+half-open: start_ts <= ts < end_ts. The index also cuts a range into byte
+chunks that start on line boundaries. That lets one large file be parsed by
+several processes (ReplayIngestor.arrays(workers=...)).
+"""
+from __future__ import annotations
+import io
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import chain
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from .segments import COMPRESSED, open_binary
+
+try:
+    from orjson import loads as _loads
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+INDEX_STRIDE = 4096     # lines between samples
+INDEX_VERSION = 1
+READ_CHUNK = 8 << 20
+
+
+def index_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(f".{path.name}.idx.npz")
+
+
+def parse_ts(value) -> Optional[float]:
+    """
+    None, epoch seconds (a number or numeric string), or an ISO-8601 time /
+    datetime (UTC unless it carries an offset).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        s = str(value).strip()
+        try:
+            return float(s)
+        except ValueError:
+            dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _line_ts(line: bytes) -> Optional[float]:
+    if not line.strip():
+        return None
+    try:
+        return float(_loads(line)["ts"])
+    except (ValueError, KeyError, TypeError):  # blank, truncated tail of a live capture
+        return None
+
+
+@dataclass
+class SeekIndex:
+    ts: np.ndarray          # (k,) ts of every stride-th line, running max
+    offset: np.ndarray      # (k,) byte offset of those lines
+    rows: int               # lines in the segment
+    size: int               # bytes (decompressed)
+    first_ts: float
+    last_ts: float
+    stride: int = INDEX_STRIDE
+    source_size: int = 0    # on-disk size and mtime the index was built from
+    source_mtime_ns: int = 0
+
+    def overlaps(self, start_ts: Optional[float], end_ts: Optional[float]) -> bool:
+        return (self.rows > 0 and (start_ts is None or self.last_ts >= start_ts)
+                and (end_ts is None or self.first_ts < end_ts))
+
+    def seek(self, t: Optional[float]) -> int:
+        """Offset of a line at or before the first line with ts >= t."""
+        if t is None:
+            return 0
+        i = int(np.searchsorted(self.ts, t, side="left")) - 1
+        return int(self.offset[i]) if i >= 0 else 0
+
+    def stop(self, t: Optional[float]) -> int:
+        """Offset past which every line has ts >= t."""
+        if t is None:
+            return self.size
+        i = int(np.searchsorted(self.ts, t, side="left"))
+        return int(self.offset[i]) if i < self.ts.shape[0] else self.size
+
+    def block_end(self, offset: int) -> int:
+        """Offset of the first sample after `offset` (or the end of the segment)."""
+        i = int(np.searchsorted(self.offset, offset, side="right"))
+        return int(self.offset[i]) if i < self.offset.shape[0] else self.size
+
+    def chunks(self, start_ts: Optional[float], end_ts: Optional[float], n: int) -> List[Tuple[int, int]]:
+        """Up to n byte ranges covering [start_ts, end_ts), cut at sampled lines."""
+        lo, hi = self.seek(start_ts), self.stop(end_ts)
+        if hi <= lo:
+            return []
+        inner = self.offset[(self.offset > lo) & (self.offset < hi)]
+        targets = lo + (hi - lo) * np.arange(1, max(n, 1)) / max(n, 1)
+        picks = np.unique(np.minimum(np.searchsorted(inner, targets), inner.shape[0] - 1)) if inner.size else []
+        cuts = [lo] + [int(inner[i]) for i in picks] + [hi]
+        return [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+
+    def fresh(self, path: str | Path) -> bool:
+        st = Path(path).stat()
+        return (self.source_size, self.source_mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+
+def build_index(path: str | Path, stride: int = INDEX_STRIDE) -> SeekIndex:
+    """One pass over the segment: count lines in bulk, parse ts only for the sampled ones."""
+    path = Path(path)
+    st = path.stat()
+    ts: List[float] = []
+    offsets: List[int] = []
+    rows = pos = 0
+    first: Optional[float] = None
+    last: Optional[float] = None
+    tail = b""
+    with open_binary(path) as f:
+        while True:
+            block = f.read(READ_CHUNK)
+            if not block:
+                break
+            buf = tail + block
+            nl = np.flatnonzero(np.frombuffer(buf, dtype=np.uint8) == 10)
+            if nl.size == 0:
+                tail = buf
+                continue
+            starts = np.concatenate(([0], nl[:-1] + 1))
+            for k in range((-rows) % stride, nl.size, stride):
+                t = _line_ts(buf[starts[k]:nl[k]])
+                if t is not None:
+                    ts.append(t)
+                    offsets.append(pos + int(starts[k]))
+            k = 0
+            while first is None and k < nl.size:
+                first = _line_ts(buf[starts[k]:nl[k]])
+                k += 1
+            for k in range(nl.size - 1, -1, -1):
+                t = _line_ts(buf[starts[k]:nl[k]])
+                if t is not None:
+                    last = t
+                    break
+            rows += nl.size
+            pos += int(nl[-1]) + 1
+            tail = buf[int(nl[-1]) + 1:]
+    t = _line_ts(tail)  # last line without a newline
+    if t is not None:
+        if rows % stride == 0:
+            ts.append(t)
+            offsets.append(pos)
+        first = t if first is None else first
+        last = t
+        rows += 1
+    pos += len(tail)
+    return SeekIndex(ts=np.maximum.accumulate(np.asarray(ts, dtype=np.float64)) if ts else np.empty(0),
+                     offset=np.asarray(offsets, dtype=np.int64), rows=rows, size=pos,
+                     first_ts=np.nan if first is None else first, last_ts=np.nan if last is None else last,
+                     stride=stride, source_size=st.st_size, source_mtime_ns=st.st_mtime_ns)
+
+
+def save_index(index: SeekIndex, path: str | Path) -> Path:
+    out = index_path(path)
+    tmp = out.with_name(out.name + ".tmp")
+    meta = np.array([INDEX_VERSION, index.rows, index.size, index.stride, index.source_size, index.source_mtime_ns],
+                    dtype=np.int64)
+    with open(tmp, "wb") as f:
+        np.savez(f, ts=index.ts, offset=index.offset, meta=meta, span=np.array([index.first_ts, index.last_ts]))
+    os.replace(tmp, out)
+    return out
+
+
+def read_index(path: str | Path) -> Optional[SeekIndex]:
+    """The stored sidecar for a segment, or None if missing, unreadable or stale."""
+    try:
+        with np.load(index_path(path)) as z:
+            version, rows, size, stride, src_size, src_mtime = (int(v) for v in z["meta"])
+            if version != INDEX_VERSION:
+                return None
+            idx = SeekIndex(ts=z["ts"], offset=z["offset"], rows=rows, size=size,
+                            first_ts=float(z["span"][0]), last_ts=float(z["span"][1]), stride=stride,
+                            source_size=src_size, source_mtime_ns=src_mtime)
+    except (OSError, ValueError, KeyError):
+        return None
+    return idx if idx.fresh(path) else None
+
+
+def load_index(path: str | Path, stride: int = INDEX_STRIDE) -> SeekIndex:
+    """The segment's sidecar index, built and saved first if missing or stale."""
+    idx = read_index(path)
+    if idx is None:
+        idx = build_index(path, stride)
+        try:
+            save_index(idx, path)
+        except OSError:  # read-only capture directory: keep it for this run only
+            pass
+    return idx
+
+
+def _skip(f: IO[bytes], offset: int) -> None:
+    if f.seekable():
+        f.seek(offset)
+        return
+    while offset > 0:
+        n = len(f.read(min(offset, READ_CHUNK)))
+        if not n:
+            break
+        offset -= n
+
+
+def _first_line_at(block: bytes, t: float) -> int:
+    """Offset in `block` (whole lines) of the first line with ts >= t, by binary search."""
+    nl = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+    starts = np.concatenate(([0], nl + 1))
+    ends = np.concatenate((nl, [len(block)]))
+    if starts[-1] >= len(block):
+        starts, ends = starts[:-1], ends[:-1]
+    lo, hi = 0, starts.shape[0]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        ts = _line_ts(block[starts[mid]:ends[mid]])
+        if ts is None or ts < t:
+            lo = mid + 1
+        else:
+            hi = mid
+    return int(starts[lo]) if lo < starts.shape[0] else len(block)
+
+
+def iter_records(path: str | Path, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+                 lo: Optional[int] = None, hi: Optional[int] = None,
+                 index: Optional[SeekIndex] = None) -> Iterator[dict]:
+    """
+    Parsed lines of one JSONL segment with start_ts <= ts < end_ts, reading
+    only bytes [lo, hi) (by default, the span the index gives for the range).
+    Within the sampled block holding start_ts the first row is found by a
+    binary search over its lines, so at most ~log2(stride) lines are parsed
+    before it.
+    """
+    if lo is None or hi is None:
+        index = index or load_index(path)
+        lo = index.seek(start_ts) if lo is None else lo
+        hi = index.stop(end_ts) if hi is None else hi
+    elif start_ts is not None:
+        index = index or read_index(path)
+    with open_binary(path) as f:
+        if lo:
+            _skip(f, lo)
+        pos = lo
+        lines: Iterable[bytes] = f
+        if start_ts is not None and index is not None and lo == index.seek(start_ts):
+            block = f.read(min(index.block_end(lo), hi) - lo)
+            k = _first_line_at(block, start_ts)
+            pos += k
+            lines = chain(io.BytesIO(block[k:]), f)
+        for line in lines:
+            if pos >= hi:
+                break
+            pos += len(line)
+            if not line.strip():
+                continue
+            d = json.loads(line)
+            ts = float(d["ts"])
+            if start_ts is not None and ts < start_ts:
+                continue
+            if end_ts is not None and ts >= end_ts:
+                break
+            yield d
+
+
+def compressed(path: str | Path) -> bool:
+    return Path(path).suffix in COMPRESSED
@@ -0,0 +1,64 @@
+"""
+Replay inputs that span several files.
+
+A replay path may name a single file, a directory of segments, or the base
+path a capture was started with (e.g. data/raw/btcusdt.jsonl) whose rotated
+segments are btcusdt.00000.jsonl.gz, btcusdt.00001.jsonl.gz, ... Segments are
+read in name order; .gz and .zst segments are decompressed while streaming.
+"""
+from __future__ import annotations
+import gzip
+import io
+from pathlib import Path
+from typing import IO, List
+
+COMPRESSED = (".gz", ".zst")
+
+
+def segment_name(base: str | Path, seq: int, compression: str | None = None) -> Path:
+    """base.jsonl -> base.00007.jsonl[.gz|.zst]"""
+    base = Path(base)
+    ext = {None: "", "none": "", "gzip": ".gz", "zstd": ".zst"}[compression]
+    return base.with_name(f"{base.stem}.{seq:05d}{base.suffix}{ext}")
+
+
+def replay_segments(path: str | Path) -> List[Path]:
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.is_file() and not p.name.startswith(".") and p.suffix != ".tmp")
+    if path.exists():
+        return [path]
+    names = {path.suffix + ext for ext in ("",) + COMPRESSED}
+    segs = sorted(p for p in path.parent.glob(f"{path.stem}.[0-9][0-9][0-9][0-9][0-9]{path.suffix}*")
+                  if p.name[len(path.stem) + 6:] in names)
+    if not segs:
+        raise FileNotFoundError(f"no replay file or segments for {path}")
+    return segs
+
+
+def _zstd_reader(path: Path):
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(f"reading {path.name} needs zstandard (pip install 'market-order-app[zstd]')") from e
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+def open_text(path: str | Path) -> IO[str]:
+    """Open a (possibly gzip/zstd-compressed) text segment for streaming reads."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".zst":
+        return io.TextIOWrapper(_zstd_reader(path), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def open_binary(path: str | Path) -> IO[bytes]:
+    """open_text without decoding; offsets are positions in the decompressed stream."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".zst":
+        return io.BufferedReader(_zstd_reader(path))
+    return open(path, "rb")
@@ -0,0 +1,206 @@
+"""
+Multi-symbol mode: symbols are sharded across worker processes.
+
+Each shard runs one PipelineRunner per symbol on its own event loop and sends
+signals, evaluations and periodic health records back to the parent in
+batched lists over a single multiprocessing queue.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import Config
+from .ingest import ReplayIngestor, BinanceIngestor
+from .features import FeatureEngine
+from .conflate import conflator_from_config
+from .featurelib import library_from_config
+from .signals import ThresholdSignalEngine
+from .backtest import RollingBacktester
+from .pipeline import PipelineRunner, PipelineEvent
+
+# outbound record layouts (plain tuples keep pickling cheap)
+#   ("signal", symbol, ts, kind, strength)
+#   ("eval", symbol, ts, kind, entry_mid, exit_mid, pnl_ticks)
+#   ("health", shard_id, {symbol: {...}})
+#   ("done", shard_id, {symbol: summary})
+Record = Tuple[Any, ...]
+
+
+def shard_symbols(symbols: List[str], workers: int) -> List[List[str]]:
+    workers = max(1, min(workers, len(symbols)))
+    return [symbols[i::workers] for i in range(workers)]
+
+
+def build_engines(cfg: Config) -> Tuple[FeatureEngine, ThresholdSignalEngine, RollingBacktester]:
+    fe = FeatureEngine(window_size=cfg.features["window_size"],
+                       update_rate_window=cfg.features["update_rate_window"],
+                       depth_levels=cfg.levels,
+                       mid_ewma_alpha=cfg.features.get("mid_ewma_alpha", 0.1),
+                       library=library_from_config(cfg))
+    se = ThresholdSignalEngine(imbalance_threshold=cfg.signals["imbalance_threshold"],
+                               min_update_rate=cfg.signals["min_update_rate"],
+                               confirm_n=cfg.signals["confirm_n"])
+    bt = RollingBacktester(tick_size=cfg.tick_size, horizon_seconds=cfg.backtest["horizon_seconds"],
+                           exit_on_opposite_signal=cfg.backtest.get("exit_on_opposite_signal", False),
+                           slippage_ticks=cfg.backtest.get("slippage_ticks", 0.0))
+    return fe, se, bt
+
+
+class _Shard:
+    def __init__(self, shard_id: int, symbols: List[str], cfg: Config, out_q, flush_every: int, flush_s: float,
+                 health_s: float, max_snapshots: Optional[int]):
+        self.shard_id = shard_id
+        self.symbols = symbols
+        self.cfg = cfg
+        self.out_q = out_q
+        self.flush_every = flush_every
+        self.flush_s = flush_s
+        self.health_s = health_s
+        self.max_snapshots = max_snapshots
+        self.outbox: List[Record] = []
+        self.runners: Dict[str, PipelineRunner] = {}
+        self.replays: Dict[str, ReplayIngestor] = {}
+        self.last_ts: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    def _flush(self) -> None:
+        if self.outbox:
+            self.out_q.put(self.outbox)
+            self.outbox = []
+
+    def _on_event(self, symbol: str) -> Callable[[PipelineEvent], None]:
+        def handle(ev: PipelineEvent) -> None:
+            self.last_ts[symbol] = ev.snap.ts
+            if ev.signal:
+                self.outbox.append(("signal", symbol, ev.signal.ts, ev.signal.kind, ev.signal.strength))
+            for e in ev.evaluations:
+                self.outbox.append(("eval", symbol, e.ts, e.signal_kind, e.entry_mid, e.exit_mid, e.pnl_ticks))
+            if len(self.outbox) >= self.flush_every:
+                self._flush()
+        return handle
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        out = {}
+        for sym, r in self.runners.items():
+            st = r.stats
+            lat = st.latency_percentiles((50, 99))
+            rec = {"processed": st.processed, "rate": st.processed / elapsed,
+                   "dropped": r.snap_q.dropped + r.feat_q.dropped, "queued": len(r.snap_q) + len(r.feat_q),
+                   "latency_p50_ms": lat.get("p50", 0.0), "latency_p99_ms": lat.get("p99", 0.0)}
+            if sym in self.replays:
+                rec["pacing_lag_p99_ms"] = self.replays[sym].clock.lag_stats().get("p99_ms", 0.0)
+            elif sym in self.last_ts:
+                rec["data_lag_s"] = time.time() - self.last_ts[sym]
+            out[sym] = rec
+        return out
+
+    async def _ticker(self) -> None:
+        next_health = time.perf_counter() + self.health_s
+        while True:
+            await asyncio.sleep(self.flush_s)
+            self._flush()
+            if time.perf_counter() >= next_health:
+                self.out_q.put([("health", self.shard_id, self.health())])
+                next_health += self.health_s
+
+    async def run(self) -> None:
+        cfg = self.cfg
+        for sym in self.symbols:
+            if cfg.mode == "replay":
+                ing = ReplayIngestor(cfg.replay_file(sym), speedup=cfg.replay.get("speedup", 0.0),
+                                     pacing=cfg.replay.get("pacing", "sleep"),
+                                     start_ts=cfg.replay.get("start_ts"), end_ts=cfg.replay.get("end_ts"))
+                self.replays[sym] = ing
+                source = ing.stream()
+            else:
+                source = BinanceIngestor(cfg.ws_url_for(sym), levels=cfg.levels).stream()
+            fe, se, bt = build_engines(cfg)
+            self.runners[sym] = PipelineRunner(source, fe, se, bt, queue_size=cfg.pipeline.get("queue_size", 1024),
+                                               policy=cfg.pipeline.get("overflow", "drop_oldest"),
+                                               on_event=self._on_event(sym), conflator=conflator_from_config(cfg))
+        ticker = asyncio.create_task(self._ticker())
+        try:
+            await asyncio.gather(*(r.run(stop_after=self.max_snapshots) for r in self.runners.values()))
+        finally:
+            ticker.cancel()
+        self._flush()
+        self.out_q.put([("health", self.shard_id, self.health()),
+                        ("done", self.shard_id, {s: r.bt.summary() for s, r in self.runners.items()})])
+
+
+def _shard_main(shard_id: int, symbols: List[str], cfg: Config, out_q, flush_every: int, flush_s: float,
+                health_s: float, max_snapshots: Optional[int]) -> None:
+    shard = _Shard(shard_id, symbols, cfg, out_q, flush_every, flush_s, health_s, max_snapshots)
+    asyncio.run(shard.run())
+
+
+@dataclass
+class ShardedResult:
+    signals: int = 0
+    evaluations: int = 0
+    summaries: Dict[str, dict] = field(default_factory=dict)
+    health: Dict[int, Dict[str, Dict[str, Any]]] = field(default_factory=dict)  # shard -> symbol -> stats
+    shards: List[List[str]] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def health_table(self) -> List[Dict[str, Any]]:
+        rows = []
+        for shard_id, syms in sorted(self.health.items()):
+            for sym, rec in syms.items():
+                rows.append({"shard": shard_id, "symbol": sym, **rec})
+        return rows
+
+
+def run_sharded(cfg: Config, workers: int = 2, on_record: Optional[Callable[[Record], None]] = None,
+                flush_every: int = 256, flush_s: float = 0.05, health_s: float = 1.0,
+                max_snapshots: Optional[int] = None, on_health: Optional[Callable[[ShardedResult], None]] = None) -> ShardedResult:
+    """
+    Run every symbol in cfg.symbol_list() across `workers` processes and
+    collect their records. Blocks until all shards finish.
+    """
+    res = ShardedResult(shards=shard_symbols(cfg.symbol_list(), workers))
+    ctx = mp.get_context("spawn")
+    out_q = ctx.Queue()
+    procs = [ctx.Process(target=_shard_main, args=(i, syms, cfg, out_q, flush_every, flush_s, health_s, max_snapshots),
+                         daemon=True) for i, syms in enumerate(res.shards)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    pending = len(procs)
+    try:
+        while pending:
+            try:
+                batch = out_q.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs):
+                    raise RuntimeError("shard worker exited without reporting; see its traceback above")
+                continue
+            for rec in batch:
+                tag = rec[0]
+                if tag == "signal":
+                    res.signals += 1
+                elif tag == "eval":
+                    res.evaluations += 1
+                elif tag == "health":
+                    res.health[rec[1]] = rec[2]
+                    if on_health is not None:
+                        on_health(res)
+                    continue
+                elif tag == "done":
+                    res.summaries.update(rec[2])
+                    pending -= 1
+                    continue
+                if on_record is not None:
+                    on_record(rec)
+    finally:
+        for p in procs:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+    res.elapsed_s = time.perf_counter() - t0
+    return res
@@ -1,8 +1,12 @@
 from __future__ import annotations
-from typing import Optional, Deque
+from typing import Optional, Deque, Tuple
 from collections import deque
+import numpy as np
+from .jit import kernel
 from .schemas import FeatureVector, Signal
 
+BUY, SELL = 1, -1
+
 class ThresholdSignalEngine:
     def __init__(self, imbalance_threshold: float = 0.12, min_update_rate: float = 2.0, confirm_n: int = 2):
         self.imb_th = imbalance_threshold
@@ -28,3 +32,43 @@ class ThresholdSignalEngine:
         else:
             self.buf.clear()
         return None
+
+@kernel(warm=lambda: (np.zeros(2), np.zeros(2), np.zeros(2), np.zeros(2), 0.12, 2.0, 2))
+def _signal_kernel(imb, bid_slope, ask_slope, rate, imb_th, min_rate, confirm_n):
+    n = imb.shape[0]
+    out = np.zeros(n, dtype=np.int8)
+    last = 0
+    run = 0
+    for i in range(n):
+        if rate[i] < min_rate:
+            run = 0
+            continue
+        kind = 0
+        if imb[i] > imb_th and bid_slope[i] > ask_slope[i]:
+            kind = 1
+        elif imb[i] < -imb_th and ask_slope[i] > bid_slope[i]:
+            kind = -1
+        if kind == 0:
+            run = 0
+            continue
+        # confirmation buffer == run length of the current kind since the last clear
+        run = run + 1 if (run > 0 and kind == last) else 1
+        last = kind
+        if run >= confirm_n:
+            out[i] = kind
+            run = 0
+    return out
+
+def generate_signals(imbalance: np.ndarray, bid_slope: np.ndarray, ask_slope: np.ndarray, update_rate: np.ndarray,
+                     imbalance_threshold: float = 0.12, min_update_rate: float = 2.0, confirm_n: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array equivalent of feeding every row through a fresh ThresholdSignalEngine.
+    Returns (direction int8 (N,): +1 buy / -1 sell / 0 none, strength (N,)).
+    """
+    imb = np.ascontiguousarray(imbalance, dtype=np.float64)
+    kind = _signal_kernel(imb, np.ascontiguousarray(bid_slope, dtype=np.float64),
+                          np.ascontiguousarray(ask_slope, dtype=np.float64),
+                          np.ascontiguousarray(update_rate, dtype=np.float64),
+                          float(imbalance_threshold), float(min_update_rate), int(confirm_n))
+    strength = np.where(kind != 0, np.abs(imb), 0.0)
+    return kind, strength
@@ -0,0 +1,231 @@
+"""
+Chunked result sinks for replay output.
+
+Rows are buffered and flushed every `chunk_rows` rows as one column chunk:
+a Parquet row group, an NPZ part file, or a block of CSV lines. With
+threaded=True, chunks are handed to a background writer so formatting,
+compression and I/O overlap the replay loop.
+"""
+from __future__ import annotations
+import csv
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+RESULT_COLUMNS = ("ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate", "signal", "strength", "cum_pnl_ticks")
+SIGNAL_LABELS = ("", "BUY_PRESSURE", "SELL_PRESSURE")  # signal codes 0, 1, 2
+_SIGNAL_CODES = {k: i for i, k in enumerate(SIGNAL_LABELS)}
+
+Chunk = Dict[str, np.ndarray]
+
+
+class ResultSink:
+    """Base class; subclasses implement _write_chunk (and optionally _open/_close)."""
+    suffix = ""
+
+    def __init__(self, path: str | Path, chunk_rows: int = 65536, threaded: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.rows_written = 0
+        self._rows: List[Tuple[float, ...]] = []
+        self._q: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._open()
+        if threaded:
+            self._q = queue.Queue(maxsize=2)
+            self._thread = threading.Thread(target=self._writer, name="result-sink", daemon=True)
+            self._thread.start()
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- producer side -----------------------------------------------------
+
+    def write_row(self, ts: float, mid: float, imbalance: float, bid_slope: float, ask_slope: float,
+                  update_rate: float, signal: str = "", strength: float = np.nan, cum_pnl_ticks: float = 0.0) -> None:
+        code = _SIGNAL_CODES[signal]
+        self._rows.append((ts, mid, imbalance, bid_slope, ask_slope, update_rate, code,
+                           strength if code else np.nan, cum_pnl_ticks))
+        if len(self._rows) >= self.chunk_rows:
+            self._flush_rows()
+
+    def write_columns(self, ts: np.ndarray, mid: np.ndarray, imbalance: np.ndarray, bid_slope: np.ndarray,
+                      ask_slope: np.ndarray, update_rate: np.ndarray, direction: np.ndarray, strength: np.ndarray,
+                      cum_pnl_ticks: np.ndarray) -> None:
+        """Whole columns at once; `direction` is +1/-1/0 as from signals.generate_signals."""
+        self._flush_rows()
+        code = np.where(direction > 0, 1, np.where(direction < 0, 2, 0)).astype(np.int8)
+        cols = {"ts": ts, "mid": mid, "imbalance": imbalance, "bid_slope": bid_slope, "ask_slope": ask_slope,
+                "update_rate": update_rate, "signal": code, "strength": np.where(code != 0, strength, np.nan),
+                "cum_pnl_ticks": cum_pnl_ticks}
+        n = len(ts)
+        for s in range(0, n, self.chunk_rows):
+            self._submit({k: np.ascontiguousarray(v[s:s + self.chunk_rows]) for k, v in cols.items()})
+
+    def _flush_rows(self) -> None:
+        if not self._rows:
+            return
+        a = np.array(self._rows, dtype=np.float64)
+        self._rows = []
+        chunk = {c: a[:, i] for i, c in enumerate(RESULT_COLUMNS)}
+        chunk["signal"] = chunk["signal"].astype(np.int8)
+        self._submit(chunk)
+
+    def _submit(self, chunk: Chunk) -> None:
+        if self._error is not None:
+            raise self._error
+        self.rows_written += len(chunk["ts"])
+        if self._q is None:
+            self._write_chunk(chunk)
+        else:
+            self._q.put(chunk)
+
+    def close(self) -> None:
+        if self._rows is None:
+            return
+        try:
+            self._flush_rows()
+            if self._q is not None:
+                self._q.put(None)
+                self._thread.join()
+                if self._error is not None:
+                    raise self._error
+        finally:
+            self._rows = None
+            self._close()
+
+    # --- writer side -------------------------------------------------------
+
+    def _writer(self) -> None:
+        while True:
+            chunk = self._q.get()
+            if chunk is None:
+                return
+            if self._error is None:
+                try:
+                    self._write_chunk(chunk)
+                except BaseException as e:  # surfaced to the producer on its next submit/close
+                    self._error = e
+
+    def _open(self) -> None:
+        pass
+
+    def _write_chunk(self, chunk: Chunk) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+
+class CsvSink(ResultSink):
+    """Same text layout as the original per-row CSV output."""
+    suffix = ".csv"
+
+    def _open(self) -> None:
+        self._f = open(self.path, "w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        self._w.writerow(RESULT_COLUMNS)
+
+    def _write_chunk(self, chunk: Chunk) -> None:
+        code = chunk["signal"]
+        labels = np.array(SIGNAL_LABELS, dtype=object)[code].tolist()
+        strength = np.where(code != 0, chunk["strength"], 0.0).tolist()
+        strength = [s if k else "" for k, s in zip(labels, strength)]
+        cols = [chunk[c].tolist() for c in ("ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate")]
+        self._w.writerows(zip(*cols, labels, strength, chunk["cum_pnl_ticks"].tolist()))
+
+    def _close(self) -> None:
+        self._f.close()
+
+
+class NpzSink(ResultSink):
+    """One compressed part-NNNNN.npz per chunk inside directory `path`."""
+    suffix = ".npz"
+
+    def _open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        for old in self.path.glob("part-*.npz"):
+            old.unlink()
+        self._parts = 0
+
+    def _write_chunk(self, chunk: Chunk) -> None:
+        np.savez_compressed(self.path / f"part-{self._parts:05d}.npz", **chunk)
+        self._parts += 1
+
+
+class ParquetSink(ResultSink):
+    """Single Parquet file, one row group per chunk. Needs pyarrow."""
+    suffix = ".parquet"
+
+    def __init__(self, path: str | Path, chunk_rows: int = 65536, threaded: bool = False, compression: str = "zstd"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("ParquetSink needs pyarrow (pip install 'market-order-app[parquet]')") from e
+        self._pa, self._pq, self.compression = pa, pq, compression
+        super().__init__(path, chunk_rows, threaded)
+
+    def _open(self) -> None:
+        pa = self._pa
+        self._labels = pa.array(SIGNAL_LABELS)
+        fields = [pa.field(c, pa.dictionary(pa.int8(), pa.string()) if c == "signal" else pa.float64())
+                  for c in RESULT_COLUMNS]
+        self._schema = pa.schema(fields)
+        self._pq_writer = self._pq.ParquetWriter(str(self.path), self._schema, compression=self.compression)
+
+    def _write_chunk(self, chunk: Chunk) -> None:
+        pa = self._pa
+        arrays = [pa.DictionaryArray.from_arrays(pa.array(chunk[c]), self._labels) if c == "signal"
+                  else pa.array(chunk[c]) for c in RESULT_COLUMNS]
+        self._pq_writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def _close(self) -> None:
+        self._pq_writer.close()
+
+
+SINKS = {"csv": CsvSink, "npz": NpzSink, "parquet": ParquetSink}
+
+
+def sink_format(path: str | Path) -> str:
+    suffix = Path(path).suffix.lower()
+    for name, cls in SINKS.items():
+        if suffix == cls.suffix:
+            return name
+    return "npz" if suffix == "" else "csv"
+
+
+def open_sink(path: str | Path, fmt: Optional[str] = None, chunk_rows: int = 65536, threaded: bool = False) -> ResultSink:
+    """Sink for `path`; the format defaults to the suffix (.csv, .parquet, .npz or a directory)."""
+    fmt = fmt or sink_format(path)
+    if fmt not in SINKS:
+        raise ValueError(f"unknown sink format {fmt!r}; expected one of {sorted(SINKS)}")
+    return SINKS[fmt](path, chunk_rows=chunk_rows, threaded=threaded)
+
+
+def read_results(path: str | Path, fmt: Optional[str] = None):
+    """Load any sink's output as a pandas DataFrame with RESULT_COLUMNS."""
+    import pandas as pd
+    fmt = fmt or sink_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path, keep_default_na=False, na_values={"strength": [""]}, float_precision="round_trip")
+    if fmt == "parquet":
+        df = pd.read_parquet(path)
+        df["signal"] = df["signal"].astype(str)
+        return df
+    parts = sorted(Path(path).glob("part-*.npz"))
+    cols: Dict[str, list] = {c: [] for c in RESULT_COLUMNS}
+    for p in parts:
+        with np.load(p) as z:
+            for c in RESULT_COLUMNS:
+                cols[c].append(z[c])
+    data = {c: (np.concatenate(v) if v else np.empty(0)) for c, v in cols.items()}
+    data["signal"] = np.array(SIGNAL_LABELS, dtype=object)[data["signal"].astype(np.int64)]
+    return pd.DataFrame(data, columns=list(RESULT_COLUMNS))
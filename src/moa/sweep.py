@@ -0,0 +1,102 @@
+"""
+Parallel parameter sweep over the signal and backtest stages.
+
+Features are computed once, packed into a single shared-memory block and
+attached read-only by every worker; each grid point then only re-runs the
+signal and backtest stages.
+"""
+from __future__ import annotations
+import csv
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+import numpy as np
+
+from .features import FeatureEngine, batch_mid
+from .signals import generate_signals
+from .backtest import backtest_signals
+
+COLUMNS = ("ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate")
+SIGNAL_PARAMS = ("imbalance_threshold", "min_update_rate", "confirm_n")
+BACKTEST_PARAMS = ("horizon_seconds", "exit_on_opposite_signal", "slippage_ticks")
+
+
+def feature_table(ts: np.ndarray, bids: np.ndarray, asks: np.ndarray, fe: FeatureEngine) -> np.ndarray:
+    """Stack the columns the signal/backtest stages need into a (len(COLUMNS), N) array."""
+    fb = fe.batch(ts, bids, asks)
+    return np.stack([fb.ts, batch_mid(np.asarray(bids), np.asarray(asks)), fb.imbalance,
+                     fb.bid_slope, fb.ask_slope, fb.update_rate])
+
+
+def expand_grid(grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    keys = list(grid)
+    return [dict(zip(keys, vals)) for vals in itertools.product(*(grid[k] for k in keys))]
+
+
+def evaluate_params(table: np.ndarray, params: Mapping[str, Any], tick_size: float = 0.1) -> Dict[str, Any]:
+    """Run one parameter set through the array signal + backtest kernels."""
+    ts, mid, imb, bs, asl, rate = table
+    direction, _ = generate_signals(imb, bs, asl, rate, **{k: params[k] for k in SIGNAL_PARAMS if k in params})
+    _, summary = backtest_signals(ts, mid, direction, tick_size=tick_size,
+                                  **{k: params[k] for k in BACKTEST_PARAMS if k in params})
+    return {**params, **summary}
+
+
+# --- worker side -----------------------------------------------------------
+
+_shm: Optional[shared_memory.SharedMemory] = None
+_table: Optional[np.ndarray] = None
+_tick_size = 0.1
+
+
+def _attach(name: str, shape: tuple, tick_size: float) -> None:
+    global _shm, _table, _tick_size
+    _shm = shared_memory.SharedMemory(name=name)
+    _table = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _table.flags.writeable = False
+    _tick_size = tick_size
+
+
+def _run_one(params: Dict[str, Any]) -> Dict[str, Any]:
+    return evaluate_params(_table, params, _tick_size)
+
+
+# --- driver ----------------------------------------------------------------
+
+def run_sweep(table: np.ndarray, grid: Iterable[Dict[str, Any]], tick_size: float = 0.1,
+              workers: Optional[int] = None, sort_by: str = "avg_pnl_ticks") -> List[Dict[str, Any]]:
+    """
+    Evaluate every parameter set in `grid` against a shared feature table and
+    return the results ranked by `sort_by` (descending); ties keep grid order.
+    """
+    points = list(grid)
+    workers = workers or mp.cpu_count()
+    if workers <= 1:
+        results = [evaluate_params(table, p, tick_size) for p in points]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+        try:
+            shared = np.ndarray(table.shape, dtype=np.float64, buffer=shm.buf)
+            shared[:] = table
+            chunk = max(1, len(points) // (workers * 8))
+            with mp.get_context("spawn").Pool(workers, initializer=_attach, initargs=(shm.name, table.shape, tick_size)) as pool:
+                results = list(pool.imap(_run_one, points, chunksize=chunk))  # grid order: ties rank as in a serial run
+        finally:
+            shm.close()
+            shm.unlink()
+    results.sort(key=lambda r: r[sort_by], reverse=True)
+    return results
+
+
+def write_results(results: Sequence[Dict[str, Any]], out_path: str | Path) -> Path:
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        fields = ["rank"] + list(results[0]) if results else ["rank"]
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        for rank, r in enumerate(results, 1):
+            w.writerow({"rank": rank, **r})
+    return out_path
@@ -0,0 +1,205 @@
+"""
+Deterministic synthetic order books at benchmark scale.
+
+The generator produces fixed-size blocks of snapshots, and each block draws
+from its own generator seeded by (seed, block index). Output therefore
+depends only on the parameters, and a shorter run is an exact prefix of a
+longer one.
+Within a block every random draw is vectorized. The two recursions, the
+calm/burst regime chain and the per-level size dynamics, run in small numba
+kernels.
+
+Model:
+- arrivals: exponential gaps at `rate_hz`, or at `burst_rate_hz` while in a
+  burst. A burst starts with probability `p_burst` per snapshot and lasts
+  `burst_len` snapshots on average.
+- best bid: an integer-tick random walk. It moves with probability `p_move`
+  (`burst_p_move` in a burst).
+- spread: one tick, widened by a geometric number of ticks with probability `p_wide`.
+- sizes: log-AR(1) around a profile that grows with depth. When the touch
+  moves, queues shift with their price level, and the levels exposed by the
+  move start from the profile mean. Each level takes a step with
+  probability `p_size_update` per snapshot (1 by default), so lower values
+  give quiet books whose top levels often repeat.
+Timestamps, prices and sizes are integer multiples of a microsecond, a tick
+and a lot, divided out exactly as moa.orderbook rebuilds prices, so a JSONL
+round trip returns the same doubles.
+"""
+from __future__ import annotations
+import gzip
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Tuple
+import numpy as np
+
+from .columnar import allocate_columnar
+from .jit import kernel
+
+BLOCK_ROWS = 1 << 16
+
+
+@kernel(warm=lambda: (np.zeros(1), False, 0.5, 0.5))
+def _regimes(u, burst, p_burst, p_end):
+    """Two-state Markov chain; returns the state per row and the final state."""
+    out = np.empty(u.shape[0], dtype=np.bool_)
+    for i in range(u.shape[0]):
+        burst = (u[i] >= p_end) if burst else (u[i] < p_burst)
+        out[i] = burst
+    return out, burst
+
+
+@kernel(warm=lambda: (np.zeros((2, 1)), np.zeros((1, 2), dtype=np.int64), np.zeros(1), 0.9, 0.1,
+                      np.zeros((1, 2, 1)), np.ones((1, 2, 1), dtype=np.bool_), 1e4, np.zeros((1, 1, 2)),
+                      np.zeros((1, 1, 2))),
+        size=lambda x, shift, *rest: shift.shape[0])
+def _sizes(x, shift, mu, phi, sigma, eps, upd, lot, bids, asks):
+    """
+    Sizes per side and level, rounded to whole lots of 1/lot and written to
+    bids/asks[:, :, 1]. x (2, L) holds the previous row's log sizes and is
+    updated in place. shift[i, s] is how many ticks the touch of side s
+    improved (negative: backed off); queues follow their price and levels
+    exposed by the move restart at the mean. A level only takes its AR step
+    where upd[i, s, k] is set.
+    """
+    n, L = eps.shape[0], eps.shape[2]
+    tmp = np.empty(L)
+    for i in range(n):
+        for s in range(2):
+            out = bids if s == 0 else asks
+            m = shift[i, s]
+            if m != 0:
+                for k in range(L):
+                    j = k - m
+                    tmp[k] = x[s, j] if 0 <= j < L else mu[k]
+                for k in range(L):
+                    x[s, k] = tmp[k]
+            for k in range(L):
+                if upd[i, s, k]:
+                    x[s, k] = mu[k] + phi * (x[s, k] - mu[k]) + sigma * eps[i, s, k]
+                out[i, k, 1] = max(np.rint(np.exp(x[s, k]) * lot), 1.0) / lot
+
+
+@dataclass
+class SyntheticBook:
+    levels: int = 20
+    tick_size: float = 0.1
+    price_decimals: int = 1
+    size_decimals: int = 4
+    mid: float = 60000.0
+    start_ts: float = 1.7e9
+    rate_hz: float = 10.0
+    burst_rate_hz: float = 200.0
+    p_burst: float = 0.002
+    burst_len: float = 200.0
+    p_move: float = 0.15
+    burst_p_move: float = 0.5
+    p_wide: float = 0.05
+    size_touch: float = 1.0      # mean size at the touch
+    size_growth: float = 0.08    # log-size added per level of depth
+    size_phi: float = 0.97       # AR(1) persistence of log sizes
+    size_sigma: float = 0.25
+    p_size_update: float = 1.0   # chance a level's size changes per snapshot (< 1: quieter books)
+    seed: int = 7
+    block_rows: int = BLOCK_ROWS
+
+    def __post_init__(self):
+        self.scale = 10 ** self.price_decimals
+        self.units = int(round(self.tick_size * self.scale))
+
+    def _initial(self):
+        """(last ts, best bid tick, best ask tick, in burst, log sizes (2, L))"""
+        bid = int(np.floor(self.mid / self.tick_size))
+        return self.start_ts, bid, bid + 1, False, np.tile(self._mu(), (2, 1))
+
+    def _mu(self) -> np.ndarray:
+        return np.log(self.size_touch) + self.size_growth * np.arange(self.levels)
+
+    def _block(self, index: int, rows: int, state):
+        t, bid, ask, burst, x = state
+        rng = np.random.default_rng([self.seed, index])
+        L = self.levels
+        regime, burst = _regimes(rng.random(rows), burst, self.p_burst, 1.0 / max(self.burst_len, 1.0))
+        rate = np.where(regime, self.burst_rate_hz, self.rate_hz)
+        clock = t + np.cumsum(rng.exponential(1.0, rows) / rate)
+        ts = np.rint(clock * 1e6) / 1e6  # whole microseconds, as written to JSONL
+
+        p_move = np.where(regime, self.burst_p_move, self.p_move)
+        step = np.where(rng.random(rows) < p_move, np.where(rng.random(rows) < 0.5, -1, 1), 0)
+        best_bid = bid + np.cumsum(step)
+        spread = 1 + np.where(rng.random(rows) < self.p_wide, rng.geometric(0.5, rows), 0)
+        best_ask = best_bid + spread
+
+        prev_bid = np.concatenate([[bid], best_bid[:-1]])
+        prev_ask = np.concatenate([[ask], best_ask[:-1]])
+        shift = np.stack([best_bid - prev_bid, prev_ask - best_ask], axis=1).astype(np.int64)
+        eps = rng.standard_normal((rows, 2, L))
+        # drawn last, and only when needed, so p_size_update=1 leaves every other draw as before
+        upd = rng.random((rows, 2, L)) < self.p_size_update if self.p_size_update < 1 else np.ones((rows, 2, L), dtype=bool)
+        k = np.arange(L)
+        bids = np.empty((rows, L, 2))
+        asks = np.empty((rows, L, 2))
+        bids[:, :, 0] = ((best_bid[:, None] - k) * self.units) / self.scale
+        asks[:, :, 0] = ((best_ask[:, None] + k) * self.units) / self.scale
+        _sizes(x, shift, self._mu(), self.size_phi, self.size_sigma, eps, upd, float(10 ** self.size_decimals), bids, asks)
+        return (ts, bids, asks), (float(clock[-1]), int(best_bid[-1]), int(best_ask[-1]), bool(burst), x)
+
+    def blocks(self, rows: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (ts (n,), bids (n, L, 2), asks (n, L, 2)) blocks covering `rows` snapshots."""
+        state = self._initial()
+        for index, start in enumerate(range(0, rows, self.block_rows)):
+            # always draw a whole block so a shorter run is an exact prefix of a longer one
+            block, state = self._block(index, self.block_rows, state)
+            n = min(self.block_rows, rows - start)
+            yield tuple(a[:n] for a in block) if n < self.block_rows else block
+
+    def arrays(self, rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        parts = list(self.blocks(rows))
+        if not parts:
+            return np.empty(0), np.empty((0, self.levels, 2)), np.empty((0, self.levels, 2))
+        return tuple(np.concatenate(p) for p in zip(*parts))
+
+    # --- writers -----------------------------------------------------------
+
+    def _template(self) -> str:
+        p, q = self.price_decimals, self.size_decimals
+        side = ", ".join([f"[%.{p}f, %.{q}f]"] * self.levels)
+        return f'{{"ts": %.6f, "bids": [{side}], "asks": [{side}]}}'
+
+    def write_jsonl(self, path: str | Path, rows: int, compresslevel: int = 3) -> Path:
+        """Replay JSONL (gzip-compressed when `path` ends in .gz)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tpl = self._template()
+        f = (gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel) if path.suffix == ".gz"
+             else open(path, "w", encoding="utf-8"))
+        with f:
+            for ts, bids, asks in self.blocks(rows):
+                flat = np.concatenate([ts[:, None], bids.reshape(len(ts), -1), asks.reshape(len(ts), -1)], axis=1)
+                f.write("\n".join([tpl % tuple(r) for r in flat.tolist()]) + "\n")
+        return path
+
+    def write_columnar(self, path: str | Path, rows: int) -> Path:
+        """Memory-mapped columnar replay file (moa.columnar), filled block by block."""
+        book = allocate_columnar(path, rows, self.levels)
+        i = 0
+        for ts, bids, asks in self.blocks(rows):
+            n = ts.shape[0]
+            book.ts[i:i + n] = ts
+            book.bids[i:i + n] = bids
+            book.asks[i:i + n] = asks
+            i += n
+        if rows:
+            book.n_bids[:] = self.levels
+            book.n_asks[:] = self.levels
+            for a in (book.ts, book.n_bids, book.n_asks, book.bids, book.asks):
+                a.flush()
+        return Path(path)
+
+    def write(self, path: str | Path, rows: int, fmt: str | None = None) -> Path:
+        """Write `rows` snapshots; fmt is "jsonl" or "columnar" (default: columnar for .moab, else jsonl)."""
+        fmt = fmt or ("columnar" if Path(path).suffix == ".moab" else "jsonl")
+        if fmt == "columnar":
+            return self.write_columnar(path, rows)
+        if fmt == "jsonl":
+            return self.write_jsonl(path, rows)
+        raise ValueError(f"unknown synthetic format {fmt!r}; expected 'jsonl' or 'columnar'")
@@ -0,0 +1,117 @@
+"""
+Bounded-memory series for live charts.
+
+RingBuffer keeps the most recent N rows in preallocated NumPy columns.
+MinMaxSeries keeps an entire history in a fixed number of buckets (min and
+max per bucket, buckets merge pairwise as the history grows), so drawing it
+costs the same after 1k or 10M appends.
+"""
+from __future__ import annotations
+from typing import Tuple
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity: int, columns: int = 2):
+        self.capacity = max(int(capacity), 1)
+        self.data = np.empty((self.capacity, columns))
+        self.n = 0  # total appended
+
+    def __len__(self) -> int:
+        return min(self.n, self.capacity)
+
+    def append(self, *row: float) -> None:
+        self.data[self.n % self.capacity] = row
+        self.n += 1
+
+    def values(self) -> np.ndarray:
+        """Retained rows, oldest first."""
+        if self.n <= self.capacity:
+            return self.data[:self.n]
+        k = self.n % self.capacity
+        return np.concatenate([self.data[k:], self.data[:k]])
+
+
+class MinMaxSeries:
+    """
+    Whole-history (t, y) series in at most `buckets` buckets. Each bucket keeps
+    its min and max sample; when all buckets are used, neighbours merge and the
+    bucket width doubles. Appends are O(1) amortized.
+    """
+    # bucket columns
+    T_MIN, Y_MIN, T_MAX, Y_MAX = range(4)
+
+    def __init__(self, buckets: int = 1000):
+        self.buckets = max(int(buckets) // 2 * 2, 2)
+        self.b = np.empty((self.buckets, 4))
+        self.width = 1    # samples per bucket
+        self.used = 0     # closed buckets
+        self.fill = 0     # samples in the open bucket
+        self.n = 0
+        self.last: Tuple[float, float] = (np.nan, np.nan)
+        self._cur = [0.0, np.inf, 0.0, -np.inf]
+
+    def __len__(self) -> int:
+        return self.n
+
+    def append(self, t: float, y: float) -> None:
+        self.n += 1
+        self.last = (t, y)
+        cur = self._cur
+        if y < cur[1]:
+            cur[0], cur[1] = t, y
+        if y > cur[3]:
+            cur[2], cur[3] = t, y
+        self.fill += 1
+        if self.fill >= self.width:
+            self._close()
+
+    def _close(self) -> None:
+        cur = self._cur
+        if self.fill and np.isfinite(cur[1]):
+            if self.used == self.buckets:
+                self._merge()
+            self.b[self.used] = cur
+            self.used += 1
+        self._cur = [0.0, np.inf, 0.0, -np.inf]
+        self.fill = 0
+
+    def _merge(self) -> None:
+        b = self.b
+        lo, hi = b[0::2], b[1::2]
+        take_lo_min = lo[:, self.Y_MIN] <= hi[:, self.Y_MIN]
+        take_lo_max = lo[:, self.Y_MAX] >= hi[:, self.Y_MAX]
+        merged = np.empty((self.buckets // 2, 4))
+        merged[:, :2] = np.where(take_lo_min[:, None], lo[:, :2], hi[:, :2])
+        merged[:, 2:] = np.where(take_lo_max[:, None], lo[:, 2:], hi[:, 2:])
+        b[:self.buckets // 2] = merged
+        self.used = self.buckets // 2
+        self.width *= 2
+
+    def points(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Decimated (t, y) in time order, ending with the latest sample."""
+        rows = self.b[:self.used]
+        if self.fill and np.isfinite(self._cur[1]):
+            rows = np.vstack([rows, self._cur])
+        t = np.concatenate([rows[:, self.T_MIN], rows[:, self.T_MAX]])
+        y = np.concatenate([rows[:, self.Y_MIN], rows[:, self.Y_MAX]])
+        if self.n:
+            t = np.append(t, self.last[0])
+            y = np.append(y, self.last[1])
+        order = np.argsort(t, kind="stable")
+        t, y = t[order], y[order]
+        keep = np.ones(t.shape[0], dtype=bool)
+        keep[1:] = (t[1:] != t[:-1]) | (y[1:] != y[:-1])
+        return t[keep], y[keep]
+
+
+def minmax_decimate(t: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """One-shot min/max-per-bucket decimation of an array series to <= 2 * buckets points."""
+    n = t.shape[0]
+    if n <= 2 * buckets:
+        return t, y
+    lens = np.diff(np.linspace(0, n, buckets + 1).astype(np.int64))
+    order = np.lexsort((y, np.repeat(np.arange(buckets), lens)))  # by bucket, then value
+    ends = np.cumsum(lens)
+    pick = np.unique(np.concatenate([order[ends - lens], order[ends - 1]]))
+    return t[pick], y[pick]
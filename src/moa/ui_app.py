@@ -1,7 +1,9 @@
 from __future__ import annotations
 import argparse
+import time
 from pathlib import Path
 from collections import deque
+import numpy as np
 import pandas as pd
 import altair as alt
 import sys
@@ -12,14 +14,20 @@ SRC_DIR = Path(__file__).resolve().parents[1]  # .../repo/src
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 from moa.config import load_config
+from moa.conflate import conflator_from_config
 from moa.ingest import ReplayIngestor, BinanceIngestor
 from moa.features import FeatureEngine
-from moa.signals import ThresholdSignalEngine
-from moa.backtest import RollingBacktester
+from moa.featurelib import library_from_config
+from moa.signals import ThresholdSignalEngine, generate_signals
+from moa.backtest import RollingBacktester, backtest_signals, cumulative_pnl
+from moa.cache import FeatureCache
+from moa.timeseries import MinMaxSeries, RingBuffer, minmax_decimate
+from moa.metrics import profiler_from_config
 
 # --- header with left-aligned logo the size of the font ---
 import base64
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 
 def header_with_logo(title: str, logo_path: str, size_rem: float = 1.6, gap_px: int = 10):
     """
@@ -47,6 +55,102 @@ SRC_DIR = Path(__file__).resolve().parents[1]
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
+def line_chart(ts, ys, field: str, title: str, y_title: str):
+    df = pd.DataFrame({"time": pd.to_datetime(ts, unit="s"), field: ys})
+    return (
+        alt.Chart(df)
+        .mark_line()
+        .encode(
+            x=alt.X("time:T", title="Time"),
+            y=alt.Y(f"{field}:Q", title=y_title),
+            tooltip=[alt.Tooltip("time:T", title="Time"), alt.Tooltip(f"{field}:Q", title=y_title)]
+        )
+        .properties(title=title, width="container", height=400)
+    )
+
+class LiveChart:
+    """
+    Altair line chart fed incrementally. New points go out via add_rows; once
+    `redraw_after` points were appended (or more arrived between renders than
+    the pending buffer holds) the chart is redrawn from the decimated series,
+    so the browser never holds more than ~max_points + redraw_after rows.
+    """
+    def __init__(self, placeholder, field: str, title: str, y_title: str, max_points: int = 1000, redraw_after: int = 500):
+        self.placeholder = placeholder
+        self.field, self.title, self.y_title = field, title, y_title
+        self.series = MinMaxSeries(max_points // 2)
+        self.pending = RingBuffer(redraw_after, 2)
+        self.redraw_after = redraw_after
+        self.element = None
+        self.appended = 0
+        self.flushed = 0  # pending.n at the last render
+        self.incremental = True  # add_rows is gone from newer Streamlit; fall back to bounded redraws
+
+    def append(self, ts: float, y: float) -> None:
+        self.series.append(ts, y)
+        self.pending.append(ts, y)
+
+    def _frame(self, ts, ys) -> pd.DataFrame:
+        return pd.DataFrame({"time": pd.to_datetime(ts, unit="s"), self.field: ys})
+
+    def render(self) -> None:
+        new = self.pending.n - self.flushed
+        if new == 0 and self.element is not None:
+            return
+        if not self.incremental or self.element is None or new > self.pending.capacity or self.appended + new > self.redraw_after:
+            self._redraw()
+        else:
+            rows = self.pending.values()[-new:]
+            try:
+                self.element.add_rows(self._frame(rows[:, 0], rows[:, 1]))
+                self.appended += new
+            except StreamlitAPIException:
+                self.incremental = False
+                self._redraw()
+        self.flushed = self.pending.n
+
+    def _redraw(self) -> None:
+        ts, ys = self.series.points()
+        chart = line_chart(ts, ys, self.field, self.title, self.y_title)
+        self.element = self.placeholder.altair_chart(chart, use_container_width=True)
+        self.appended = 0
+
+@st.cache_resource
+def feature_cache(root: str, max_mb: float) -> FeatureCache:
+    # one instance per session server, so the file-hash memo survives reruns
+    return FeatureCache(root, int(max_mb * (1 << 20)))
+
+def replay_cached(cfg, fe, right, imb_th, min_rate, confirm_n, horizon):
+    """Whole-file replay from cached features; a slider change only re-runs signals and the backtest."""
+    c = cfg.cache
+    cache = feature_cache(c.get("dir", "data/cache/features"), float(c.get("max_mb", 2048)))
+    t0 = time.perf_counter()
+    table, hit = cache.load_or_compute(cfg.replay["file"], fe)
+    ts, mid, imb, bs, asl, rate = table[:6]
+    t1 = time.perf_counter()
+    direction, strength = generate_signals(imb, bs, asl, rate, imbalance_threshold=imb_th,
+                                           min_update_rate=min_rate, confirm_n=confirm_n)
+    evals, summary = backtest_signals(ts, mid, direction, tick_size=cfg.tick_size, horizon_seconds=horizon,
+                                      slippage_ticks=cfg.backtest.get("slippage_ticks", 0.0),
+                                      exit_on_opposite_signal=cfg.backtest.get("exit_on_opposite_signal", False))
+    cum = cumulative_pnl(evals, ts.shape[0])
+    t2 = time.perf_counter()
+
+    max_points = int(cfg.ui.get("max_points", 1000))
+    finite = np.isfinite(mid)
+    right.altair_chart(line_chart(*minmax_decimate(ts[finite], mid[finite], max_points // 2),
+                                  "mid", "Mid Price Over Time", "Mid Price"), use_container_width=True)
+    right.altair_chart(line_chart(*minmax_decimate(ts, cum, max_points // 2),
+                                  "cum_pnl_ticks", "Cumulative P&L", "Cumulative P&L (ticks)"), use_container_width=True)
+    idx = np.flatnonzero(direction)[-int(cfg.ui.get("tape_rows", 15)):]
+    if idx.size:
+        right.dataframe(pd.DataFrame({"ts": ts[idx], "signal": np.where(direction[idx] > 0, "BUY_PRESSURE", "SELL_PRESSURE"),
+                                      "strength": strength[idx]}))
+    st.caption(f"Features {'from cache' if hit else 'computed'} in {t1 - t0:.2f}s; "
+               f"signals + backtest over {ts.shape[0]:,} snapshots in {(t2 - t1) * 1e3:.0f} ms")
+    st.success("Replay complete.")
+    st.json(summary)
+
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--config", type=str, default="configs/default.yaml")
@@ -74,92 +178,89 @@ def main(cfg_path: str):
         min_rate = st.slider("Min update rate (events/s)", 0.0, 10.0, float(cfg.signals['min_update_rate']), 0.1)
         confirm_n = st.slider("Consecutive confirmations", 1, 5, int(cfg.signals['confirm_n']), 1)
         horizon = st.slider("Backtest horizon (s)", 1, 30, int(cfg.backtest['horizon_seconds']), 1)
+        # opt-in: the default stays the paced streaming replay even though cache.enabled is on by default
+        instant = cfg.mode == "replay" and st.checkbox("Instant replay (cached features)", value=False)
 
     # engines
     fe = FeatureEngine(window_size=cfg.features["window_size"],
                        update_rate_window=cfg.features["update_rate_window"],
-                       depth_levels=cfg.levels)
+                       depth_levels=cfg.levels,
+                       mid_ewma_alpha=cfg.features.get("mid_ewma_alpha", 0.1),
+                       library=library_from_config(cfg))
     se = ThresholdSignalEngine(imbalance_threshold=imb_th, min_update_rate=min_rate, confirm_n=confirm_n)
-    bt = RollingBacktester(tick_size=cfg.tick_size, horizon_seconds=horizon)
+    bt = RollingBacktester(tick_size=cfg.tick_size, horizon_seconds=horizon,
+                           exit_on_opposite_signal=cfg.backtest.get("exit_on_opposite_signal", False),
+                           slippage_ticks=cfg.backtest.get("slippage_ticks", 0.0))
+    if instant:
+        replay_cached(cfg, fe, right, imb_th, min_rate, confirm_n, horizon)
+        return
+    prof = profiler_from_config(cfg)
+    prof.instrument(fe, se, bt)
 
-    # state
-    tape = []
-    history_mid = []
-    cum_pnl = []
+    # state: bounded regardless of replay length
+    ui = cfg.ui
+    refresh_s = float(ui.get("refresh_seconds", 0.5))
+    max_points = int(ui.get("max_points", 1000))
+    tape = deque(maxlen=int(ui.get("tape_rows", 15)))
     cum = 0.0
 
     # Ingestor selection
     if cfg.mode == "replay":
-        ing = ReplayIngestor(cfg.replay["file"], speedup=cfg.replay.get("speedup", 0.0))
-        iterator = ing.iter()
+        ing = ReplayIngestor(cfg.replay["file"], speedup=cfg.replay.get("speedup", 0.0),
+                             pacing=cfg.replay.get("pacing", "sleep"),
+                             start_ts=cfg.replay.get("start_ts"), end_ts=cfg.replay.get("end_ts"))
+        snaps = prof.iter(ing.iter(), "ingest", counter="snapshots")
+        conf = conflator_from_config(cfg)
+        iterator = conf.iter(snaps) if conf is not None else ((s, ()) for s in snaps)
     else:
         ing = BinanceIngestor(cfg.ws_url, levels=cfg.levels)
         iterator = ing.stream()  # note: this is async; Streamlit won't run it here
 
-        st.warning("Live mode is defined, but the Streamlit loop uses synchronous replay. Use scripts/capture_ws.py or integrate asyncio in a custom runner.")
+        st.warning("Live mode is defined, but the Streamlit loop uses synchronous replay. Use scripts/run_live.py for the async live pipeline or scripts/capture_ws.py to record.")
         return
 
-    # Main sync loop for replay
-    placeholder_chart = right.empty()
-    placeholder_pnl = right.empty()
+    # Main sync loop for replay; rendering runs on a wall-clock cadence, decoupled from tick rate
+    mid_chart = LiveChart(right.empty(), "mid", "Mid Price Over Time", "Mid Price", max_points)
+    pnl_chart = LiveChart(right.empty(), "cum_pnl_ticks", "Cumulative P&L", "Cumulative P&L (ticks)", max_points)
     placeholder_table = right.empty()
+    placeholder_prof = left.empty() if prof.enabled else None
+    tape_rendered = 0
+    next_render = 0.0
+
+    def render():
+        nonlocal tape_rendered
+        mid_chart.render()
+        pnl_chart.render()
+        if len(tape) and tape_rendered != tape[-1]["n"]:
+            placeholder_table.dataframe(pd.DataFrame(list(tape)).drop(columns="n"))
+            tape_rendered = tape[-1]["n"]
+        if placeholder_prof is not None:
+            rows, counters = prof.report()
+            with placeholder_prof.container():
+                st.caption("Stage latency (us) · " + ", ".join(f"{k}={v}" for k, v in sorted(counters.items())))
+                st.dataframe(pd.DataFrame(rows).round(2), hide_index=True)
 
-    for i, snap in enumerate(iterator):
-        history_mid.append({"ts": snap.ts, "mid": snap.mid})
+    for i, (snap, skipped) in enumerate(iterator):
+        if skipped:
+            fe.skip(skipped)
+        mid_chart.append(snap.ts, snap.mid)
         fv = fe.push(snap)
         sig = se.evaluate(fv)
         if sig:
-            tape.append({"ts": sig.ts, "signal": sig.kind, "strength": sig.strength})
+            tape.append({"n": i, "ts": sig.ts, "signal": sig.kind, "strength": sig.strength})
             bt.on_signal(snap, sig)
-        ev = bt.on_snapshot(snap)
-        if ev:
+        evs = bt.on_snapshot(snap)
+        for ev in evs:
             cum += ev.pnl_ticks
-            cum_pnl.append({"ts": ev.ts, "cum_pnl_ticks": cum})
-
-        if i % 5 == 0:
-            # update charts every 5 ticks
-            df_mid = pd.DataFrame(history_mid)
-            if not df_mid.empty and "ts" in df_mid.columns:
-                df_mid["time"] = pd.to_datetime(df_mid["ts"], unit="s")
-                mid_chart = (
-                    alt.Chart(df_mid)
-                    .mark_line()
-                    .encode(
-                        x=alt.X("time:T", title="Time"),
-                        y=alt.Y("mid:Q", title="Mid Price"),
-                        tooltip=[alt.Tooltip("time:T", title="Time"), alt.Tooltip("mid:Q", title="Mid")]
-                    )
-                    .properties(title="Mid Price Over Time", width="container", height=400)
-                )
-                placeholder_chart.altair_chart(mid_chart, use_container_width=True)
-
-            # seed cum_pnl so the chart has an initial point if desired
-            if not cum_pnl:
-                cum_pnl.append({"ts": snap.ts, "cum_pnl_ticks": cum})
-
-            df_pnl = pd.DataFrame(cum_pnl)
-            if not df_pnl.empty and "ts" in df_pnl.columns:
-                df_pnl["time"] = pd.to_datetime(df_pnl["ts"], unit="s")
-                pnl_chart = (
-                    alt.Chart(df_pnl)
-                    .mark_line()
-                    .encode(
-                        x=alt.X("time:T", title="Time"),
-                        y=alt.Y("cum_pnl_ticks:Q", title="Cumulative P&L (ticks)"),
-                        tooltip=[alt.Tooltip("time:T", title="Time"), alt.Tooltip("cum_pnl_ticks:Q", title="PnL (ticks)")]
-                    )
-                    .properties(title="Cumulative P&L", width="container", height=400)
-                )
-                placeholder_pnl.altair_chart(pnl_chart, use_container_width=True)
-
-            # keep the signal tape as-is
-            df_tape = pd.DataFrame(tape).tail(15)
-            placeholder_table.dataframe(df_tape)
-
-
-            df_tape = pd.DataFrame(tape).tail(15)
-            placeholder_table.dataframe(df_tape)
+        if evs or i == 0:
+            # seed at the first tick so the chart has an initial point
+            pnl_chart.append(snap.ts, cum)
 
+        now = time.perf_counter()
+        if now >= next_render:
+            render()
+            next_render = now + refresh_s
+    render()
 
     st.success("Replay complete.")
     st.json(bt.summary())
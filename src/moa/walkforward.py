@@ -0,0 +1,190 @@
+"""
+Walk-forward evaluation over time folds.
+
+The series is cut into equal-duration blocks. Each fold chooses signal
+parameters on its train blocks (grid search, best `objective` among points
+with at least `min_trades` trades) and is scored on the block that follows.
+Folds run in parallel worker processes. A worker computes features only for
+its own rows, starting `warmup_rows` before the train window: every rolling
+window the signal inputs depend on is then fully populated at the fold
+boundary, so there is no replay from the start of the series. (The mid EWMA,
+which no signal reads, only converges.)
+
+Workers memory-map a columnar replay file themselves; any other input is
+copied once into shared memory.
+"""
+from __future__ import annotations
+import multiprocessing as mp
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+
+from .backtest import backtest_signals, trade_stats
+from .columnar import ColumnarBook, is_columnar
+from .features import FeatureEngine
+from .signals import generate_signals
+from .sweep import BACKTEST_PARAMS, SIGNAL_PARAMS, feature_table
+
+
+@dataclass
+class Fold:
+    index: int
+    train: Tuple[int, int]  # [start, stop) rows
+    test: Tuple[int, int]
+
+
+def make_folds(ts: np.ndarray, n_folds: int, train_blocks: int = 1, anchored: bool = False) -> List[Fold]:
+    """
+    Split `ts` into n_folds + train_blocks blocks of equal duration. Fold k
+    tests on block train_blocks + k and trains on the train_blocks blocks
+    before it (anchored: on every block before it).
+    """
+    n = ts.shape[0]
+    blocks = n_folds + train_blocks
+    if n == 0 or n_folds < 1 or train_blocks < 1:
+        return []
+    t0, t1 = float(ts[0]), float(ts[-1])
+    edges = np.searchsorted(ts, t0 + (t1 - t0) * np.arange(blocks + 1) / blocks, side="left")
+    edges[-1] = n
+    folds = []
+    for k in range(n_folds):
+        b = train_blocks + k
+        start = 0 if anchored else int(edges[k])
+        folds.append(Fold(k, (start, int(edges[b])), (int(edges[b]), int(edges[b + 1]))))
+    return folds
+
+
+def warmup_rows(fe_params: Mapping[str, Any]) -> int:
+    """Rows before a fold that bring every rolling feature window to full length."""
+    return max(int(fe_params.get("update_rate_window", 30)), int(fe_params.get("window_size", 20))) - 1
+
+
+def _trades(table: np.ndarray, params: Mapping[str, Any], tick_size: float, lo: int, hi: int):
+    """Trades entered in rows [lo, hi) of `table`; exits may use any later row."""
+    ts, mid, imb, bs, asl, rate = table
+    direction, _ = generate_signals(imb, bs, asl, rate, **{k: params[k] for k in SIGNAL_PARAMS if k in params})
+    direction[:lo] = 0
+    direction[hi:] = 0
+    batch, _ = backtest_signals(ts[lo:], mid[lo:], direction[lo:], tick_size=tick_size,
+                                **{k: params[k] for k in BACKTEST_PARAMS if k in params})
+    return batch
+
+
+def evaluate_fold(ts: np.ndarray, bids: np.ndarray, asks: np.ndarray, fold: Fold, job: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Fit on fold.train, score on fold.test. `job` carries fe_params, grid,
+    tick_size, objective, min_trades and optionally warmup (rows of feature
+    history before the train window; default warmup_rows(fe_params)).
+    """
+    tick, grid = job["tick_size"], job["grid"]
+    (a, b), (c, d) = fold.train, fold.test
+    s = max(0, a - job.get("warmup", warmup_rows(job["fe_params"])))
+    tail = max(float(p.get("horizon_seconds", 0.0)) for p in grid)
+    e = int(np.searchsorted(ts, ts[d - 1] + tail, side="right")) if d > c else d
+    table = feature_table(ts[s:e], bids[s:e], asks[s:e], FeatureEngine(**job["fe_params"]))
+
+    train_span = float(ts[b - 1] - ts[a]) if b > a else 0.0
+    best, best_stats = None, None
+    for params in grid:  # train trades must also exit inside the train window
+        stats = trade_stats(_trades(table[:, :b - s], params, tick, a - s, b - s).pnl_ticks, train_span)
+        if stats["trades"] < job["min_trades"]:
+            continue
+        if best_stats is None or stats[job["objective"]] > best_stats[job["objective"]]:
+            best, best_stats = params, stats
+
+    test_span = float(ts[d - 1] - ts[c]) if d > c else 0.0
+    pnl = _trades(table, best, tick, c - s, d - s).pnl_ticks if best is not None else np.empty(0)
+    return {
+        "fold": fold.index,
+        "train_start": float(ts[a]), "test_start": float(ts[c]), "test_end": float(ts[d - 1]) if d > c else float(ts[c]),
+        "rows": e - s,
+        "params": best,
+        "train": best_stats,
+        "test": trade_stats(pnl, test_span),
+        "pnl_ticks": pnl,
+    }
+
+
+# --- worker side -----------------------------------------------------------
+
+_shm: Optional[shared_memory.SharedMemory] = None
+_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+_job: Optional[Dict[str, Any]] = None
+
+
+def _views(buf, n: int, lb: int, la: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ts = np.ndarray((n,), dtype=np.float64, buffer=buf)
+    bids = np.ndarray((n, lb, 2), dtype=np.float64, buffer=buf, offset=8 * n)
+    asks = np.ndarray((n, la, 2), dtype=np.float64, buffer=buf, offset=8 * n * (1 + 2 * lb))
+    return ts, bids, asks
+
+
+def _attach(source: Tuple[Any, ...], job: Dict[str, Any]) -> None:
+    global _shm, _arrays, _job
+    if source[0] == "columnar":
+        book = ColumnarBook(source[1])
+        _arrays = (np.asarray(book.ts), np.asarray(book.bids), np.asarray(book.asks))
+    else:
+        _shm = shared_memory.SharedMemory(name=source[1])
+        _arrays = _views(_shm.buf, *source[2:])
+    _job = job
+
+
+def _run_fold(fold: Fold) -> Dict[str, Any]:
+    return evaluate_fold(*_arrays, fold, _job)
+
+
+# --- driver ----------------------------------------------------------------
+
+def run_walkforward(ts: np.ndarray, bids: np.ndarray, asks: np.ndarray, fe_params: Mapping[str, Any],
+                    grid: Sequence[Mapping[str, Any]], n_folds: int = 5, train_blocks: int = 1, anchored: bool = False,
+                    tick_size: float = 0.1, objective: str = "sharpe_ticks", min_trades: int = 10,
+                    workers: Optional[int] = None, source: Optional[str | Path] = None) -> Dict[str, Any]:
+    """
+    Walk-forward evaluation of `grid` (sweep-style parameter dicts). Pass
+    `source`, the replay path the arrays came from, to let workers map a
+    columnar file instead of receiving a shared-memory copy. Returns
+    {"folds": [per-fold dicts], "aggregate": trade_stats over all test trades}.
+    """
+    ts = np.ascontiguousarray(ts, dtype=np.float64)
+    folds = make_folds(ts, n_folds, train_blocks, anchored)
+    job = {"fe_params": dict(fe_params), "grid": [dict(p) for p in grid], "tick_size": tick_size,
+           "objective": objective, "min_trades": min_trades}
+    workers = max(1, min(workers or mp.cpu_count(), len(folds)))
+    if workers == 1:
+        results = [evaluate_fold(ts, bids, asks, f, job) for f in folds]
+    else:
+        shm = None
+        if source is not None and is_columnar(source):
+            src: Tuple[Any, ...] = ("columnar", str(source))
+        else:
+            n, lb, la = ts.shape[0], bids.shape[1], asks.shape[1]
+            shm = shared_memory.SharedMemory(create=True, size=max(8 * n * (1 + 2 * lb + 2 * la), 1))
+            for dst, a in zip(_views(shm.buf, n, lb, la), (ts, bids, asks)):
+                dst[:] = a
+            src = ("shm", shm.name, n, lb, la)
+        try:
+            with mp.get_context("spawn").Pool(workers, initializer=_attach, initargs=(src, job)) as pool:
+                results = pool.map(_run_fold, folds, chunksize=1)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+    pnl = np.concatenate([r["pnl_ticks"] for r in results]) if results else np.empty(0)
+    span = sum(r["test_end"] - r["test_start"] for r in results)
+    return {"folds": results, "aggregate": trade_stats(pnl, span)}
+
+
+def fold_rows(result: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten run_walkforward output into one dict per fold (plus an 'all' row) for CSV/printing."""
+    rows = []
+    for r in result["folds"]:
+        row = {"fold": r["fold"], "train_start": r["train_start"], "test_start": r["test_start"], "test_end": r["test_end"]}
+        row.update({f"param_{k}": v for k, v in (r["params"] or {}).items()})
+        row.update({f"train_{k}": v for k, v in (r["train"] or {}).items() if k in ("trades", "sharpe_ticks")})
+        row.update(r["test"])
+        rows.append(row)
+    rows.append({"fold": "all", **result["aggregate"]})
+    return rows
@@ -0,0 +1,111 @@
+"""
+Local websocket stand-in for Binance depth streams.
+
+Serves a replay file as Binance-shaped combined-stream messages so the live
+path (BinanceIngestor, PipelineRunner, capture) can be exercised offline:
+    {"stream": "<symbol>@depth20@100ms", "data": {"E": ms, "T": ms, "b": [["p", "q"], ...], "a": [...]}}
+"""
+from __future__ import annotations
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .ingest import ReplayIngestor
+
+
+def depth_message(snap, stream: str = "btcusdt@depth20@100ms") -> str:
+    ms = int(round(snap.ts * 1000.0))
+    return json.dumps({"stream": stream, "data": {
+        "e": "depthUpdate", "E": ms, "T": ms,
+        "b": [[repr(float(p)), repr(float(q))] for p, q in snap.bids],
+        "a": [[repr(float(p)), repr(float(q))] for p, q in snap.asks],
+    }})
+
+
+class ReplayWebSocketServer:
+    """
+    Serves `file_path` to every client that connects, paced at `speedup`
+    (0 = as fast as the client reads). Use as an async context manager:
+        async with ReplayWebSocketServer(path, speedup=50) as srv:
+            BinanceIngestor(srv.url).stream()
+    """
+    def __init__(self, file_path: str | Path, speedup: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 stream: str = "btcusdt@depth20@100ms", limit: Optional[int] = None):
+        self.file_path = Path(file_path)
+        self.speedup = speedup
+        self.host = host
+        self.port = port
+        self.stream = stream
+        self.limit = limit
+        self.sent = 0
+        self._server = None
+        self._handlers: set = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/stream?streams={self.stream}"
+
+    async def _handler(self, ws, *_):
+        from websockets import ConnectionClosed
+        self._handlers.add(asyncio.current_task())
+        try:
+            await self._serve(ws)
+        except ConnectionClosed:  # client went away mid-replay
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+
+    async def _serve(self, ws):
+        ing = ReplayIngestor(self.file_path, speedup=self.speedup)
+        n = 0
+        async for snap in ing.stream():
+            await ws.send(depth_message(snap, self.stream))
+            n += 1
+            self.sent += 1
+            if self.limit is not None and n >= self.limit:
+                break
+        await ws.close()
+
+    async def __aenter__(self) -> "ReplayWebSocketServer":
+        import websockets  # lazy import so offline code paths don't need it
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=2**22)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        for task in list(self._handlers):  # a slow-paced handler may be sleeping between sends
+            task.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+
+@contextmanager
+def serve_in_thread(file_path: str | Path, **kwargs) -> Iterator[ReplayWebSocketServer]:
+    """
+    Run a ReplayWebSocketServer on its own event loop in a daemon thread, so
+    its pacing is unaffected by whatever the client loop is doing.
+    """
+    srv = ReplayWebSocketServer(file_path, **kwargs)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    stop: Optional[asyncio.Event] = None
+
+    async def main():
+        nonlocal stop
+        stop = asyncio.Event()
+        async with srv:
+            ready.set()
+            await stop.wait()
+
+    t = threading.Thread(target=loop.run_until_complete, args=(main(),), daemon=True)
+    t.start()
+    ready.wait()
+    try:
+        yield srv
+    finally:
+        loop.call_soon_threadsafe(stop.set)
+        t.join()
+        loop.close()
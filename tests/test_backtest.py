@@ -0,0 +1,36 @@
+from __future__ import annotations
+from typing import NamedTuple
+import numpy as np
+from moa.backtest import RollingBacktester, backtest_signals
+from moa.schemas import Signal
+
+class _MidPoint(NamedTuple):
+    ts: float
+    mid: float
+
+def test_overlapping_positions_streaming_matches_array():
+    rng = np.random.default_rng(13)
+    n, signals = 8000, 4000
+    # bursty arrivals: clusters of near-zero gaps between quiet stretches, so bursts mature together
+    gaps = np.where(rng.random(n) < 0.9, rng.exponential(0.005, n), rng.exponential(0.5, n))
+    ts = 1.7e9 + np.cumsum(gaps)
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, n))
+    direction = np.zeros(n, dtype=np.int8)
+    direction[rng.choice(n, signals, replace=False)] = rng.choice(np.array([1, -1], dtype=np.int8), signals)
+    for exit_on_opposite in (False, True):
+        bt = RollingBacktester(horizon_seconds=60.0, exit_on_opposite_signal=exit_on_opposite)
+        evals, max_open = [], 0
+        for i in range(n):
+            snap = _MidPoint(float(ts[i]), float(mid[i]))
+            if direction[i]:
+                kind = "BUY_PRESSURE" if direction[i] > 0 else "SELL_PRESSURE"
+                bt.on_signal(snap, Signal(ts=snap.ts, kind=kind, strength=1.0))
+            evals += bt.on_snapshot(snap)
+            max_open = max(max_open, bt.open_positions)
+        batch, summary = backtest_signals(ts, mid, direction, horizon_seconds=60.0,
+                                          exit_on_opposite_signal=exit_on_opposite)
+        assert summary == bt.summary() and len(batch) == len(evals) > 0, exit_on_opposite
+        assert np.array_equal(batch.ts, [e.ts for e in evals])
+        assert np.array_equal(batch.entry_mid, [e.entry_mid for e in evals])
+        assert np.array_equal(batch.pnl_ticks, [e.pnl_ticks for e in evals])
+        assert max_open > (5 if exit_on_opposite else 500)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+import yaml
+from moa.cache import CACHE_COLUMNS, FeatureCache, compute_table
+from moa.features import FeatureEngine
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE = ROOT / "data/samples/sample_orderbook.jsonl"
+
+def _copy(tmp_path: Path, name: str = "book.jsonl") -> Path:
+    p = tmp_path / name
+    shutil.copy(SAMPLE, p)
+    return p
+
+def test_hit_after_miss(tmp_path: Path):
+    path, fe = _copy(tmp_path), FeatureEngine()
+    cache = FeatureCache(tmp_path / "cache")
+    assert cache.get(path, fe) is None
+    table, hit = cache.load_or_compute(path, fe)
+    assert not hit and table.shape == (len(CACHE_COLUMNS), 300)
+    again, hit = cache.load_or_compute(path, fe)
+    assert hit and np.array_equal(again, table, equal_nan=True)
+    assert np.array_equal(table, compute_table(path, fe), equal_nan=True)
+    assert FeatureCache(tmp_path / "cache").get(path, fe) is not None  # survives a new process's cache object
+
+def test_key_follows_file_content_and_feature_params(tmp_path: Path):
+    path, fe = _copy(tmp_path), FeatureEngine()
+    cache = FeatureCache(tmp_path / "cache")
+    key = cache.key(path, fe)
+    cache.load_or_compute(path, fe)
+    assert cache.key(_copy(tmp_path, "other.jsonl"), fe) == key  # content, not name
+    assert cache.get(path, FeatureEngine(window_size=50)) is None
+    assert cache.get(path, FeatureEngine(mid_ewma_alpha=0.2)) is None
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]))  # edited in place
+    assert cache.key(path, fe) != key and cache.get(path, fe) is None
+    table, hit = cache.load_or_compute(path, fe)
+    assert not hit and table.shape[1] == 299
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path):
+    path = _copy(tmp_path)
+    cache = FeatureCache(tmp_path / "cache")
+    engines = [FeatureEngine(window_size=w) for w in (5, 10, 15)]
+    for fe in engines:
+        cache.load_or_compute(path, fe)
+    entries = sorted((tmp_path / "cache").glob("*.npy"))
+    size = entries[0].stat().st_size
+    for i, fe in enumerate(engines):  # written 100s, 99s, 98s ago
+        t = 1_700_000_000_000_000_000 + i * 1_000_000_000
+        os.utime(cache._path(cache.key(path, fe)), ns=(t, t))
+    assert cache.get(path, engines[0]) is not None  # a hit makes the oldest the most recent
+    cache.max_bytes = 3 * size
+    cache.load_or_compute(path, FeatureEngine(window_size=20))
+    assert cache.get(path, engines[1]) is None  # least recently used goes first
+    assert all(cache.get(path, fe) is not None for fe in (engines[0], engines[2], FeatureEngine(window_size=20)))
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 3
+
+def test_cached_replay_writes_the_same_csv(tmp_path: Path):
+    cfg = yaml.safe_load((ROOT / "configs/default.yaml").read_text())
+    cfg["replay"].update(file=str(SAMPLE), speedup=0.0)
+    cfg["cache"].update(enabled=True, dir=str(tmp_path / "cache"))
+    (tmp_path / "cfg.yaml").write_text(yaml.safe_dump(cfg))
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+
+    def run(out: str, *extra: str) -> str:
+        return subprocess.run([sys.executable, str(ROOT / "scripts/run_replay.py"), "--config", str(tmp_path / "cfg.yaml"),
+                               "--out", str(tmp_path / out), *extra], env=env, cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout
+
+    assert "computed and cached" in run("cold.csv")
+    assert "loaded from cache" in run("warm.csv")
+    assert "Features" not in run("stream.csv", "--no-cache")  # through the engines
+    stream = (tmp_path / "stream.csv").read_bytes()
+    assert stream and (tmp_path / "cold.csv").read_bytes() == stream == (tmp_path / "warm.csv").read_bytes()
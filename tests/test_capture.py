@@ -0,0 +1,137 @@
+from __future__ import annotations
+import asyncio
+from pathlib import Path
+import numpy as np
+import json
+from moa.capture import CaptureWriter, SegmentWriter, capture
+from moa.columnar import ColumnarBook, convert_jsonl
+from moa.ingest import ReplayIngestor
+from moa.wsreplay import depth_message, serve_in_thread
+
+SAMPLE = "data/samples/sample_orderbook.jsonl"
+STREAM = "btcusdt@depth20@100ms"
+
+async def _capture(url, base, n, capture_kw=None, **kw):
+    async with CaptureWriter(base, flush_s=0.05, **kw) as w:
+        stats = await capture(url, {"btcusdt": w}, max_messages=n, reconnect_s=0.05, **(capture_kw or {}))
+    return w, stats
+
+def _served(levels=None):
+    """What a capture of SAMPLE should replay: ts at ms resolution, sides as sent."""
+    return [(round(s.ts * 1000.0) / 1000.0, s.bids[:levels], s.asks[:levels]) for s in ReplayIngestor(SAMPLE).iter()]
+
+def _same(replayed, expected) -> bool:
+    return len(replayed) == len(expected) and all(
+        r.ts == ts and np.array_equal(r.bids, b) and np.array_equal(r.asks, a) for r, (ts, b, a) in zip(replayed, expected))
+
+def _roundtrip(tmp_path: Path, name: str, limit: int = 120, **kw):
+    n = 2 * limit + 10  # the stand-in hangs up every `limit` messages: two reconnects
+    base = tmp_path / ("btcusdt.moab" if kw.get("fmt") == "columnar" else "btcusdt.jsonl")
+    with serve_in_thread(SAMPLE, speedup=0.0, limit=limit) as srv:
+        w, stats = asyncio.run(_capture(srv.url, base, n, **kw))
+    expected = (_served(kw.get("levels") if kw.get("fmt") == "columnar" else None)[:limit] * 3)[:n]
+    assert stats["messages"] == n and stats["reconnects"] >= 2
+    assert _same(list(ReplayIngestor(base).iter()), expected), name  # read back through the base path
+    return w
+
+def test_rotation_by_size_with_reconnects(tmp_path: Path):
+    w = _roundtrip(tmp_path, "plain", rotate_bytes=16_000)
+    sizes = [p.stat().st_size for p in w.segments]
+    assert len(sizes) > 2 and all(16_000 <= s < 17_000 for s in sizes[:-1]) and sizes[-1] <= 17_000
+    assert [p.name for p in w.segments][:2] == ["btcusdt.00000.jsonl", "btcusdt.00001.jsonl"]
+    moab = convert_jsonl(tmp_path / "btcusdt.jsonl", tmp_path / "all.moab")  # the base path, all segments
+    assert _same(list(ReplayIngestor(moab).iter()),
+                 [(s.ts, s.bids, s.asks) for s in ReplayIngestor(tmp_path / "btcusdt.jsonl").iter()])
+
+def test_rotation_by_time(tmp_path: Path):
+    with serve_in_thread(SAMPLE, speedup=0.0) as srv:
+        w, _ = asyncio.run(_capture(srv.url, tmp_path / "btcusdt.jsonl", 300, rotate_s=10.0))
+    spans = [[s.ts for s in ReplayIngestor(p).iter()] for p in w.segments]
+    assert len(spans) == 8 and sum(map(len, spans)) == 300  # 74.75s of data
+    assert all(ts[-1] - ts[0] < 10.0 for ts in spans)
+    assert all(b[0] - a[0] >= 10.0 for a, b in zip(spans, spans[1:]))
+
+def test_gzip_segments(tmp_path: Path):
+    w = _roundtrip(tmp_path, "gzip", compression="gzip", rotate_bytes=16_000)
+    assert len(w.segments) > 1 and all(p.suffix == ".gz" for p in w.segments)
+
+def test_columnar_segments(tmp_path: Path):
+    w = _roundtrip(tmp_path, "columnar", fmt="columnar", levels=3, rotate_bytes=16_000)
+    assert len(w.segments) > 1 and all(p.suffix == ".moab" for p in w.segments)
+
+def test_columnar_rows_on_disk_before_rotation(tmp_path: Path):
+    payloads = [json.loads(depth_message(s))["data"] for s in ReplayIngestor(SAMPLE).iter()]
+    base = tmp_path / "btcusdt.moab"
+    seg = SegmentWriter(base, fmt="columnar", levels=5)
+    seg.write(payloads[:100])
+    seg.flush()
+    seg.write(payloads[100:150])  # written but not flushed: lost with the process
+    (tmp,) = tmp_path.glob("*.tmp")
+    assert ColumnarBook(tmp).filled == 100
+    del seg  # crash: the segment is never closed
+    SegmentWriter(base, fmt="columnar", levels=5)  # a restarted capture finishes it
+    assert not list(tmp_path.glob("*.tmp"))
+    assert _same(list(ReplayIngestor(base).iter()), _served()[:100])
+    assert len(ColumnarBook(tmp_path / "btcusdt.00000.moab")) == 100
+
+def test_stalled_handshake_reconnects(tmp_path: Path):
+    async def run(port):
+        conns = 0
+        stalled = []
+
+        async def pipe(r, w):
+            try:
+                while data := await r.read(1 << 16):
+                    w.write(data)
+                    await w.drain()
+            except ConnectionError:
+                pass
+            finally:
+                w.close()
+
+        async def handle(reader, writer):
+            nonlocal conns
+            conns += 1
+            if conns == 1:  # accept, swallow the opening handshake, never answer
+                await reader.read(1 << 16)
+                stalled.append(writer)  # keep the socket open
+                return
+            r2, w2 = await asyncio.open_connection("127.0.0.1", port)
+            await asyncio.gather(pipe(reader, w2), pipe(r2, writer))
+
+        proxy = await asyncio.start_server(handle, "127.0.0.1", 0)
+        url = f"ws://127.0.0.1:{proxy.sockets[0].getsockname()[1]}/stream?streams={STREAM}"
+        try:
+            return await _capture(url, tmp_path / "btcusdt.jsonl", 50, capture_kw={"open_timeout": 0.3})
+        finally:
+            for w in stalled:
+                w.close()
+            proxy.close()
+
+    with serve_in_thread(SAMPLE, speedup=0.0) as srv:
+        w, stats = asyncio.run(run(srv.port))
+    assert stats["reconnects"] >= 1 and stats["messages"] == 50
+    assert len(list(ReplayIngestor(tmp_path / "btcusdt.jsonl").iter())) == 50
+
+class _TimesOutOnce:
+    """websockets.connect whose first handshake times out the way Python 3.10 reports it."""
+    def __init__(self, connect):
+        self.connect, self.calls = connect, 0
+
+    def __call__(self, *args, **kw):
+        self.calls += 1
+        return self if self.calls == 1 else self.connect(*args, **kw)
+
+    async def __aenter__(self):
+        raise asyncio.TimeoutError  # not an OSError before 3.11
+
+    async def __aexit__(self, *exc):
+        return False
+
+def test_handshake_timeout_error_reconnects(tmp_path: Path, monkeypatch):
+    import websockets
+    connect = _TimesOutOnce(websockets.connect)
+    monkeypatch.setattr(websockets, "connect", connect)
+    with serve_in_thread(SAMPLE, speedup=0.0) as srv:
+        _, stats = asyncio.run(_capture(srv.url, tmp_path / "btcusdt.jsonl", 50))
+    assert connect.calls == 2 and stats["reconnects"] == 1 and stats["messages"] == 50
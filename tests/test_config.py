@@ -0,0 +1,20 @@
+from __future__ import annotations
+from moa.config import load_config
+
+def test_ws_url_for_substitutes_lower_case_symbols():
+    cfg = load_config("configs/default.yaml")
+    assert cfg.ws_url_for("ETHUSDT") == "wss://fstream.binance.com/stream?streams=ethusdt@depth20@100ms"
+    cfg.ws_url = "wss://fstream.binance.com/stream?streams={symbol}@depth20@100ms"
+    assert cfg.ws_url_for("SolUsdt") == "wss://fstream.binance.com/stream?streams=solusdt@depth20@100ms"
+    cfg.symbol, cfg.ws_url = "BTCUSDT", "wss://fstream.binance.com/stream?streams=btcusdt@depth20@100ms"
+    assert cfg.ws_url_for("ethusdt").endswith("=ethusdt@depth20@100ms")
+
+def test_ws_url_for_without_a_symbol_to_replace_raises():
+    cfg = load_config("configs/default.yaml")
+    cfg.ws_url = "wss://fstream.binance.com/stream?streams=xrpusdt@depth20@100ms"
+    try:
+        cfg.ws_url_for("ethusdt")
+    except ValueError as e:
+        assert "btcusdt" in str(e)
+    else:
+        raise AssertionError("ws_url_for returned the unchanged url")
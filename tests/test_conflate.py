@@ -0,0 +1,56 @@
+from __future__ import annotations
+import asyncio
+import numpy as np
+from moa.backtest import RollingBacktester
+from moa.conflate import Conflator, conflate_index
+from moa.features import FeatureEngine
+from moa.pipeline import PipelineRunner
+from moa.schemas import BookSnapshot
+from moa.signals import ThresholdSignalEngine
+from moa.synthetic import SyntheticBook
+
+def _snaps(rows=3000):
+    ts, bids, asks = SyntheticBook(levels=4, p_size_update=0.05, p_move=0.02, burst_p_move=0.06,
+                                   block_rows=512).arrays(rows)
+    return ts, bids, asks, [BookSnapshot(ts=float(ts[i]), bids=bids[i], asks=asks[i]) for i in range(rows)]
+
+def test_conflator_matches_index_and_keeps_update_rate():
+    ts, bids, asks, snaps = _snaps()
+    ref = FeatureEngine(depth_levels=4, update_rate_window=30)
+    base = [ref.push(s) for s in snaps]
+    row = {id(s): i for i, s in enumerate(snaps)}
+    for kw in (dict(dedupe=True), dict(dedupe=False, bucket_ms=50), dict(dedupe=True, bucket_ms=50)):
+        conf = Conflator(levels=3, keep_ts=30, **kw)
+        fe = FeatureEngine(depth_levels=4, update_rate_window=30)
+        kept = []
+        for snap, skipped in conf.iter(snaps):
+            fe.skip(skipped)
+            fv = fe.push(snap)
+            i = row[id(snap)]
+            assert fv.update_rate == base[i].update_rate and fv.imbalance == base[i].imbalance
+            kept.append(i)
+        assert np.array_equal(conflate_index(ts, bids, asks, levels=3, **kw), kept)
+        st = conf.stats
+        assert st.forwarded == len(kept) < st.received == len(snaps)
+        assert st.received == st.forwarded + st.unchanged + st.bucketed
+
+def test_dedupe_drops_only_repeats():
+    a = BookSnapshot(ts=0.0, bids=np.array([[100.0, 1.0]]), asks=np.array([[101.0, 1.0]]))
+    b = BookSnapshot(ts=0.1, bids=np.array([[100.0, 1.0]]), asks=np.array([[101.0, 1.0]]))
+    c = BookSnapshot(ts=0.2, bids=np.array([[100.0, 2.0]]), asks=np.array([[101.0, 1.0]]))
+    out = list(Conflator(levels=5).iter([a, b, c]))
+    assert [(s.ts, skipped) for s, skipped in out] == [(0.0, ()), (0.2, (0.1,))]
+
+def test_pipeline_with_conflator():
+    _, _, _, snaps = _snaps(1000)
+
+    async def source():
+        for s in snaps:
+            yield s
+
+    conf = Conflator(levels=4, bucket_ms=20)
+    runner = PipelineRunner(source(), FeatureEngine(depth_levels=4), ThresholdSignalEngine(), RollingBacktester(),
+                            policy="block", conflator=conf)
+    stats = asyncio.run(runner.run())
+    assert stats.received == 1000
+    assert stats.processed == conf.stats.forwarded == stats.conflation["forwarded"] < 1000
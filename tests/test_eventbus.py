@@ -0,0 +1,82 @@
+from __future__ import annotations
+import asyncio
+import uuid
+import numpy as np
+from moa.backtest import RollingBacktester
+from moa.bus import EventBus, SharedRing
+from moa.features import FeatureEngine
+from moa.pipeline import PipelineRunner
+from moa.schemas import BookSnapshot, Signal
+from moa.signals import ThresholdSignalEngine
+from moa.synthetic import SyntheticBook
+
+def test_fanout_shares_objects_and_filters_topics():
+    bus = EventBus(capacity=64)
+    every, signals = bus.subscribe(), bus.subscribe(["signal"])
+    sig = Signal(ts=1.0, kind="BUY_PRESSURE", strength=0.2)
+    payloads = [object() for _ in range(10)]
+    for p in payloads:
+        bus.publish("snapshot", p)
+    bus.publish("signal", sig)
+    got = every.poll()
+    assert [t for t, _ in got] == ["snapshot"] * 10 + ["signal"]
+    assert all(a is b for (_, a), b in zip(got, payloads + [sig]))
+    assert signals.poll() == [("signal", sig)] and signals.poll() == []
+    assert every.lag == signals.lag == 0
+
+def test_slow_subscriber_is_lapped_not_waited_for():
+    bus = EventBus(capacity=8)
+    slow, fast = bus.subscribe(name="slow"), bus.subscribe(name="fast")
+    for i in range(5):
+        bus.publish("features", i)
+    assert [ev for _, ev in fast.poll()] == list(range(5))
+    for i in range(5, 30):
+        bus.publish("features", i)
+    assert slow.lag == 30
+    assert [ev for _, ev in slow.poll(5)] == list(range(22, 27))
+    assert slow.missed == 22 and fast.poll(100)[-1] == ("features", 29) and fast.missed == 17
+    assert [ev for _, ev in slow.poll()] == [27, 28, 29]
+    assert bus.stats()["subscribers"]["slow"] == {"received": 8, "missed": 22, "lag": 0}
+
+def test_shared_ring_roundtrip_and_overrun():
+    bus = EventBus(capacity=64)
+    ring = bus.share(name=f"moa_test_{uuid.uuid4().hex[:8]}", topics=["snapshot", "signal"], capacity=4, slot_size=512)
+    reader = SharedRing.attach(ring.name)
+    try:
+        sub = reader.subscribe(["signal"])
+        snap = BookSnapshot(ts=1.0, bids=np.array([[100.0, 1.0]]), asks=np.array([[101.0, 2.0]]))
+        bus.publish("snapshot", snap)
+        bus.publish("features", 1.0)  # not shared
+        bus.publish("signal", Signal(ts=1.0, kind="SELL_PRESSURE", strength=0.3))
+        assert sub.poll() == [("signal", Signal(ts=1.0, kind="SELL_PRESSURE", strength=0.3))]
+        all_sub = reader.subscribe(from_oldest=True)
+        (_, got), _ = all_sub.poll()
+        assert got.ts == 1.0 and np.array_equal(got.asks, snap.asks)
+        for i in range(10):
+            bus.publish("snapshot", snap)
+        assert len(all_sub.poll()) == 4 and all_sub.missed == 6
+        bus.publish("snapshot", BookSnapshot(ts=2.0, bids=np.ones((100, 2)), asks=np.ones((100, 2))))
+        assert ring.oversize == 1 and ring.published == 12
+    finally:
+        reader.close()
+        bus.close()
+
+def test_pipeline_publishes_every_stage():
+    ts, bids, asks = SyntheticBook(levels=4).arrays(2000)
+    snaps = [BookSnapshot(ts=float(ts[i]), bids=bids[i], asks=asks[i]) for i in range(ts.shape[0])]
+
+    async def source():
+        for s in snaps:
+            yield s
+
+    bus = EventBus(capacity=1 << 14)
+    sub = bus.subscribe()
+    seen = []
+    sub.start(lambda topic, ev: seen.append(topic))
+    runner = PipelineRunner(source(), FeatureEngine(depth_levels=4), ThresholdSignalEngine(),
+                            RollingBacktester(tick_size=0.1), policy="block", bus=bus)
+    stats = asyncio.run(runner.run())
+    sub.stop()
+    assert seen.count("snapshot") == seen.count("features") == stats.processed == len(snaps)
+    assert seen.count("signal") == stats.signals and seen.count("evaluation") == stats.evaluations
+    assert stats.as_dict()["bus"]["published"] == len(seen)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+import numpy as np
+from moa.featurelib import FeatureLibrary
+from moa.features import FeatureEngine
+from moa.schemas import BookSnapshot
+from moa.synthetic import SyntheticBook
+
+SPECS = ["ofi", {"name": "ofi", "depth": 5}, "microprice_offset", {"name": "depth_mid", "depth": 5}, "spread_ticks",
+         {"name": "imbalance", "depth": 1}, {"name": "imbalance", "depth": 10},
+         {"name": "decay_imbalance", "decay": 0.5, "depth": 10}, "mid_change"]
+
+def _shallow_book(n: int = 2000, levels: int = 10):
+    """Synthetic rows with some sides cut short or empty, NaN-padded like ReplayIngestor.arrays()."""
+    ts, bids, asks = SyntheticBook(levels=levels).arrays(n)
+    rng = np.random.default_rng(3)
+    depth = rng.integers(0, levels + 1, size=(n, 2))
+    depth[rng.random((n, 2)) < 0.8] = levels  # most rows are full
+    for side, d in ((bids, depth[:, 0]), (asks, depth[:, 1])):
+        side[np.arange(levels)[None, :] >= d[:, None]] = np.nan
+    return ts, bids, asks, depth
+
+def _snaps(ts, bids, asks, depth, empty=np.array([])):
+    def side(a, d):
+        return a[:d] if d else empty
+    return [BookSnapshot(ts=float(ts[i]), bids=side(bids[i], depth[i, 0]), asks=side(asks[i], depth[i, 1]))
+            for i in range(ts.shape[0])]
+
+def test_step_matches_compute_with_shallow_and_empty_sides():
+    ts, bids, asks, depth = _shallow_book()
+    assert (depth == 0).any() and ((depth > 0) & (depth < 10)).any()
+    lib = FeatureLibrary(SPECS, 0.1, horizons=(1, 10))
+    state = lib.new_state()
+    rows = np.array([lib.step(s, state) for s in _snaps(ts, bids, asks, depth)])
+    assert rows.shape == (ts.shape[0], lib.width)
+    batch_state = lib.new_state()
+    assert np.array_equal(rows, lib.compute(bids, asks, batch_state), equal_nan=True)
+    assert np.array_equal(state, batch_state, equal_nan=True)  # same state to carry on from
+
+def test_feature_engine_push_extra_matches_batch():
+    ts, bids, asks, depth = _shallow_book(500)
+    fe = FeatureEngine(depth_levels=10, library=FeatureLibrary(SPECS, 0.1, horizons=(1, 5)))
+    extra = np.array([fe.push(s).extra for s in _snaps(ts, bids, asks, depth, empty=np.empty((0, 2)))])
+    assert np.array_equal(extra, fe.batch(ts, bids, asks).extra, equal_nan=True)
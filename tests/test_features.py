@@ -1,7 +1,10 @@
 from __future__ import annotations
+from collections import deque
 import numpy as np
 from moa.schemas import BookSnapshot
-from moa.features import compute_imbalance, FeatureEngine
+from moa.features import (compute_imbalance, compute_features_batch, FeatureEngine, RollingMoments,
+                          _ewma_step, _rolling_kernel)
+from moa.synthetic import SyntheticBook
 
 def test_imbalance_balanced():
     bids = np.array([[100, 5],[99,5]])
@@ -18,3 +21,65 @@ def test_feature_engine_basic():
         fv = fe.push(snap)
     assert fv.imbalance > 0.0
     assert fv.update_rate > 0.0
+
+def _shallow_rows(n: int = 3000, levels: int = 8):
+    """Synthetic rows, some cut short (one side empty at times), NaN-padded like ReplayIngestor.arrays()."""
+    ts, bids, asks = SyntheticBook(levels=levels).arrays(n)
+    rng = np.random.default_rng(5)
+    depth = rng.integers(0, levels + 1, size=(n, 2))
+    depth[rng.random((n, 2)) < 0.7] = levels
+    for side, d in ((bids, depth[:, 0]), (asks, depth[:, 1])):
+        side[np.arange(levels)[None, :] >= d[:, None]] = np.nan
+    snaps = [BookSnapshot(ts=float(ts[i]), bids=bids[i, :depth[i, 0]], asks=asks[i, :depth[i, 1]]) for i in range(n)]
+    return ts, bids, asks, snaps
+
+def test_compute_features_batch_matches_push():
+    ts, bids, asks, snaps = _shallow_rows()
+    for kw in ({}, {"depth_levels": 3, "window_size": 7, "update_rate_window": 4, "mid_ewma_alpha": 0.3}):
+        fe = FeatureEngine(**kw)
+        rows = [fe.push(s) for s in snaps]
+        fb = compute_features_batch(ts, bids, asks, **kw)
+        for name in ("ts", "imbalance", "bid_slope", "ask_slope", "update_rate", "imbalance_mean", "imbalance_var", "mid_ewma"):
+            assert np.array_equal(getattr(fb, name), [getattr(r, name) for r in rows], equal_nan=True), (name, kw)
+
+def test_rolling_moments_match_numpy_over_the_window():
+    rng = np.random.default_rng(8)
+    xs = np.concatenate([rng.uniform(-1, 1, 400), np.full(50, 0.25), 1e3 + rng.normal(0, 1e-3, 200)])
+    for window in (1, 2, 20, 101):
+        rm, win = RollingMoments(window), deque(maxlen=window)
+        for x in xs:
+            rm.push(float(x))
+            win.append(float(x))
+            assert abs(rm.mean - np.mean(win)) <= 1e-9 * max(1.0, abs(rm.mean)), window
+            assert abs(rm.var - np.var(win)) <= 1e-9 and rm.var >= 0.0, window
+
+def test_ewma_step_matches_closed_form_and_skips_nan():
+    rng = np.random.default_rng(4)
+    x = 100.0 + rng.normal(0, 1, 300)
+    x[[0, 1, 57, 58, 200]] = np.nan
+    alpha, ewma, got = 0.1, np.nan, []
+    for v in x:
+        ewma = _ewma_step(ewma, v, alpha)
+        got.append(ewma)
+    fin = x[np.isfinite(x)]
+    k = np.arange(fin.shape[0])
+    w = alpha * (1 - alpha) ** (k[:, None] - k[None, :])  # weight of fin[j] in step i
+    w[:, 0] = (1 - alpha) ** k  # the first finite value seeds the average
+    expect = np.where(k[:, None] >= k[None, :], w, 0.0) @ fin
+    last = np.maximum.accumulate(np.where(np.isfinite(x), np.cumsum(np.isfinite(x)) - 1, -1))
+    want = np.where(last >= 0, expect[np.maximum(last, 0)], np.nan)  # NaN holds the last value
+    assert np.allclose(got, want, rtol=1e-12, equal_nan=True)
+
+def test_rolling_kernel_matches_streaming_recurrences():
+    rng = np.random.default_rng(6)
+    imb, mid = rng.uniform(-1, 1, 2000), 60000.0 + np.cumsum(rng.normal(0, 0.5, 2000))
+    mid[rng.random(2000) < 0.05] = np.nan
+    for window, alpha in ((1, 0.5), (20, 0.1), (333, 0.01)):
+        rm, ewma, want = RollingMoments(window), np.nan, []
+        for x, m in zip(imb, mid):
+            rm.push(float(x))
+            ewma = _ewma_step(ewma, float(m), alpha)
+            want.append((rm.mean, rm.var, ewma))
+        got = _rolling_kernel(imb, mid, window, alpha)
+        for a, b in zip(got, np.array(want).T):
+            assert np.array_equal(a, b, equal_nan=True), (window, alpha)
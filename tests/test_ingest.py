@@ -1,6 +1,11 @@
 from __future__ import annotations
+import json
 from pathlib import Path
-from moa.ingest import ReplayIngestor
+import numpy as np
+from moa.columnar import ColumnarBook, convert_jsonl
+from moa.ingest import ReplayIngestor, decode_depth, decode_payload
+
+SAMPLE = "data/samples/sample_orderbook.jsonl"
 
 def test_replay_iter(tmp_path: Path):
     p = tmp_path / "s.jsonl"
@@ -9,3 +14,73 @@ def test_replay_iter(tmp_path: Path):
     snaps = list(ing.iter())
     assert len(snaps) == 2
     assert snaps[0].best_bid == 100
+
+def _same_snapshots(a, b) -> bool:
+    return len(a) == len(b) and all(
+        x.ts == y.ts and np.array_equal(x.bids, y.bids) and np.array_equal(x.asks, y.asks) for x, y in zip(a, b))
+
+def test_columnar_replays_the_same_snapshots_as_jsonl(tmp_path: Path):
+    moab = convert_jsonl(SAMPLE, tmp_path / "sample.moab")
+    from_jsonl, from_moab = list(ReplayIngestor(SAMPLE).iter()), list(ReplayIngestor(moab).iter())
+    assert len(from_jsonl) == 300 and _same_snapshots(from_jsonl, from_moab)
+    for a, b in zip(ReplayIngestor(SAMPLE).arrays(), ReplayIngestor(moab).arrays()):
+        assert np.array_equal(a, b, equal_nan=True)
+
+def test_columnar_keeps_rows_shallower_than_the_file(tmp_path: Path):
+    rng = np.random.default_rng(2)
+    src = tmp_path / "shallow.jsonl"
+    with open(src, "w") as f:
+        for i, line in enumerate(open(SAMPLE)):
+            d = json.loads(line)
+            if i:  # the first row sets the file depth
+                d["bids"], d["asks"] = d["bids"][:rng.integers(1, 6)], d["asks"][:rng.integers(1, 6)]
+            f.write(json.dumps(d) + "\n")
+    moab = convert_jsonl(src, tmp_path / "shallow.moab")
+    from_jsonl, from_moab = list(ReplayIngestor(src).iter()), list(ReplayIngestor(moab).iter())
+    assert any(s.bids.shape[0] < 5 for s in from_jsonl) and any(s.asks.shape[0] < 5 for s in from_jsonl)
+    assert ColumnarBook(moab).levels == 5 and _same_snapshots(from_jsonl, from_moab)
+    ts, bids, asks = ReplayIngestor(moab).arrays()
+    for a, b in zip((ts, bids, asks), ReplayIngestor(src).arrays()):
+        assert np.array_equal(a, b, equal_nan=True)
+    assert np.isnan(bids[:, 4]).any()
+
+def _reference_decode(payload: dict, levels: int):
+    """The original per-message decode: truncate each side to `levels`, then sort best-first."""
+    bids = np.array([[float(p), float(q)] for p, q in payload.get("b", [])[:levels]], dtype=float)
+    asks = np.array([[float(p), float(q)] for p, q in payload.get("a", [])[:levels]], dtype=float)
+    if bids.size == 0 or asks.size == 0:
+        return None
+    ts = float(payload.get("E", payload.get("T", 0))) / 1000.0
+    return ts, bids[np.argsort(-bids[:, 0])], asks[np.argsort(asks[:, 0])]
+
+def _payload(rng, nb: int, na: int, shuffle: bool) -> dict:
+    bids = [[f"{60000.0 - 0.1 * k:.1f}", f"{q:.3f}"] for k, q in zip(range(nb), rng.uniform(0.001, 5, nb))]
+    asks = [[f"{60000.1 + 0.1 * k:.1f}", f"{q:.3f}"] for k, q in zip(range(na), rng.uniform(0.001, 5, na))]
+    if shuffle:
+        rng.shuffle(bids)
+        rng.shuffle(asks)
+    return {"e": "depthUpdate", "E": int(rng.integers(1.7e12, 1.8e12)), "T": 1, "b": bids, "a": asks}
+
+def test_decode_payload_matches_reference():
+    rng = np.random.default_rng(9)
+    for i in range(400):
+        p = _payload(rng, int(rng.integers(0, 21)), int(rng.integers(0, 21)), shuffle=i % 2 == 1)
+        if i % 7 == 0:
+            del p["E"]  # falls back to T
+        for levels in (1, 5, 20, 50):
+            want = _reference_decode(p, levels)
+            for got in (decode_payload(p, levels), decode_depth(json.dumps(p), levels),
+                        decode_depth(json.dumps({"stream": "btcusdt@depth20@100ms", "data": p}).encode(), levels)):
+                if want is None:
+                    assert got is None, (i, levels)
+                    continue
+                assert got.ts == want[0] and np.array_equal(got.bids, want[1]) and np.array_equal(got.asks, want[2])
+
+def test_decode_payload_sorts_out_of_order_levels():
+    p = {"E": 1755546238238, "b": [["99.5", "1"], ["100.0", "2"], ["99.9", "3"]], "a": [["100.3", "4"], ["100.1", "5"]]}
+    snap = decode_payload(p)
+    assert snap.ts == 1755546238.238 and (snap.best_bid, snap.best_ask) == (100.0, 100.1)
+    assert snap.bids[:, 0].tolist() == [100.0, 99.9, 99.5] and snap.asks[:, 1].tolist() == [5.0, 4.0]
+    assert decode_payload({**p, "a": []}) is None and decode_payload({"E": 1, "b": p["b"]}) is None
+    wrapped = decode_depth(json.dumps({"stream": "btcusdt@depth20@100ms", "data": p}))
+    assert np.array_equal(wrapped.bids, snap.bids) and np.array_equal(wrapped.asks, snap.asks)
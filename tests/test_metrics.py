@@ -0,0 +1,57 @@
+from __future__ import annotations
+import numpy as np
+from moa.metrics import LatencyHistogram, Profiler
+
+def test_percentiles_within_bucket_error_of_numpy():
+    rng = np.random.default_rng(12)
+    for sub_bits in (3, 5, 7):
+        err = 1.0 / (1 << sub_bits)  # half a bucket over the bucket's lower bound
+        h = LatencyHistogram(sub_bits=sub_bits)
+        x = rng.lognormal(np.log(20_000), 1.2, 50_000).astype(np.int64)  # ns, 20us median with a long tail
+        for v in x.tolist():
+            h.record(v)
+        s = np.sort(x)
+        for q in (1, 10, 50, 90, 99, 99.9, 100):
+            got = h.percentile(q)
+            ref = np.percentile(x, q)
+            rank = max(1, int(round(q / 100 * x.size)))  # nearest-rank, within one rank of numpy's
+            lo, hi = s[max(rank - 2, 0)], s[min(rank, x.size - 1)]
+            assert lo * (1 - err) <= got <= hi * (1 + err) and lo <= ref <= hi, (sub_bits, q, got, ref)
+        assert (h.total, h.min, h.max, h.sum) == (x.size, s[0], s[-1], int(x.sum()))
+
+def test_small_values_exact_and_large_values_clamped():
+    h = LatencyHistogram(sub_bits=5, max_bits=20)
+    for v in range(32):
+        h.record(v)
+    assert [h.percentile(100 * (v + 1) / 32) for v in range(32)] == list(range(32))
+    h.record(-5)
+    h.record(1 << 30)
+    assert h.min == 0 and h.max == (1 << 20) - 1 and abs(h.percentile(100) - h.max) <= h.max / 32
+
+class _Engine:
+    def __init__(self):
+        self.calls = 0
+
+    def step(self, x):
+        self.calls += 1
+        return x if x % 3 == 0 else None
+
+def test_wrap_and_iter_count_calls():
+    prof = Profiler()
+    eng = prof.wrap(_Engine(), "step", "stage", count_truthy="hits")
+    out = [eng.step(x) for x in range(1, 31)]
+    assert eng.calls == 30 and out[2] == 3 and eng.step.__name__ == "step"
+    assert prof.stages["stage"].total == 30 and prof.counters == {"hits": 10}
+    items = list(prof.iter(range(7), "ingest", counter="rows"))
+    assert items == list(range(7)) and prof.stages["ingest"].total == 7 and prof.counters["rows"] == 7
+    rows, counters = prof.report()
+    assert [r["stage"] for r in rows] == ["stage", "ingest"] and rows[0]["count"] == 30
+    assert counters == {"hits": 10, "rows": 7} and "hits=10" in prof.format()
+
+def test_disabled_profiler_changes_nothing():
+    prof = Profiler(enabled=False)
+    eng = _Engine()
+    step = eng.step
+    assert prof.wrap(eng, "step", "stage") is eng and eng.step == step and "step" not in vars(eng)
+    it = iter(range(3))
+    assert prof.iter(it, "ingest") is it and not prof.stages and not prof.counters
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import asyncio
+import json
+import numpy as np
+from moa.orderbook import DiffDepthIngestor, DiffDepthSync, LocalOrderBook, SyntheticDiffFeed
+
+def _same_book(book: LocalOrderBook, feed: SyntheticDiffFeed, k=None) -> bool:
+    got, ref = book.top(k), feed.reference_top(k)
+    return all(np.array_equal(g, r) for g, r in zip(got, ref))
+
+def _run_feed(events=3000, levels=300, every=250, gap_prob=0.0, seed=7, **feed_kw):
+    """Feed a DiffDepthSync the way DiffDepthIngestor does; returns (book, sync, dropped, resyncs)."""
+    feed = SyntheticDiffFeed(levels=levels, seed=seed, **feed_kw)
+    book = LocalOrderBook(0.1, 1, capacity=1 << 10)
+    sync = DiffDepthSync(book)
+    rng = np.random.default_rng(seed + 1)
+    for ev in feed.events(5):  # arrive before the snapshot: buffered, then the stale ones dropped
+        sync.on_event(ev)
+    snap = feed.snapshot()
+    for ev in feed.events(5):
+        sync.on_event(ev)
+    sync.load_snapshot(snap)
+    dropped = resyncs = 0
+    for i in range(events):
+        ev = feed.event()
+        if rng.random() < gap_prob:
+            dropped += 1
+            continue
+        sync.on_event(ev)
+        if sync.needs_snapshot:
+            resyncs += 1
+            sync.load_snapshot(feed.snapshot())
+        if (i + 1) % every == 0:
+            assert _same_book(book, feed) and _same_book(book, feed, 20), f"book differs after event {i}"
+    assert _same_book(book, feed)
+    return book, sync, dropped, resyncs
+
+def test_futures_feed_matches_reference():
+    book, sync, _, resyncs = _run_feed()
+    assert sync.gaps == resyncs == 0 and book.updates > 0
+
+def test_gaps_are_detected_and_resynced():
+    _, sync, dropped, resyncs = _run_feed(gap_prob=0.005)
+    assert dropped > 0 and sync.gaps == resyncs == dropped
+
+def test_spot_ids_without_pu():
+    _, sync, dropped, resyncs = _run_feed(gap_prob=0.005, spot=True)
+    assert dropped > 0 and sync.gaps == resyncs == dropped
+
+def test_book_drifting_off_its_grid():
+    book, _, _, _ = _run_feed(events=5000, p_move=0.9)  # the touch wanders, so the grid has to recentre
+    nb, na = book.depth()
+    assert book.capacity > 1 << 10 and nb > 0 and na > 0  # outgrew the starting grid
+
+def test_grid_prices_match_float_of_venue_strings():
+    for tick, dec in ((0.1, 1), (0.01, 2), (0.5, 1), (0.001, 3), (1.0, 0)):
+        book = LocalOrderBook(tick, dec)
+        units = round(tick * 10 ** dec)
+        ticks = np.random.default_rng(7).integers(1, 10 ** 7, 1000)
+        strs = [f"{t * units / 10 ** dec:.{dec}f}" for t in ticks]
+        assert all(book.price(book.tick(float(s))) == float(s) for s in strs), (tick, dec)
+
+def _ingest_over_websocket(fetch_errors: int = 0, slow: int = 3):
+    """Serve a diff feed on a local socket; `fetch` fails `fetch_errors` times before returning the snapshot."""
+    import websockets
+    feed = SyntheticDiffFeed(levels=200, seed=7)
+    events = feed.events(3)  # subscribed before the REST snapshot was taken
+    snapshot = feed.snapshot()
+    events += feed.events(300)
+    calls = []
+
+    def fetch():
+        calls.append(len(calls))
+        if len(calls) <= fetch_errors:
+            raise OSError("HTTP Error 503: Service Unavailable")
+        return snapshot
+
+    async def run():
+        async def handler(ws, *_):
+            for i, ev in enumerate(events):
+                await ws.send(json.dumps({"stream": "btcusdt@depth@100ms", "data": ev}))
+                if i < slow:  # give the snapshot fetch time to land
+                    await asyncio.sleep(0.05)
+            await ws.close()
+        async with websockets.serve(handler, "127.0.0.1", 0) as srv:
+            port = next(iter(srv.sockets)).getsockname()[1]
+            ing = DiffDepthIngestor(f"ws://127.0.0.1:{port}", fetch=fetch, levels=10, retry_s=0.02)
+            return ing, [s async for s in ing.stream()]
+
+    ing, snaps = asyncio.run(run())
+    ref_b, ref_a = feed.reference_top(10)
+    assert snaps and np.array_equal(snaps[-1].bids, ref_b) and np.array_equal(snaps[-1].asks, ref_a)
+    assert ing.resyncs == 1 and ing.sync.gaps == 0 and snaps[-1].ts == events[-1]["E"] / 1000.0
+    return ing, calls
+
+def test_ingestor_over_websocket():
+    ing, calls = _ingest_over_websocket()
+    assert len(calls) == 1 and ing.fetch_errors == 0
+
+def test_failed_snapshot_fetch_is_retried():
+    ing, calls = _ingest_over_websocket(fetch_errors=1, slow=10)  # events keep coming while the retry backs off
+    assert len(calls) == 2 and ing.fetch_errors == 1
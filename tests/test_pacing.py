@@ -0,0 +1,59 @@
+from __future__ import annotations
+import asyncio
+import time
+from pathlib import Path
+import numpy as np
+from moa.columnar import write_columnar
+from moa.ingest import ReplayIngestor
+from moa.pacing import PacingClock
+
+BOUND_MS = 25.0  # check_pacing holds 5ms over 100k rows on an idle machine; CI is not idle
+
+def _book(tmp_path: Path, n: int = 3000, interval_ms: float = 10.0):
+    rng = np.random.default_rng(21)
+    ts = 1.7e9 + np.cumsum(rng.exponential(interval_ms / 1e3, n))
+    book = np.ones((n, 3, 2))
+    return write_columnar(tmp_path / "pacing.moab", ts, book, book), (ts[-1] - ts[0])
+
+def _check(ing: ReplayIngestor, elapsed: float, scheduled: float):
+    st = ing.clock.lag_stats()
+    assert abs(elapsed - scheduled) * 1e3 <= BOUND_MS and st["p99_ms"] <= BOUND_MS, st
+
+def test_replay_at_50x_has_bounded_drift(tmp_path: Path):
+    path, span = _book(tmp_path)
+    scheduled = span / 50.0
+    for mode in ("sleep", "hybrid"):
+        ing = ReplayIngestor(path, speedup=50.0, pacing=mode)
+        t0 = None
+        for _ in ing.iter():
+            t0 = t0 or time.perf_counter()
+        _check(ing, time.perf_counter() - t0, scheduled)
+
+        async def consume():
+            t0 = None
+            async for _ in ing.stream():
+                t0 = t0 or time.perf_counter()
+            return time.perf_counter() - t0
+        _check(ing, asyncio.run(consume()), scheduled)
+
+def test_hybrid_wait_async_does_not_block_the_loop():
+    clock = PacingClock(speedup=1.0, mode="hybrid", spin_s=0.05)
+    ticks = 0
+
+    async def other():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def run():
+        task = asyncio.create_task(other())
+        await clock.wait_async(0.0)  # anchors
+        await asyncio.sleep(0)
+        before = ticks
+        await clock.wait_async(0.04)  # entirely inside the spin window
+        task.cancel()
+        return ticks - before
+
+    assert asyncio.run(run()) > 10
+    assert clock.lags[-1] < 0.005
@@ -0,0 +1,63 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import astuple
+from moa.backtest import RollingBacktester
+from moa.features import FeatureEngine
+from moa.ingest import BinanceIngestor, ReplayIngestor
+from moa.pipeline import PipelineRunner
+from moa.schemas import BookSnapshot
+from moa.signals import ThresholdSignalEngine
+from moa.synthetic import SyntheticBook
+from moa.wsreplay import serve_in_thread
+
+SAMPLE = "data/samples/sample_orderbook.jsonl"
+
+def _snaps(n: int):
+    ts, bids, asks = SyntheticBook(levels=4).arrays(n)
+    return [BookSnapshot(ts=float(ts[i]), bids=bids[i], asks=asks[i]) for i in range(n)]
+
+def _run_policy(policy: str, snaps, queue_size: int):
+    async def burst():  # never suspends: the stages downstream only run once the reader is done
+        for s in snaps:
+            yield s
+
+    seen = []
+    runner = PipelineRunner(burst(), FeatureEngine(depth_levels=4), ThresholdSignalEngine(),
+                            RollingBacktester(tick_size=0.1), queue_size=queue_size, policy=policy,
+                            on_event=lambda ev: seen.append(ev.snap.ts))
+    return asyncio.run(runner.run()), seen
+
+def test_overflow_policies_with_a_slow_consumer():
+    snaps, q = _snaps(200), 16
+    ts = [s.ts for s in snaps]
+    expected = {"drop_oldest": ts[-q:], "drop_newest": ts[:q], "conflate": ts[:q - 1] + ts[-1:], "block": ts}
+    for policy, kept in expected.items():
+        stats, seen = _run_policy(policy, snaps, q)
+        dropped = 0 if policy == "block" else len(snaps) - q
+        assert stats.received == len(snaps) and stats.processed == len(kept), policy
+        assert stats.dropped == {"snapshots": dropped, "features": 0}, policy
+        assert stats.high_water["snapshots"] == q and seen == kept, policy
+
+def test_pipeline_over_the_websocket_stand_in():
+    fe, se, bt = FeatureEngine(), ThresholdSignalEngine(), RollingBacktester()
+    ref_fv, ref_sig, ref_ev = [], [], []
+    for s in ReplayIngestor(SAMPLE).iter():
+        snap = BookSnapshot(ts=round(s.ts * 1000.0) / 1000.0, bids=s.bids, asks=s.asks)  # ms on the wire
+        fv = fe.push(snap)
+        sig = se.evaluate(fv)
+        if sig:
+            bt.on_signal(snap, sig)
+            ref_sig.append(sig)
+        ref_ev += bt.on_snapshot(snap)
+        ref_fv.append(fv)
+
+    events = []
+    with serve_in_thread(SAMPLE, speedup=0.0) as srv:
+        runner = PipelineRunner(BinanceIngestor(srv.url).stream(), FeatureEngine(), ThresholdSignalEngine(),
+                                RollingBacktester(), policy="block", on_event=events.append)
+        stats = asyncio.run(runner.run())
+    assert stats.received == stats.processed == len(events) == len(ref_fv) == 300
+    assert sum(stats.dropped.values()) == 0 and stats.signals == len(ref_sig) > 0 and ref_ev
+    assert [astuple(e.features)[:-1] for e in events] == [astuple(fv)[:-1] for fv in ref_fv]
+    assert [e.signal for e in events if e.signal] == ref_sig
+    assert [ev for e in events for ev in e.evaluations] == ref_ev
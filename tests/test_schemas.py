@@ -0,0 +1,58 @@
+from __future__ import annotations
+import math
+import numpy as np
+from moa.features import FeatureEngine
+from moa.schemas import BookSnapshot, SnapshotBatch
+from moa.synthetic import SyntheticBook
+
+def _book(i: int, nb: int, na: int) -> BookSnapshot:
+    bids = np.array([[100.0 - i - k, 1.0 + k] for k in range(nb)]).reshape(-1, 2)
+    asks = np.array([[101.0 + i + k, 2.0 + k] for k in range(na)]).reshape(-1, 2)
+    return BookSnapshot(ts=float(i), bids=bids, asks=asks)
+
+def test_top_is_cached_on_first_access():
+    snap = _book(0, 3, 3)
+    assert snap._top is None
+    assert (snap.best_bid, snap.best_ask, snap.mid) == (100.0, 101.0, 100.5)
+    assert snap._top == (100.0, 101.0, 100.5)
+    snap.bids[0, 0] = 50.0  # read-only after first access: the cached touch stands
+    assert snap.mid == 100.5
+    empty = _book(0, 0, 2)
+    assert math.isnan(empty.best_bid) and empty.best_ask == 101.0 and math.isnan(empty.mid)
+
+def test_ring_wraps_oldest_first():
+    batch = SnapshotBatch(4, levels=3, ring=True)
+    snaps = [_book(i, nb=i % 4, na=3 - i % 3) for i in range(10)]  # shallow and empty sides too
+    for s in snaps:
+        batch.append(s)
+    assert len(batch) == 4 and batch.n == 10
+    for got, want in zip(batch, snaps[-4:]):
+        assert got.ts == want.ts and np.array_equal(got.bids, want.bids) and np.array_equal(got.asks, want.asks)
+    assert batch[-1].ts == 9.0 and batch[0].ts == 6.0
+    ts, bids, asks = batch.arrays()
+    assert np.array_equal(ts, [6.0, 7.0, 8.0, 9.0]) and bids.shape == (4, 3, 2)
+    assert np.isnan(bids[0, 2:]).all() and np.array_equal(bids[0, :2], snaps[6].bids)
+    assert np.array_equal(batch.mid, [s.mid for s in snaps[-4:]], equal_nan=True)
+    for bad in (4, -5):
+        try:
+            batch[bad]
+        except IndexError:
+            continue
+        raise AssertionError(f"index {bad} did not raise")
+
+def test_fixed_batch_refuses_to_overwrite():
+    ts, bids, asks = SyntheticBook(levels=3).arrays(5)
+    batch = SnapshotBatch.from_arrays(ts, bids, asks)
+    assert np.array_equal(batch.ts, ts) and len(batch) == 5
+    try:
+        batch.append(batch[0])
+    except IndexError:
+        return
+    raise AssertionError("append to a full SnapshotBatch did not raise")
+
+def test_feature_engine_keeps_snapshots_only_when_asked():
+    snaps = [_book(i, 3, 3) for i in range(30)]
+    plain, keeping = FeatureEngine(window_size=8, depth_levels=3), FeatureEngine(window_size=8, depth_levels=3, keep_snapshots=True)
+    for s in snaps:
+        assert plain.push(s) == keeping.push(s)
+    assert plain.snaps is None and [s.ts for s in keeping.snaps] == [s.ts for s in snaps[-8:]]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+from pathlib import Path
+import numpy as np
+from moa.ingest import ReplayIngestor
+from moa.seekindex import build_index, index_path, load_index, parse_ts
+from moa.synthetic import SyntheticBook
+
+def _ranges(ts):
+    return [(None, None), (ts[500], ts[1200]), (ts[0] - 1, ts[10]), (ts[1990], None),
+            (ts[300] + 1e-7, ts[300] + 2e-7), (ts[-1] + 1, None)]
+
+def test_ranged_replay_matches_filter(tmp_path: Path):
+    gen = SyntheticBook(levels=3, block_rows=256)
+    ts, bids, _ = gen.arrays(2000)
+    for name in ("s.jsonl", "s.jsonl.gz", "s.moab"):
+        path = gen.write(tmp_path / name, 2000)
+        for lo, hi in _ranges(ts):
+            keep = np.ones(ts.shape[0], dtype=bool)
+            if lo is not None:
+                keep &= ts >= lo
+            if hi is not None:
+                keep &= ts < hi
+            ing = ReplayIngestor(path, start_ts=lo, end_ts=hi)
+            got_ts, got_bids, _ = ing.arrays()
+            assert np.array_equal(np.asarray(got_ts), ts[keep]), (name, lo, hi)
+            if keep.any():
+                assert np.array_equal(np.asarray(got_bids), bids[keep])
+            assert [s.ts for s in ing.iter()] == ts[keep].tolist()
+    assert index_path(tmp_path / "s.jsonl").exists()
+
+def test_index_reused_and_refreshed(tmp_path: Path):
+    path = SyntheticBook(levels=2).write(tmp_path / "s.jsonl", 1000)
+    idx = build_index(path, stride=64)
+    assert idx.rows == 1000 and idx.size == path.stat().st_size
+    assert idx.offset[0] == 0 and idx.ts.shape[0] == 16
+    assert load_index(path).stride == 4096  # first call builds and saves with the default stride
+    first = index_path(path).stat().st_mtime_ns
+    load_index(path)
+    assert index_path(path).stat().st_mtime_ns == first
+    SyntheticBook(levels=2).write(path, 1500)
+    assert load_index(path).rows == 1500
+
+def test_segments_and_parallel_chunks(tmp_path: Path):
+    gen = SyntheticBook(levels=3, block_rows=256)
+    ts, bids, asks = gen.arrays(3000)
+    (tmp_path / "cap").mkdir()
+    text = (tmp_path / "all.jsonl")
+    gen.write(text, 3000)
+    lines = text.read_text().splitlines(keepends=True)
+    for k, part in enumerate((lines[:1000], lines[1000:2200], lines[2200:])):
+        (tmp_path / "cap" / f"x.{k:05d}.jsonl").write_text("".join(part))
+    ing = ReplayIngestor(tmp_path / "cap", start_ts=ts[1500], end_ts=ts[2500])
+    assert [c[0].endswith("x.00000.jsonl") for c in ing.chunks(2)].count(True) == 0
+    serial = ing.arrays()
+    parallel = ing.arrays(workers=2)
+    for a, b, ref in zip(serial, parallel, (ts, bids, asks)):
+        assert np.array_equal(a, ref[1500:2500]) and np.array_equal(b, a)
+
+def test_parse_ts():
+    assert parse_ts(None) is None
+    assert parse_ts("1700000000.5") == 1700000000.5
+    assert parse_ts("2023-11-14T22:13:20Z") == parse_ts("2023-11-14T22:13:20") == 1700000000.0
@@ -0,0 +1,65 @@
+from __future__ import annotations
+from pathlib import Path
+from moa.config import load_config
+from moa.featurelib import FeatureLibrary
+from moa.ingest import ReplayIngestor
+from moa.schemas import BookSnapshot
+from moa.shards import build_engines, run_sharded, shard_symbols
+from moa.synthetic import SyntheticBook
+from moa.wsreplay import serve_in_thread
+
+SAMPLE = "data/samples/sample_orderbook.jsonl"
+
+def _serial(cfg, snaps) -> dict:
+    fe, se, bt = build_engines(cfg)
+    for snap in snaps:
+        sig = se.evaluate(fe.push(snap))
+        if sig:
+            bt.on_signal(snap, sig)
+        bt.on_snapshot(snap)
+    return bt.summary()
+
+def test_build_engines_follows_the_config():
+    cfg = load_config("configs/default.yaml")
+    cfg.features.update(window_size=7, update_rate_window=9, mid_ewma_alpha=0.3)
+    cfg.signals.update(imbalance_threshold=0.2, confirm_n=3)
+    cfg.backtest.update(horizon_seconds=2.5, exit_on_opposite_signal=True)
+    fe, se, bt = build_engines(cfg)
+    assert (fe.window_size, fe.update_rate_window, fe.depth_levels, fe.mid_ewma_alpha) == (7, 9, cfg.levels, 0.3)
+    assert fe.library is None and (se.imb_th, se.confirm_n) == (0.2, 3)
+    assert (bt.horizon, bt.exit_on_opposite, bt.tick_size) == (2.5, True, cfg.tick_size)
+    cfg.features["library"]["enabled"] = True
+    fe2, _, _ = build_engines(cfg)
+    assert isinstance(fe2.library, FeatureLibrary) and fe2.library is not fe.library
+    assert build_engines(cfg)[2] is not bt  # fresh engines per symbol
+
+def test_run_sharded_replay_matches_serial(tmp_path: Path):
+    cfg = load_config("configs/default.yaml")
+    cfg.symbols = ["btcusdt", "ethusdt", "solusdt"]
+    cfg.replay.update(speedup=0.0, files={
+        "btcusdt": SAMPLE,
+        "ethusdt": str(SyntheticBook(levels=5, seed=1).write(tmp_path / "eth.jsonl", 3000)),
+        "solusdt": str(SyntheticBook(levels=5, seed=2).write(tmp_path / "sol.moab", 3000))})
+    cfg.pipeline["overflow"] = "block"  # an unpaced replay outruns the engines; keep every snapshot
+    res = run_sharded(cfg, workers=2, health_s=0.2)
+    assert res.shards == shard_symbols(cfg.symbols, 2) == [["btcusdt", "solusdt"], ["ethusdt"]]
+    for sym in cfg.symbols:
+        assert res.summaries[sym] == _serial(cfg, ReplayIngestor(cfg.replay_file(sym)).iter()), sym
+    rows = {r["symbol"]: r for r in res.health_table()}
+    assert rows["btcusdt"]["processed"] == 300 and rows["ethusdt"]["processed"] == 3000
+    assert all(r["dropped"] == 0 for r in rows.values())
+    assert res.signals == sum(s["buy_signals"] + s["sell_signals"] for s in res.summaries.values())
+    assert res.evaluations == sum(s["trades"] for s in res.summaries.values())
+
+def test_run_sharded_live_over_the_websocket_stand_in():
+    cfg = load_config("configs/default.yaml")
+    cfg.mode, cfg.symbols = "live", ["BTCUSDT", "ethusdt"]
+    cfg.pipeline["overflow"] = "block"
+    snaps = [BookSnapshot(ts=round(s.ts * 1000.0) / 1000.0, bids=s.bids, asks=s.asks)  # ms on the wire
+             for s in ReplayIngestor(SAMPLE).iter()]
+    with serve_in_thread(SAMPLE, speedup=0.0) as srv:
+        cfg.ws_url = f"ws://127.0.0.1:{srv.port}/stream?streams={{symbol}}@depth20@100ms"
+        res = run_sharded(cfg, workers=2)
+    expected = _serial(cfg, snaps)
+    assert res.summaries == {"BTCUSDT": expected, "ethusdt": expected}
+    assert srv.sent == 600
@@ -0,0 +1,40 @@
+from __future__ import annotations
+from typing import NamedTuple
+import numpy as np
+from moa.backtest import RollingBacktester, backtest_signals
+from moa.schemas import FeatureVector
+from moa.signals import BUY, SELL, ThresholdSignalEngine, generate_signals
+
+class _MidPoint(NamedTuple):
+    ts: float
+    mid: float
+
+def _features(n: int = 20_000, seed: int = 9):
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.cumsum(rng.exponential(0.25, n))
+    mid = 60000.0 + np.cumsum(rng.normal(0.0, 0.5, n))
+    mid[rng.choice(n, n // 100, replace=False)] = np.nan  # one-sided books
+    imb = np.clip(rng.normal(0.05, 0.3, n), -1, 1)
+    return ts, mid, imb, rng.uniform(0.5, 2.0, n), rng.uniform(0.5, 2.0, n), rng.uniform(1.0, 6.0, n)
+
+def test_kernels_match_streaming_engine_and_backtester():
+    ts, mid, imb, bs, asl, rate = _features()
+    for confirm_n in (0, 1, 2, 4):
+        se, bt = ThresholdSignalEngine(confirm_n=confirm_n), RollingBacktester()
+        direction, strength = np.zeros(ts.shape[0], dtype=np.int8), np.zeros(ts.shape[0])
+        evals = []
+        for i in range(ts.shape[0]):
+            snap = _MidPoint(float(ts[i]), float(mid[i]))
+            sig = se.evaluate(FeatureVector(ts=snap.ts, imbalance=float(imb[i]), bid_slope=float(bs[i]),
+                                            ask_slope=float(asl[i]), update_rate=float(rate[i])))
+            if sig:
+                direction[i], strength[i] = (BUY if sig.kind == "BUY_PRESSURE" else SELL), sig.strength
+                bt.on_signal(snap, sig)
+            evals += bt.on_snapshot(snap)
+
+        got_dir, got_strength = generate_signals(imb, bs, asl, rate, confirm_n=confirm_n)
+        assert np.array_equal(got_dir, direction) and np.array_equal(got_strength, strength), confirm_n
+        batch, summary = backtest_signals(ts, mid, got_dir)
+        assert summary == bt.summary() and summary["trades"] > 0, confirm_n
+        assert np.array_equal(batch.pnl_ticks, [e.pnl_ticks for e in evals])
+        assert np.array_equal(batch.ts, [e.ts for e in evals])
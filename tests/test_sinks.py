@@ -0,0 +1,57 @@
+from __future__ import annotations
+import importlib.util
+from pathlib import Path
+import numpy as np
+from moa.sinks import RESULT_COLUMNS, SIGNAL_LABELS, open_sink, read_results
+
+FORMATS = ("csv", "npz") + (("parquet",) if importlib.util.find_spec("pyarrow") else ())  # pyarrow is optional
+
+def _results(n: int = 1000):
+    rng = np.random.default_rng(17)
+    cols = {c: rng.normal(0, 1, n) for c in ("imbalance", "bid_slope", "ask_slope", "update_rate")}
+    cols["ts"] = 1.7e9 + np.cumsum(rng.exponential(0.1, n))
+    cols["mid"] = 60000.0 + np.cumsum(rng.normal(0, 0.5, n))
+    cols["mid"][[3, n // 2]] = np.nan  # one-sided books
+    cols["direction"] = rng.choice(np.array([0, 0, 0, 1, -1], dtype=np.int8), n)
+    cols["strength"] = np.where(cols["direction"] != 0, rng.uniform(0.1, 0.9, n), np.nan)
+    cols["cum_pnl_ticks"] = np.cumsum(rng.normal(0, 1, n))
+    return cols
+
+def _write(sink, cols, by_row: bool) -> None:
+    names = ("ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate")
+    if not by_row:
+        sink.write_columns(*(cols[c] for c in names), cols["direction"], cols["strength"], cols["cum_pnl_ticks"])
+        return
+    for i in range(cols["ts"].shape[0]):
+        d = int(cols["direction"][i])
+        sink.write_row(*(float(cols[c][i]) for c in names), signal=SIGNAL_LABELS[d % 3],
+                       strength=float(cols["strength"][i]), cum_pnl_ticks=float(cols["cum_pnl_ticks"][i]))
+
+def test_every_sink_round_trips(tmp_path: Path):
+    cols = _results()
+    labels = np.array(SIGNAL_LABELS, dtype=object)[cols["direction"] % 3]
+    for fmt in FORMATS:
+        for threaded in (False, True):
+            for by_row in (True, False):
+                path = tmp_path / f"{fmt}-{threaded}-{by_row}.{fmt}"
+                with open_sink(path, chunk_rows=300, threaded=threaded) as sink:  # 3 full chunks and 100 rows
+                    _write(sink, cols, by_row)
+                assert sink.rows_written == 1000
+                if fmt == "npz":
+                    assert len(list(path.glob("part-*.npz"))) == 4
+                df = read_results(path)
+                assert list(df.columns) == list(RESULT_COLUMNS) and len(df) == 1000, (fmt, threaded, by_row)
+                for c in ("ts", "mid", "imbalance", "bid_slope", "ask_slope", "update_rate", "strength", "cum_pnl_ticks"):
+                    assert np.array_equal(df[c].to_numpy(dtype=float), cols[c], equal_nan=True), (fmt, threaded, by_row, c)
+                assert df["signal"].tolist() == labels.tolist(), (fmt, threaded, by_row)
+
+def test_writer_thread_surfaces_errors(tmp_path: Path):
+    sink = open_sink(tmp_path / "out.npz", chunk_rows=10, threaded=True)
+    sink.path.rmdir()  # parts can no longer be written
+    cols = _results(50)
+    try:
+        _write(sink, cols, by_row=False)
+        sink.close()
+    except OSError:
+        return
+    raise AssertionError("a failed background write was not reported")
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import os
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+HEAVY = ("numba", "pandas", "pyarrow", "streamlit", "altair", "websockets")
+# import time of moa's own modules on top of numpy; MOA_IMPORT_BUDGET_MS overrides
+BUDGET_MS = float(os.environ.get("MOA_IMPORT_BUDGET_MS", 150))
+
+def _importtime(stmt: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": SRC}
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt], env=env,
+                         capture_output=True, text=True, check=True).stderr
+    cumulative = {}
+    for line in err.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cum, name = line.split("|")
+            cumulative[name.strip()] = int(cum) / 1000.0
+    return cumulative
+
+def test_import_budget():
+    for stmt, module in (("import moa.ingest", "moa.ingest"), ("import moa.features", "moa.features")):
+        cum = _importtime(stmt)
+        heavy = sorted(m for m in cum if m.split(".")[0] in HEAVY)
+        assert not heavy, f"{stmt} imports {heavy}"
+        own = cum[module] - cum.get("numpy", 0.0)
+        assert own < BUDGET_MS, f"{stmt}: {own:.0f} ms over numpy, budget {BUDGET_MS:.0f} ms"
+
+def test_fallbacks_match_compiled():
+    from moa import backtest, features
+    from moa.jit import LazyKernel
+    rng = np.random.default_rng(3)
+    depth = features._sum_depth_side.py_func  # LazyKernel and numba dispatcher both expose py_func
+    levels = rng.uniform(0.1, 3.0, (7, 2))
+    assert depth(levels, 5) == LazyKernel(depth).compile()(levels, 5)
+
+    rolling = features._rolling_kernel.py_func
+    imb, mid = rng.normal(size=500), rng.normal(size=500)
+    mid[::7] = np.nan
+    for a, b in zip(rolling(imb, mid, 20, 0.1), LazyKernel(rolling).compile()(imb, mid, 20, 0.1)):
+        assert np.array_equal(a, b, equal_nan=True)
+
+    ts = 1.7e9 + np.cumsum(rng.choice([0.0, 0.1, 0.3], 2000))
+    finite = rng.random(2000) > 0.1
+    sig = np.sort(rng.choice(2000, 300, replace=False)).astype(np.int64)
+    due = np.searchsorted(ts, ts[sig] + 0.3, side="left").astype(np.int64)
+    exits = LazyKernel(backtest._horizon_exits.py_func).compile()(ts, finite, sig, due, 0.3)
+    assert np.array_equal(backtest._horizon_exits_numpy(ts, finite, sig, due, 0.3), exits)
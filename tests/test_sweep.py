@@ -0,0 +1,18 @@
+from __future__ import annotations
+from pathlib import Path
+from moa.features import FeatureEngine
+from moa.sweep import expand_grid, evaluate_params, feature_table, run_sweep, write_results
+from moa.synthetic import SyntheticBook
+
+def test_two_worker_sweep_ranks_like_a_serial_loop(tmp_path: Path):
+    ts, bids, asks = SyntheticBook(levels=5).arrays(20_000)
+    table = feature_table(ts, bids, asks, FeatureEngine())
+    grid = expand_grid({"imbalance_threshold": [0.08, 0.12, 0.9], "confirm_n": [0, 1, 3],
+                        "horizon_seconds": [2.0, 5.0], "exit_on_opposite_signal": [False, True]})
+    serial = [evaluate_params(table, p) for p in grid]
+    serial.sort(key=lambda r: r["avg_pnl_ticks"], reverse=True)
+    assert sum(r["trades"] == 0 for r in serial) > 1  # ties, which must keep grid order
+    pooled = run_sweep(table, grid, workers=2)
+    assert pooled == serial == run_sweep(table, grid, workers=1)
+    out = write_results(pooled, tmp_path / "sweep.csv")
+    assert len(out.read_text().splitlines()) == len(grid) + 1
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from pathlib import Path
+import numpy as np
+from moa.ingest import ReplayIngestor
+from moa.synthetic import SyntheticBook
+
+def test_synthetic_deterministic_prefix():
+    short = SyntheticBook(levels=3, block_rows=100).arrays(250)
+    long = SyntheticBook(levels=3, block_rows=100).arrays(1000)
+    for a, b in zip(short, long):
+        assert np.array_equal(a, b[:250])
+    ts, bids, asks = long
+    assert np.all(np.diff(ts) >= 0)
+    assert np.all(bids[:, 0, 0] < asks[:, 0, 0])
+    assert np.all(np.diff(bids[:, :, 0], axis=1) < 0)
+
+def test_synthetic_roundtrip(tmp_path: Path):
+    gen = SyntheticBook(levels=4, block_rows=64)
+    expected = gen.arrays(300)
+    for name in ("s.jsonl", "s.jsonl.gz", "s.moab"):
+        got = ReplayIngestor(gen.write(tmp_path / name, 300)).arrays()
+        for a, b in zip(got, expected):
+            assert np.array_equal(np.asarray(a), b)
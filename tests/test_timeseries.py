@@ -0,0 +1,57 @@
+from __future__ import annotations
+import numpy as np
+from moa.timeseries import MinMaxSeries, RingBuffer, minmax_decimate
+
+def _walk(n: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), np.cumsum(rng.normal(0, 1, n))
+
+def test_ring_buffer_wraps_oldest_first():
+    rb = RingBuffer(5, columns=2)
+    for i in range(3):
+        rb.append(i, 10 * i)
+    assert len(rb) == 3 and rb.values()[:, 0].tolist() == [0, 1, 2]
+    for i in range(3, 12):
+        rb.append(i, 10 * i)
+    assert len(rb) == 5 and rb.values().tolist() == [[i, 10 * i] for i in range(7, 12)]
+    rb.append(12, 120)  # write position back at the start of the array
+    assert rb.values()[:, 0].tolist() == list(range(8, 13))
+
+def _bucket_spans(n: int, buckets: int):
+    """Sample index ranges the closed buckets should cover: width doubles each time all buckets merge pairwise."""
+    spans, width, start = [], 1, 0
+    while start + width <= n:
+        if len(spans) == buckets:
+            spans = [(a[0], b[1]) for a, b in zip(spans[0::2], spans[1::2])]
+            end, width = start + width, width * 2
+        else:
+            end = start + width
+        spans.append((start, end))
+        start = end
+    return spans, start
+
+def test_minmax_series_buckets_hold_the_true_extremes():
+    t, y = _walk(10_007)
+    s = MinMaxSeries(buckets=64)
+    for i in range(t.shape[0]):
+        s.append(t[i], y[i])
+    spans, open_from = _bucket_spans(t.shape[0], 64)
+    assert s.used == len(spans) <= 64 and s.fill == t.shape[0] - open_from
+    for (a, b), row in zip(spans, s.b[:s.used]):
+        lo, hi = a + np.argmin(y[a:b]), a + np.argmax(y[a:b])
+        assert row.tolist() == [t[lo], y[lo], t[hi], y[hi]], (a, b)
+    pt, py = s.points()
+    assert len(pt) <= 2 * 64 + 3 and np.all(np.diff(pt) > 0)
+    assert np.array_equal(py, y[pt.astype(int)])  # every point is a real sample
+    assert py.min() == y.min() and py.max() == y.max() and (pt[-1], py[-1]) == (t[-1], y[-1])
+
+def test_minmax_decimate_keeps_each_buckets_extremes():
+    t, y = _walk(10_000)
+    dt, dy = minmax_decimate(t, y, 100)
+    assert len(dt) <= 200 and np.all(np.diff(dt) > 0) and np.array_equal(dy, y[dt.astype(int)])
+    edges = np.linspace(0, t.shape[0], 101).astype(np.int64)
+    for a, b in zip(edges[:-1], edges[1:]):
+        inside = dy[(dt >= a) & (dt < b)]
+        assert inside.min() == y[a:b].min() and inside.max() == y[a:b].max()
+    short_t, short_y = minmax_decimate(t[:150], y[:150], 100)  # already small enough
+    assert np.array_equal(short_t, t[:150]) and np.array_equal(short_y, y[:150])
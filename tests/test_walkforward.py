@@ -0,0 +1,77 @@
+from __future__ import annotations
+from pathlib import Path
+import numpy as np
+from moa.columnar import write_columnar
+from moa.features import FeatureEngine
+from moa.sweep import evaluate_params, expand_grid, feature_table
+from moa.synthetic import SyntheticBook
+from moa.walkforward import evaluate_fold, make_folds, run_walkforward, warmup_rows
+
+FE_PARAMS = {"window_size": 20, "update_rate_window": 30, "depth_levels": 5, "mid_ewma_alpha": 0.1}
+GRID = expand_grid({"imbalance_threshold": [0.05, 0.1, 0.2], "confirm_n": [1, 2], "horizon_seconds": [5.0]})
+JOB = {"fe_params": FE_PARAMS, "grid": GRID, "tick_size": 0.1, "objective": "sharpe_ticks", "min_trades": 5}
+
+def _book(rows: int = 20_000):
+    return SyntheticBook(levels=5).arrays(rows)  # ~24 minutes of data
+
+def test_make_folds_rolling_and_anchored():
+    ts = np.arange(101.0)  # blocks of 20 seconds
+    assert [(f.train, f.test) for f in make_folds(ts, 3, train_blocks=2)] == [
+        ((0, 40), (40, 60)), ((20, 60), (60, 80)), ((40, 80), (80, 101))]
+    assert [(f.train, f.test) for f in make_folds(ts, 3, train_blocks=2, anchored=True)] == [
+        ((0, 40), (40, 60)), ((0, 60), (60, 80)), ((0, 80), (80, 101))]
+    assert make_folds(ts, 0) == [] and make_folds(ts[:0], 3) == [] and make_folds(ts, 2, train_blocks=0) == []
+    ts = _book()[0]
+    folds = make_folds(ts, 4)
+    assert [f.index for f in folds] == [0, 1, 2, 3] and folds[0].train[0] == 0 and folds[-1].test[1] == ts.shape[0]
+    block = (ts[-1] - ts[0]) / 5
+    for prev, f in zip(folds, folds[1:]):
+        assert prev.test == f.train and prev.test[1] == f.test[0]  # one train block, tests tile the tail
+    for f in folds:
+        c, d = f.test
+        assert ts[c] - ts[0] >= block * (f.index + 1) > ts[c - 1] - ts[0]  # first row of its block
+
+def test_train_trades_never_see_test_rows():
+    ts, bids, asks = _book()
+    for f in make_folds(ts, 4):
+        (a, b), _ = f.train, f.test
+        res = evaluate_fold(ts, bids, asks, f, JOB)
+        s = max(0, a - warmup_rows(FE_PARAMS))
+        table = feature_table(ts[s:b], bids[s:b], asks[s:b], FeatureEngine(**FE_PARAMS))[:, a - s:]
+        assert res["train"]["trades"] == evaluate_params(table, res["params"])["trades"], f.index  # series cut at b
+        moved_bids, moved_asks = bids.copy(), asks.copy()
+        moved_bids[b:, :, 0] += 500.0  # the book jumps 5000 ticks at the end of the train window
+        moved_asks[b:, :, 0] += 500.0
+        moved = evaluate_fold(ts, moved_bids, moved_asks, f, JOB)
+        assert (moved["params"], moved["train"]) == (res["params"], res["train"]), f.index
+
+def test_warm_start_features_match_the_full_series():
+    ts, bids, asks = _book()
+    w = warmup_rows(FE_PARAMS)
+    assert w == 29
+    for f in make_folds(ts, 4, train_blocks=2):
+        a, d = f.train[0], f.test[1]
+        full = feature_table(ts[:d], bids[:d], asks[:d], FeatureEngine(**FE_PARAMS))[:, a:]
+        s = max(0, a - w)
+        warm = feature_table(ts[s:d], bids[s:d], asks[s:d], FeatureEngine(**FE_PARAMS))[:, a - s:]
+        assert np.array_equal(warm, full, equal_nan=True), f.index
+        if a > w:  # one row less is not enough
+            short = feature_table(ts[s + 1:d], bids[s + 1:d], asks[s + 1:d], FeatureEngine(**FE_PARAMS))[:, a - s - 1:]
+            assert not np.array_equal(short, full, equal_nan=True), f.index
+
+def _same(x, y) -> bool:
+    def plain(r):
+        return {k: v for k, v in r.items() if k != "pnl_ticks"}
+    return (len(x["folds"]) == len(y["folds"]) and x["aggregate"] == y["aggregate"]
+            and all(plain(r) == plain(q) and np.array_equal(r["pnl_ticks"], q["pnl_ticks"]) for r, q in zip(x["folds"], y["folds"])))
+
+def test_worker_processes_match_serial(tmp_path: Path):
+    ts, bids, asks = _book()
+    kw = dict(n_folds=4, min_trades=5)
+    serial = run_walkforward(ts, bids, asks, FE_PARAMS, GRID, workers=1, **kw)
+    assert len(serial["folds"]) == 4 and serial["aggregate"]["trades"] > 0
+    assert _same(run_walkforward(ts, bids, asks, FE_PARAMS, GRID, workers=2, **kw), serial)  # shared memory
+    path = write_columnar(tmp_path / "wf.moab", ts, bids, asks)
+    assert _same(run_walkforward(ts, bids, asks, FE_PARAMS, GRID, workers=2, source=path, **kw), serial)  # mapped file
+    anchored = run_walkforward(ts, bids, asks, FE_PARAMS, GRID, workers=1, anchored=True, **kw)
+    assert _same(run_walkforward(ts, bids, asks, FE_PARAMS, GRID, workers=2, anchored=True, **kw), anchored)